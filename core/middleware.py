@@ -0,0 +1,108 @@
+"""
+Per-request metrics - how many queries a request ran, how long they took,
+how long the whole view took and how big the response was.
+They're sent back in a Server-Timing header (shown in the browser's network
+tab) and written to the metrics log, see METRICS_LOG in settings.
+"""
+import json
+import logging
+import time
+from contextlib import ExitStack
+from typing import Callable
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpRequest, HttpResponse
+
+logger = logging.getLogger("eris.metrics")
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper counting and timing the queries it sees.
+    The SQL of each query is only kept if keep_sql is set, so that
+    requests within their query budget don't hold on to it. Query
+    parameters are never kept, as they can hold session keys and other
+    secrets.
+    """
+
+    def __init__(self, keep_sql: bool = False) -> None:
+        """
+        :param: keep_sql, whether to keep the SQL text of each query
+        """
+        self.keep_sql = keep_sql
+        self.count = 0
+        self.duration = 0.0
+        self.queries: list[tuple[str, float]] = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.duration += duration
+            if self.keep_sql:
+                self.queries.append((sql, duration))
+
+
+class RequestMetricsMiddleware:
+    """
+    Records the query count, database time, view time and response size of
+    each request. If QUERY_BUDGET is set, requests running more queries than
+    it are logged as warnings along with the SQL of every query they ran.
+    """
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        budget: int = getattr(settings, "QUERY_BUDGET", 0)
+        recorder = QueryRecorder(keep_sql=bool(budget))
+
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        view_time = time.perf_counter() - start
+
+        db_ms = recorder.duration * 1000
+        view_ms = view_time * 1000
+
+        response["Server-Timing"] = (
+            f'db;dur={db_ms:.1f};desc="{recorder.count} queries", '
+            f"view;dur={view_ms:.1f}"
+        )
+
+        # the size of a streamed response isn't known until it's sent, and
+        # queries made while streaming aren't counted
+        size = None if response.streaming else len(response.content)
+
+        metrics = {
+            "method": request.method,
+            "path": request.path,
+            "view": getattr(request.resolver_match, "view_name", None),
+            "status": response.status_code,
+            "queries": recorder.count,
+            "db_ms": round(db_ms, 1),
+            "view_ms": round(view_ms, 1),
+            "bytes": size,
+        }
+        logger.info(json.dumps(metrics))
+
+        if budget and recorder.count > budget:
+            logger.warning(
+                "%s %s ran %s queries, over the budget of %s:\n%s",
+                request.method,
+                request.path,
+                recorder.count,
+                budget,
+                "\n".join(
+                    f"[{duration * 1000:.1f} ms] {sql}"
+                    for sql, duration in recorder.queries
+                ),
+            )
+
+        return response
@@ -60,6 +60,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # first, so its metrics cover the queries of the other middleware too
+    "core.middleware.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -175,3 +177,38 @@ HGNC_IDS_TO_OMIT = (
 PANELAPP_API_URL = os.environ.get(
     "PANELAPP_API_URL", "https://panelapp.genomicsengland.co.uk/api/v1/panels/"
 )
+
+# per-request metrics (query count, db time, view time, response size) are
+# written as json lines to this rotating log, see core/middleware.py - if
+# it isn't set, they aren't written anywhere
+METRICS_LOG = os.environ.get("ERIS_METRICS_LOG")
+
+# if set, requests running more queries than this are logged as warnings to
+# the metrics log along with the SQL of every query they ran
+QUERY_BUDGET = int(os.environ.get("ERIS_QUERY_BUDGET") or 0)
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "metrics": (
+            {
+                "class": "logging.handlers.RotatingFileHandler",
+                "filename": METRICS_LOG,
+                "maxBytes": 10 * 1024 * 1024,
+                "backupCount": 5,
+                # the file isn't opened until something is logged
+                "delay": True,
+            }
+            if METRICS_LOG
+            else {"class": "logging.NullHandler"}
+        ),
+    },
+    "loggers": {
+        "eris.metrics": {
+            "handlers": ["metrics"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}
@@ -0,0 +1,143 @@
+import os
+from typing import IO, ContextManager, Iterable, Iterator
+
+import dxpy as dx
+
+from panels_backend.models import (
+    GffRelease,
+    ReferenceGenome,
+    Transcript,
+    TranscriptGffRelease,
+    TranscriptReleaseTranscript,
+)
+
+# number of transcripts read from the db at a time
+G2T_READ_ROWS = 5000
+
+# number of g2t lines joined into each write to the output file
+G2T_WRITE_ROWS = 10000
+
+
+def g2t_rows(
+    ref_genome: ReferenceGenome,
+    release_ids: list[int],
+    gff_release: GffRelease | None = None,
+) -> Iterator[tuple[str, str, bool]]:
+    """
+    Generate the rows of a g2t file - each transcript with its gene and
+    whether it's clinical in the latest transcript releases.
+    Clinical transcripts are found with one query, and transcripts are read
+    in chunks, so the number of queries doesn't grow with the transcripts.
+
+    :param: ref_genome, the reference genome
+    :param: release_ids, ids of the latest MANE Select, MANE Plus Clinical
+    and HGMD releases - a transcript is clinical if it's default clinical in
+    any of them
+    :param: gff_release, if given, only transcripts in this GFF release are
+    included, in the order they were linked to it. Otherwise every
+    transcript of the reference genome is included, in gene order.
+    :return: a generator of (HGNC ID, transcript, clinical)
+    """
+    clinical_ids = set(
+        TranscriptReleaseTranscript.objects.filter(
+            release_id__in=release_ids, default_clinical=True
+        ).values_list("transcript_id", flat=True)
+    )
+
+    if gff_release:
+        transcripts = (
+            TranscriptGffRelease.objects.filter(gff_release=gff_release)
+            .order_by("id")
+            .values_list(
+                "transcript__gene__hgnc_id",
+                "transcript__transcript",
+                "transcript_id",
+            )
+        )
+    else:
+        transcripts = (
+            Transcript.objects.filter(reference_genome=ref_genome)
+            .order_by("gene_id", "id")
+            .values_list("gene__hgnc_id", "transcript", "id")
+        )
+
+    for hgnc_id, transcript, transcript_id in transcripts.iterator(
+        chunk_size=G2T_READ_ROWS
+    ):
+        yield hgnc_id, transcript, transcript_id in clinical_ids
+
+
+class LocalDirectorySink:
+    """
+    Writes g2t files to a local directory - used by tests and benchmarks in
+    place of DNAnexus
+    """
+
+    def __init__(self, directory: str) -> None:
+        """
+        :param: directory, the directory to write files to
+        """
+        self.directory = directory
+
+    def open(self, name: str) -> ContextManager[IO]:
+        """
+        :param: name, the file name
+        :return: the file, open for writing text
+        """
+        return open(os.path.join(self.directory, name), "w", newline="")
+
+
+class DNAnexusSink:
+    """
+    Writes g2t files to a DNAnexus project. The caller must already have set
+    the DNAnexus security context.
+    """
+
+    def __init__(self, project_id: str) -> None:
+        """
+        :param: project_id, the DNAnexus project to write files to
+        """
+        self.project_id = project_id
+
+    def open(self, name: str) -> ContextManager[IO]:
+        """
+        :param: name, the file name
+        :return: a new DNAnexus file, which is closed when the context exits
+        """
+        return dx.new_dxfile(
+            name=name, project=self.project_id, media_type="text/plain"
+        )
+
+
+def write_g2t(
+    rows: Iterable[tuple[str, str, bool]],
+    sink: LocalDirectorySink | DNAnexusSink,
+    name: str,
+) -> int:
+    """
+    Stream g2t rows into a file, as tab-separated HGNC ID, transcript and
+    clinical (True/False) lines. Lines are joined into large chunks, so each
+    write to the file (a network call for DNAnexus) carries many rows.
+
+    :param: rows, the g2t rows, e.g. from g2t_rows
+    :param: sink, where to write the file
+    :param: name, the file name
+    :return: the number of rows written
+    """
+    count = 0
+    lines = []
+
+    with sink.open(name) as f:
+        for hgnc_id, transcript, clinical in rows:
+            lines.append(f"{hgnc_id}\t{transcript}\t{clinical}\n")
+
+            if len(lines) >= G2T_WRITE_ROWS:
+                f.write("".join(lines))
+                count += len(lines)
+                lines = []
+
+        if lines:
+            f.write("".join(lines))
+            count += len(lines)
+
+    return count
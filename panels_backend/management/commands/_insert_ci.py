@@ -1,10 +1,17 @@
 #!usr/bin/env python
 
+import collections
+from typing import Iterable
+
 from django.db import transaction
+from django.db.models import Q
 from packaging.version import Version
 from django.http import HttpRequest
 
-from .history import History
+from .history import History, event_type_of, record_history
+from .utils import gene_set_fingerprint
+from ._td_import import TestDirectoryImport
+from ._lookup_cache import LookupCache
 
 from panels_backend.models import (
     TestDirectoryRelease,
@@ -15,44 +22,78 @@ from panels_backend.models import (
     ClinicalIndicationPanel,
     ClinicalIndicationSuperPanel,
     ClinicalIndicationSuperPanelHistory,
-    Gene,
     PanelGene,
     ClinicalIndicationPanelHistory,
-    ClinicalIndicationTestMethodHistory,
     PanelGeneHistory,
     CiPanelTdRelease,
-    CiPanelTdReleaseHistory,
     CiSuperpanelTdRelease,
-    CiSuperpanelTdReleaseHistory,
 )
 
 
 def _backward_deactivate(
     indications: list[dict], user: HttpRequest | None
-) -> None:
+) -> tuple[int, int]:
     """
-    This function flag any clinical indication that doesn't exist in TestDirectory
+    This function flag any clinical indication that doesn't exist in TestDirectory.
+    The CI-panel and CI-superpanel links of those clinical indications are
+    deactivated and set to pending with one update each, and their history
+    is written in bulk.
 
     :params: indications [list]: list of clinical indication from TD
+    :params: user, either 'request.user' (if called from web) or None (if called from CLI)
+    :return: the number of CI-panel links deactivated
+    :return: the number of CI-superpanel links deactivated
     """
-    r_codes = set([indication["code"] for indication in indications])
+    r_codes = set([indication["code"].strip() for indication in indications])
+    note = History.flag_clinical_indication_panel(
+        "clinical indication not found in latest TD"
+    )
 
-    for clinical_indication in ClinicalIndication.objects.all():
-        if clinical_indication.r_code not in r_codes:
-            for cip in ClinicalIndicationPanel.objects.filter(
-                clinical_indication_id=clinical_indication.id
-            ):
-                cip.current = False  # deactivate ci-panel link
-                cip.pending = True
-                cip.save()
-
-                ClinicalIndicationPanelHistory.objects.create(
-                    clinical_indication_panel_id=cip.id,
-                    note=History.flag_clinical_indication_panel(
-                        "clinical indication not found in latest TD"
-                    ),
-                    user=user,
-                )
+    ci_panel_ids = list(
+        ClinicalIndicationPanel.objects.exclude(
+            clinical_indication__r_code__in=r_codes
+        ).values_list("id", flat=True)
+    )
+    ClinicalIndicationPanel.objects.filter(id__in=ci_panel_ids).update(
+        current=False,  # deactivate ci-panel link
+        pending=True,
+    )
+    ClinicalIndicationPanelHistory.objects.bulk_create(
+        [
+            ClinicalIndicationPanelHistory(
+                clinical_indication_panel_id=ci_panel_id,
+                note=note,
+                event_type=note.event_type,
+                user=user,
+            )
+            for ci_panel_id in ci_panel_ids
+        ]
+    )
+
+    ci_superpanel_ids = list(
+        ClinicalIndicationSuperPanel.objects.exclude(
+            clinical_indication__r_code__in=r_codes
+        ).values_list("id", flat=True)
+    )
+    ClinicalIndicationSuperPanel.objects.filter(
+        id__in=ci_superpanel_ids
+    ).update(
+        current=False,  # deactivate ci-superpanel link
+        pending=True,
+    )
+    ClinicalIndicationSuperPanelHistory.objects.bulk_create(
+        [
+            ClinicalIndicationSuperPanelHistory(
+                clinical_indication_superpanel_id=ci_superpanel_id,
+                note=note,
+                event_type=note.event_type,
+                user=user,
+            )
+            for ci_superpanel_id in ci_superpanel_ids
+        ]
+    )
+
+    return len(ci_panel_ids), len(ci_superpanel_ids)
 
 
 @transaction.atomic
@@ -79,7 +120,8 @@ def flag_clinical_indication_panel_for_review(
     # this function mainly deal with old ci-panel link so changing `current` here to False make sense
     clinical_indication_panel.save()
 
-    ClinicalIndicationPanelHistory.objects.create(
+    record_history(
+        ClinicalIndicationPanelHistory,
         clinical_indication_panel_id=clinical_indication_panel.id,
         note=History.flag_clinical_indication_panel(
             "new clinical indication provided"
@@ -112,7 +154,8 @@ def flag_clinical_indication_superpanel_for_review(
     # this function mainly deal with old ci-panel link so changing `current` here to False make sense
     clinical_indication_panel.save()
 
-    ClinicalIndicationSuperPanelHistory.objects.create(
+    record_history(
+        ClinicalIndicationSuperPanelHistory,
         clinical_indication_superpanel=clinical_indication_panel,
         note=History.flag_clinical_indication_panel(
             "new clinical indication provided"
@@ -161,7 +204,8 @@ def provisionally_link_clinical_indication_to_panel(
         )
 
     if created:
-        ClinicalIndicationPanelHistory.objects.create(
+        record_history(
+            ClinicalIndicationPanelHistory,
             clinical_indication_panel_id=ci_panel_instance.id,
             note=History.auto_created_clinical_indication_panel(),
             user=user,
@@ -210,7 +254,8 @@ def provisionally_link_clinical_indication_to_superpanel(
         )
 
     if created:
-        ClinicalIndicationSuperPanelHistory.objects.create(
+        record_history(
+            ClinicalIndicationSuperPanelHistory,
             clinical_indication_superpanel=ci_superpanel_instance,
             note=History.auto_created_clinical_indication_panel(),
             user=user,
@@ -250,232 +295,277 @@ def _check_td_version_valid(
             )
 
 
-def _retrieve_panel_from_pa_id(pa_id: str) -> Panel | None:
-    """
-    Retrieve a single Panel record based on PA panel id.
-    We order multiple Panel records by version and select the highest,
-    to account for multiple entries.
-    :param: pa_id [str]: panelapp id
-
-    returns:
-        panel_instance [Panel record] or None if a panel isn't found
+def _get_hgnc_panels(hgnc_lists: Iterable[list[str]]) -> dict[str, Panel]:
     """
-    panel_instance: Panel = (
-        Panel.objects.filter(external_id=pa_id)
-        .order_by("-panel_version")
-        .first()
-    )
-
-    if not panel_instance:
-        return None
-
-    return panel_instance
+    Find the test directory panels with the same genes as lists of HGNC ids,
+    in one query. Panels are matched on their gene set fingerprint, so the
+    order and repeats of the ids don't matter. Panels made before
+    fingerprints were stored are matched on their name, which lists their
+    HGNC ids.
 
-
-def _retrieve_superpanel_from_pa_id(pa_id: str) -> SuperPanel | None:
+    :param: hgnc_lists, lists of HGNC ids from the test directory
+    :return: a dict of gene set fingerprint to the matching Panel
     """
-    Retrieve a single SuperPanel record based on PA panel id.
-    We order multiple SuperPanel records by version and select the highest,
-    to account for multiple entries.
-    :param: pa_id [str]: panelapp id
+    hgnc_lists = list(hgnc_lists)
+    fingerprints = {
+        gene_set_fingerprint(hgnc_list) for hgnc_list in hgnc_lists
+    }
+    panel_names = {"&".join(sorted(hgnc_list)) for hgnc_list in hgnc_lists}
 
-    returns:
-        panel_instance [SuperPanel record] or None if a SuperPanel isn't found
-    """
-    panel_instance: SuperPanel = (
-        SuperPanel.objects.filter(external_id=pa_id)
-        .order_by("-panel_version")
-        .first()
-    )
-
-    if not panel_instance:
-        return None
-
-    return panel_instance
-
-
-def _check_for_changed_pg_justification(
-    pg_instance: PanelGene,
-    unique_td_source: str,
-    user: HttpRequest | None = None,
-) -> None:
-    """
-    For a PanelGene instance, check that the justification hasn't changed.
-    Example scenarios: a PanelGene previously defined in Test Directory 5
-    is now defined in Test Directory 6 (or perhaps it's now in PanelApp).
-    If the justification has changed, update it and log it in history.
-    You might run this if there's a new td import, for example.
-
-    :param pg_instance: a PanelGene which might have changed
-    :param unique_td_source: the test directory source, which can be used
-    as a justification.
-    :param: user, either 'request.user' (if called from web) or None (if called from CLI)
-    """
-    if pg_instance.justification != unique_td_source:
-        PanelGeneHistory.objects.create(
-            panel_gene_id=pg_instance.id,
-            note=History.panel_gene_metadata_changed(
-                "justification",
-                pg_instance.justification,
-                unique_td_source,
-            ),
-            user=user,
-        )
+    panels: dict[str, Panel] = {}
+    for panel in Panel.objects.filter(
+        Q(gene_set_fingerprint__in=fingerprints)
+        | Q(gene_set_fingerprint__isnull=True, panel_name__in=panel_names),
+        test_directory=True,
+    ).order_by("-id"):
+        panels[
+            panel.gene_set_fingerprint
+            or gene_set_fingerprint(panel.panel_name.split("&"))
+        ] = panel
 
-        pg_instance.justification = unique_td_source
-        pg_instance.save()
+    return panels
 
 
-def _make_panels_from_hgncs(
-    ci: ClinicalIndication,
+def _make_panels_from_hgnc_lists(
+    hgnc_lists: list[tuple[ClinicalIndication, list[str]]],
     td_release: TestDirectoryRelease,
-    hgnc_list: list,
     user: HttpRequest | None = None,
 ) -> None:
     """
-    Make Panel records from a list of HGNC ids.
+    Make Panel records from the HGNC id lists of several clinical indications
+    in one pass. Each list becomes a test directory panel named after its
+    HGNC ids, linked to its clinical indication.
+    Genes, panels, panel-gene links, CI-panel links and history are fetched
+    and written in bulk, so the number of queries doesn't depend on the
+    number of clinical indications or genes.
 
-    :param: ci [ClinicalIndication record], the CI record to link to the new panel
-    :param: td_release [TestDirectoryRelease], the td release instance to link to the new CI-panel interaction
-    :param: hgnc_list [list], list of HGNC ids which need to be made into a single panel
+    :param: hgnc_lists, a list of (ClinicalIndication, list of HGNC ids)
+    :param: td_release [TestDirectoryRelease], the td release instance to link to the new CI-panel interactions
     :param user: either 'request.user' (if called from web) or None (if called from CLI)
     """
-    # get current config source and test directory date
-    td_source: str = td_release.td_source
-    config_source: str = td_release.config_source
+    if not hgnc_lists:
+        return
 
+    # get current config source and test directory date
     unique_td_source: str = (
-        f"{td_source} + {config_source} + {td_release.td_date}"
+        f"{td_release.td_source} + {td_release.config_source} + "
+        f"{td_release.td_date}"
     )
 
-    conf = moi = mop = pen = None
-
-    panel_name = "&".join(sorted(hgnc_list))
+    gene_sets = {
+        gene_set_fingerprint(hgnc_list): hgnc_list
+        for _, hgnc_list in hgnc_lists
+    }
 
     # create Panel record only when HGNC is different
-    panel_instance, panel_created = Panel.objects.get_or_create(
-        panel_name=panel_name,
-        test_directory=True,
-        defaults={
-            "panel_source": unique_td_source,
-            "external_id": None,
-            "panel_version": "1.0",  # test directory doesn't have versioning of its gene lists - give it 1.0
-        },
+    panels = _get_hgnc_panels(gene_sets.values())
+
+    new_panels = Panel.objects.bulk_create(
+        [
+            Panel(
+                panel_name="&".join(sorted(hgnc_list)),
+                test_directory=True,
+                panel_source=unique_td_source,
+                external_id=None,
+                panel_version="1.0",  # test directory doesn't have versioning of its gene lists - give it 1.0
+                gene_set_fingerprint=fingerprint,
+            )
+            for fingerprint, hgnc_list in gene_sets.items()
+            if fingerprint not in panels
+        ]
     )
+    created_panels = {panel.gene_set_fingerprint for panel in new_panels}
+    panels.update((panel.gene_set_fingerprint, panel) for panel in new_panels)
+
+    # link each HGNC (gene) to its Panel record
+    hgnc_ids = {
+        hgnc_id for hgnc_list in gene_sets.values() for hgnc_id in hgnc_list
+    }
+    cache = LookupCache()
+    cache.prefetch_genes(hgnc_ids)
+    cache.create_missing_genes({hgnc_id: (None, None) for hgnc_id in hgnc_ids})
+
+    panel_genes: dict[tuple[int, int], PanelGene] = {}
+    for panel_gene in PanelGene.objects.filter(
+        panel_id__in=[panel.id for panel in panels.values()],
+        confidence__isnull=True,
+        moi__isnull=True,
+        mop__isnull=True,
+        penetrance__isnull=True,
+        active=True,
+    ).order_by("-id"):
+        panel_genes[(panel_gene.panel_id, panel_gene.gene_id)] = panel_gene
+
+    new_panel_genes: list[PanelGene] = []
+    changed_panel_genes: list[PanelGene] = []
+    panel_gene_history: list[tuple[PanelGene, str]] = []
+
+    for fingerprint, hgnc_list in gene_sets.items():
+        panel = panels[fingerprint]
+
+        for hgnc_id in hgnc_list:
+            gene = cache.gene(hgnc_id)
+            panel_gene = panel_genes.get((panel.id, gene.id))
+
+            if panel_gene is None:
+                # create PanelGene record, linking Panel to HGNC Gene, and add to History
+                panel_gene = PanelGene(
+                    panel=panel,
+                    gene=gene,
+                    active=True,  # this should be True because it's linking HGNC panel to HGNC
+                    justification=unique_td_source,
+                )
+                panel_genes[(panel.id, gene.id)] = panel_gene
+                new_panel_genes.append(panel_gene)
+                panel_gene_history.append(
+                    (panel_gene, History.panel_gene_created())
+                )
 
-    # addition of HGNC, need to retire previous CI-Panel link
-    # and make new CI-Panel link
-
-    # link each HGNC (gene) to the created Panel record
-    for hgnc_id in hgnc_list:
-        gene_instance, _ = Gene.objects.get_or_create(hgnc_id=hgnc_id)
-
-        # create PanelGene record, linking Panel to HGNC Gene, and add to History
-        pg_instance, created = PanelGene.objects.get_or_create(
-            panel_id=panel_instance.id,
-            gene_id=gene_instance.id,
-            confidence=conf,
-            moi=moi,
-            mop=mop,
-            penetrance=pen,
-            active=True,  # this should be True because it's linking HGNC panel to HGNC
-            defaults={
-                "justification": unique_td_source,
-            },
-        )
+            elif panel_gene.justification != unique_td_source:
+                # a Panel-Gene record already exists - change justification
+                panel_gene_history.append(
+                    (
+                        panel_gene,
+                        History.panel_gene_metadata_changed(
+                            "justification",
+                            panel_gene.justification,
+                            unique_td_source,
+                        ),
+                    )
+                )
+                panel_gene.justification = unique_td_source
+                changed_panel_genes.append(panel_gene)
 
-        if created:
-            PanelGeneHistory.objects.create(
-                panel_gene_id=pg_instance.id,
-                note=History.panel_gene_created(),
+    PanelGene.objects.bulk_create(new_panel_genes)
+    PanelGene.objects.bulk_update(
+        changed_panel_genes, ["justification"], batch_size=1000
+    )
+    PanelGeneHistory.objects.bulk_create(
+        [
+            PanelGeneHistory(
+                panel_gene=panel_gene,
+                note=note,
+                event_type=event_type_of(note),
                 user=user,
             )
-        else:
-            # a Panel-Gene record already exists - change justification
-            _check_for_changed_pg_justification(
-                pg_instance, unique_td_source, user
-            )
+            for panel_gene, note in panel_gene_history
+        ]
+    )
+
+    # existing CI-panel links of the clinical indications, and which of them
+    # are already linked to the test directory release
+    ci_ids = {ci.id for ci, _ in hgnc_lists}
+    ci_panels: dict[tuple[int, int], ClinicalIndicationPanel] = {}
+    ci_panels_by_ci = collections.defaultdict(list)
+    for ci_panel in ClinicalIndicationPanel.objects.filter(
+        clinical_indication_id__in=ci_ids
+    ).select_related("panel"):
+        ci_panels[
+            (ci_panel.clinical_indication_id, ci_panel.panel_id)
+        ] = ci_panel
+        ci_panels_by_ci[ci_panel.clinical_indication_id].append(ci_panel)
+
+    linked_to_release = set(
+        CiPanelTdRelease.objects.filter(
+            td_release=td_release,
+            ci_panel__clinical_indication_id__in=ci_ids,
+        ).values_list("ci_panel_id", flat=True)
+    )
+
+    new_ci_panels: list[ClinicalIndicationPanel] = []
+    changed_ci_panels: dict[int, ClinicalIndicationPanel] = {}
+    ci_panel_history: list[tuple[ClinicalIndicationPanel, str]] = []
 
-    if panel_created:  # new panel created
-        previous_ci_panels = ClinicalIndicationPanel.objects.filter(
-            clinical_indication_id=ci.id,
-            panel_id__test_directory=True,
-            current=True,
-        )  # find all previous associated ci-panel
+    for ci, hgnc_list in hgnc_lists:
+        fingerprint = gene_set_fingerprint(hgnc_list)
+        panel = panels[fingerprint]
+
+        if fingerprint in created_panels:  # new panel created
+            # only the first clinical indication with the list sees it as new
+            created_panels.discard(fingerprint)
+
+            # addition of HGNC, need to retire previous CI-Panel link
+            # and make new CI-Panel link
+            previous_ci_panels = [
+                ci_panel
+                for ci_panel in ci_panels_by_ci[ci.id]
+                if ci_panel.panel.test_directory and ci_panel.current
+            ]  # find all previous associated ci-panel
 
-        if previous_ci_panels:  # in the case where there are old ci-panel
             for ci_panel in previous_ci_panels:
-                flag_clinical_indication_panel_for_review(
-                    ci_panel, user
-                )  # flag for review
+                # flag for review
+                ci_panel.pending = True
+                ci_panel.current = False
+                if ci_panel.pk:
+                    changed_ci_panels[ci_panel.pk] = ci_panel
+                ci_panel_history.append(
+                    (
+                        ci_panel,
+                        History.flag_clinical_indication_panel(
+                            "new clinical indication provided"
+                        ),
+                    )
+                )
 
+            if previous_ci_panels:
                 # linking old ci with new panel with pending = True
-                new_clinical_indication_panel = (
-                    provisionally_link_clinical_indication_to_panel(
-                        panel_instance.id, ci.id, td_release, user
+                ci_panel = ClinicalIndicationPanel(
+                    clinical_indication=ci,
+                    panel=panel,
+                    current=True,
+                    pending=True,
+                )
+                ci_panels[(ci.id, panel.id)] = ci_panel
+                ci_panels_by_ci[ci.id].append(ci_panel)
+                new_ci_panels.append(ci_panel)
+                ci_panel_history.append(
+                    (
+                        ci_panel,
+                        History.auto_created_clinical_indication_panel(),
                     )
                 )
 
-                # check if there is any change in config source
-                # update as appropriate
-                new_clinical_indication_panel.config_source = config_source
-
-                new_clinical_indication_panel.save()
+        # a panel or ci might be newly imported (first seed), thus have no previous ci-panel link
+        if (ci.id, panel.id) not in ci_panels:
+            ci_panel = ClinicalIndicationPanel(
+                clinical_indication=ci, panel=panel, current=True
+            )
+            ci_panels[(ci.id, panel.id)] = ci_panel
+            ci_panels_by_ci[ci.id].append(ci_panel)
+            new_ci_panels.append(ci_panel)
+            ci_panel_history.append(
+                (ci_panel, History.clinical_indication_panel_created())
+            )
 
-    # a panel or ci might be newly imported (first seed), thus have no previous ci-panel link
-    cpi_instance, created = ClinicalIndicationPanel.objects.get_or_create(
-        clinical_indication_id=ci.id,
-        panel_id=panel_instance.id,
-        defaults={
-            "current": True,
-        },
-    )
-    # link it to the current test directory release
-    cip_release, _ = CiPanelTdRelease.objects.get_or_create(
-        ci_panel=cpi_instance, td_release=td_release
+    ClinicalIndicationPanel.objects.bulk_create(new_ci_panels)
+    ClinicalIndicationPanel.objects.bulk_update(
+        changed_ci_panels.values(), ["current", "pending"], batch_size=1000
     )
 
-    if created:
-        ClinicalIndicationPanelHistory.objects.create(
-            clinical_indication_panel_id=cpi_instance.id,
-            note=History.clinical_indication_panel_created(),
-            user=user,
-        )
-
-
-def _make_provisional_test_method_change(
-    ci_instance: ClinicalIndication,
-    new_test_method: str,
-    user: HttpRequest | None = None,
-) -> None:
-    """
-    When a test method changes for a clinical indication,
-    set the clinical indication record to `pending` = True,
-    and log this in the history table.
-
-    :param: ci_instance [ClinicalIndication record], the CI record to link to
-    :param: new_test_method [str], new test method
-    :param user: either 'request.user' (if called from web) or None (if called from CLI)
-
-    return: None
-    """
-
-    with transaction.atomic():
-        # record the change in history table first before making the change
-        ClinicalIndicationTestMethodHistory.objects.create(
-            clinical_indication_id=ci_instance.id,
-            note=History.clinical_indication_metadata_changed(
-                "test_method",
-                ci_instance.test_method,
-                new_test_method,
-            ),
-            user=user,
-        )
-
-        ci_instance.pending = True
-        ci_instance.test_method = new_test_method
-
-        ci_instance.save()
+    # link each CI-panel to the current test directory release
+    td_links: dict[int, CiPanelTdRelease] = {}
+    for ci, hgnc_list in hgnc_lists:
+        ci_panel = ci_panels[
+            (ci.id, panels[gene_set_fingerprint(hgnc_list)].id)
+        ]
+        if ci_panel.id not in linked_to_release:
+            td_links.setdefault(
+                ci_panel.id,
+                CiPanelTdRelease(ci_panel=ci_panel, td_release=td_release),
+            )
+    CiPanelTdRelease.objects.bulk_create(td_links.values())
+
+    ClinicalIndicationPanelHistory.objects.bulk_create(
+        [
+            ClinicalIndicationPanelHistory(
+                clinical_indication_panel=ci_panel,
+                note=note,
+                event_type=event_type_of(note),
+                user=user,
+            )
+            for ci_panel, note in ci_panel_history
+        ]
+    )
 
 
 def _fetch_latest_td_version() -> str | None:
@@ -487,289 +577,8 @@ def _fetch_latest_td_version() -> str | None:
     :returns: latest_td [str], the maximum test directory version in
     the database, or None if there isn't an entry yet
     """
-    latest_tds = TestDirectoryRelease.objects.all()
-    if not latest_tds:
-        return None
-    else:
-        releases = [v.release for v in latest_tds]
-        latest = max(releases, key=Version)
-        return latest
-
-
-def _update_ci_panel_tables_with_new_ci(
-    r_code: str,
-    td_version: TestDirectoryRelease,
-    ci_instance: ClinicalIndication,
-    user: HttpRequest | None,
-) -> None:
-    """
-    New clinical indication - the old CI-panel entries with the
-    same R code, will be set to 'pending = True'. The new CI will be linked to
-    those panels, again with 'pending = True' to make it "provisional".
-
-    :param: r_code [str], the R code of the new clinical indication
-    :param: td_version [TestDirectoryRelease], the test directory's version
-    :param: ci_instance [ClinicalIndication], the new ClinicalIndication object
-    in the database which may need linking to some panels
-    :param: user, either 'request.user' (if called from web) or None (if called from CLI)
-    """
-    for clinical_indication_panel in ClinicalIndicationPanel.objects.filter(
-        clinical_indication_id__r_code=r_code,
-        current=True,
-    ):
-        # flag previous ci-panel link for review because a new ci is created
-        flag_clinical_indication_panel_for_review(
-            clinical_indication_panel, user
-        )
-
-        # linking new ci with old panel with pending = True
-        # this might be duplicated down the line when panel is created
-        # but if old panel and new panel are the same, we expect that there
-        # will still be one ci-panel link instead of two being created
-        previous_panel_id = clinical_indication_panel.panel_id
-
-        provisionally_link_clinical_indication_to_panel(
-            previous_panel_id, ci_instance.id, td_version, user
-        )
-
-
-def _update_ci_superpanel_tables_with_new_ci(
-    r_code: str,
-    td_version: TestDirectoryRelease,
-    ci_instance: ClinicalIndication,
-    user: HttpRequest | None,
-) -> None:
-    """
-    New clinical indication - the old CI-superpanel entries with the
-    same R code, will be set to 'pending = True'. The new CI will be linked to
-    those panels, again with 'pending = True' to make it "provisional".
-
-    :param: r_code [str], the R code of the new clinical indication
-    :param: td_version [TestDirectoryRelease], the test directory's version
-    :param: ci_instance [ClinicalIndication], the new ClinicalIndication object
-    in the database which may need linking to some superpanels
-    :param: config_source [str], source metadata for the CI-superpanel link
-    :param: user - the current user, or None if CLI
-    """
-    for (
-        clinical_indication_superpanel
-    ) in ClinicalIndicationSuperPanel.objects.filter(
-        clinical_indication__r_code=r_code,
-        current=True,
-    ):
-        # flag previous ci-panel link for review because a new ci is created
-        flag_clinical_indication_superpanel_for_review(
-            clinical_indication_superpanel
-        )
-
-        # linking new ci with old panel with pending = True
-        # this might be duplicated down the line when panel is created
-        # but if old panel and new panel are the same, we expect that there
-        # will still be one ci-panel link instead of two being created
-        (
-            provisionally_link_clinical_indication_to_superpanel(
-                clinical_indication_superpanel.superpanel,
-                ci_instance,
-                td_version,
-                user,
-            )
-        )
-
-
-def _make_ci_panel_td_link(
-    ci_instance: ClinicalIndication,
-    panel_record: Panel,
-    td_version: TestDirectoryRelease,
-    user: HttpRequest | None = None,
-) -> tuple[ClinicalIndicationPanel, bool]:
-    """
-    Gets-or-creates a ClinicalIndicationPanel entry. Links to test directory release.
-
-    :param: ci_instance [ClinicalIndication], a clinical indication which
-    needs linking to a panel
-    :param: panel_record [Panel], a panel which needs linking to a clinical
-    indication
-    :param: td_version [TestDirectoryRelease], the TD version in the current user-added source
-    :param: user, either a HttpRequest user, or None if not applicable
-
-    :return: a tuple containing the created or fetched ClinicalIndicationPanel
-    instance, plus a bool for if it was created or not
-    """
-    (
-        cip_instance,
-        cip_created,
-    ) = ClinicalIndicationPanel.objects.get_or_create(
-        clinical_indication_id=ci_instance.id,
-        panel_id=panel_record.id,
-        defaults={"current": True},
-    )
-
-    # link the CI-Panel to the current test directory release
-    cipanel_td, cipanel_td_created = CiPanelTdRelease.objects.get_or_create(
-        ci_panel=cip_instance, td_release=td_version
-    )
-
-    if cip_created:
-        # if CI-Panel record is created, create a history record
-        ClinicalIndicationPanelHistory.objects.create(
-            clinical_indication_panel_id=cip_instance.id,
-            note=History.clinical_indication_panel_created(),
-            user=user,
-        )
-
-    # log the fact that a td-ci_panel link was made
-    if cipanel_td_created:
-        CiPanelTdReleaseHistory.objects.create(
-            cip_td=cipanel_td,
-            note=History.td_panel_ci_autolink(
-                td_version.release,
-            ),
-            user=user,
-        )
-
-    return cip_instance, cip_created
-
-
-def _make_ci_superpanel_td_link(
-    ci_instance: ClinicalIndication,
-    superpanel_record: SuperPanel,
-    td_version: TestDirectoryRelease,
-    user: HttpRequest | None = None,
-) -> tuple[ClinicalIndicationSuperPanel, bool]:
-    """
-    Gets-or-creates a ClinicalIndicationSuperPanel entry. Link to td release.
-
-    :param: ci_instance [ClinicalIndication], a clinical indication which
-    needs linking to a panel
-    :param: panel_record [Panel], a panel which needs linking to a clinical
-    indication
-    :param: td_version [str], the TD version in the current user-added source
-    :param: user, either a HttpRequest user, or None if not applicable
-
-    :return: a tuple containing the created or fetched ClinicalIndicationSuperPanel
-    instance, plus a bool for if it was created or not
-    """
-    (
-        cip_instance,
-        cip_created,
-    ) = ClinicalIndicationSuperPanel.objects.get_or_create(
-        clinical_indication=ci_instance,
-        superpanel=superpanel_record,
-        defaults={
-            "current": True,
-        },
-    )
-
-    # link ci-superpanel to current test directory release
-    (
-        cisuperpanel_td,
-        cisuperpanel_td_created,
-    ) = CiSuperpanelTdRelease.objects.get_or_create(
-        ci_superpanel=cip_instance, td_release=td_version
-    )
-
-    if cip_created:
-        # if CI-Panel record is created, create a history record
-        ClinicalIndicationSuperPanelHistory.objects.create(
-            clinical_indication_superpanel=cip_instance,
-            note=History.clinical_indication_superpanel_created(),
-            user=user,
-        ),
-
-    # log the fact that a td-ci_panel link was made
-    if cisuperpanel_td_created:
-        CiSuperpanelTdReleaseHistory.objects.create(
-            cip_td=cisuperpanel_td,
-            note=History.td_superpanel_ci_autolink(
-                cisuperpanel_td.td_release.release,
-            ),
-            user=user,
-        )
-
-    return cip_instance, cip_created
-
-
-def _flag_panels_removed_from_test_directory(
-    ci_instance: ClinicalIndication,
-    panels: list,
-    user: HttpRequest | None = None,
-) -> None:
-    """
-    For a clinical indication, finds any pre-existing links to Panels and
-    checks that each Panel is still in the test directory.
-    If the Panel isn't in the test directory anymore, it sets it to Pending and logs
-    information in history tables.
-
-    :param: ci_instance, a ClinicalIndication which needs its pre-existing links
-    to be found and flagged
-    :param: panels, a list of relevant panels taken from the TD json or other data source
-    :param: user, the current user
-    """
-    ci_panels = ClinicalIndicationPanel.objects.filter(
-        clinical_indication_id__r_code=ci_instance.r_code, current=True
-    )
-
-    for cip in ci_panels:
-        associated_panel = Panel.objects.get(id=cip.panel_id)
-
-        # if for the clinical indication,
-        # the associated panel association is not in test directory
-        # flag for review
-        if (
-            associated_panel.external_id
-            and associated_panel.external_id not in panels
-        ):
-            with transaction.atomic():
-                cip.pending = True
-                cip.current = False
-                cip.save()
-
-                ClinicalIndicationPanelHistory.objects.create(
-                    clinical_indication_panel_id=cip.id,
-                    note=History.flag_clinical_indication_panel(
-                        "Panel ID no longer attached to clinical indication in TD"
-                    ),
-                    user=user,
-                )
-
-
-def _flag_superpanels_removed_from_test_directory(
-    ci_instance: ClinicalIndication,
-    panels: list,
-    user: HttpRequest | None = None,
-) -> None:
-    """
-    For a clinical indication, finds any pre-existing links to SuperPanels and
-    checks that each SuperPanel is still in the test directory.
-    If a SuperPanel isn't in the test directory anymore, it sets it to Pending and logs
-    information in history tables.
-
-    :param: ci_instance, a ClinicalIndication which needs its pre-existing links
-    to be found and flagged
-    :param: panels, a list of relevant superpanels taken from the TD json or other
-    data source
-    :param: user, the current user
-    """
-    ci_superpanels = ClinicalIndicationSuperPanel.objects.filter(
-        clinical_indication__r_code=ci_instance.r_code, current=True
-    )
-
-    for cip in ci_superpanels:
-        # if the linked panel is not in test directory,
-        # flag it for review
-        if cip.superpanel.external_id not in panels:
-            with transaction.atomic():
-                cip.pending = True
-                cip.current = False
-                cip.save()
-
-                ClinicalIndicationSuperPanelHistory.objects.create(
-                    clinical_indication_superpanel=cip,
-                    note=History.flag_clinical_indication_panel(
-                        "Superpanel ID no longer attached to clinical indication in TD"
-                    ),
-                    user=user,
-                )
+    latest_td = TestDirectoryRelease.objects.latest_release()
+    return latest_td.release if latest_td else None
 
 
 def _add_td_release_to_db(
@@ -795,8 +604,11 @@ def _add_td_release_to_db(
         config_source=config_source,
     )
 
-    TestDirectoryReleaseHistory.objects.create(
-        td_release=td, note=History.td_added(), user=user
+    record_history(
+        TestDirectoryReleaseHistory,
+        td_release=td,
+        note=History.td_added(),
+        user=user,
     )
     return td
 
@@ -839,36 +651,28 @@ def insert_test_directory_data(
 
     all_indication: list[dict] = json_data["indications"]
 
-    for indication in all_indication:
-        r_code: str = indication["code"].strip()
+    # preload the clinical indications, panels and links the TD refers to
+    td_import = TestDirectoryImport(all_indication, td_version, user)
 
-        ci_instance, ci_created = ClinicalIndication.objects.get_or_create(
-            r_code=r_code,
-            name=indication["name"],
-            defaults={
-                "test_method": indication["test_method"],
-            },
-        )
+    clinical_indications = td_import.get_or_create_clinical_indications(
+        all_indication
+    )
+
+    # HGNC IDs for each clinical indication, made into panels once the
+    # PanelApp links have been written
+    hgnc_lists: list[tuple[ClinicalIndication, list[str]]] = []
 
+    for indication, (ci_instance, ci_created) in zip(
+        all_indication, clinical_indications
+    ):
         if ci_created:
             # if a clinical indication is new to the db - check it isn't already linked to a panel
             # # under a different name. If it IS, mark the old panel link as pending,
             # and provisionally link the affected panel to this new CI
-            _update_ci_panel_tables_with_new_ci(
-                r_code, td_version, ci_instance, user
+            td_import.ci_panels.relink_new_clinical_indication(ci_instance)
+            td_import.ci_superpanels.relink_new_clinical_indication(
+                ci_instance
             )
-            _update_ci_superpanel_tables_with_new_ci(
-                r_code, td_version, ci_instance, user
-            )
-
-        else:
-            # if this isn't a new clinical indication - check in case test method needs updating
-            if ci_instance.test_method != indication["test_method"]:
-                _make_provisional_test_method_change(
-                    ci_instance,
-                    indication["test_method"],
-                    user,
-                )
 
         # now that clinical indications have been made and added to the database,
         # link each CI record to the appropriate Panel records
@@ -886,23 +690,17 @@ def insert_test_directory_data(
                     hgnc_list.append(pa_id.strip().upper())
                     continue
 
-                # for PA panel ids, retrieve latest version matching Panel and SuperPanel records
-                panel_record: Panel = _retrieve_panel_from_pa_id(pa_id)
-                super_panel_record: SuperPanel = (
-                    _retrieve_superpanel_from_pa_id(pa_id)
-                )
+                # for PA panel ids, use the latest version matching Panel and SuperPanel records
+                panel_record = td_import.panels.get(pa_id)
+                super_panel_record = td_import.superpanels.get(pa_id)
 
                 # if we import the same version of TD but with different config source:
                 if panel_record:
-                    _make_ci_panel_td_link(
-                        ci_instance, panel_record, td_version
-                    )
+                    td_import.ci_panels.link(ci_instance, panel_record)
 
                 if super_panel_record:
-                    _make_ci_superpanel_td_link(
-                        ci_instance,
-                        super_panel_record,
-                        td_version,
+                    td_import.ci_superpanels.link(
+                        ci_instance, super_panel_record
                     )
 
                 if not panel_record and not super_panel_record:
@@ -912,21 +710,43 @@ def insert_test_directory_data(
                         f"{indication['code']}: No Panel or SuperPanel record "
                         f"has panelapp ID {pa_id}"
                     )
-                    pass
 
             # deal with change in clinical indication-panel/superpanel interaction
             # e.g. clinical indication R1 changed from panel 1 to panel 2
-            _flag_panels_removed_from_test_directory(
-                ci_instance, indication["panels"]
-            )
-            _flag_superpanels_removed_from_test_directory(
-                ci_instance, indication["panels"]
-            )
+            for cip in td_import.ci_panels.current_links(ci_instance.r_code):
+                if (
+                    cip.panel.external_id
+                    and cip.panel.external_id not in indication["panels"]
+                ):
+                    td_import.ci_panels.flag_for_review(
+                        cip,
+                        "Panel ID no longer attached to clinical indication in TD",
+                    )
+
+            for cip in td_import.ci_superpanels.current_links(
+                ci_instance.r_code
+            ):
+                if cip.superpanel.external_id not in indication["panels"]:
+                    td_import.ci_superpanels.flag_for_review(
+                        cip,
+                        "Superpanel ID no longer attached to clinical indication in TD",
+                    )
 
         if hgnc_list:
-            _make_panels_from_hgncs(ci_instance, td_version, hgnc_list)
+            hgnc_lists.append((ci_instance, hgnc_list))
+
+    td_import.save()
 
-    _backward_deactivate(all_indication, user)
+    _make_panels_from_hgnc_lists(hgnc_lists, td_version, user)
+
+    deactivated_panels, deactivated_superpanels = _backward_deactivate(
+        all_indication, user
+    )
+    print(
+        f"Flagged {deactivated_panels} clinical indication-panel links and "
+        f"{deactivated_superpanels} clinical indication-superpanel links "
+        "for clinical indications no longer in the test directory"
+    )
 
     print("Data insertion completed.")
     return True
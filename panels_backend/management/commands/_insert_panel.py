@@ -1,5 +1,8 @@
 #!usr/bin/env python
 
+import collections
+import hashlib
+import json
 
 from panels_backend.models import (
     Panel,
@@ -8,31 +11,32 @@ from panels_backend.models import (
     ClinicalIndicationSuperPanel,
     ClinicalIndicationPanel,
     ClinicalIndicationPanelHistory,
-    Gene,
-    Confidence,
     Penetrance,
     ModeOfInheritance,
     ModeOfPathogenicity,
     PanelGene,
     PanelGeneHistory,
     TestDirectoryRelease,
-    CiPanelTdRelease,
-    CiSuperpanelTdRelease,
 )
 
-from .utils import sortable_version
-from .history import History
+from .utils import sortable_version, gene_set_fingerprint
+from .history import (
+    History,
+    HistoryRecorder,
+    event_type_of,
+    record_history,
+)
+from ._lookup_cache import LookupCache
 from ._insert_ci import (
     flag_clinical_indication_panel_for_review,
     flag_clinical_indication_superpanel_for_review,
     provisionally_link_clinical_indication_to_panel,
     provisionally_link_clinical_indication_to_superpanel,
-    _check_for_changed_pg_justification,
 )
-from .panelapp import PanelClass, SuperPanelClass
+from .panelapp import PanelClass, SuperPanelClass, PanelGeneData
 from django.db import transaction
 from django.http import HttpRequest
-from packaging.version import Version
+from typing import Iterable
 
 
 def _handle_nulls_and_blanks_from_json(json_field: str | None) -> str | None:
@@ -56,7 +60,8 @@ def _handle_nulls_and_blanks_from_json(json_field: str | None) -> str | None:
 
 
 def _populate_nullable_gene_fields(
-    gene: dict,
+    gene: PanelGeneData,
+    cache: LookupCache | None = None,
 ) -> tuple[
     ModeOfInheritance | None, ModeOfPathogenicity | None, Penetrance | None
 ]:
@@ -65,164 +70,424 @@ def _populate_nullable_gene_fields(
     Where the fields exist, make them in the db.
     Strips leading and trailing spaces for strings.
 
-    :param: gene - a dictionary containing attributes such as moi, mop, e.t.c. Values
+    :param: gene - a PanelGeneData with attributes such as moi, mop, e.t.c. Values
     might be null
+    :param: cache - a LookupCache for the current run, or None to use a new one
 
     :return: moi_instance, a ModeOfInheritance instance, or None if not applicable
     :return: mop_instance, a ModeOfPathogenicity instance, or None if not applicable
     :return: penetrance, a Penetrance instance, or None if not applicable
     """
+    cache = cache or LookupCache()
+
     moi_instance = None
     mop_instance = None
     penetrance_instance = None
 
-    inheritance = _handle_nulls_and_blanks_from_json(
-        gene.get("mode_of_inheritance")
-    )
+    inheritance = _handle_nulls_and_blanks_from_json(gene.mode_of_inheritance)
     if inheritance:
-        moi_instance, _ = ModeOfInheritance.objects.get_or_create(
-            mode_of_inheritance=inheritance
-        )
+        moi_instance = cache.mode_of_inheritance(inheritance)
 
-    mop = _handle_nulls_and_blanks_from_json(gene.get("mode_of_pathogenicity"))
+    mop = _handle_nulls_and_blanks_from_json(gene.mode_of_pathogenicity)
     if mop:
-        mop_instance, _ = ModeOfPathogenicity.objects.get_or_create(
-            mode_of_pathogenicity=mop,
-        )
+        mop_instance = cache.mode_of_pathogenicity(mop)
 
-    penetrance = _handle_nulls_and_blanks_from_json(gene.get("penetrance"))
+    penetrance = _handle_nulls_and_blanks_from_json(gene.penetrance)
     if penetrance:
-        penetrance_instance, _ = Penetrance.objects.get_or_create(
-            penetrance=penetrance,
-        )
+        penetrance_instance = cache.penetrance(penetrance)
 
     return moi_instance, mop_instance, penetrance_instance
 
 
+def _get_adjacent_panel_versions(
+    panel_instance: Panel,
+) -> tuple[Panel | None, Panel | None]:
+    """
+    Find the versions of a PanelApp panel just before and just after a
+    given version, if there are any
+
+    :param: panel_instance, a version of a PanelApp panel
+    :return: the previous version, or None
+    :return: the next version, or None
+    """
+    versions = Panel.objects.filter(
+        external_id=panel_instance.external_id,
+        panel_source="PanelApp",
+        panel_version__isnull=False,
+    ).exclude(id=panel_instance.id)
+
+    previous_panel = (
+        versions.filter(panel_version__lt=panel_instance.panel_version)
+        .order_by("-panel_version")
+        .first()
+    )
+    next_panel = (
+        versions.filter(panel_version__gt=panel_instance.panel_version)
+        .order_by("panel_version")
+        .first()
+    )
+
+    return previous_panel, next_panel
+
+
+def _has_same_panel_gene_state(
+    panel_gene: PanelGene, other_panel_gene: PanelGene
+) -> bool:
+    """
+    Check whether two PanelGene links have the same gene, metadata and
+    review state, so that one can be used in place of the other
+
+    :param: panel_gene, a PanelGene
+    :param: other_panel_gene, another PanelGene
+    :return: True if the links are interchangeable
+    """
+    fields = [
+        "gene_id",
+        "confidence_id",
+        "moi_id",
+        "mop_id",
+        "penetrance_id",
+        "justification",
+        "active",
+        "pending",
+    ]
+    return all(
+        getattr(panel_gene, field) == getattr(other_panel_gene, field)
+        for field in fields
+    )
+
+
+def _split_panel_genes_to_change(
+    genes_to_link: list[PanelGeneData],
+    panel_genes: dict[str, list[PanelGene]],
+    panel_instance: Panel,
+) -> None:
+    """
+    Before flagging existing links, or changing their justification, for a
+    panel version which is seeded again, split them off from any other
+    versions sharing them, so that the changes only apply to this version
+
+    :param: genes_to_link, the panel's genes from PanelApp
+    :param: panel_genes, the panel version's existing links by HGNC ID -
+    updated in place
+    :param: panel_instance, the Panel version
+    """
+    to_change: dict[int, PanelGene] = {}
+
+    for single_gene in genes_to_link:
+        existing = panel_genes.get(single_gene.hgnc_id, [])
+
+        if float(single_gene.confidence_level) != 3.0:
+            to_change.update(
+                (panel_gene.id, panel_gene) for panel_gene in existing
+            )
+        elif existing and existing[0].justification != "PanelApp":
+            to_change[existing[0].id] = existing[0]
+
+    if not to_change:
+        return
+
+    own = PanelGene.objects.split_for_panel(
+        list(to_change.values()), panel_instance
+    )
+
+    for hgnc_id, links in panel_genes.items():
+        panel_genes[hgnc_id] = [
+            own.get(panel_gene.id, panel_gene) for panel_gene in links
+        ]
+
+
+def _share_unchanged_panel_genes(
+    panel_instance: Panel,
+    previous_panel: Panel,
+    next_panel: Panel | None,
+    panel_genes_to_create: list[PanelGene],
+    panel_genes_to_update: dict[int, PanelGene],
+    history_notes: list[tuple[PanelGene, str]],
+) -> tuple[list[PanelGene], list[tuple[PanelGene, str]]]:
+    """
+    For a new version of a PanelApp panel, replace new links which are
+    unchanged from the previous version with the previous version's links,
+    so that only the genes which changed are written.
+    Links from the previous version which don't apply to the new version are
+    ended at it. If a later version was already in the db, and shared the
+    ended link, the link is copied for the later version.
+
+    :param: panel_instance, the new Panel version
+    :param: previous_panel, the version before it
+    :param: next_panel, the version after it if there is one, or None
+    :param: panel_genes_to_create, new PanelGene links for the new version
+    :param: panel_genes_to_update, existing PanelGene links which need
+    saving, by ID - updated in place
+    :param: history_notes, history notes for new and updated links
+    :return: the new links which still need creating
+    :return: the history notes which still need creating
+    """
+    next_version = next_panel.panel_version if next_panel else None
+
+    # links which applied to the previous version, by gene
+    previous_panel_genes: dict[int, PanelGene] = {}
+    for panel_gene in PanelGene.objects.for_panel(previous_panel).order_by(
+        "-id"
+    ):
+        previous_panel_genes[panel_gene.gene_id] = panel_gene
+
+    still_to_create: list[PanelGene] = []
+    shared_ids: set[int] = set()
+    unneeded: list[PanelGene] = []
+
+    for panel_gene in panel_genes_to_create:
+        previous = previous_panel_genes.get(panel_gene.gene_id)
+
+        if previous and _has_same_panel_gene_state(panel_gene, previous):
+            # the previous version's link applies unchanged
+            shared_ids.add(previous.id)
+            unneeded.append(panel_gene)
+
+            if not previous.shared:
+                previous.shared = True
+                previous.valid_until = next_version
+                panel_genes_to_update[previous.id] = previous
+        else:
+            still_to_create.append(panel_gene)
+
+    for previous in previous_panel_genes.values():
+        if previous.id in shared_ids or not previous.shared:
+            continue
+
+        old_valid_until = previous.valid_until
+        if (
+            old_valid_until is not None
+            and old_valid_until <= panel_instance.panel_version
+        ):
+            continue
+
+        # the link stops applying from the new version
+        previous.valid_until = panel_instance.panel_version
+        panel_genes_to_update[previous.id] = previous
+
+        # ...but carries on for a later version which shared it
+        if next_panel and (
+            old_valid_until is None or old_valid_until > next_version
+        ):
+            still_to_create.append(
+                PanelGene(
+                    panel_id=next_panel.id,
+                    gene_id=previous.gene_id,
+                    confidence_id=previous.confidence_id,
+                    moi_id=previous.moi_id,
+                    mop_id=previous.mop_id,
+                    penetrance_id=previous.penetrance_id,
+                    justification=previous.justification,
+                    active=previous.active,
+                    pending=previous.pending,
+                    shared=True,
+                    valid_until=old_valid_until,
+                )
+            )
+
+    unneeded_ids = {id(panel_gene) for panel_gene in unneeded}
+    remaining_notes = [
+        (panel_gene, note)
+        for panel_gene, note in history_notes
+        if id(panel_gene) not in unneeded_ids
+    ]
+
+    return still_to_create, remaining_notes
+
+
 def _insert_gene(
     panel: PanelClass,
     panel_instance: Panel,
     panel_created: bool,
     user: HttpRequest | None = None,
+    cache: LookupCache | None = None,
 ) -> None:
     """
     Function to insert gene component of Panel into database.
+    Existing PanelGene records for the panel are fetched in one query and
+    compared with the panel's genes in memory. New PanelGenes, changed
+    PanelGenes and their history are then written in bulk.
+    Versions of a PanelApp panel share PanelGenes for genes which haven't
+    changed, so a new version only writes links for the genes which have.
+    Changes made when re-seeding an existing version apply to the links it
+    shares with other versions.
 
     :param panel: PanelClass object
     :param panel_instance: Panel object
     :param panel_created: boolean to indicate if panel is newly created
     :param user: the user if web, or None if CLI
+    :param cache: a LookupCache for the current run, or None to use a new one
     """
-    # attaching each Gene record to Panel record
-    for single_gene in panel.genes:
-        gene_data: dict = single_gene.get("gene_data")
-
-        if not gene_data:
-            continue
+    cache = cache or LookupCache()
 
-        hgnc_id = gene_data.get("hgnc_id")
-        confidence_level = single_gene.get("confidence_level")
+    genes_to_link: list[PanelGeneData] = []
 
-        if not hgnc_id:
+    for single_gene in panel.genes:
+        if not single_gene.hgnc_id:
             print(
-                f"For panel {str(panel.name)}, skipping gene without HGNC ID: {str(gene_data['gene_name'])}"
+                f"For panel {str(panel.name)}, skipping gene without HGNC ID: {str(single_gene.gene_name)}"
             )
             continue
 
         # there is only confidence level 0 1 2 3
         # and we only fetch confidence level 3
         try:
-            if float(confidence_level) != 3.0:
-                # check if panel-gene exist in db
-                # flag as pending and return
-                # else move on
-                existing_panel_genes = PanelGene.objects.filter(
-                    gene_id__hgnc_id=hgnc_id, panel_id=panel_instance.id
-                )
-                if existing_panel_genes.exists():
-                    for panel_gene in existing_panel_genes:
-                        with transaction.atomic():
-                            panel_gene.active = False
-                            panel_gene.pending = True
-                            panel_gene.save()
-
-                            # this is recording duplicate records as there're duplicate genes within the same panel with varying confidence level
-                            # either filter out those genes or something
-                            PanelGeneHistory.objects.create(
-                                panel_gene_id=panel_gene.id,
-                                note=History.panel_gene_flagged_due_to_confidence(
-                                    confidence_level
-                                ),
-                                user=user,
-                            )
-                continue  # if panel-gene doesn't exist in db then we don't care about this gene with confidence level < 3
-            else:
-                pass  # if gene is confidence level 3 then we move on
+            float(single_gene.confidence_level)
         except (ValueError, TypeError):
             # the confidence_level is an alphabetical, None, or some other type that can't be converted to float
             print(
                 f"For panel {str(panel.name)}, skipping gene without confidence "
-                f"information: {str(gene_data['gene_name'])}"
+                f"information: {str(single_gene.gene_name)}"
             )
             continue
 
-        gene_symbol = gene_data.get("gene_symbol")
-        alias_symbols = gene_data.get("alias", [])
-
-        # don't update gene symbol here. We do it when seeding hgnc dump
-        gene_instance, _ = Gene.objects.get_or_create(
-            hgnc_id=hgnc_id,
-            defaults={
-                "gene_symbol": gene_symbol,
-                "alias_symbols": ",".join(sorted(alias_symbols))
-                if alias_symbols
-                else None,
-            },
+        genes_to_link.append(single_gene)
+
+    # make any level 3 genes which aren't in the db yet, in one batch
+    # don't update gene symbol here. We do it when seeding hgnc dump
+    new_genes: dict[str, tuple[str | None, str | None]] = {}
+    for single_gene in genes_to_link:
+        if float(single_gene.confidence_level) == 3.0:
+            new_genes.setdefault(
+                single_gene.hgnc_id,
+                (
+                    single_gene.gene_symbol,
+                    ",".join(sorted(single_gene.alias_symbols))
+                    if single_gene.alias_symbols
+                    else None,
+                ),
+            )
+    cache.prefetch_genes(list(new_genes))
+    cache.create_missing_genes(new_genes)
+
+    # versions of a PanelApp panel share links to unchanged genes
+    shares_panel_genes = PanelGene.objects.shares_panel_genes(panel_instance)
+    previous_panel = next_panel = None
+    if shares_panel_genes:
+        previous_panel, next_panel = _get_adjacent_panel_versions(
+            panel_instance
         )
 
-        confidence_instance, _ = Confidence.objects.get_or_create(
-            confidence_level=3,  # we only seed level 3 confidence
+    # existing panel-gene records for this panel, by HGNC ID
+    # a new panel version starts without any - links from the previous
+    # version are only shared with it at the end, if they're unchanged
+    panel_genes: dict[str, list[PanelGene]] = collections.defaultdict(list)
+    if not panel_created:
+        for panel_gene in (
+            PanelGene.objects.for_panel(panel_instance)
+            .select_related("gene")
+            .order_by("id")
+        ):
+            panel_genes[panel_gene.gene.hgnc_id].append(panel_gene)
+        _split_panel_genes_to_change(
+            genes_to_link, panel_genes, panel_instance
         )
 
+    panel_genes_to_create: list[PanelGene] = []
+    panel_genes_to_update: dict[int, PanelGene] = {}
+    history_notes: list[tuple[PanelGene, str]] = []
+
+    # genes are handled in the order PanelApp lists them, as a gene can
+    # appear more than once with different confidence levels
+    for single_gene in genes_to_link:
+        hgnc_id = single_gene.hgnc_id
+        confidence_level = single_gene.confidence_level
+
+        if float(confidence_level) != 3.0:
+            # if panel-gene exist in db, flag as pending
+            # if panel-gene doesn't exist in db then we don't care about this gene with confidence level < 3
+            for panel_gene in panel_genes.get(hgnc_id, []):
+                panel_gene.active = False
+                panel_gene.pending = True
+                if panel_gene.id:
+                    panel_genes_to_update[panel_gene.id] = panel_gene
+
+                # this is recording duplicate records as there're duplicate genes within the same panel with varying confidence level
+                # either filter out those genes or something
+                history_notes.append(
+                    (
+                        panel_gene,
+                        History.panel_gene_flagged_due_to_confidence(
+                            confidence_level
+                        ),
+                    )
+                )
+            continue
+
+        if panel_genes.get(hgnc_id):
+            # Panel-Gene record already exist
+            # meaning probably there's a new PanelApp import
+            # with a different justification
+            panel_gene = panel_genes[hgnc_id][0]
+            if panel_gene.justification != "PanelApp":
+                history_notes.append(
+                    (
+                        panel_gene,
+                        History.panel_gene_metadata_changed(
+                            "justification",
+                            panel_gene.justification,
+                            "PanelApp",
+                        ),
+                    )
+                )
+                panel_gene.justification = "PanelApp"
+                if panel_gene.id:
+                    panel_genes_to_update[panel_gene.id] = panel_gene
+            continue
+
         (
             moi_instance,
             mop_instance,
             penetrance_instance,
-        ) = _populate_nullable_gene_fields(single_gene)
-
-        pg_instance, pg_created = PanelGene.objects.get_or_create(
-            panel_id=panel_instance.id,
-            gene_id=gene_instance.id,
-            defaults={
-                "justification": "PanelApp",
-                "confidence_id": confidence_instance.id,
-                "moi_id": (moi_instance.id if moi_instance else None),
-                "mop_id": (mop_instance.id if mop_instance else None),
-                "penetrance_id": (
-                    penetrance_instance.id if penetrance_instance else None
-                ),
-                "active": True,
-            },
-        )
+        ) = _populate_nullable_gene_fields(single_gene, cache)
 
         # if panel-gene record is newly created and the panel already exist in db
         # this mean the panel-gene record is newly added in PanelApp API
         # which will require our manual review
-        if pg_created and not panel_created:
-            pg_instance.pending = True
-            pg_instance.save()
-
-        if pg_created:
-            PanelGeneHistory.objects.create(
-                panel_gene_id=pg_instance.id,
-                note=History.panel_gene_created(),
+        panel_gene = PanelGene(
+            panel_id=panel_instance.id,
+            gene=cache.gene(hgnc_id),
+            justification="PanelApp",
+            confidence=cache.confidence(3),  # we only seed level 3 confidence
+            moi=moi_instance,
+            mop=mop_instance,
+            penetrance=penetrance_instance,
+            active=True,
+            pending=not panel_created,
+            shared=shares_panel_genes,
+            valid_until=next_panel.panel_version if next_panel else None,
+        )
+        panel_genes[hgnc_id].append(panel_gene)
+        panel_genes_to_create.append(panel_gene)
+        history_notes.append((panel_gene, History.panel_gene_created()))
+
+    if panel_created and previous_panel:
+        panel_genes_to_create, history_notes = _share_unchanged_panel_genes(
+            panel_instance,
+            previous_panel,
+            next_panel,
+            panel_genes_to_create,
+            panel_genes_to_update,
+            history_notes,
+        )
+
+    PanelGene.objects.bulk_create(panel_genes_to_create)
+    PanelGene.objects.bulk_update(
+        panel_genes_to_update.values(),
+        ["active", "pending", "justification", "shared", "valid_until"],
+    )
+    PanelGeneHistory.objects.bulk_create(
+        [
+            PanelGeneHistory(
+                panel_gene=panel_gene,
+                note=note,
+                event_type=event_type_of(note),
                 user=user,
             )
-        else:
-            # Panel-Gene record already exist
-            # meaning probably there's a new PanelApp import
-            # with a different justification
-            _check_for_changed_pg_justification(pg_instance, "PanelApp", user)
+            for panel_gene, note in history_notes
+        ]
+    )
 
 
 def _get_most_recent_td_release_for_ci_panel(
@@ -237,20 +502,9 @@ def _get_most_recent_td_release_for_ci_panel(
     :param ci_panel: the ClinicalIndicationPanel for which we want the most recent td release
     :return: most recent TestDirectoryRelease, or None if no db entries
     """
-    # get all td_releases
-    releases = CiPanelTdRelease.objects.filter(ci_panel=ci_panel)
-    if not releases:
-        return None
-    else:
-        # get the latest release - use packaging Version to do sorting
-        td_releases = [v.td_release.release for v in releases]
-        latest_td = max(td_releases, key=Version)
-
-        # return the instance for that release
-        latest_td_instance = TestDirectoryRelease.objects.get(
-            release=latest_td
-        )
-        return latest_td_instance
+    return TestDirectoryRelease.objects.filter(
+        cipaneltdrelease__ci_panel=ci_panel
+    ).latest_release()
 
 
 def _get_most_recent_td_release_for_ci_superpanel(
@@ -262,22 +516,9 @@ def _get_most_recent_td_release_for_ci_superpanel(
     Used in cases where an inferred link is being made between a new CI and a new SuperPanel,
     based on data which exists for earlier versions of the same R code and SuperPanel ID.
     """
-    # get all td_releases
-    releases = CiSuperpanelTdRelease.objects.filter(
-        ci_superpanel=ci_superpanel
-    )
-    if not releases:
-        return None
-    else:
-        # get the latest release - use packaging Version to do sorting
-        td_releases = [v.td_release.release for v in releases]
-        latest_td = max(td_releases, key=Version)
-
-        # return the instance for that release
-        latest_td_instance = TestDirectoryRelease.objects.get(
-            release=latest_td
-        )
-        return latest_td_instance
+    return TestDirectoryRelease.objects.filter(
+        cisuperpaneltdrelease__ci_superpanel=ci_superpanel
+    ).latest_release()
 
 
 def _disable_custom_hgnc_panels(
@@ -286,30 +527,25 @@ def _disable_custom_hgnc_panels(
     """
     Function to disable custom hgnc panels
     if a PanelApp-created panel is linked to exactly the same HGNC IDs as
-    those in the "ACTIVE" custom panel's name
+    an "ACTIVE" custom panel. Custom panels are matched on their indexed
+    gene set fingerprint, rather than on the HGNC IDs in their name
 
     NOTE: if it's inactive custom panel, that's fine
 
     :param panel: PanelClass object
     :param user: either 'request.user' (if called from web) or None (if called from CLI)
     """
-    genes: list[dict[str, str]] = [
-        gene.get("gene_data") for gene in panel.genes if gene.get("gene_data")
+    hgnc_ids: list[str] = [
+        gene.hgnc_id for gene in panel.genes if gene.hgnc_id
     ]
 
-    potential_hgnc_panel_name: str = "&".join(
-        sorted(
-            [
-                gene.get("hgnc_id").strip().upper()
-                for gene in genes
-                if gene.get("hgnc_id")
-            ]
-        )
-    )
+    if not hgnc_ids:
+        return
 
     # will only have 1 hgnc panel
     hgnc_panels = Panel.objects.filter(
-        panel_name=potential_hgnc_panel_name, test_directory=True
+        gene_set_fingerprint=gene_set_fingerprint(hgnc_ids),
+        test_directory=True,
     )
 
     if hgnc_panels.exists():
@@ -325,28 +561,89 @@ def _disable_custom_hgnc_panels(
             cip.current = False
             cip.save()
 
-            ClinicalIndicationPanelHistory.objects.create(
+            record_history(
+                ClinicalIndicationPanelHistory,
                 clinical_indication_panel_id=cip.id,
-                note="Panel of similar genes has been created in PanelApp",
+                note=History.similar_panel_created_in_panelapp(),
                 user=user,
             )
 
 
+def _get_panel_content_hash(panel: PanelClass) -> str:
+    """
+    Make a hash of the gene content of a parsed panel - the HGNC ID,
+    confidence, MOI, MOP and penetrance of each gene.
+    Genes are sorted first, so the order PanelApp lists them in doesn't
+    change the hash.
+
+    :param: panel [PanelClass], parsed panel input from the API
+    :return: a sha256 hex digest
+    """
+    gene_content = sorted(
+        [
+            str(field or "")
+            for field in (
+                gene.hgnc_id,
+                gene.confidence_level,
+                _handle_nulls_and_blanks_from_json(gene.mode_of_inheritance),
+                _handle_nulls_and_blanks_from_json(gene.mode_of_pathogenicity),
+                _handle_nulls_and_blanks_from_json(gene.penetrance),
+            )
+        ]
+        for gene in panel.genes
+    )
+
+    return hashlib.sha256(json.dumps(gene_content).encode()).hexdigest()
+
+
+def _get_superpanel_content_hash(child_panels: list[Panel]) -> str:
+    """
+    Make a hash of a superpanel's child panels - the external ID, version
+    and content hash of each one
+
+    :param: child_panels [list[Panel]], the child panels in the db
+    :return: a sha256 hex digest
+    """
+    child_content = sorted(
+        [
+            str(field or "")
+            for field in (
+                child.external_id,
+                child.panel_version,
+                child.content_hash,
+            )
+        ]
+        for child in child_panels
+    )
+
+    return hashlib.sha256(json.dumps(child_content).encode()).hexdigest()
+
+
 def _insert_panel_data_into_db(
-    panel: PanelClass, user: HttpRequest | None = None
+    panel: PanelClass,
+    user: HttpRequest | None = None,
+    cache: LookupCache | None = None,
+    summary: collections.Counter | None = None,
 ) -> Panel:
     """
     Insert data from a parsed JSON panel record, into the database.
     Controls creation and flagging of new and old CI-Panel links,
     where the Panel version has changed.
     Controls creation of genes.
+    If the panel is already in the database with the same gene content,
+    gene insertion and the custom panel check are skipped.
 
     :param: panel [PanelClass], parsed panel input from the API
     :param: user if web, None if CLI
+    :param: cache, a LookupCache for the current run, or None to use a new one
+    :param: summary, a Counter of "skipped" and "changed" panels for the
+    current run, or None
     """
     panel_external_id: str = panel.id
     panel_name: str = panel.name
     panel_version: str = panel.version
+    content_hash: str = _get_panel_content_hash(panel)
+    summary = summary if summary is not None else collections.Counter()
 
     # if there's a change in the panel_name or panel_version,
     # create a new record
@@ -357,9 +654,17 @@ def _insert_panel_data_into_db(
         defaults={
             "panel_source": panel.panel_source,
             "test_directory": False,
+            "content_hash": content_hash,
         },
     )
 
+    # the genes haven't changed since this panel was last seeded
+    if not created and panel_instance.content_hash == content_hash:
+        summary["skipped"] += 1
+        return panel_instance, created
+
+    summary["changed"] += 1
+
     # if created, the new Panel record will have a different name or version,
     # regardless of panel_source
     if created:
@@ -397,9 +702,13 @@ def _insert_panel_data_into_db(
 
     # attach each Gene record to the Panel record,
     # whether it was created just now or was already in the database
-    _insert_gene(panel, panel_instance, created)
+    _insert_gene(panel, panel_instance, created, cache=cache)
     _disable_custom_hgnc_panels(panel, user)
 
+    if panel_instance.content_hash != content_hash:
+        panel_instance.content_hash = content_hash
+        panel_instance.save(update_fields=["content_hash"])
+
     return panel_instance, created
 
 
@@ -407,6 +716,7 @@ def _insert_superpanel_into_db(
     superpanel: SuperPanelClass,
     child_panels: list[Panel],
     user: HttpRequest | None = None,
+    summary: collections.Counter | None = None,
 ) -> None:
     """
     Insert data from a parsed SuperPanel.
@@ -419,10 +729,14 @@ def _insert_superpanel_into_db(
     the SuperPanel. These are already added to the db, so they're a list
     of database objects.
     :param: user if web, None if CLI
+    :param: summary, a Counter of "skipped" and "changed" panels for the
+    current run, or None
     """
     panel_external_id: str = superpanel.id
     panel_name: str = superpanel.name
     panel_version: str = superpanel.version
+    content_hash: str = _get_superpanel_content_hash(child_panels)
+    summary = summary if summary is not None else collections.Counter()
 
     # if there's a change in the panel_name or panel_version,
     # create a new record
@@ -433,9 +747,20 @@ def _insert_superpanel_into_db(
         defaults={
             "panel_source": superpanel.panel_source,
             "test_directory": False,
+            "content_hash": content_hash,
         },
     )
 
+    if not created and superpanel.content_hash == content_hash:
+        summary["skipped"] += 1
+        return superpanel, created
+
+    summary["changed"] += 1
+
+    if superpanel.content_hash != content_hash:
+        superpanel.content_hash = content_hash
+        superpanel.save(update_fields=["content_hash"])
+
     if created:
         # make links between the SuperPanel and its child panels
         for child in child_panels:
@@ -491,16 +816,94 @@ def panel_insert_controller(
     input from the API
     :param: user, either 'request.user' (if called from web) or None (if called from CLI)
     """
+    cache = LookupCache()
+    summary = collections.Counter()
+
     # currently, we only handle Panel/SuperPanel if the panel data is from
     # PanelApp, hence adding the source manually
-    for panel in panels:
+    with HistoryRecorder():
+        for panel in panels:
+            panel.panel_source = "PanelApp"  # manual addition of source
+            _insert_panel_data_into_db(panel, user, cache, summary)
+
+        for superpanel in superpanels:
+            _insert_panelapp_superpanel(superpanel, user, cache, summary)
+
+    _print_panel_summary(summary)
+
+
+def _print_panel_summary(summary: collections.Counter) -> None:
+    """
+    Print how many panels and superpanels were skipped as unchanged, and how
+    many were new or changed, during a run
+
+    :param: summary, a Counter of "skipped" and "changed" panels
+    """
+    print(
+        f"Panels and superpanels: {summary['skipped']} unchanged (skipped), "
+        f"{summary['changed']} new or changed"
+    )
+
+
+def _insert_panelapp_superpanel(
+    superpanel: SuperPanelClass,
+    user: HttpRequest | None = None,
+    cache: LookupCache | None = None,
+    summary: collections.Counter | None = None,
+) -> None:
+    """
+    Insert a PanelApp SuperPanel, inserting its child panels first so that
+    the SuperPanel can be linked to them
+
+    :param: superpanel [SuperPanelClass], parsed superpanel input from the API
+    :param: user, either 'request.user' (if called from web) or None (if called from CLI)
+    :param: cache, a LookupCache for the current run, or None to use a new one
+    :param: summary, a Counter of "skipped" and "changed" panels for the
+    current run, or None
+    """
+    superpanel.panel_source = "PanelApp"  # manual addition of source
+
+    child_panel_instances = []
+    for panel in superpanel.child_panels:
         panel.panel_source = "PanelApp"  # manual addition of source
-        _insert_panel_data_into_db(panel, user)
+        child_panel_instance, _ = _insert_panel_data_into_db(
+            panel, user, cache, summary
+        )
+        child_panel_instances.append(child_panel_instance)
+    _insert_superpanel_into_db(
+        superpanel, child_panel_instances, user, summary
+    )
 
-    for superpanel in superpanels:
-        child_panel_instances = []
-        for panel in superpanel.child_panels:
-            panel.panel_source = "PanelApp"  # manual addition of source
-            child_panel_instance, _ = _insert_panel_data_into_db(panel, user)
-            child_panel_instances.append(child_panel_instance)
-        _insert_superpanel_into_db(superpanel, child_panel_instances, user)
+
+@transaction.atomic
+def panel_stream_insert_controller(
+    panel_stream: Iterable[tuple[PanelClass | SuperPanelClass, bool]],
+    user: HttpRequest | None = None,
+) -> None:
+    """
+    Carries out coordination of panel creation for a stream of panels, such as
+    the one returned by process_all_signed_off_panels. Each panel is inserted
+    as soon as it arrives, so insertion overlaps with fetching the next panels.
+    As with panel_insert_controller, everything is inserted in one transaction.
+
+    :param: panel_stream, an iterable of (PanelClass or SuperPanelClass,
+    is_superpanel)
+    :param: user, either 'request.user' (if called from web) or None (if called from CLI)
+    """
+    cache = LookupCache()
+    summary = collections.Counter()
+    panel_count = 0
+    superpanel_count = 0
+
+    with HistoryRecorder():
+        for panel, is_superpanel in panel_stream:
+            if is_superpanel:
+                _insert_panelapp_superpanel(panel, user, cache, summary)
+                superpanel_count += 1
+            else:
+                panel.panel_source = "PanelApp"  # manual addition of source
+                _insert_panel_data_into_db(panel, user, cache, summary)
+                panel_count += 1
+
+    print(f"Inserted {panel_count} panels and {superpanel_count} superpanels")
+    _print_panel_summary(summary)
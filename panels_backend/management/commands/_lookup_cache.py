@@ -0,0 +1,155 @@
+from django.db.models import Model
+
+from panels_backend.models import (
+    Confidence,
+    Gene,
+    ModeOfInheritance,
+    ModeOfPathogenicity,
+    Penetrance,
+)
+
+
+class LookupCache:
+    """
+    Run-scoped cache of the small lookup tables used when inserting panel
+    genes (Confidence, ModeOfInheritance, ModeOfPathogenicity, Penetrance),
+    and of Gene records.
+    Each lookup table is loaded in one query the first time it's needed.
+    Missing entries are created once, then served from memory.
+
+    A cache should only be used within the run (and transaction) it was made
+    for - it isn't refreshed if the tables are changed elsewhere.
+    """
+
+    def __init__(self):
+        self._tables: dict[type[Model], dict] = {}
+        self._genes: dict[str, Gene] = {}
+
+    def _get_or_create(
+        self, model: type[Model], field: str, value: str | None
+    ) -> Model:
+        """
+        Get the lookup row with a given value, creating it if needed.
+        The whole table is loaded the first time it's used.
+
+        :param: model, the lookup table model
+        :param: field, the name of the value field on the model
+        :param: value, the value to look up - may be None
+        :return: the model instance for that value
+        """
+        # normalise the value the way the db would, e.g. 3 -> "3"
+        value = model._meta.get_field(field).to_python(value)
+
+        table = self._tables.get(model)
+        if table is None:
+            table = {}
+            # if there are duplicate values, use the oldest row
+            for instance in model.objects.order_by("-id"):
+                table[getattr(instance, field)] = instance
+            self._tables[model] = table
+
+        if value not in table:
+            table[value] = model.objects.create(**{field: value})
+
+        return table[value]
+
+    def confidence(self, confidence_level: str | int | None) -> Confidence:
+        """
+        :param: confidence_level, e.g. 3, or None
+        :return: the matching Confidence instance
+        """
+        return self._get_or_create(
+            Confidence, "confidence_level", confidence_level
+        )
+
+    def mode_of_inheritance(self, moi: str | None) -> ModeOfInheritance:
+        """
+        :param: moi, a mode of inheritance, or None
+        :return: the matching ModeOfInheritance instance
+        """
+        return self._get_or_create(
+            ModeOfInheritance, "mode_of_inheritance", moi
+        )
+
+    def mode_of_pathogenicity(self, mop: str | None) -> ModeOfPathogenicity:
+        """
+        :param: mop, a mode of pathogenicity, or None
+        :return: the matching ModeOfPathogenicity instance
+        """
+        return self._get_or_create(
+            ModeOfPathogenicity, "mode_of_pathogenicity", mop
+        )
+
+    def penetrance(self, penetrance: str | None) -> Penetrance:
+        """
+        :param: penetrance, a penetrance, or None
+        :return: the matching Penetrance instance
+        """
+        return self._get_or_create(Penetrance, "penetrance", penetrance)
+
+    def prefetch_genes(self, hgnc_ids: list[str]) -> None:
+        """
+        Load the Gene records for a batch of HGNC IDs in one query, so that
+        later calls to gene() don't need to query the db
+
+        :param: hgnc_ids, the HGNC IDs to load
+        """
+        missing = {str(hgnc_id) for hgnc_id in hgnc_ids} - self._genes.keys()
+        if missing:
+            for gene in Gene.objects.filter(hgnc_id__in=missing):
+                self._genes[gene.hgnc_id] = gene
+
+    def create_missing_genes(
+        self, genes: dict[str, tuple[str | None, str | None]]
+    ) -> None:
+        """
+        Create any genes in a batch which aren't in the cache, in one query.
+        Genes should be prefetched with prefetch_genes() first, so that only
+        genes which aren't in the db are created.
+
+        :param: genes, a dict of HGNC ID to (gene symbol, alias symbols), to
+        use if the gene is created
+        """
+        new_genes = Gene.objects.bulk_create(
+            [
+                Gene(
+                    hgnc_id=str(hgnc_id),
+                    gene_symbol=gene_symbol,
+                    alias_symbols=alias_symbols,
+                )
+                for hgnc_id, (gene_symbol, alias_symbols) in genes.items()
+                if str(hgnc_id) not in self._genes
+            ]
+        )
+
+        for gene in new_genes:
+            self._genes[gene.hgnc_id] = gene
+
+    def gene(
+        self,
+        hgnc_id: str,
+        gene_symbol: str | None = None,
+        alias_symbols: str | None = None,
+    ) -> Gene:
+        """
+        Get the Gene with a given HGNC ID, creating it if needed.
+        As with get_or_create, the symbol and aliases are only used when
+        the gene is created - existing genes aren't updated.
+
+        :param: hgnc_id, the HGNC ID of the gene
+        :param: gene_symbol, the symbol to use if the gene is created
+        :param: alias_symbols, the aliases to use if the gene is created
+        :return: the Gene instance
+        """
+        hgnc_id = str(hgnc_id)
+
+        if hgnc_id not in self._genes:
+            self._genes[hgnc_id], _ = Gene.objects.get_or_create(
+                hgnc_id=hgnc_id,
+                defaults={
+                    "gene_symbol": gene_symbol,
+                    "alias_symbols": alias_symbols,
+                },
+            )
+
+        return self._genes[hgnc_id]
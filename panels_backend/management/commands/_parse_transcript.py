@@ -9,7 +9,7 @@ from packaging.version import Version
 pd.options.mode.chained_assignment = None  # default='warn'
 import datetime
 
-from .history import History
+from .history import History, HistoryRecorder, record_history
 from panels_backend.models import (
     Gene,
     Transcript,
@@ -70,7 +70,8 @@ def _update_existing_gene_metadata_symbol_in_db(
         new = hgnc_id_to_symbol[gene.hgnc_id]["new"]
         old = hgnc_id_to_symbol[gene.hgnc_id]["old"]
 
-        GeneHgncReleaseHistory.objects.create(
+        record_history(
+            GeneHgncReleaseHistory,
             gene_hgnc_release=gene_hgnc_release,
             note=History.gene_hgnc_release_approved_symbol_change(old, new),
             user=user,
@@ -113,7 +114,8 @@ def _update_existing_gene_metadata_aliases_in_db(
         new = hgnc_id_to_alias_symbols[gene.hgnc_id]["new"]
         old = hgnc_id_to_alias_symbols[gene.hgnc_id]["old"]
 
-        GeneHgncReleaseHistory.objects.create(
+        record_history(
+            GeneHgncReleaseHistory,
             gene_hgnc_release=gene_hgnc_release,
             note=History.gene_hgnc_release_alias_symbol_change(old, new),
             user=user,
@@ -151,7 +153,8 @@ def _link_unchanged_genes_to_new_release(
         # if a new gene-release link was made, log it in history
         # if it existed already, don't log it
         if release_created:
-            GeneHgncReleaseHistory.objects.create(
+            record_history(
+                GeneHgncReleaseHistory,
                 gene_hgnc_release=gene_hgnc_release,
                 note=History.gene_hgnc_release_present(),
                 user=user,
@@ -193,7 +196,8 @@ def _add_new_genes_to_db(
             gene=gene, hgnc_release=hgnc_release
         )
 
-        GeneHgncReleaseHistory.objects.create(
+        record_history(
+            GeneHgncReleaseHistory,
             gene_hgnc_release=gene_hgnc_release,
             note=History.gene_hgnc_release_new(),
             user=user,
@@ -386,7 +390,8 @@ def _prepare_hgnc_file(
     )
 
     # make edits and release links to pre-existing genes, and add genes which are new in the HGNC file
-    with transaction.atomic():
+    # - the history of every gene is written in bulk at the end
+    with transaction.atomic(), HistoryRecorder():
         if symbol_changed:
             _update_existing_gene_metadata_symbol_in_db(
                 symbol_changed, hgnc_release, user
@@ -1003,38 +1008,27 @@ def _parse_reference_genome(ref_genome: str) -> str:
 
 def _get_latest_hgnc_release() -> HgncRelease | None:
     """
-    Get the latest release in HgncRelease, using packaging.version to handle version formatting
-    which isn't 100% consistent. Return None if the table has no matching results.
+    Get the latest release in HgncRelease, using the release sort key to handle
+    version formatting which isn't 100% consistent. Return None if the table has
+    no matching results.
 
     :returns: HgncRelease with latest version in database
     """
-    hgncs = HgncRelease.objects.all()
-
-    max_release = max([Version(v.release) for v in hgncs]) if hgncs else None
-    if max_release:
-        return HgncRelease.objects.get(release=max_release)
-    else:
-        return None
+    return HgncRelease.objects.latest_release()
 
 
 def _get_latest_gff_release(ref_genome: ReferenceGenome) -> GffRelease | None:
     """
     Get the latest GFF release in GffRelease for a given reference genome,
-    using packaging.version because the version formatting
+    using the release sort key because the version formatting
     isn't 100% consistent. Return None if the table has no matching results.
 
     :param reference_genome: a ReferenceGenome object corresponding to user input
     :returns: latest version in database
     """
-    gffs = GffRelease.objects.filter(reference_genome=ref_genome)
-
-    max_release = (
-        max([Version(v.ensembl_release) for v in gffs]) if gffs else None
-    )
-    if max_release:
-        return GffRelease.objects.get(ensembl_release=max_release)
-    else:
-        return None
+    return GffRelease.objects.filter(
+        reference_genome=ref_genome
+    ).latest_release()
 
 
 def get_latest_transcript_release(
@@ -1048,25 +1042,9 @@ def get_latest_transcript_release(
     :param reference_genome: a ReferenceGenome object corresponding to user input
     :returns: the latest TranscriptRelease, or None if no database matches
     """
-    tx_releases = TranscriptRelease.objects.filter(
+    return TranscriptRelease.objects.filter(
         source__source=source, reference_genome=ref_genome
-    )
-
-    latest_version = (
-        max([Version(v.release) for v in tx_releases]) if tx_releases else None
-    )
-
-    # A 'unique_together' constraint on "source", "release", "reference_genome" means
-    # we'll either get 1 result or none
-    return (
-        TranscriptRelease.objects.filter(
-            source__source=source,
-            reference_genome=ref_genome,
-            release=latest_version,
-        ).first()
-        if latest_version
-        else None
-    )
+    ).latest_release()
 
 
 def _get_highest_mane_version(
@@ -1131,24 +1109,14 @@ def _check_for_transcript_seeding_version_regression(
 
     max_mane = _get_highest_mane_version(select, plus)
 
-    if _get_latest_hgnc_release():
-        latest_hgnc_release = _get_latest_hgnc_release().release
-    else:
-        latest_hgnc_release = None
+    hgnc = _get_latest_hgnc_release()
+    latest_hgnc_release = hgnc.release if hgnc else None
 
-    if _get_latest_gff_release(reference_genome):
-        latest_gff_release = _get_latest_gff_release(
-            reference_genome
-        ).ensembl_release
-    else:
-        latest_gff_release = None
+    gff = _get_latest_gff_release(reference_genome)
+    latest_gff_release = gff.ensembl_release if gff else None
 
-    if get_latest_transcript_release("HGMD", reference_genome):
-        latest_hgmd_release = get_latest_transcript_release(
-            "HGMD", reference_genome
-        ).release
-    else:
-        latest_hgmd_release = None
+    hgmd = get_latest_transcript_release("HGMD", reference_genome)
+    latest_hgmd_release = hgmd.release if hgmd else None
 
     latest_db_versions = {
         "HGNC": latest_hgnc_release,
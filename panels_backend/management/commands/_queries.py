@@ -10,6 +10,8 @@ from django.db.models import QuerySet
 from django.db import transaction
 from django.http import HttpRequest
 
+from .history import History, record_history
+
 
 @transaction.atomic
 def activate_clinical_indication_panel(
@@ -41,8 +43,9 @@ def activate_clinical_indication_panel(
             cip_instance.current = True
             cip_instance.save()
 
-            ClinicalIndicationPanelHistory.objects.create(
-                note=f"Existing ci-panel link set to active by {user}",
+            record_history(
+                ClinicalIndicationPanelHistory,
+                note=History.clinical_indication_panel_set_active(user),
                 clinical_indication_panel_id=cip_instance.id,
                 user=user,
             )
@@ -58,8 +61,9 @@ def activate_clinical_indication_panel(
             current=True,
         )
 
-        ClinicalIndicationPanelHistory.objects.create(
-            note="Created by command line",
+        record_history(
+            ClinicalIndicationPanelHistory,
+            note=History.clinical_indication_panel_created_by_command_line(),
             clinical_indication_panel_id=cip_instance.id,
             user=user,
         )
@@ -91,8 +95,9 @@ def deactivate_clinical_indication_panel(
             cip_instance.current = False
             cip_instance.save()
 
-            ClinicalIndicationPanelHistory.objects.create(
-                note=f"Existing ci-panel link set to inactive by {user}",
+            record_history(
+                ClinicalIndicationPanelHistory,
+                note=History.clinical_indication_panel_set_inactive(user),
                 clinical_indication_panel_id=cip_instance.id,
                 user=user,
             )
@@ -0,0 +1,382 @@
+import collections
+
+from django.db.models import Count
+
+from ._insert_ci import (
+    _check_td_version_valid,
+    _fetch_latest_td_version,
+    _get_hgnc_panels,
+)
+from .utils import gene_set_fingerprint
+
+from panels_backend.models import (
+    Panel,
+    SuperPanel,
+    ClinicalIndication,
+    ClinicalIndicationPanel,
+    ClinicalIndicationSuperPanel,
+)
+
+
+def _load_links(r_codes: set[str]) -> dict[str, list[dict]]:
+    """
+    Load the CI-panel and CI-superpanel links of the R codes in a test
+    directory, in two queries
+
+    :param: r_codes, the R codes in the test directory
+    :return: a dict of R code to a list of its links, each a dict of the
+    CI ID and name, panel ID and name, PanelApp ID, link type and current
+    status
+    """
+    links = collections.defaultdict(list)
+
+    for row in ClinicalIndicationPanel.objects.filter(
+        clinical_indication__r_code__in=r_codes
+    ).values(
+        "clinical_indication_id",
+        "clinical_indication__r_code",
+        "clinical_indication__name",
+        "panel_id",
+        "panel__panel_name",
+        "panel__external_id",
+        "panel__test_directory",
+        "current",
+    ):
+        links[row["clinical_indication__r_code"]].append(
+            {
+                "ci_id": row["clinical_indication_id"],
+                "ci_name": row["clinical_indication__name"],
+                "panel_id": row["panel_id"],
+                "panel": row["panel__panel_name"],
+                "external_id": row["panel__external_id"],
+                "type": "hgnc" if row["panel__test_directory"] else "panel",
+                "current": row["current"],
+            }
+        )
+
+    for row in ClinicalIndicationSuperPanel.objects.filter(
+        clinical_indication__r_code__in=r_codes
+    ).values(
+        "clinical_indication_id",
+        "clinical_indication__r_code",
+        "clinical_indication__name",
+        "superpanel_id",
+        "superpanel__panel_name",
+        "superpanel__external_id",
+        "current",
+    ):
+        links[row["clinical_indication__r_code"]].append(
+            {
+                "ci_id": row["clinical_indication_id"],
+                "ci_name": row["clinical_indication__name"],
+                "panel_id": row["superpanel_id"],
+                "panel": row["superpanel__panel_name"],
+                "external_id": row["superpanel__external_id"],
+                "type": "superpanel",
+                "current": row["current"],
+            }
+        )
+
+    return links
+
+
+def _latest_by_external_id(model, pa_ids: set[str]) -> dict[str, dict]:
+    """
+    :param: model, Panel or SuperPanel
+    :param: pa_ids, PanelApp IDs from the test directory
+    :return: a dict of PanelApp ID to the id and name of its latest version,
+    chosen as in TestDirectoryImport
+    """
+    latest = {}
+    for row in (
+        model.objects.filter(external_id__in=pa_ids)
+        .order_by("panel_version")
+        .values("id", "panel_name", "external_id")
+    ):
+        latest[row["external_id"]] = row
+    return latest
+
+
+def diff_test_directory(json_data: dict, td_release: str) -> dict:
+    """
+    Work out what importing a test directory would change, without writing
+    to the db. The current state is read with a fixed number of bulk queries,
+    and the import's rules are applied to it in memory.
+
+    :param: json_data, the test directory json
+    :param: td_release, the release version the test directory would be
+    imported as
+    :return: a change report, with lists of new clinical indications, test
+    method changes, panels added and removed per R code, PanelApp IDs with
+    no matching panel, links which would be set to pending, and R codes
+    which are no longer in the test directory
+    """
+    indications: list[dict] = json_data["indications"]
+    r_codes = {indication["code"].strip() for indication in indications}
+
+    latest_td_release = _fetch_latest_td_version()
+    try:
+        _check_td_version_valid(td_release, latest_td_release, force=False)
+        version_error = None
+    except Exception as e:
+        version_error = str(e)
+
+    report = {
+        "td_release": td_release,
+        "latest_td_release": latest_td_release,
+        "version_error": version_error,
+        "new_clinical_indications": [],
+        "test_method_changes": [],
+        "panels_added": [],
+        "panels_removed": [],
+        "unknown_panel_ids": [],
+        "links_to_pending": [],
+        "clinical_indications_removed": [],
+    }
+
+    pa_ids = {
+        pa_id
+        for indication in indications
+        for pa_id in indication["panels"] or []
+        if pa_id and not pa_id.upper().startswith("HGNC:")
+    }
+    hgnc_lists = [
+        hgnc_ids
+        for hgnc_ids in (
+            [
+                pa_id.strip().upper()
+                for pa_id in indication["panels"] or []
+                if pa_id and pa_id.upper().startswith("HGNC:")
+            ]
+            for indication in indications
+        )
+        if hgnc_ids
+    ]
+
+    cis = {
+        (ci["r_code"], ci["name"]): ci
+        for ci in ClinicalIndication.objects.filter(r_code__in=r_codes).values(
+            "id", "r_code", "name", "test_method"
+        )
+    }
+    panels = _latest_by_external_id(Panel, pa_ids)
+    superpanels = _latest_by_external_id(SuperPanel, pa_ids)
+    # HGNC panels are matched on their genes, as in the import
+    hgnc_panels = _get_hgnc_panels(hgnc_lists)
+    links = _load_links(r_codes)
+
+    def _flag(r_code: str, link: dict, reason: str) -> None:
+        link["current"] = False
+        report["links_to_pending"].append(
+            {
+                "r_code": r_code,
+                "clinical_indication": link["ci_name"],
+                "panel": link["panel"],
+                "type": link["type"],
+                "reason": reason,
+            }
+        )
+
+    def _link(r_code: str, ci: dict, panel: dict, link_type: str) -> None:
+        linked = any(
+            link["ci_id"] == ci["id"]
+            and link["panel_id"] == panel["id"]
+            and link["type"] == link_type
+            for link in links[r_code]
+        )
+        if not linked:
+            report["panels_added"].append(
+                {
+                    "r_code": r_code,
+                    "panel": panel["panel_name"],
+                    "type": link_type,
+                    "pending": False,
+                }
+            )
+
+    for indication in indications:
+        r_code = indication["code"].strip()
+        ci = cis.get((r_code, indication["name"]))
+
+        if ci is None:
+            ci = {
+                "id": None,
+                "r_code": r_code,
+                "name": indication["name"],
+                "test_method": indication["test_method"],
+            }
+            cis[(r_code, indication["name"])] = ci
+            report["new_clinical_indications"].append(
+                {
+                    "r_code": r_code,
+                    "name": indication["name"],
+                    "test_method": indication["test_method"],
+                }
+            )
+
+            # links of CIs with the same R code are flagged, and their
+            # panels provisionally linked to the new CI
+            for link in [link for link in links[r_code] if link["current"]]:
+                _flag(r_code, link, "new clinical indication provided")
+                links[r_code].append(
+                    {
+                        **link,
+                        "ci_id": None,
+                        "ci_name": indication["name"],
+                        "current": True,
+                    }
+                )
+                report["panels_added"].append(
+                    {
+                        "r_code": r_code,
+                        "panel": link["panel"],
+                        "type": link["type"],
+                        "pending": True,
+                    }
+                )
+
+        elif ci["test_method"] != indication["test_method"]:
+            report["test_method_changes"].append(
+                {
+                    "r_code": r_code,
+                    "name": ci["name"],
+                    "old": ci["test_method"],
+                    "new": indication["test_method"],
+                }
+            )
+            ci["test_method"] = indication["test_method"]
+
+        hgnc_ids: list[str] = []
+
+        if indication["panels"]:
+            for pa_id in indication["panels"]:
+                if not pa_id or not pa_id.strip():
+                    continue
+
+                if pa_id.upper().startswith("HGNC:"):
+                    hgnc_ids.append(pa_id.strip().upper())
+                    continue
+
+                if pa_id in panels:
+                    _link(r_code, ci, panels[pa_id], "panel")
+                if pa_id in superpanels:
+                    _link(r_code, ci, superpanels[pa_id], "superpanel")
+                if pa_id not in panels and pa_id not in superpanels:
+                    report["unknown_panel_ids"].append(
+                        {"r_code": r_code, "panel_id": pa_id}
+                    )
+
+            for link in links[r_code]:
+                if not link["current"] or link["type"] == "hgnc":
+                    continue
+
+                if link["external_id"] not in indication["panels"] and (
+                    link["external_id"] or link["type"] == "superpanel"
+                ):
+                    report["panels_removed"].append(
+                        {
+                            "r_code": r_code,
+                            "panel": link["panel"],
+                            "type": link["type"],
+                        }
+                    )
+                    _flag(
+                        r_code,
+                        link,
+                        f"{link['type'].capitalize()} ID no longer attached "
+                        "to clinical indication in TD",
+                    )
+
+        if hgnc_ids:
+            panel = hgnc_panels.get(gene_set_fingerprint(hgnc_ids))
+
+            if panel is None:
+                # a new HGNC panel replaces the CI's previous HGNC panels
+                for link in links[r_code]:
+                    if (
+                        link["type"] == "hgnc"
+                        and link["current"]
+                        and link["ci_id"] == ci["id"]
+                    ):
+                        report["panels_removed"].append(
+                            {
+                                "r_code": r_code,
+                                "panel": link["panel"],
+                                "type": "hgnc",
+                            }
+                        )
+                        _flag(r_code, link, "new clinical indication provided")
+
+            _link(
+                r_code,
+                ci,
+                {
+                    "id": panel.id if panel else None,
+                    "panel_name": (
+                        panel.panel_name
+                        if panel
+                        else "&".join(sorted(hgnc_ids))
+                    ),
+                },
+                "hgnc",
+            )
+
+    # every link of an R code which isn't in the test directory is flagged
+    removed = collections.Counter()
+    for model in (ClinicalIndicationPanel, ClinicalIndicationSuperPanel):
+        for row in (
+            model.objects.exclude(clinical_indication__r_code__in=r_codes)
+            .values("clinical_indication__r_code")
+            .annotate(links=Count("id"))
+        ):
+            removed[row["clinical_indication__r_code"]] += row["links"]
+
+    report["clinical_indications_removed"] = [
+        {"r_code": r_code, "links_to_pending": count}
+        for r_code, count in sorted(removed.items())
+    ]
+
+    return report
+
+
+def format_td_diff_table(report: dict) -> str:
+    """
+    Lay out a test directory change report as plain-text tables
+
+    :param: report, a report from diff_test_directory
+    :return: the report as text, one table per type of change
+    """
+    lines = [
+        f"Test directory release {report['td_release']} "
+        f"(latest in db: {report['latest_td_release']})"
+    ]
+    if report["version_error"]:
+        lines.append(f"WARNING: {report['version_error']}")
+
+    for section, rows in report.items():
+        if not isinstance(rows, list):
+            continue
+
+        lines.append("")
+        lines.append(f"{section.replace('_', ' ').capitalize()}: {len(rows)}")
+
+        if not rows:
+            continue
+
+        columns = list(rows[0].keys())
+        widths = {
+            column: max(len(column), *(len(str(row[column])) for row in rows))
+            for column in columns
+        }
+        lines.append(
+            "  ".join(column.ljust(widths[column]) for column in columns)
+        )
+        for row in rows:
+            lines.append(
+                "  ".join(
+                    str(row[column]).ljust(widths[column])
+                    for column in columns
+                )
+            )
+
+    return "\n".join(lines)
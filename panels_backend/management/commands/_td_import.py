@@ -0,0 +1,389 @@
+import collections
+
+from django.db.models import Model
+from django.http import HttpRequest
+
+from .history import History, event_type_of
+
+from panels_backend.models import (
+    TestDirectoryRelease,
+    Panel,
+    SuperPanel,
+    ClinicalIndication,
+    ClinicalIndicationPanel,
+    ClinicalIndicationPanelHistory,
+    ClinicalIndicationSuperPanel,
+    ClinicalIndicationSuperPanelHistory,
+    ClinicalIndicationTestMethodHistory,
+    CiPanelTdRelease,
+    CiPanelTdReleaseHistory,
+    CiSuperpanelTdRelease,
+    CiSuperpanelTdReleaseHistory,
+)
+
+
+class ClinicalIndicationLinks:
+    """
+    In-memory copy of the links between clinical indications and one kind of
+    panel (Panel or SuperPanel), for the R codes in a test directory import.
+    Links are changed in memory with the same review/pending rules as
+    flag_clinical_indication_panel_for_review and
+    provisionally_link_clinical_indication_to_panel in _insert_ci, then
+    written in bulk by save().
+    """
+
+    def __init__(
+        self,
+        model: type[Model],
+        panel_field: str,
+        history_model: type[Model],
+        history_field: str,
+        td_model: type[Model],
+        td_field: str,
+        td_history_model: type[Model],
+        created_note: str,
+        td_note: str,
+        r_codes: set[str],
+        td_release: TestDirectoryRelease,
+        user: HttpRequest | None = None,
+    ):
+        """
+        :param: model, ClinicalIndicationPanel or ClinicalIndicationSuperPanel
+        :param: panel_field, the name of the model's panel field
+        :param: history_model, the history table for the links
+        :param: history_field, the name of the history table's link field
+        :param: td_model, the table linking links to test directory releases
+        :param: td_field, the name of the td_model's link field
+        :param: td_history_model, the history table for td_model
+        :param: created_note, the history note for a newly-created link
+        :param: td_note, the history note for a link being attached to the
+        test directory release
+        :param: r_codes, the R codes in the test directory
+        :param: td_release, the test directory release being imported
+        :param: user, either 'request.user' (if called from web) or None (if
+        called from CLI)
+        """
+        self.model = model
+        self.panel_field = panel_field
+        self.history_model = history_model
+        self.history_field = history_field
+        self.td_model = td_model
+        self.td_field = td_field
+        self.td_history_model = td_history_model
+        self.created_note = created_note
+        self.td_note = td_note
+        self.td_release = td_release
+        self.user = user
+
+        self._links: dict[tuple[int, int], Model] = {}
+        self._links_by_r_code: dict[
+            str, list[Model]
+        ] = collections.defaultdict(list)
+
+        for link in model.objects.filter(
+            clinical_indication__r_code__in=r_codes
+        ).select_related("clinical_indication", panel_field):
+            self._add(link)
+
+        self._created: list[Model] = []
+        self._updated: dict[int, Model] = {}
+        self._history: list[tuple[Model, str]] = []
+        # links to attach to the release, and whether to log it in history
+        self._td_links: dict[int, tuple[Model, bool]] = {}
+
+    def _add(self, link: Model) -> None:
+        """
+        Index a link by its CI and panel, and by its CI's R code
+        """
+        panel = getattr(link, self.panel_field)
+        self._links[(link.clinical_indication.id, panel.id)] = link
+        self._links_by_r_code[link.clinical_indication.r_code].append(link)
+
+    def _create(self, ci: ClinicalIndication, panel: Model, **fields) -> Model:
+        """
+        Make a new link, to be written by save()
+        """
+        link = self.model(
+            clinical_indication=ci, **{self.panel_field: panel}, **fields
+        )
+        self._add(link)
+        self._created.append(link)
+        return link
+
+    def _changed(self, link: Model) -> None:
+        """
+        Record that an existing link needs saving - new links are saved
+        with their final values anyway
+        """
+        if link.pk:
+            self._updated[link.pk] = link
+
+    def _attach_to_td_release(self, link: Model, log: bool) -> None:
+        """
+        Link a CI-panel link to the test directory release, once
+        """
+        self._td_links.setdefault(id(link), (link, log))
+
+    def current_links(self, r_code: str) -> list[Model]:
+        """
+        :param: r_code, a clinical indication R code
+        :return: the current links of any clinical indication with the R code
+        """
+        return [link for link in self._links_by_r_code[r_code] if link.current]
+
+    def flag_for_review(self, link: Model, reason: str) -> None:
+        """
+        Deactivate a link and set it to pending, so that it's reviewed
+
+        :param: link, the link to flag
+        :param: reason, the reason to give in its history
+        """
+        link.pending = True
+        link.current = False
+        self._changed(link)
+        self._history.append(
+            (link, History.flag_clinical_indication_panel(reason))
+        )
+
+    def provisionally_link(self, ci: ClinicalIndication, panel: Model) -> None:
+        """
+        Link a CI and panel as current but pending review, as with
+        provisionally_link_clinical_indication_to_panel
+
+        :param: ci, the clinical indication
+        :param: panel, the Panel or SuperPanel
+        """
+        link = self._links.get((ci.id, panel.id))
+
+        if link:
+            link.current = True
+            link.pending = True
+            self._changed(link)
+        else:
+            link = self._create(ci, panel, current=True, pending=True)
+            self._history.append(
+                (link, History.auto_created_clinical_indication_panel())
+            )
+
+        self._attach_to_td_release(link, log=False)
+
+    def link(self, ci: ClinicalIndication, panel: Model) -> None:
+        """
+        Get-or-create a current link between a CI and panel, and attach it
+        to the test directory release, logging the attachment in history
+
+        :param: ci, the clinical indication
+        :param: panel, the Panel or SuperPanel
+        """
+        link = self._links.get((ci.id, panel.id))
+
+        if not link:
+            link = self._create(ci, panel, current=True)
+            self._history.append((link, self.created_note))
+
+        self._attach_to_td_release(link, log=True)
+
+    def relink_new_clinical_indication(self, ci: ClinicalIndication) -> None:
+        """
+        A new CI has the same R code as CIs already in the db - flag their
+        current links for review, and provisionally link their panels to
+        the new CI
+
+        :param: ci, the new clinical indication
+        """
+        for link in self.current_links(ci.r_code):
+            self.flag_for_review(link, "new clinical indication provided")
+            self.provisionally_link(ci, getattr(link, self.panel_field))
+
+    def save(self) -> None:
+        """
+        Write the changed links, their links to the test directory release,
+        and their history, in bulk
+        """
+        self.model.objects.bulk_create(self._created)
+        self.model.objects.bulk_update(
+            self._updated.values(), ["current", "pending"], batch_size=1000
+        )
+
+        # the release is new, so none of these links exist yet
+        td_links = self.td_model.objects.bulk_create(
+            [
+                self.td_model(
+                    **{self.td_field: link}, td_release=self.td_release
+                )
+                for link, _ in self._td_links.values()
+            ]
+        )
+
+        self.td_history_model.objects.bulk_create(
+            [
+                self.td_history_model(
+                    cip_td=td_link,
+                    note=self.td_note,
+                    user=self.user,
+                )
+                for td_link, (_, log) in zip(td_links, self._td_links.values())
+                if log
+            ]
+        )
+
+        self.history_model.objects.bulk_create(
+            [
+                self.history_model(
+                    **{self.history_field: link},
+                    note=note,
+                    event_type=event_type_of(note),
+                    user=self.user,
+                )
+                for link, note in self._history
+            ]
+        )
+
+
+class TestDirectoryImport:
+    """
+    Preloaded state for importing one test directory release.
+    The clinical indications in the test directory, the latest Panel and
+    SuperPanel for each PanelApp ID, and the existing CI-panel and
+    CI-superpanel links of those indications are each loaded in one query.
+    Changes are made in memory and written in bulk by save().
+    """
+
+    def __init__(
+        self,
+        indications: list[dict],
+        td_release: TestDirectoryRelease,
+        user: HttpRequest | None = None,
+    ):
+        """
+        :param: indications, the indications from the test directory json
+        :param: td_release, the test directory release being imported
+        :param: user, either 'request.user' (if called from web) or None (if
+        called from CLI)
+        """
+        self.td_release = td_release
+        self.user = user
+
+        r_codes = {indication["code"].strip() for indication in indications}
+        pa_ids = {
+            pa_id
+            for indication in indications
+            for pa_id in indication["panels"] or []
+            if pa_id and not pa_id.upper().startswith("HGNC:")
+        }
+
+        self._cis: dict[tuple[str, str], ClinicalIndication] = {
+            (ci.r_code, ci.name): ci
+            for ci in ClinicalIndication.objects.filter(r_code__in=r_codes)
+        }
+
+        # ordered so the highest version of each panel is kept
+        self.panels: dict[str, Panel] = {}
+        for panel in Panel.objects.filter(external_id__in=pa_ids).order_by(
+            "panel_version"
+        ):
+            self.panels[panel.external_id] = panel
+
+        self.superpanels: dict[str, SuperPanel] = {}
+        for superpanel in SuperPanel.objects.filter(
+            external_id__in=pa_ids
+        ).order_by("panel_version"):
+            self.superpanels[superpanel.external_id] = superpanel
+
+        self.ci_panels = ClinicalIndicationLinks(
+            ClinicalIndicationPanel,
+            "panel",
+            ClinicalIndicationPanelHistory,
+            "clinical_indication_panel",
+            CiPanelTdRelease,
+            "ci_panel",
+            CiPanelTdReleaseHistory,
+            History.clinical_indication_panel_created(),
+            History.td_panel_ci_autolink(td_release.release),
+            r_codes,
+            td_release,
+            user,
+        )
+
+        self.ci_superpanels = ClinicalIndicationLinks(
+            ClinicalIndicationSuperPanel,
+            "superpanel",
+            ClinicalIndicationSuperPanelHistory,
+            "clinical_indication_superpanel",
+            CiSuperpanelTdRelease,
+            "ci_superpanel",
+            CiSuperpanelTdReleaseHistory,
+            History.clinical_indication_superpanel_created(),
+            History.td_superpanel_ci_autolink(td_release.release),
+            r_codes,
+            td_release,
+            user,
+        )
+
+    def get_or_create_clinical_indications(
+        self, indications: list[dict]
+    ) -> list[tuple[ClinicalIndication, bool]]:
+        """
+        Get or create the clinical indication for each indication in the test
+        directory. New indications are created in one query. Where an
+        existing indication's test method has changed, it's updated and set
+        to pending, and the change is logged in history.
+
+        :param: indications, the indications from the test directory json
+        :return: a list of (ClinicalIndication, created) for each indication
+        """
+        results: list[tuple[ClinicalIndication, bool]] = []
+        new_cis: list[ClinicalIndication] = []
+        changed_cis: dict[int, ClinicalIndication] = {}
+        method_history: list[ClinicalIndicationTestMethodHistory] = []
+
+        for indication in indications:
+            key = (indication["code"].strip(), indication["name"])
+            ci = self._cis.get(key)
+
+            if ci is None:
+                ci = ClinicalIndication(
+                    r_code=key[0],
+                    name=key[1],
+                    test_method=indication["test_method"],
+                )
+                self._cis[key] = ci
+                new_cis.append(ci)
+                results.append((ci, True))
+                continue
+
+            results.append((ci, False))
+
+            # an existing CI (or one repeated in the test directory) - check
+            # in case its test method needs updating
+            if ci.test_method != indication["test_method"]:
+                method_history.append(
+                    ClinicalIndicationTestMethodHistory(
+                        clinical_indication=ci,
+                        note=History.clinical_indication_metadata_changed(
+                            "test_method",
+                            ci.test_method,
+                            indication["test_method"],
+                        ),
+                        user=self.user,
+                    )
+                )
+                ci.pending = True
+                ci.test_method = indication["test_method"]
+                if ci.pk:
+                    changed_cis[ci.pk] = ci
+
+        ClinicalIndication.objects.bulk_create(new_cis)
+        ClinicalIndication.objects.bulk_update(
+            changed_cis.values(), ["pending", "test_method"], batch_size=1000
+        )
+        ClinicalIndicationTestMethodHistory.objects.bulk_create(method_history)
+
+        return results
+
+    def save(self) -> None:
+        """
+        Write every change to CI-panel and CI-superpanel links in bulk
+        """
+        self.ci_panels.save()
+        self.ci_superpanels.save()
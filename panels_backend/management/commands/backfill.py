@@ -0,0 +1,349 @@
+"""
+python manage.py backfill gene_set_fingerprint
+python manage.py backfill shared_panel_genes
+python manage.py backfill release_sort_key
+python manage.py backfill history_event_type
+"""
+import collections
+import re
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from panels_backend.models import (
+    ClinicalIndicationPanelHistory,
+    ClinicalIndicationSuperPanelHistory,
+    GffRelease,
+    HgncRelease,
+    HistoryEvent,
+    Panel,
+    PanelGene,
+    PanelGeneHistory,
+    TestDirectoryRelease,
+    TranscriptRelease,
+    release_sort_key,
+)
+from .utils import gene_set_fingerprint
+
+# number of history rows read and updated at a time
+HISTORY_BACKFILL_ROWS = 5000
+
+# the wording of the notes written before event types were stored, for
+# each kind of event - checked in order, first match wins. New rows get
+# their event type from the History helper which wrote their note.
+_EVENT_PATTERNS = [
+    # deactivates and flags the custom panel's links, so before "created"
+    (
+        re.compile(r"panel of similar genes has been created", re.I),
+        HistoryEvent.FLAGGED,
+    ),
+    (re.compile(r"flagged for manual review", re.I), HistoryEvent.FLAGGED),
+    (
+        re.compile(r"automatically been linked to an existing", re.I),
+        HistoryEvent.TD_LINKED,
+    ),
+    (re.compile(r"created", re.I), HistoryEvent.CREATED),
+    (re.compile(r"approved by", re.I), HistoryEvent.APPROVED),
+    (re.compile(r"reverted", re.I), HistoryEvent.REVERTED),
+    (
+        re.compile(r"deactivated|set to inactive", re.I),
+        HistoryEvent.DEACTIVATED,
+    ),
+    (re.compile(r"activated|set to active", re.I), HistoryEvent.ACTIVATED),
+    (
+        re.compile(r"linked to (a )?new test ?directory ?release", re.I),
+        HistoryEvent.TD_LINKED,
+    ),
+    (re.compile(r"metadata .* changed", re.I), HistoryEvent.CHANGED),
+]
+
+
+def history_event_type(note: str | None) -> str:
+    """
+    Work out the kind of event an old history note records, from its
+    wording
+
+    :param: note, the history note
+    :return: one of the HistoryEvent values
+    """
+    for pattern, event_type in _EVENT_PATTERNS:
+        if note and pattern.search(note):
+            return event_type
+
+    return HistoryEvent.OTHER
+
+
+@transaction.atomic
+def backfill_gene_set_fingerprints() -> int:
+    """
+    Set the gene set fingerprint of test directory HGNC panels which were
+    made before fingerprints were added. These panels are named after their
+    "&"-joined HGNC IDs, so the fingerprint is made from the panel name.
+
+    :return: the number of panels updated
+    """
+    panels = list(
+        Panel.objects.filter(
+            test_directory=True,
+            gene_set_fingerprint__isnull=True,
+            panel_name__startswith="HGNC:",
+        )
+    )
+
+    for panel in panels:
+        panel.gene_set_fingerprint = gene_set_fingerprint(
+            panel.panel_name.split("&")
+        )
+
+    Panel.objects.bulk_update(
+        panels, ["gene_set_fingerprint"], batch_size=1000
+    )
+
+    return len(panels)
+
+
+def _panel_gene_state(panel_gene: PanelGene) -> tuple:
+    """
+    The fields which must match for a link to be shared between versions
+
+    :param: panel_gene, a PanelGene link
+    :return: a tuple of the link's gene and review state
+    """
+    return (
+        panel_gene.gene_id,
+        panel_gene.confidence_id,
+        panel_gene.moi_id,
+        panel_gene.mop_id,
+        panel_gene.penetrance_id,
+        panel_gene.justification,
+        panel_gene.active,
+        panel_gene.pending,
+    )
+
+
+def _share_lineage_panel_genes(
+    versions: list[Panel],
+) -> tuple[list[PanelGene], dict[int, int]]:
+    """
+    Work out how the links of every version of one PanelApp panel can be
+    shared. Versions are walked in order - a link which is unchanged from the
+    previous version is replaced by the previous version's link, which is
+    ended at the first version it doesn't apply to.
+
+    :param: versions, every version of the panel, oldest first
+    :return: the kept links, with shared and valid_until set
+    :return: a dict of duplicate link ID to the ID of the link replacing it
+    """
+    links_by_version = PanelGene.objects.for_panels(versions)
+
+    # open links, by state and by occurrence within a version
+    open_links: dict[tuple, PanelGene] = {}
+    kept: dict[int, PanelGene] = {}
+    replaced_by: dict[int, int] = {}
+
+    for version in versions:
+        still_open: dict[tuple, PanelGene] = {}
+        occurrences = collections.Counter()
+
+        for panel_gene in sorted(
+            links_by_version.get(version.id, []), key=lambda pg: pg.id
+        ):
+            state = _panel_gene_state(panel_gene)
+            occurrences[state] += 1
+            key = (state, occurrences[state])
+
+            link = open_links.get(key, panel_gene)
+            if link.id != panel_gene.id:
+                replaced_by[panel_gene.id] = link.id
+
+            link.shared = True
+            link.valid_until = None
+            kept[link.id] = link
+            still_open[key] = link
+
+        # links which stop applying at this version
+        for key, link in open_links.items():
+            if key not in still_open:
+                link.valid_until = version.panel_version
+
+        open_links = still_open
+
+    kept_links = [
+        link for link_id, link in kept.items() if link_id not in replaced_by
+    ]
+
+    return kept_links, replaced_by
+
+
+@transaction.atomic
+def backfill_shared_panel_genes() -> tuple[int, int]:
+    """
+    Share the PanelGene links of PanelApp panel versions which were seeded
+    before links were shared between versions. Unchanged links are
+    collapsed into one row, and the history of the removed rows is moved to
+    the row which replaces them.
+
+    :return: the number of PanelGene rows before the backfill
+    :return: the number of PanelGene rows after the backfill
+    """
+    before = PanelGene.objects.count()
+
+    lineages = collections.defaultdict(list)
+    for panel in Panel.objects.filter(
+        panel_source="PanelApp",
+        external_id__isnull=False,
+        panel_version__isnull=False,
+    ).order_by("panel_version"):
+        lineages[panel.external_id].append(panel)
+
+    kept_links: list[PanelGene] = []
+    replaced_by: dict[int, int] = {}
+
+    for versions in lineages.values():
+        lineage_kept, lineage_replaced = _share_lineage_panel_genes(versions)
+        kept_links.extend(lineage_kept)
+        replaced_by.update(lineage_replaced)
+
+    PanelGene.objects.bulk_update(
+        kept_links, ["shared", "valid_until"], batch_size=1000
+    )
+
+    # move the history of removed rows onto the rows replacing them
+    histories = list(
+        PanelGeneHistory.objects.filter(panel_gene_id__in=replaced_by.keys())
+    )
+    for history in histories:
+        history.panel_gene_id = replaced_by[history.panel_gene_id]
+
+    PanelGeneHistory.objects.bulk_update(
+        histories, ["panel_gene_id"], batch_size=1000
+    )
+    PanelGene.objects.filter(id__in=replaced_by.keys()).delete()
+
+    return before, PanelGene.objects.count()
+
+
+@transaction.atomic
+def backfill_release_sort_keys() -> int:
+    """
+    Set the release sort key of releases which were made before sort keys
+    were added, so that they're ordered correctly when finding the latest
+    release
+
+    :return: the number of releases updated
+    """
+    updated = 0
+
+    for model, release_field in (
+        (TestDirectoryRelease, "release"),
+        (HgncRelease, "release"),
+        (TranscriptRelease, "release"),
+        (GffRelease, "ensembl_release"),
+    ):
+        releases = list(model.objects.filter(release_sort_key__isnull=True))
+
+        for release in releases:
+            release.release_sort_key = release_sort_key(
+                getattr(release, release_field)
+            )
+
+        model.objects.bulk_update(
+            releases, ["release_sort_key"], batch_size=1000
+        )
+        updated += len(releases)
+
+    return updated
+
+
+@transaction.atomic
+def backfill_history_event_types() -> int:
+    """
+    Set the event type of history rows which were written before event
+    types were added, working it out from the wording of each row's note
+
+    :return: the number of history rows updated
+    """
+    updated = 0
+
+    for model in (
+        ClinicalIndicationPanelHistory,
+        ClinicalIndicationSuperPanelHistory,
+        PanelGeneHistory,
+    ):
+        rows = []
+
+        for history_id, note in (
+            model.objects.filter(event_type="")
+            .values_list("id", "note")
+            .iterator(chunk_size=HISTORY_BACKFILL_ROWS)
+        ):
+            rows.append(
+                model(id=history_id, event_type=history_event_type(note))
+            )
+
+        model.objects.bulk_update(
+            rows, ["event_type"], batch_size=HISTORY_BACKFILL_ROWS
+        )
+        updated += len(rows)
+
+    return updated
+
+
+class Command(BaseCommand):
+    help = "Fill in columns which were added after data was seeded"
+
+    def add_arguments(self, parser) -> None:
+        subparsers = parser.add_subparsers(dest="command")
+
+        # python manage.py backfill gene_set_fingerprint
+        subparsers.add_parser(
+            "gene_set_fingerprint",
+            help="set the gene set fingerprint of test directory HGNC panels",
+        )
+
+        # python manage.py backfill shared_panel_genes
+        subparsers.add_parser(
+            "shared_panel_genes",
+            help="share unchanged PanelGene links between PanelApp panel "
+            "versions",
+        )
+
+        # python manage.py backfill release_sort_key
+        subparsers.add_parser(
+            "release_sort_key",
+            help="set the sort key used to find the latest release",
+        )
+
+        # python manage.py backfill history_event_type
+        subparsers.add_parser(
+            "history_event_type",
+            help="set the event type of history rows from their notes",
+        )
+
+    def handle(self, *args, **kwargs) -> None:
+        command: str = kwargs.get("command")
+
+        assert command, (
+            "Please specify command: gene_set_fingerprint / "
+            "shared_panel_genes / release_sort_key / history_event_type"
+        )
+
+        if command == "gene_set_fingerprint":
+            updated = backfill_gene_set_fingerprints()
+            print(f"Set the gene set fingerprint of {updated} panels")
+
+        elif command == "shared_panel_genes":
+            before, after = backfill_shared_panel_genes()
+            reduction = (before - after) / before * 100 if before else 0
+            print(
+                f"PanelGene rows: {before} before, {after} after "
+                f"({reduction:.1f}% fewer)"
+            )
+
+        elif command == "release_sort_key":
+            updated = backfill_release_sort_keys()
+            print(f"Set the release sort key of {updated} releases")
+
+        elif command == "history_event_type":
+            updated = backfill_history_event_types()
+            print(f"Set the event type of {updated} history rows")
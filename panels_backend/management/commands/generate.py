@@ -6,6 +6,7 @@ from panels_backend.models import (
     ClinicalIndicationSuperPanel,
     CiPanelTdRelease,
     CiSuperpanelTdRelease,
+    Panel,
     PanelSuperPanel,
     PanelGene,
     Transcript,
@@ -14,7 +15,6 @@ from panels_backend.models import (
     TestDirectoryRelease,
     ReferenceGenome,
     GffRelease,
-    TranscriptGffRelease,
 )
 import os
 import csv
@@ -32,6 +32,7 @@ from ._parse_transcript import (
     check_missing_columns,
 )
 from ._insert_ci import _fetch_latest_td_version
+from ._g2t import g2t_rows
 
 ACCEPTABLE_COMMANDS = ["genepanels", "g2t"]
 
@@ -148,12 +149,15 @@ class Command(BaseCommand):
         """
         panel_genes = collections.defaultdict(list)
 
-        for row in PanelGene.objects.filter(
-            panel__pk__in=relevant_panels,
+        # versions of a PanelApp panel share links to unchanged genes
+        shared_panel_genes = PanelGene.objects.filter(
             active=True,
             pending=False,  # only fetch active, not-pending panel-gene links
-        ).values("gene__hgnc_id", "panel__id"):
-            panel_genes[row["panel__id"]].append(row["gene__hgnc_id"])
+        ).for_panels(list(Panel.objects.filter(pk__in=relevant_panels)))
+
+        for panel_id, links in shared_panel_genes.items():
+            for panel_gene in links:
+                panel_genes[panel_id].append(panel_gene.gene.hgnc_id)
 
         return panel_genes
 
@@ -175,19 +179,29 @@ class Command(BaseCommand):
         # set prevents duplicates
         superpanel_genes = collections.defaultdict(set)
 
-        for superpanel_id in relevant_superpanels:
-            # find all linked panels and add their ids to a list
-            constituent_panels = []
-            for linked_panel in PanelSuperPanel.objects.filter(
-                superpanel__id=superpanel_id
-            ).values("panel__id"):
-                constituent_panels.append(linked_panel["panel__id"])
+        # find the linked panels of every superpanel at once
+        constituent_panels = collections.defaultdict(list)
+        for linked_panel in PanelSuperPanel.objects.filter(
+            superpanel__id__in=relevant_superpanels
+        ).values("superpanel_id", "panel_id"):
+            constituent_panels[linked_panel["superpanel_id"]].append(
+                linked_panel["panel_id"]
+            )
 
-            # for the linked panels, get linked genes, link to SuperPanel's ID
-            panels_genes = self._get_relevant_panel_genes(constituent_panels)
-            for panel_id, genes in panels_genes.items():
-                for gene in genes:
-                    superpanel_genes[superpanel_id].add(gene)
+        # get the linked panels' genes together, then link them to the
+        # SuperPanel's ID
+        panels_genes = self._get_relevant_panel_genes(
+            [
+                panel_id
+                for panel_ids in constituent_panels.values()
+                for panel_id in panel_ids
+            ]
+        )
+        for superpanel_id, panel_ids in constituent_panels.items():
+            for panel_id in panel_ids:
+                superpanel_genes[superpanel_id].update(
+                    panels_genes.get(panel_id, [])
+                )
 
         return superpanel_genes
 
@@ -499,7 +513,7 @@ class Command(BaseCommand):
     ) -> list[dict[str, str]]:
         """
         Main function to generate g2t.tsv
-        Calls the function to get all current transcripts, then formats it, ready to write to file.
+        Gets all current transcripts with g2t_rows, then formats them, ready to write to file.
         Returned transcripts are limited to those represented in the user-requested reference genome
         and GFF release.
 
@@ -517,33 +531,24 @@ class Command(BaseCommand):
         )
 
         # We only need to assess those transcripts which are linked to the correct GFF release and reference genome
-        gff_transcripts = TranscriptGffRelease.objects.filter(
-            gff_release=gff_release,
+        rows = g2t_rows(
+            ref_genome,
+            [latest_select.id, latest_plus_clinical.id, latest_hgmd.id],
+            gff_release,
         )
 
-        # Append per-transcript results to a list-of-dictionaries
-        results = []
-
-        for gff_tx in gff_transcripts:
-            # For each Transcript linked to this GFF release - make a row-dictionary of its data
-            tx = gff_tx.transcript
-            clinical_status = (
-                self.get_current_transcript_clinical_status_for_g2t(
-                    tx, latest_select, latest_plus_clinical, latest_hgmd
-                )
-            )
-            displayable_clinical_status = (
-                "clinical_transcript"
-                if clinical_status
-                else "not_clinical_transcript"
-            )
-            transcript_data = {
-                "hgnc_id": tx.gene.hgnc_id,
-                "transcript": tx.transcript,
-                "clinical": displayable_clinical_status,
+        return [
+            {
+                "hgnc_id": hgnc_id,
+                "transcript": transcript,
+                "clinical": (
+                    "clinical_transcript"
+                    if clinical
+                    else "not_clinical_transcript"
+                ),
             }
-            results.append(transcript_data)
-        return results
+            for hgnc_id, transcript, clinical in rows
+        ]
 
     def _write_g2t_results(
         self, results: list[dict[str, str]], output_directory: str
@@ -1,4 +1,140 @@
 # trying to standardize the way we write history into db
+import collections
+import contextvars
+import functools
+from typing import Callable
+
+from django.db.models import Model
+
+from panels_backend.models import HistoryEvent
+
+
+class HistoryNote(str):
+    """
+    A history note, carrying the kind of event it records - one of the
+    HistoryEvent values - so writers can set the event_type column without
+    reading the note
+    """
+
+    def __new__(cls, note: str, event_type: str = HistoryEvent.OTHER):
+        history_note = super().__new__(cls, note)
+        history_note.event_type = event_type
+        return history_note
+
+
+def event_type_of(note: str | None) -> str:
+    """
+    :param: note, a history note
+    :return: its event type if it's a HistoryNote, otherwise OTHER
+    """
+    return getattr(note, "event_type", HistoryEvent.OTHER)
+
+
+def _event(event_type: str) -> Callable:
+    """
+    Make a History helper return its note as a HistoryNote of event_type
+
+    :param: event_type, one of the HistoryEvent values
+    """
+
+    def decorator(helper: Callable[..., str]) -> Callable[..., HistoryNote]:
+        @functools.wraps(helper)
+        def wrapper(*args, **kwargs) -> HistoryNote:
+            return HistoryNote(helper(*args, **kwargs), event_type)
+
+        return wrapper
+
+    return decorator
+
+
+def _with_event_type(history_model: type[Model], fields: dict) -> dict:
+    """
+    Set the event type of a history row from its note, for history tables
+    with an event_type column, unless the caller already set it
+
+    :param: history_model, the history table
+    :param: fields, the fields of the row
+    :return: the fields, with event_type added where the table has it
+    """
+    has_event_type = any(
+        field.name == "event_type"
+        for field in history_model._meta.concrete_fields
+    )
+    if has_event_type and "event_type" not in fields:
+        fields = {**fields, "event_type": event_type_of(fields.get("note"))}
+    return fields
+
+
+# the recorder buffering history rows in the current context, if any
+_active_recorder: contextvars.ContextVar = contextvars.ContextVar(
+    "history_recorder", default=None
+)
+
+
+class HistoryRecorder:
+    """
+    Buffers history rows written with record_history, and writes them with
+    one bulk_create per history table when the 'with' block exits.
+    Use it inside the transaction of a write path which makes many changes,
+    so that each history note doesn't cost its own INSERT:
+
+        with transaction.atomic(), HistoryRecorder():
+            ...
+
+    Rows are only written if the block exits without an error - if it
+    raises, the transaction is rolled back anyway.
+    """
+
+    def __init__(self):
+        self._rows: dict[type[Model], list[Model]] = collections.defaultdict(
+            list
+        )
+        self._token = None
+
+    def add(self, history_model: type[Model], **fields) -> None:
+        """
+        Buffer a history row
+
+        :param: history_model, the history table, e.g. PanelGeneHistory
+        :param: fields, the fields of the row, e.g. note, user
+        """
+        self._rows[history_model].append(history_model(**fields))
+
+    def flush(self) -> None:
+        """
+        Write the buffered history rows, one query per history table
+        """
+        for history_model, rows in self._rows.items():
+            history_model.objects.bulk_create(rows, batch_size=1000)
+        self._rows.clear()
+
+    def __enter__(self) -> "HistoryRecorder":
+        self._token = _active_recorder.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        _active_recorder.reset(self._token)
+        if exc_type is None:
+            self.flush()
+
+
+def record_history(history_model: type[Model], **fields) -> None:
+    """
+    Write a history row. Inside a HistoryRecorder block the row is buffered
+    and written in bulk when the block exits, otherwise it's written now.
+    Rows of tables with an event_type column get the event type of their
+    note.
+
+    :param: history_model, the history table, e.g. PanelGeneHistory
+    :param: fields, the fields of the row, e.g. note, user
+    """
+    recorder: HistoryRecorder | None = _active_recorder.get()
+    fields = _with_event_type(history_model, fields)
+
+    if recorder is None:
+        history_model.objects.create(**fields)
+    else:
+        recorder.add(history_model, **fields)
 
 
 class History:
@@ -6,67 +142,94 @@ class History:
         pass
 
     # automation
-    def flag_clinical_indication_panel(reason: str) -> str:
+    @_event(HistoryEvent.FLAGGED)
+    def flag_clinical_indication_panel(reason: str) -> HistoryNote:
         return f"Flagged for manual review - {reason}"
 
-    def auto_created_clinical_indication_panel() -> str:
+    @_event(HistoryEvent.CREATED)
+    def auto_created_clinical_indication_panel() -> HistoryNote:
         return "Auto-created ci-panel link"
 
     # creation
-    def panel_gene_created() -> str:
+    @_event(HistoryEvent.CREATED)
+    def panel_gene_created() -> HistoryNote:
         return "PanelGene record created"
 
-    def clinical_indication_panel_created() -> str:
+    @_event(HistoryEvent.CREATED)
+    def clinical_indication_panel_created() -> HistoryNote:
         return "ClinicalIndicationPanel record created"
 
-    def clinical_indication_superpanel_created() -> str:
+    @_event(HistoryEvent.CREATED)
+    def clinical_indication_superpanel_created() -> HistoryNote:
         return "ClinicalIndicationSuperPanel record created"
 
     # modification
+    @_event(HistoryEvent.CHANGED)
     def panel_gene_metadata_changed(
         field: str,
         old_value: str,
         new_value: str,
-    ) -> str:
+    ) -> HistoryNote:
         return f"PanelGene metadata {field} changed from {old_value} to {new_value}"
 
     # clinical indication panel
+    @_event(HistoryEvent.TD_LINKED)
     def clinical_indication_panel_new_td_link(
         new_value: str,
-    ) -> str:
+    ) -> HistoryNote:
         return f"ClinicalIndicationPanel linked to new test directory release: {new_value}"
 
+    @_event(HistoryEvent.CHANGED)
     def clinical_indication_metadata_changed(
         field: str, old_value: str, new_value: str
-    ) -> str:
+    ) -> HistoryNote:
         return f"ClinicalIndication metadata {field} changed from {old_value} to {new_value}"
 
+    @_event(HistoryEvent.FLAGGED)
+    def similar_panel_created_in_panelapp() -> HistoryNote:
+        return "Panel of similar genes has been created in PanelApp"
+
+    @_event(HistoryEvent.CREATED)
+    def clinical_indication_panel_created_by_command_line() -> HistoryNote:
+        return "Created by command line"
+
+    @_event(HistoryEvent.ACTIVATED)
+    def clinical_indication_panel_set_active(user) -> HistoryNote:
+        return f"Existing ci-panel link set to active by {user}"
+
+    @_event(HistoryEvent.DEACTIVATED)
+    def clinical_indication_panel_set_inactive(user) -> HistoryNote:
+        return f"Existing ci-panel link set to inactive by {user}"
+
+    @_event(HistoryEvent.ACTIVATED)
     def clinical_indication_panel_activated(
         id: str,
         review: bool = False,
-    ) -> str:
+    ) -> HistoryNote:
         return (
             f"ClinicalIndicationPanel {id} activated online" + " by review"
             if review
             else ""
         )
 
+    @_event(HistoryEvent.DEACTIVATED)
     def clinical_indication_panel_deactivated(
         id: str,
         review: bool = False,
-    ) -> str:
+    ) -> HistoryNote:
         return (
             f"ClinicalIndicationPanel {id} deactivated online" + " by review"
             if review
             else ""
         )
 
+    @_event(HistoryEvent.REVERTED)
     def clinical_indication_panel_reverted(
         id: str,
         old_value: str,
         new_value: str,
         review: bool = False,
-    ) -> str:
+    ) -> HistoryNote:
         return (
             f"ClinicalIndicationPanel {id} reverted from {old_value} to {new_value}"
             + " by review"
@@ -74,17 +237,19 @@ class History:
             else ""
         )
 
-    def clinical_indication_panel_approved(id: str) -> str:
+    @_event(HistoryEvent.APPROVED)
+    def clinical_indication_panel_approved(id: str) -> HistoryNote:
         return f"ClinicalIndicationPanel {id} approved by review"
 
     # clinical indication superpanel
+    @_event(HistoryEvent.REVERTED)
     def clinical_indication_superpanel_reverted(
         id: str,
         metadata: str,
         old_value: str,
         new_value: str,
         review: bool = False,
-    ) -> str:
+    ) -> HistoryNote:
         return (
             f"ClinicalIndicationSuperPanel {id} metadata '{metadata}' reverted from {old_value} to {new_value}"
             + " by review"
@@ -92,56 +257,70 @@ class History:
             else ""
         )
 
-    def clinical_indication_superpanel_approved(id: str) -> str:
+    @_event(HistoryEvent.APPROVED)
+    def clinical_indication_superpanel_approved(id: str) -> HistoryNote:
         return f"ClinicalIndicationSuperPanel {id} approved by review"
 
     # panel gene
+    @_event(HistoryEvent.FLAGGED)
     def panel_gene_flagged_due_to_confidence(
         confidence_level: str,
-    ) -> str:
+    ) -> HistoryNote:
         return f"PanelGene flagged for manual review - confidence level dropped to {confidence_level}"
 
-    def panel_gene_approved(user) -> str:
+    @_event(HistoryEvent.APPROVED)
+    def panel_gene_approved(user) -> HistoryNote:
         return f"PanelGene approved by {user}"
 
-    def panel_gene_reverted(user) -> str:
+    @_event(HistoryEvent.REVERTED)
+    def panel_gene_reverted(user) -> HistoryNote:
         return f"PanelGene reverted by {user}"
 
     # test directory history
-    def td_added() -> str:
+    @_event(HistoryEvent.OTHER)
+    def td_added() -> HistoryNote:
         return "New td version added"
 
-    def panel_ci_autolink() -> str:
+    @_event(HistoryEvent.TD_LINKED)
+    def panel_ci_autolink() -> HistoryNote:
         return "Panel has automatically been linked to an existing ClinicalIndication - test directory version applied automatically"
 
-    def td_panel_ci_autolink(new_td) -> str:
+    @_event(HistoryEvent.TD_LINKED)
+    def td_panel_ci_autolink(new_td) -> HistoryNote:
         return f"Panel-ClinicalIndication linked to a new TestDirectoryRelease {new_td}"
 
-    def td_superpanel_ci_autolink(new_td) -> str:
+    @_event(HistoryEvent.TD_LINKED)
+    def td_superpanel_ci_autolink(new_td) -> HistoryNote:
         return f"SuperPanel-ClinicalIndication linked to a new TestDirectoryRelease {new_td}"
 
     # gene/HGNC releases
+    @_event(HistoryEvent.CHANGED)
     def gene_hgnc_release_approved_symbol_change(
         old_value: str, new_value: str
-    ) -> str:
+    ) -> HistoryNote:
         return (
             f"HGNC approved symbol has changed from {old_value} to {new_value}"
         )
 
+    @_event(HistoryEvent.CHANGED)
     def gene_hgnc_release_alias_symbol_change(
         old_value: str, new_value: str
-    ) -> str:
+    ) -> HistoryNote:
         return f"HGNC alias symbol has changed from {old_value} to {new_value}"
 
-    def gene_hgnc_release_new() -> str:
+    @_event(HistoryEvent.CREATED)
+    def gene_hgnc_release_new() -> HistoryNote:
         return "HGNC gene has been added for the first time"
 
-    def gene_hgnc_release_present() -> str:
+    @_event(HistoryEvent.OTHER)
+    def gene_hgnc_release_present() -> HistoryNote:
         return "HGNC gene is present in this release"
 
     # transcript/gff releases
-    def tx_gff_release_new() -> str:
+    @_event(HistoryEvent.CREATED)
+    def tx_gff_release_new() -> HistoryNote:
         return "Transcript added from a GFF release for the first time"
 
-    def tx_gff_release_present() -> str:
+    @_event(HistoryEvent.OTHER)
+    def tx_gff_release_present() -> HistoryNote:
         return "Transcript is present in this release"
@@ -1,44 +1,103 @@
+import collections
+import queue
+import threading
+from typing import Iterator
+
 import requests
 
 from core.settings import PANELAPP_API_URL
+from panels_backend.models import Panel, SuperPanel
+from .utils import sortable_version
+
+
+class PanelGeneData:
+    """
+    Class for a single gene on a PanelApp panel. Only the fields which Eris
+    stores are kept - evidence, publications, phenotypes and other nested
+    data from the API are dropped.
+    """
+
+    __slots__ = (
+        "hgnc_id",
+        "gene_name",
+        "gene_symbol",
+        "alias_symbols",
+        "confidence_level",
+        "mode_of_inheritance",
+        "mode_of_pathogenicity",
+        "penetrance",
+        "panel_id",
+    )
+
+    def __init__(self, gene: dict):
+        """
+        :param: gene, a single entry from the 'genes' list of the PanelApp API
+        """
+        gene_data: dict = gene.get("gene_data") or {}
+
+        hgnc_id = gene_data.get("hgnc_id")
+        self.hgnc_id: str | None = str(hgnc_id) if hgnc_id else None
+        self.gene_name: str | None = gene_data.get("gene_name")
+        self.gene_symbol: str | None = gene_data.get("gene_symbol")
+        self.alias_symbols: tuple[str] = tuple(gene_data.get("alias") or ())
+        self.confidence_level: str | None = gene.get("confidence_level")
+        self.mode_of_inheritance: str | None = gene.get("mode_of_inheritance")
+        self.mode_of_pathogenicity: str | None = gene.get(
+            "mode_of_pathogenicity"
+        )
+        self.penetrance: str | None = gene.get("penetrance")
+        # for superpanels, the child panel which the gene comes from
+        self.panel_id: int | None = (gene.get("panel") or {}).get("id")
 
 
 class PanelClass:
     """
-    Class for panel data. Default population is by greedy ingestion of all
-    attributes from PanelApp API.
+    Class for panel data, built from the PanelApp API response. Only the
+    fields which Eris stores are kept, and genes without gene data are
+    dropped.
 
     SuperPanelClass is available for superpanels
     """
 
+    __slots__ = ("id", "name", "version", "panel_source", "genes")
+
     def __init__(self, **a):
-        # common default attributes
-        self.id: str = None
-        self.name: str = None
-        self.version: str = None
-        self.panel_source: str = None
-        self.genes: list[dict] = []
-        self.regions: list[dict] = []
-        self.types: list[dict] = []
-        [setattr(self, key, a[key]) for key in a]
+        self.id: str = a.get("id")
+        self.name: str = a.get("name")
+        self.version: str = a.get("version")
+        self.panel_source: str = a.get("panel_source")
+        self.genes: list[PanelGeneData] = [
+            PanelGeneData(gene)
+            for gene in a.get("genes") or []
+            if gene.get("gene_data")
+        ]
 
 
 class SuperPanelClass:
     """
-    Class for superpanel data, which ingests from PanelApp API.
+    Class for superpanel data, built from the PanelApp API response.
     Will contain PanelClass objects.
     """
 
+    __slots__ = (
+        "id",
+        "name",
+        "version",
+        "panel_source",
+        "child_panel_ids",
+        "child_panels",
+    )
+
     def __init__(self, **a):
-        # common default attributes
-        self.id: str = None
-        self.name: str = None
-        self.version: str = None
-        self.panel_source: str = None
-        self.genes: list[dict] = []
-        self.regions: list[dict] = []
-        self.types: list[dict] = []
-        [setattr(self, key, a[key]) for key in a]
+        self.id: str = a.get("id")
+        self.name: str = a.get("name")
+        self.version: str = a.get("version")
+        self.panel_source: str = a.get("panel_source")
+
+        # child panels are found under 'panel' in each constituent gene
+        self.child_panel_ids: list[int] = list(
+            dict.fromkeys(g["panel"]["id"] for g in a.get("genes") or [])
+        )
 
         self.child_panels: list[PanelClass] = []
         self._create_component_panels()
@@ -53,9 +112,7 @@ class SuperPanelClass:
         in parsing.
         In addition: we need to find LATEST SIGNED OFF versions of each child-panel
         """
-        children_panel_ids = set([g["panel"]["id"] for g in self.genes])
-
-        for panel_id in children_panel_ids:
+        for panel_id in self.child_panel_ids:
             latest_signed_off_version = (
                 _fetch_latest_signed_off_version_based_on_panel_id(panel_id)
             )
@@ -183,35 +240,165 @@ def get_specific_version_panel(
     return panel, is_superpanel
 
 
-def process_all_signed_off_panels() -> (
-    tuple[list[PanelClass], list[SuperPanelClass]]
-):
+def _classify_signed_off_panels(
+    signed_off_panels: list[dict],
+) -> tuple[list[dict], list[dict], list[dict]]:
+    """
+    Compare the PanelApp signed-off listing against the Panel and SuperPanel
+    records already in the database, using a single query.
+    A listed panel is 'unchanged' if a Panel or SuperPanel with the same
+    external_id and version already exists, 'updated' if the external_id is
+    known but not at this version, and 'new' otherwise.
+
+    :param: signed_off_panels, the listing from _get_all_signed_off_panels()
+    :return: unchanged, a list of listing entries already in the db
+    :return: updated, a list of listing entries with a new version
+    :return: new, a list of listing entries not yet in the db
+    """
+    external_ids = set([str(panel["id"]) for panel in signed_off_panels])
+
+    # panels and superpanels share PanelApp IDs, so check both in one UNION
+    known_versions: dict[str, set[str]] = collections.defaultdict(set)
+    for external_id, version in (
+        Panel.objects.filter(external_id__in=external_ids)
+        .values_list("external_id", "panel_version")
+        .union(
+            SuperPanel.objects.filter(
+                external_id__in=external_ids
+            ).values_list("external_id", "panel_version")
+        )
+    ):
+        known_versions[external_id].add(version)
+
+    unchanged, updated, new = [], [], []
+
+    for panel in signed_off_panels:
+        external_id = str(panel["id"])
+
+        if external_id not in known_versions:
+            new.append(panel)
+        elif (
+            sortable_version(panel.get("version"))
+            in known_versions[external_id]
+        ):
+            unchanged.append(panel)
+        else:
+            updated.append(panel)
+
+    return unchanged, updated, new
+
+
+# marks the end of a stream of fetched panels
+_END_OF_STREAM = object()
+
+
+def _put_unless_stopped(
+    buffer: queue.Queue, item: object, stop: threading.Event
+) -> None:
+    """
+    Put an item on a bounded queue, waiting for space, but give up if the
+    consumer has stopped reading
+
+    :param: buffer, the bounded queue
+    :param: item, the item to add to the queue
+    :param: stop, an Event set by the consumer when it stops reading
+    """
+    while not stop.is_set():
+        try:
+            buffer.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+
+def stream_signed_off_panels(
+    signed_off_panels: list[dict], buffer_size: int = 10
+) -> Iterator[tuple[PanelClass | SuperPanelClass, bool]]:
+    """
+    Fetch the full, specific signed-off version of each panel in a listing,
+    yielding each one as soon as it is ready.
+    Fetching is done by a background thread which feeds a bounded queue, so
+    the caller can insert one panel into the database while the next ones are
+    downloaded, and no more than buffer_size panels are held in memory.
+    Errors raised while fetching are re-raised to the caller.
+
+    :param: signed_off_panels, a list of panel entries from the signed-off listing
+    :param: buffer_size, the maximum number of fetched panels waiting to be
+    consumed
+    :return: an iterator of (PanelClass or SuperPanelClass, is_superpanel)
+    """
+    buffer = queue.Queue(maxsize=buffer_size)
+    stop = threading.Event()
+
+    def _producer() -> None:
+        try:
+            for panel in signed_off_panels:
+                if stop.is_set():
+                    return
+
+                # fetching specific signed-off version
+                panel_data, is_superpanel = get_specific_version_panel(
+                    panel["id"], panel.get("version")
+                )
+                if panel_data:
+                    panel_data.panel_source = "PanelApp"
+                    _put_unless_stopped(
+                        buffer, (panel_data, is_superpanel), stop
+                    )
+
+            _put_unless_stopped(buffer, _END_OF_STREAM, stop)
+        except BaseException as e:
+            # includes SystemExit from get_panel_from_url
+            _put_unless_stopped(buffer, e, stop)
+
+    producer = threading.Thread(target=_producer, daemon=True)
+    producer.start()
+
+    try:
+        while True:
+            item = buffer.get()
+
+            if item is _END_OF_STREAM:
+                return
+
+            if isinstance(item, BaseException):
+                raise item
+
+            yield item
+    finally:
+        stop.set()
+        producer.join()
+
+
+def process_all_signed_off_panels(
+    incremental: bool = False,
+) -> Iterator[tuple[PanelClass | SuperPanelClass, bool]]:
     """
     Function to process all signed off panels and superpanels,
     starting by getting information from _get_all_signed_off_panels()
+    Panels are streamed as they are fetched - see stream_signed_off_panels()
 
-    :return: a list of PanelClass objects
-    :return: a list of SuperPanelClass objects
+    If incremental is True, panels whose external ID and version are already
+    in the database are not fetched. Note that a superpanel is only refetched
+    when its own version changes - child panels are picked up through their own
+    entries in the signed-off listing.
+
+    :param: incremental, only fetch panels which are new or have a new version
+    :return: an iterator of (PanelClass or SuperPanelClass, is_superpanel)
     """
 
     print("Fetching all PanelApp panels...")
 
-    panels: list[PanelClass] = []
-    superpanels: list[SuperPanelClass] = []
-
-    for panel in _get_all_signed_off_panels():
-        panel_id = panel["id"]
-        panel_version = panel.get("version")
+    signed_off_panels = _get_all_signed_off_panels()
 
-        # fetching specific signed-off version
-        panel_data, is_superpanel = get_specific_version_panel(
-            panel_id, panel_version
+    if incremental:
+        unchanged, updated, new = _classify_signed_off_panels(
+            signed_off_panels
         )
-        if panel_data:
-            panel_data.panel_source = "PanelApp"
-            if is_superpanel:
-                superpanels.append(panel_data)
-            else:
-                panels.append(panel_data)
-
-    return panels, superpanels
+        print(
+            f"Signed-off panels: {len(unchanged)} unchanged, "
+            f"{len(updated)} updated, {len(new)} new"
+        )
+        signed_off_panels = updated + new
+
+    return stream_signed_off_panels(signed_off_panels)
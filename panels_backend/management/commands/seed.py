@@ -6,9 +6,13 @@ import os
 import json
 import re
 
-from ._insert_panel import panel_insert_controller
+from ._insert_panel import (
+    panel_insert_controller,
+    panel_stream_insert_controller,
+)
 from ._parse_transcript import seed_transcripts
 from ._insert_ci import insert_test_directory_data
+from ._td_diff import diff_test_directory, format_td_diff_table
 from .panelapp import (
     process_all_signed_off_panels,
     get_specific_version_panel,
@@ -108,6 +112,13 @@ class Command(BaseCommand):
             help="PanelApp panel version (optional)",
         )
 
+        panelapp.add_argument(
+            "--incremental",
+            action="store_true",
+            help="with 'all', only fetch panels which are new or have a new "
+            "signed-off version",
+        )
+
         # Parser for test directory command e.g. test_dir <input_json> <Y/N>
         td = subparsers.add_parser("td", help="import test directory data")
 
@@ -130,6 +141,15 @@ class Command(BaseCommand):
             help="force td seed ignoring td version",
         )
 
+        td.add_argument(
+            "--dry_run",
+            nargs="?",
+            const="table",
+            choices=["table", "json"],
+            help="print what the import would change, as a table (default) "
+            "or json, without changing the database",
+        )
+
         # Parser for transcript command e.g. transcript
         transcript = subparsers.add_parser(
             "transcript", help="seed transcripts for genes"
@@ -227,15 +247,17 @@ class Command(BaseCommand):
 
         assert command, "Please specify command: panelapp / td / transcript"
 
-        # python manage.py seed panelapp <all/panel_id> <version>
+        # python manage.py seed panelapp <all/panel_id> <version> --incremental
         if command == "panelapp":
             panel_id: str = kwargs.get("panel")
             panel_version: str = kwargs.get("version")
+            incremental: bool = kwargs.get("incremental")
 
             if panel_id == "all":
-                # Seeding every panel and superpanel in PanelApp
-                panels, superpanels = process_all_signed_off_panels()
-                panel_insert_controller(panels, superpanels, user=None)
+                # Seeding every panel and superpanel in PanelApp - panels
+                # are inserted while the following ones are still downloading
+                panel_stream = process_all_signed_off_panels(incremental)
+                panel_stream_insert_controller(panel_stream, user=None)
                 print("Done.")
 
             else:
@@ -296,6 +318,7 @@ class Command(BaseCommand):
                     print("Done.")
 
         # python manage.py seed td <input_json> --td_release <td_release_version> <Y/N>
+        # add --dry_run [table/json] to preview the changes without importing
         elif command == "td":
             input_directory = kwargs.get("input")
             td_release = kwargs.get("td_release")
@@ -309,6 +332,16 @@ class Command(BaseCommand):
             with open(input_directory) as reader:
                 json_data = json.load(reader)
 
+            dry_run: str | None = kwargs.get("dry_run")
+
+            if dry_run:
+                report = diff_test_directory(json_data, td_release)
+                if dry_run == "json":
+                    print(json.dumps(report, indent=2))
+                else:
+                    print(format_td_diff_table(report))
+                return
+
             insert_test_directory_data(json_data, td_release, force)
 
         # python manage.py seed transcript --hgnc <path> --hgnc_release <str> --mane <path>
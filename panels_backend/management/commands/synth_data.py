@@ -0,0 +1,927 @@
+"""
+python manage.py synth_data --scale 1 --seed 0 --output synthetic_files
+
+Fill an empty database with deterministic synthetic data at realistic
+volumes, for benchmarking seeding, generate and the web pages. At scale 1
+this is about 45,000 genes, 400,000 transcripts across GRCh37 and GRCh38,
+1,000 PanelApp panels with up to 8 versions each, 100 superpanels, 400
+clinical indications linked through 5 test directory releases, and over
+100,000 history rows. Everything but the test directory releases and the
+number of panel versions scales with --scale.
+
+With --output, matching HGNC, MANE, GFF and HGMD (gene2refseq and markname)
+input files are written too, so seed transcript can be benchmarked on the
+same genes and transcripts.
+"""
+import csv
+import datetime as dt
+import os
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import DateTimeField, ExpressionWrapper, F, Model, Value
+
+from panels_backend.models import (
+    ClinicalIndication,
+    ClinicalIndicationPanel,
+    ClinicalIndicationPanelHistory,
+    ClinicalIndicationSuperPanel,
+    ClinicalIndicationSuperPanelHistory,
+    CiPanelTdRelease,
+    CiSuperpanelTdRelease,
+    Confidence,
+    Gene,
+    GeneHgncRelease,
+    GeneHgncReleaseHistory,
+    GffRelease,
+    HgncRelease,
+    ModeOfInheritance,
+    Panel,
+    PanelGene,
+    PanelGeneHistory,
+    PanelSuperPanel,
+    ReferenceGenome,
+    SuperPanel,
+    TestDirectoryRelease,
+    Transcript,
+    TranscriptGffRelease,
+    TranscriptRelease,
+    TranscriptReleaseTranscript,
+    TranscriptSource,
+)
+from .history import History
+from .utils import sortable_version
+
+# volumes at scale 1
+SYNTH_GENES = 45000
+SYNTH_PANELS = 1000
+SYNTH_SUPERPANELS = 100
+SYNTH_CLINICAL_INDICATIONS = 400
+
+# these don't scale
+SYNTH_TD_RELEASES = 5
+SYNTH_MAX_PANEL_VERSIONS = 8
+SYNTH_MAX_TRANSCRIPTS = 8
+
+# reference genomes, with the Ensembl release of their GFF
+SYNTH_REFERENCE_GENOMES = {"GRCh37": "87", "GRCh38": "110"}
+SYNTH_CHROMOSOMES = [str(i) for i in range(1, 23)] + ["X", "Y"]
+SYNTH_MOIS = [
+    "MONOALLELIC, autosomal or pseudoautosomal, imprinted status unknown",
+    "BIALLELIC, autosomal or pseudoautosomal",
+    "X-LINKED: hemizygous mutation in males, biallelic mutations in females",
+]
+SYNTH_TEST_METHODS = [
+    "WGS",
+    "Small panel",
+    "Single gene sequencing >=10 amplicons",
+]
+
+# history rows are given created times this far apart, from this time, so
+# that date filters and paging see a spread of dates
+SYNTH_HISTORY_START = dt.datetime(2023, 1, 1, tzinfo=dt.timezone.utc)
+SYNTH_HISTORY_STEP = dt.timedelta(minutes=5)
+
+# number of rows inserted at a time
+SYNTH_BULK_ROWS = 5000
+
+
+def _scaled(count: int, scale: float) -> int:
+    """
+    :param: count, the number of items at scale 1
+    :param: scale, the scale
+    :return: the number of items at the scale - always at least 1
+    """
+    return max(1, round(count * scale))
+
+
+def plan_synthetic_data(scale: float, seed: int, pending: bool = True) -> dict:
+    """
+    Work out the synthetic data to insert and write, without touching the
+    database. The same scale and seed always give the same plan.
+
+    :param: scale, 1 for the volumes in SYNTH_GENES etc.
+    :param: seed, seed for the random choices
+    :param: pending, whether to include items awaiting review - generate
+    genepanels won't run while there are any. The rest of the plan is the
+    same either way.
+    :return: a dict of:
+    - "genes": dicts of hgnc_id, symbol, previous (symbols), aliases, chrom,
+    start and transcripts - dicts of transcript, mane (the MANE type, or
+    None), hgmd (whether it's the HGMD transcript of the gene) and exons
+    - "panels": dicts of external_id, name, and versions - dicts of version
+    and the indexes of the genes added and removed in it
+    - "pending_genes": for each panel, indexes of genes awaiting review on
+    its latest version
+    - "superpanels": dicts of external_id, name and the indexes of their
+    panels
+    - "td_releases": the test directory release names, oldest first
+    - "clinical_indications": dicts of r_code, name, test_method, the
+    indexes of their panels and superpanels, first_release (the index of the
+    release they were added in) and pending (whether their panels' latest
+    versions await review)
+    """
+    rng = random.Random(seed)
+
+    gene_count = _scaled(SYNTH_GENES, scale)
+    genes = []
+    transcript_number = 0
+
+    for i in range(gene_count):
+        transcripts = []
+        for _ in range(rng.randint(1, SYNTH_MAX_TRANSCRIPTS)):
+            transcript_number += 1
+            transcripts.append(
+                {
+                    "transcript": f"NM_{transcript_number:06}."
+                    f"{rng.randint(1, 3)}",
+                    "mane": None,
+                    "hgmd": False,
+                    "exons": rng.randint(2, 6),
+                }
+            )
+
+        # most genes have a MANE Select transcript, and a few a MANE Plus
+        # Clinical one too. Genes without one fall back on HGMD.
+        if rng.random() < 0.85:
+            transcripts[0]["mane"] = "MANE SELECT"
+            if len(transcripts) > 1 and rng.random() < 0.02:
+                transcripts[1]["mane"] = "MANE PLUS CLINICAL"
+        if rng.random() < 0.9:
+            rng.choice(transcripts)["hgmd"] = True
+
+        genes.append(
+            {
+                "hgnc_id": f"HGNC:{i + 1}",
+                "symbol": f"SYN{i + 1}",
+                "previous": [f"OLD{i + 1}"] if rng.random() < 0.1 else [],
+                "aliases": [
+                    f"SYN{i + 1}A{n}"
+                    for n in range(1, rng.choice([0, 0, 0, 1, 2]) + 1)
+                ],
+                "chrom": SYNTH_CHROMOSOMES[i % len(SYNTH_CHROMOSOMES)],
+                "start": 10000 + (i // len(SYNTH_CHROMOSOMES)) * 100000,
+                "transcripts": transcripts,
+            }
+        )
+
+    panels = []
+    pending_genes = []
+
+    for p in range(_scaled(SYNTH_PANELS, scale)):
+        current = set(
+            rng.sample(range(gene_count), min(rng.randint(5, 120), gene_count))
+        )
+        versions = [
+            {
+                "version": sortable_version("1.0"),
+                "added": sorted(current),
+                "removed": [],
+            }
+        ]
+
+        for v in range(2, rng.randint(1, SYNTH_MAX_PANEL_VERSIONS) + 1):
+            removed = rng.sample(
+                sorted(current), min(rng.randint(0, 3), len(current) - 1)
+            )
+            current.difference_update(removed)
+
+            added = set()
+            for _ in range(rng.randint(0, 5)):
+                gene = rng.randrange(gene_count)
+                if gene not in current:
+                    added.add(gene)
+            current.update(added)
+
+            versions.append(
+                {
+                    "version": sortable_version(f"{v}.0"),
+                    "added": sorted(added),
+                    "removed": sorted(removed),
+                }
+            )
+
+        panels.append(
+            {
+                "external_id": str(p + 1),
+                "name": f"Synthetic panel {p + 1}",
+                "versions": versions,
+            }
+        )
+
+        # genes newly added to the panel, awaiting review
+        gene = rng.randrange(gene_count)
+        pending_genes.append(
+            [gene]
+            if gene not in current and rng.random() < 0.05 and pending
+            else []
+        )
+
+    superpanels = [
+        {
+            "external_id": str(len(panels) + s + 1),
+            "name": f"Synthetic superpanel {s + 1}",
+            "panels": rng.sample(
+                range(len(panels)), min(rng.randint(2, 10), len(panels))
+            ),
+        }
+        for s in range(_scaled(SYNTH_SUPERPANELS, scale))
+    ]
+
+    td_releases = [f"{r}.0" for r in range(1, SYNTH_TD_RELEASES + 1)]
+
+    clinical_indications = []
+    for c in range(_scaled(SYNTH_CLINICAL_INDICATIONS, scale)):
+        clinical_indications.append(
+            {
+                "r_code": f"R{c + 1}.1",
+                "name": f"Synthetic indication {c + 1}",
+                "test_method": rng.choice(SYNTH_TEST_METHODS),
+                "panels": rng.sample(
+                    range(len(panels)), min(rng.randint(1, 3), len(panels))
+                ),
+                "superpanels": (
+                    [rng.randrange(len(superpanels))]
+                    if rng.random() < 0.15
+                    else []
+                ),
+                "first_release": rng.randrange(len(td_releases)),
+                "pending": rng.random() < 0.05 and pending,
+            }
+        )
+
+    return {
+        "genes": genes,
+        "panels": panels,
+        "pending_genes": pending_genes,
+        "superpanels": superpanels,
+        "td_releases": td_releases,
+        "clinical_indications": clinical_indications,
+    }
+
+
+def write_synthetic_files(plan: dict, output: str) -> dict[str, str]:
+    """
+    Write HGNC, MANE, GFF and HGMD input files for the genes and transcripts
+    of a plan, in the formats seed transcript reads
+
+    :param: plan, from plan_synthetic_data
+    :param: output, the directory to write to - made if it doesn't exist
+    :return: the path of each file, keyed by the seed transcript argument
+    it's for (hgnc, mane, gff_GRCh37, gff_GRCh38, g2refseq and markname).
+    The HGNC file also has the columns generate genepanels needs.
+    """
+    os.makedirs(output, exist_ok=True)
+    paths = {
+        "hgnc": os.path.join(output, "hgnc_dump_synthetic.txt"),
+        "mane": os.path.join(output, "mane_synthetic.csv"),
+        "g2refseq": os.path.join(output, "gene2refseq_synthetic.csv"),
+        "markname": os.path.join(output, "markname_synthetic.csv"),
+    }
+    for genome in SYNTH_REFERENCE_GENOMES:
+        paths[f"gff_{genome}"] = os.path.join(
+            output, f"gff_synthetic_{genome}.tsv"
+        )
+
+    genes = plan["genes"]
+
+    with open(paths["hgnc"], "w", newline="") as f:
+        writer = csv.writer(f, delimiter="\t", lineterminator="\n")
+        writer.writerow(
+            [
+                "HGNC ID",
+                "Approved symbol",
+                "Approved name",
+                "Locus type",
+                "Previous symbols",
+                "Alias symbols",
+                "Accession numbers",
+                "RefSeq IDs",
+            ]
+        )
+        for gene in genes:
+            writer.writerow(
+                [
+                    gene["hgnc_id"],
+                    gene["symbol"],
+                    f"synthetic gene {gene['symbol']}",
+                    "gene with protein product",
+                    ", ".join(gene["previous"]),
+                    ", ".join(gene["aliases"]),
+                    "",
+                    gene["transcripts"][0]["transcript"].split(".")[0],
+                ]
+            )
+
+    with open(paths["mane"], "w", newline="") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL, lineterminator="\n")
+        writer.writerow(
+            [
+                "Gene",
+                "MANE TYPE",
+                "Ensembl StableID GRCh38",
+                "RefSeq StableID GRCh38 / GRCh37",
+                "Ensembl StableID GRCh37 (Not MANE)",
+                "5'UTR",
+                "CDS",
+                "3'UTR",
+            ]
+        )
+        for gene in genes:
+            for tx in gene["transcripts"]:
+                if tx["mane"]:
+                    ensembl = f"ENST{tx['transcript'][3:9].zfill(11)}"
+                    writer.writerow(
+                        [
+                            gene["symbol"],
+                            tx["mane"],
+                            f"{ensembl}.1",
+                            tx["transcript"],
+                            f"{ensembl}.1",
+                            "",
+                            "Y",
+                            "",
+                        ]
+                    )
+
+    # HGMD IDs are the gene's position in the plan, from 1
+    with open(paths["g2refseq"], "w", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["hgmdID", "refcore", "refversion"])
+        for hgmd_id, gene in enumerate(genes, 1):
+            for tx in gene["transcripts"]:
+                if tx["hgmd"]:
+                    writer.writerow([hgmd_id, *tx["transcript"].split(".")])
+
+    with open(paths["markname"], "w", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["gene_id", "genesym", "hgncID"])
+        for hgmd_id, gene in enumerate(genes, 1):
+            writer.writerow(
+                [hgmd_id, gene["symbol"], gene["hgnc_id"].split(":")[1]]
+            )
+
+    # parsed GFF: one headerless line per exon. GRCh37 coordinates are
+    # shifted so the two builds differ.
+    for offset, genome in enumerate(SYNTH_REFERENCE_GENOMES):
+        with open(paths[f"gff_{genome}"], "w", newline="") as f:
+            lines = []
+            for gene in genes:
+                start = gene["start"] + offset * 5000
+                for tx in gene["transcripts"]:
+                    for exon in range(1, tx["exons"] + 1):
+                        exon_start = start + exon * 1000
+                        lines.append(
+                            f"{gene['chrom']}\t{exon_start}\t"
+                            f"{exon_start + 200}\t{gene['hgnc_id']}\t"
+                            f"{tx['transcript']}\t{exon}\n"
+                        )
+
+                if len(lines) >= SYNTH_BULK_ROWS:
+                    f.write("".join(lines))
+                    lines = []
+
+            f.write("".join(lines))
+
+    return paths
+
+
+def _history_rows(
+    history_model: type[Model], field: str, notes: list[tuple[Model, str]]
+) -> list[Model]:
+    """
+    :param: history_model, a history table with an event_type column
+    :param: field, the field of the history table linking to the item
+    :param: notes, (item, History helper note) for each row
+    :return: the unsaved history rows, with the event type of their note
+    """
+    return [
+        history_model(**{field: item}, note=note, event_type=note.event_type)
+        for item, note in notes
+    ]
+
+
+def _insert_genes(plan: dict) -> dict[str, int]:
+    """
+    Insert the genes of a plan, linked to an HGNC release, and their
+    transcripts in both reference genomes, linked to GFF and MANE Select,
+    MANE Plus Clinical and HGMD releases
+
+    :param: plan, from plan_synthetic_data
+    :return: counts of the rows inserted
+    """
+    hgnc_release = HgncRelease.objects.create(release="1")
+    genes = Gene.objects.bulk_create(
+        [
+            Gene(
+                hgnc_id=gene["hgnc_id"],
+                gene_symbol=gene["symbol"],
+                alias_symbols=",".join(gene["aliases"]) or None,
+            )
+            for gene in plan["genes"]
+        ],
+        batch_size=SYNTH_BULK_ROWS,
+    )
+    gene_releases = GeneHgncRelease.objects.bulk_create(
+        [
+            GeneHgncRelease(gene=gene, hgnc_release=hgnc_release)
+            for gene in genes
+        ],
+        batch_size=SYNTH_BULK_ROWS,
+    )
+    GeneHgncReleaseHistory.objects.bulk_create(
+        [
+            GeneHgncReleaseHistory(
+                gene_hgnc_release=gene_release,
+                note=History.gene_hgnc_release_new(),
+            )
+            for gene_release in gene_releases
+        ],
+        batch_size=SYNTH_BULK_ROWS,
+    )
+
+    sources = {
+        source: TranscriptSource.objects.create(source=source)
+        for source in ["MANE Select", "MANE Plus Clinical", "HGMD"]
+    }
+    mane_sources = {
+        "MANE SELECT": "MANE Select",
+        "MANE PLUS CLINICAL": "MANE Plus Clinical",
+    }
+    transcript_count = 0
+
+    for name, ensembl_release in SYNTH_REFERENCE_GENOMES.items():
+        genome = ReferenceGenome.objects.create(name=name)
+        gff_release = GffRelease.objects.create(
+            ensembl_release=ensembl_release, reference_genome=genome
+        )
+        releases = {
+            source: TranscriptRelease.objects.create(
+                source=source_instance,
+                release="1.0",
+                reference_genome=genome,
+            )
+            for source, source_instance in sources.items()
+        }
+
+        planned = [
+            (gene, planned_gene, tx)
+            for gene, planned_gene in zip(genes, plan["genes"])
+            for tx in planned_gene["transcripts"]
+        ]
+        transcripts = Transcript.objects.bulk_create(
+            [
+                Transcript(
+                    transcript=tx["transcript"],
+                    gene=gene,
+                    reference_genome=genome,
+                )
+                for gene, _, tx in planned
+            ],
+            batch_size=SYNTH_BULK_ROWS,
+        )
+        transcript_count += len(transcripts)
+
+        TranscriptGffRelease.objects.bulk_create(
+            [
+                TranscriptGffRelease(
+                    transcript=transcript, gff_release=gff_release
+                )
+                for transcript in transcripts
+            ],
+            batch_size=SYNTH_BULK_ROWS,
+        )
+
+        release_links = []
+        for transcript, (_, planned_gene, tx) in zip(transcripts, planned):
+            if tx["mane"]:
+                release_links.append(
+                    TranscriptReleaseTranscript(
+                        transcript=transcript,
+                        release=releases[mane_sources[tx["mane"]]],
+                        match_version=True,
+                        match_base=True,
+                        default_clinical=True,
+                    )
+                )
+            if tx["hgmd"]:
+                has_mane = any(t["mane"] for t in planned_gene["transcripts"])
+                release_links.append(
+                    TranscriptReleaseTranscript(
+                        transcript=transcript,
+                        release=releases["HGMD"],
+                        match_version=False,
+                        match_base=True,
+                        default_clinical=not has_mane,
+                    )
+                )
+        TranscriptReleaseTranscript.objects.bulk_create(
+            release_links, batch_size=SYNTH_BULK_ROWS
+        )
+
+    return {"genes": len(genes), "transcripts": transcript_count}
+
+
+def _insert_panels(plan: dict) -> tuple[list[Panel], list[SuperPanel], dict]:
+    """
+    Insert the PanelApp panel versions and superpanels of a plan. Versions
+    of a panel share the links of genes which don't change between them,
+    ended by valid_until when a gene is removed.
+
+    :param: plan, from plan_synthetic_data
+    :return: the latest version of each panel, the superpanels, and counts
+    of the rows inserted
+    """
+    genes = list(Gene.objects.order_by("id"))
+    confidence = Confidence.objects.create(confidence_level="3")
+    amber = Confidence.objects.create(confidence_level="2")
+    mois = [
+        ModeOfInheritance.objects.create(mode_of_inheritance=moi)
+        for moi in SYNTH_MOIS
+    ]
+
+    versions = Panel.objects.bulk_create(
+        [
+            Panel(
+                external_id=panel["external_id"],
+                panel_name=panel["name"],
+                panel_version=version["version"],
+                panel_source="PanelApp",
+            )
+            for panel in plan["panels"]
+            for version in panel["versions"]
+        ],
+        batch_size=SYNTH_BULK_ROWS,
+    )
+
+    links = []
+    latest = []
+    remaining = iter(versions)
+
+    for panel, pending_genes in zip(plan["panels"], plan["pending_genes"]):
+        current = {}
+        for planned_version in panel["versions"]:
+            version = next(remaining)
+
+            for gene in planned_version["removed"]:
+                current.pop(gene).valid_until = version.panel_version
+
+            for gene in planned_version["added"]:
+                current[gene] = PanelGene(
+                    panel=version,
+                    gene=genes[gene],
+                    confidence=confidence,
+                    moi=mois[gene % len(mois)],
+                    justification="PanelApp",
+                    active=True,
+                    pending=False,
+                    shared=True,
+                )
+                links.append(current[gene])
+
+        latest.append(version)
+        links.extend(
+            PanelGene(
+                panel=version,
+                gene=genes[gene],
+                confidence=amber,
+                moi=mois[gene % len(mois)],
+                justification="PanelApp",
+                active=True,
+                pending=True,
+            )
+            for gene in pending_genes
+        )
+
+    links = PanelGene.objects.bulk_create(links, batch_size=SYNTH_BULK_ROWS)
+    PanelGeneHistory.objects.bulk_create(
+        _history_rows(
+            PanelGeneHistory,
+            "panel_gene",
+            [
+                (
+                    link,
+                    (
+                        History.panel_gene_flagged_due_to_confidence("2")
+                        if link.pending
+                        else History.panel_gene_created()
+                    ),
+                )
+                for link in links
+            ],
+        ),
+        batch_size=SYNTH_BULK_ROWS,
+    )
+
+    superpanels = SuperPanel.objects.bulk_create(
+        [
+            SuperPanel(
+                external_id=superpanel["external_id"],
+                panel_name=superpanel["name"],
+                panel_version=sortable_version("1.0"),
+                panel_source="PanelApp",
+            )
+            for superpanel in plan["superpanels"]
+        ]
+    )
+    PanelSuperPanel.objects.bulk_create(
+        [
+            PanelSuperPanel(superpanel=superpanel, panel=latest[panel])
+            for superpanel, planned in zip(superpanels, plan["superpanels"])
+            for panel in planned["panels"]
+        ],
+        batch_size=SYNTH_BULK_ROWS,
+    )
+
+    counts = {
+        "panels": len(versions),
+        "panel genes": len(links),
+        "superpanels": len(superpanels),
+    }
+    return latest, superpanels, counts
+
+
+def _insert_clinical_indications(
+    plan: dict, latest: list[Panel], superpanels: list[SuperPanel]
+) -> dict:
+    """
+    Insert the clinical indications and test directory releases of a plan.
+    Each clinical indication is linked to the latest version of its panels,
+    and to its superpanels, in every release from the one it was added in.
+    The previous version of each panel is linked too, no longer current -
+    or, for pending clinical indications, still current, with the latest
+    version awaiting review.
+
+    :param: plan, from plan_synthetic_data
+    :param: latest, the latest version of each panel, from _insert_panels
+    :param: superpanels, the superpanels, from _insert_panels
+    :return: counts of the rows inserted
+    """
+    releases = [
+        TestDirectoryRelease.objects.create(
+            release=release,
+            td_source=f"synthetic_td_{release}.json",
+            config_source="synthetic_config.json",
+            td_date=f"2023-0{index + 1}-01",
+        )
+        for index, release in enumerate(plan["td_releases"])
+    ]
+    # the version before the latest, for panels with more than one
+    previous = {}
+    for panel, planned in zip(latest, plan["panels"]):
+        if len(planned["versions"]) > 1:
+            previous[panel.external_id] = planned["versions"][-2]["version"]
+    previous_panels = {
+        (panel.external_id, panel.panel_version): panel
+        for panel in Panel.objects.filter(
+            external_id__in=previous.keys(),
+            panel_version__in=set(previous.values()),
+        )
+    }
+
+    indications = ClinicalIndication.objects.bulk_create(
+        [
+            ClinicalIndication(
+                r_code=ci["r_code"],
+                name=ci["name"],
+                test_method=ci["test_method"],
+            )
+            for ci in plan["clinical_indications"]
+        ]
+    )
+
+    ci_panels = []
+    td_links = []
+    ci_superpanels = []
+    superpanel_td_links = []
+
+    for indication, ci in zip(indications, plan["clinical_indications"]):
+        ci_releases = releases[ci["first_release"] :]
+
+        for index in ci["panels"]:
+            panel = latest[index]
+            old_version = previous_panels.get(
+                (panel.external_id, previous.get(panel.external_id))
+            )
+            pending = ci["pending"] and old_version is not None
+
+            link = ClinicalIndicationPanel(
+                clinical_indication=indication,
+                panel=panel,
+                current=not pending,
+                pending=pending,
+            )
+            ci_panels.append(link)
+            if not pending:
+                td_links.extend((link, release) for release in ci_releases)
+
+            if old_version:
+                old_link = ClinicalIndicationPanel(
+                    clinical_indication=indication,
+                    panel=old_version,
+                    current=pending,
+                    pending=False,
+                )
+                ci_panels.append(old_link)
+                if pending:
+                    td_links.extend(
+                        (old_link, release) for release in ci_releases
+                    )
+
+        for index in ci["superpanels"]:
+            link = ClinicalIndicationSuperPanel(
+                clinical_indication=indication,
+                superpanel=superpanels[index],
+                current=True,
+                pending=False,
+            )
+            ci_superpanels.append(link)
+            superpanel_td_links.extend(
+                (link, release) for release in ci_releases
+            )
+
+    ClinicalIndicationPanel.objects.bulk_create(
+        ci_panels, batch_size=SYNTH_BULK_ROWS
+    )
+    ClinicalIndicationSuperPanel.objects.bulk_create(
+        ci_superpanels, batch_size=SYNTH_BULK_ROWS
+    )
+    CiPanelTdRelease.objects.bulk_create(
+        [
+            CiPanelTdRelease(ci_panel=link, td_release=release)
+            for link, release in td_links
+        ],
+        batch_size=SYNTH_BULK_ROWS,
+    )
+    CiSuperpanelTdRelease.objects.bulk_create(
+        [
+            CiSuperpanelTdRelease(ci_superpanel=link, td_release=release)
+            for link, release in superpanel_td_links
+        ],
+        batch_size=SYNTH_BULK_ROWS,
+    )
+
+    ci_panel_notes = [
+        (
+            link,
+            (
+                History.flag_clinical_indication_panel("new panel version")
+                if link.pending
+                else History.clinical_indication_panel_created()
+            ),
+        )
+        for link in ci_panels
+    ]
+    ci_panel_notes.extend(
+        (link, History.td_panel_ci_autolink(release.release))
+        for link, release in td_links
+    )
+    ClinicalIndicationPanelHistory.objects.bulk_create(
+        _history_rows(
+            ClinicalIndicationPanelHistory,
+            "clinical_indication_panel",
+            ci_panel_notes,
+        ),
+        batch_size=SYNTH_BULK_ROWS,
+    )
+
+    ci_superpanel_notes = [
+        (link, History.clinical_indication_superpanel_created())
+        for link in ci_superpanels
+    ]
+    ci_superpanel_notes.extend(
+        (link, History.td_superpanel_ci_autolink(release.release))
+        for link, release in superpanel_td_links
+    )
+    ClinicalIndicationSuperPanelHistory.objects.bulk_create(
+        _history_rows(
+            ClinicalIndicationSuperPanelHistory,
+            "clinical_indication_superpanel",
+            ci_superpanel_notes,
+        ),
+        batch_size=SYNTH_BULK_ROWS,
+    )
+
+    return {
+        "clinical indications": len(indications),
+        "clinical indication-panels": len(ci_panels),
+        "clinical indication-superpanels": len(ci_superpanels),
+        "test directory releases": len(releases),
+    }
+
+
+def _spread_history_dates(history_model: type[Model]) -> int:
+    """
+    Give the rows of a history table created times SYNTH_HISTORY_STEP
+    apart, in ID order, in one query - bulk inserted rows would otherwise
+    all have the same time
+
+    :param: history_model, the history table
+    :return: the number of rows updated
+    """
+    return history_model.objects.update(
+        created=ExpressionWrapper(
+            Value(SYNTH_HISTORY_START) + Value(SYNTH_HISTORY_STEP) * F("id"),
+            output_field=DateTimeField(),
+        )
+    )
+
+
+@transaction.atomic
+def insert_synthetic_data(plan: dict) -> dict[str, int]:
+    """
+    Insert a plan into the database with bulk inserts, in one transaction
+
+    :param: plan, from plan_synthetic_data
+    :return: counts of the rows inserted, by table
+    :raise: ValueError if the database already has genes, panels or
+    clinical indications
+    """
+    if (
+        Gene.objects.exists()
+        or Panel.objects.exists()
+        or ClinicalIndication.objects.exists()
+    ):
+        raise ValueError(
+            "synth_data needs an empty database - it already has genes, "
+            "panels or clinical indications"
+        )
+
+    counts = _insert_genes(plan)
+    latest, superpanels, panel_counts = _insert_panels(plan)
+    counts.update(panel_counts)
+    counts.update(_insert_clinical_indications(plan, latest, superpanels))
+
+    counts["history"] = sum(
+        _spread_history_dates(history_model)
+        for history_model in [
+            GeneHgncReleaseHistory,
+            PanelGeneHistory,
+            ClinicalIndicationPanelHistory,
+            ClinicalIndicationSuperPanelHistory,
+        ]
+    )
+
+    return counts
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill an empty database with deterministic synthetic data for "
+        "benchmarking, and optionally write matching input files"
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--scale",
+            type=float,
+            default=1.0,
+            help="size of the data - 1 is about 45,000 genes, 400,000 "
+            "transcripts and 1,000 panels",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="random seed - the same scale and seed give the same data",
+        )
+        parser.add_argument(
+            "--no_pending",
+            action="store_true",
+            help="leave out items awaiting review, so that generate "
+            "genepanels can run",
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            help="directory to write synthetic HGNC, MANE, GFF and HGMD "
+            "files to",
+        )
+
+    def handle(self, *args, **kwargs) -> None:
+        scale: float = kwargs["scale"]
+
+        assert scale > 0, "Please specify a scale greater than 0"
+
+        start = time.perf_counter()
+        plan = plan_synthetic_data(
+            scale, kwargs["seed"], not kwargs["no_pending"]
+        )
+        print(f"Planned synthetic data in {time.perf_counter() - start:.1f}s")
+
+        if kwargs.get("output"):
+            start = time.perf_counter()
+            paths = write_synthetic_files(plan, kwargs["output"])
+            print(
+                f"Wrote synthetic files in {time.perf_counter() - start:.1f}s"
+            )
+            for name, path in paths.items():
+                print(f"  {name}: {path}")
+
+        start = time.perf_counter()
+        counts = insert_synthetic_data(plan)
+        print(f"Inserted synthetic data in {time.perf_counter() - start:.1f}s")
+        for table, count in counts.items():
+            print(f"  {table}: {count}")
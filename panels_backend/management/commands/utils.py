@@ -1,4 +1,6 @@
+import hashlib
 import pandas as pd
+from typing import Iterable
 
 
 def sortable_version(version: str) -> str:
@@ -29,6 +31,20 @@ def normalize_version(padded_version: str) -> str | None:
     return result
 
 
+def gene_set_fingerprint(hgnc_ids: Iterable[str]) -> str:
+    """
+    Turn a set of HGNC IDs into a fingerprint which can be matched with an
+    indexed equality lookup.
+    IDs are stripped, upper-cased, de-duplicated and sorted, so the order
+    and repeats of the genes don't change the fingerprint.
+
+    :param hgnc_ids: the HGNC IDs in the gene set
+    :return: sha256 hex digest of the "&"-joined HGNC IDs
+    """
+    normalised = sorted({hgnc_id.strip().upper() for hgnc_id in hgnc_ids})
+    return hashlib.sha256("&".join(normalised).encode()).hexdigest()
+
+
 def parse_excluded_hgncs_from_file(file_path) -> set:
     """
     Parse hgnc file, and filter it to get genes which either are RNAs, or mitochondrially encoded.
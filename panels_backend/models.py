@@ -1,4 +1,8 @@
+import collections
+import re
+
 from django.db import models
+from django.db.models import F, Q
 from django.contrib.auth import get_user_model
 
 
@@ -41,7 +45,9 @@ class Panel(models.Model):
     """Defines a single internal panel"""
 
     # this is the PanelApp Panel id itself
-    external_id = models.TextField(verbose_name="external panel id", null=True)
+    external_id = models.TextField(
+        verbose_name="external panel id", null=True, db_index=True
+    )
 
     # metadata
     panel_name = models.TextField(verbose_name="Panel Name")
@@ -80,12 +86,29 @@ class Panel(models.Model):
         default=False,
     )
 
+    # hash of the gene content last seeded from PanelApp
+    content_hash = models.TextField(
+        verbose_name="content hash",
+        null=True,
+    )
+
+    # fingerprint of the genes in a test directory HGNC panel, used to find
+    # custom panels with the same genes as a PanelApp panel
+    gene_set_fingerprint = models.TextField(
+        verbose_name="gene set fingerprint",
+        null=True,
+        db_index=True,
+    )
+
     class Meta:
         db_table = "panel"
         unique_together = (
             "panel_name",
             "panel_version",
         )
+        indexes = [
+            models.Index(fields=["created", "id"], name="panel_created_idx"),
+        ]
 
     def __str__(self):
         return str(self.id)
@@ -98,10 +121,14 @@ class SuperPanel(models.Model):
     """
 
     # this is the PanelApp Panel id itself
-    external_id = models.TextField(verbose_name="external panel id", null=True)
+    external_id = models.TextField(
+        verbose_name="external panel id", null=True, db_index=True
+    )
 
     # metadata
-    panel_name = models.TextField(verbose_name="Superpanel Name")
+    panel_name = models.TextField(
+        verbose_name="Superpanel Name", db_index=True
+    )
 
     panel_source = models.TextField(
         verbose_name="superpanel source",
@@ -139,6 +166,12 @@ class SuperPanel(models.Model):
         default=False,
     )
 
+    # hash of the child panels last seeded from PanelApp
+    content_hash = models.TextField(
+        verbose_name="content hash",
+        null=True,
+    )
+
     class Meta:
         db_table = "superpanel"
 
@@ -168,6 +201,42 @@ class PanelSuperPanel(models.Model):
         return str(self.id)
 
 
+def release_sort_key(release: str | None) -> str | None:
+    """
+    Turn a release version into text which sorts in version order,
+    e.g. 'v5.10' -> '0000000005.0000000010'. Trailing zero parts are
+    dropped, so that '5' and '5.0' match, and non-numeric parts are
+    ignored.
+
+    :param: release, a release version, or None
+    :return: the sort key, or None if there is no release
+    """
+    if release is None:
+        return None
+
+    parts = [int(part) for part in re.findall(r"\d+", str(release))]
+    while parts and parts[-1] == 0:
+        parts.pop()
+
+    return ".".join(str(part).zfill(10) for part in parts)
+
+
+class ReleaseQuerySet(models.QuerySet):
+    """
+    Queries for release tables with a release_sort_key column
+    """
+
+    def latest_release(self) -> models.Model | None:
+        """
+        The release with the highest version, found with one indexed query
+
+        :return: the latest release, or None if there are no releases
+        """
+        return self.order_by(
+            F("release_sort_key").desc(nulls_last=True), "-id"
+        ).first()
+
+
 class TestDirectoryRelease(models.Model):
     """
     Defines a test directory release.
@@ -185,9 +254,22 @@ class TestDirectoryRelease(models.Model):
 
     td_date = models.TextField(verbose_name="date from td file", null=False)
 
+    # release as text which sorts in version order - set on save
+    release_sort_key = models.TextField(
+        verbose_name="Release sort key",
+        null=True,
+        db_index=True,
+    )
+
+    objects = ReleaseQuerySet.as_manager()
+
     class Meta:
         db_table = "td_release"
 
+    def save(self, *args, **kwargs):
+        self.release_sort_key = release_sort_key(self.release)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return str(self.id)
 
@@ -230,9 +312,11 @@ class TestDirectoryReleaseHistory(models.Model):
 class ClinicalIndication(models.Model):
     """Defines a single clinical indication"""
 
-    r_code = models.TextField(verbose_name="r code")
+    r_code = models.TextField(verbose_name="r code", db_index=True)
 
-    name = models.TextField(verbose_name="clinical indication name")
+    name = models.TextField(
+        verbose_name="clinical indication name", db_index=True
+    )
 
     test_method = models.TextField(verbose_name="test method")
 
@@ -250,6 +334,9 @@ class ClinicalIndication(models.Model):
 
     class Meta:
         db_table = "clinical_indication"
+        indexes = [
+            models.Index(fields=["created", "id"], name="ci_created_idx"),
+        ]
 
     def __str__(self):
         return str(self.id)
@@ -333,6 +420,51 @@ class ClinicalIndicationSuperPanel(models.Model):
         return str(self.id)
 
 
+class HistoryEvent:
+    """
+    The kind of event a history row records, stored in the indexed
+    event_type column of the CI-panel, CI-superpanel and PanelGene history
+    tables so that history can be filtered without searching note text
+    """
+
+    CREATED = "created"
+    FLAGGED = "flagged"
+    ACTIVATED = "activated"
+    DEACTIVATED = "deactivated"
+    REVERTED = "reverted"
+    APPROVED = "approved"
+    CHANGED = "changed"
+    TD_LINKED = "td linked"
+    OTHER = "other"
+
+    CHOICES = [
+        (CREATED, "created"),
+        (FLAGGED, "flagged for manual review"),
+        (ACTIVATED, "activated"),
+        (DEACTIVATED, "deactivated"),
+        (REVERTED, "reverted"),
+        (APPROVED, "approved"),
+        (CHANGED, "changed"),
+        (TD_LINKED, "linked to test directory release"),
+        (OTHER, "other"),
+    ]
+
+
+class HistoryEventTypeField(models.CharField):
+    """
+    The kind of event a history row records - one of the HistoryEvent
+    values. Writers set it from the event type of the History helper note
+    they write, see record_history.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("max_length", 20)
+        kwargs.setdefault("choices", HistoryEvent.CHOICES)
+        kwargs.setdefault("blank", True)
+        kwargs.setdefault("default", "")
+        super().__init__(*args, **kwargs)
+
+
 class ClinicalIndicationPanelHistory(models.Model):
     # foreign key
     clinical_indication_panel = models.ForeignKey(
@@ -358,8 +490,19 @@ class ClinicalIndicationPanelHistory(models.Model):
         on_delete=models.PROTECT,
     )
 
+    event_type = HistoryEventTypeField(verbose_name="event type")
+
     class Meta:
         db_table = "clinical_indication_panel_history"
+        indexes = [
+            models.Index(
+                fields=["created", "id"], name="cip_history_created_idx"
+            ),
+            models.Index(
+                fields=["event_type", "created", "id"],
+                name="cip_history_event_idx",
+            ),
+        ]
 
     def __str__(self):
         return str(self.id)
@@ -390,8 +533,19 @@ class ClinicalIndicationSuperPanelHistory(models.Model):
         on_delete=models.PROTECT,
     )
 
+    event_type = HistoryEventTypeField(verbose_name="event type")
+
     class Meta:
         db_table = "clinical_indication_superpanel_history"
+        indexes = [
+            models.Index(
+                fields=["created", "id"], name="cisp_history_created_idx"
+            ),
+            models.Index(
+                fields=["event_type", "created", "id"],
+                name="cisp_history_event_idx",
+            ),
+        ]
 
     def __str__(self):
         return str(self.id)
@@ -646,9 +800,22 @@ class HgncRelease(models.Model):
         auto_now_add=True,
     )
 
+    # release as text which sorts in version order - set on save
+    release_sort_key = models.TextField(
+        verbose_name="Release sort key",
+        null=True,
+        db_index=True,
+    )
+
+    objects = ReleaseQuerySet.as_manager()
+
     class Meta:
         db_table = "hgnc_release"
 
+    def save(self, *args, **kwargs):
+        self.release_sort_key = release_sort_key(self.release)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return str(self.id)
 
@@ -769,11 +936,24 @@ class TranscriptRelease(models.Model):
         on_delete=models.PROTECT,
     )
 
+    # release as text which sorts in version order - set on save
+    release_sort_key = models.TextField(
+        verbose_name="Release sort key",
+        null=True,
+        db_index=True,
+    )
+
+    objects = ReleaseQuerySet.as_manager()
+
     class Meta:
         db_table = "transcript_release"
         # stop people reusing the same release version
         unique_together = ["source", "release", "reference_genome"]
 
+    def save(self, *args, **kwargs):
+        self.release_sort_key = release_sort_key(self.release)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return str(self.id)
 
@@ -920,10 +1100,23 @@ class GffRelease(models.Model):
         auto_now_add=True,
     )
 
+    # ensembl_release as text which sorts in version order - set on save
+    release_sort_key = models.TextField(
+        verbose_name="Release sort key",
+        null=True,
+        db_index=True,
+    )
+
+    objects = ReleaseQuerySet.as_manager()
+
     class Meta:
         db_table = "gff_release"
         unique_together = ["ensembl_release", "reference_genome"]
 
+    def save(self, *args, **kwargs):
+        self.release_sort_key = release_sort_key(self.ensembl_release)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return str(self.id)
 
@@ -989,6 +1182,264 @@ class TranscriptGffReleaseHistory(models.Model):
         return str(self.id)
 
 
+class PanelGeneQuerySet(models.QuerySet):
+    """
+    Queries for the PanelGene links of a panel version.
+    Versions of a PanelApp panel share links to genes which haven't changed
+    between versions, so a version's links aren't all attached to it - use
+    for_panel or for_panels rather than filtering on panel_id.
+    """
+
+    @staticmethod
+    def shares_panel_genes(panel: Panel) -> bool:
+        """
+        Only versions of PanelApp panels share links - custom and test
+        directory panels only have one version
+        """
+        return bool(
+            panel.panel_source == "PanelApp"
+            and panel.external_id
+            and panel.panel_version
+        )
+
+    def _panel_condition(self, panel: Panel) -> Q:
+        """
+        Filter for the links which apply to one panel version - its own
+        links, plus shared links from earlier versions which haven't ended
+        """
+        condition = Q(panel_id=panel.id)
+
+        if self.shares_panel_genes(panel):
+            condition |= Q(
+                shared=True,
+                panel__external_id=panel.external_id,
+                panel__panel_source="PanelApp",
+                panel__panel_version__lt=panel.panel_version,
+            ) & (
+                Q(valid_until__isnull=True)
+                | Q(valid_until__gt=panel.panel_version)
+            )
+
+        return condition
+
+    def for_panel(self, panel: Panel) -> "PanelGeneQuerySet":
+        """
+        The links which apply to a panel version
+
+        :param: panel, the Panel version
+        :return: a PanelGene queryset
+        """
+        return self.filter(self._panel_condition(panel))
+
+    def for_panels(self, panels: list[Panel]) -> dict[int, list["PanelGene"]]:
+        """
+        The links which apply to each of several panel versions, fetched in
+        one query
+
+        :param: panels, the Panel versions
+        :return: a dict of Panel ID to the PanelGene links which apply to it
+        """
+        panel_genes = collections.defaultdict(list)
+
+        if not panels:
+            return panel_genes
+
+        condition = Q()
+        panels_by_external_id = collections.defaultdict(list)
+        for panel in panels:
+            condition |= self._panel_condition(panel)
+            if self.shares_panel_genes(panel):
+                panels_by_external_id[panel.external_id].append(panel)
+
+        panel_ids = {panel.id for panel in panels}
+
+        for panel_gene in self.filter(condition).select_related(
+            "panel", "gene"
+        ):
+            if panel_gene.panel_id in panel_ids:
+                panel_genes[panel_gene.panel_id].append(panel_gene)
+
+            if not panel_gene.shared:
+                continue
+
+            # shared links also apply to later versions, until they end
+            for panel in panels_by_external_id.get(
+                panel_gene.panel.external_id, []
+            ):
+                if (
+                    panel_gene.panel.panel_source == "PanelApp"
+                    and panel_gene.panel.panel_version < panel.panel_version
+                    and (
+                        panel_gene.valid_until is None
+                        or panel_gene.valid_until > panel.panel_version
+                    )
+                ):
+                    panel_genes[panel.id].append(panel_gene)
+
+        return panel_genes
+
+    def with_panel_versions(self) -> list[tuple["PanelGene", list[Panel]]]:
+        """
+        The panel versions each link applies to - a shared link applies to
+        the version it's stored on and later versions until it ends - in two
+        queries
+
+        :return: (PanelGene, the Panel versions it applies to, oldest first)
+        for each link
+        """
+        panel_genes = list(self.select_related("panel", "gene"))
+        lineages = self._lineages(panel_genes)
+
+        return [
+            (panel_gene, self._versions_of(panel_gene, lineages))
+            for panel_gene in panel_genes
+        ]
+
+    def _lineages(
+        self, panel_genes: list["PanelGene"]
+    ) -> dict[str, list[Panel]]:
+        """
+        :param: panel_genes, links, with their panels
+        :return: the versions of each PanelApp panel with shared links
+        among them, oldest first, by external ID
+        """
+        external_ids = {
+            panel_gene.panel.external_id
+            for panel_gene in panel_genes
+            if panel_gene.shared and self.shares_panel_genes(panel_gene.panel)
+        }
+
+        lineages = collections.defaultdict(list)
+        if external_ids:
+            for panel in Panel.objects.filter(
+                panel_source="PanelApp", external_id__in=external_ids
+            ).order_by("panel_version"):
+                lineages[panel.external_id].append(panel)
+
+        return lineages
+
+    def _versions_of(
+        self, panel_gene: "PanelGene", lineages: dict[str, list[Panel]]
+    ) -> list[Panel]:
+        """
+        :param: panel_gene, a link, with its panel
+        :param: lineages, the versions of each PanelApp panel, oldest first
+        :return: the panel versions the link applies to, oldest first
+        """
+        panel = panel_gene.panel
+
+        if not (panel_gene.shared and self.shares_panel_genes(panel)):
+            return [panel]
+
+        return [
+            version
+            for version in lineages.get(panel.external_id, [panel])
+            if version.panel_version >= panel.panel_version
+            and (
+                panel_gene.valid_until is None
+                or version.panel_version < panel_gene.valid_until
+            )
+        ]
+
+    def split_for_panel(
+        self, panel_genes: list["PanelGene"], panel: Panel
+    ) -> dict[int, "PanelGene"]:
+        """
+        Give one panel version its own copies of shared links, so that the
+        links can be changed for that version without changing them for the
+        other versions sharing them. Each shared link is ended at the
+        version, and carried on by a new shared link from the version after
+        it. Written with a fixed number of queries, however many links.
+
+        :param: panel_genes, saved links which apply to the panel version
+        :param: panel, the panel version
+        :return: a dict of the given link IDs to links which only apply to
+        the panel version - the given link if it already does
+        """
+        own = {panel_gene.id: panel_gene for panel_gene in panel_genes}
+
+        if not self.shares_panel_genes(panel) or not any(
+            panel_gene.shared for panel_gene in panel_genes
+        ):
+            return own
+
+        lineage = list(
+            Panel.objects.filter(
+                panel_source="PanelApp", external_id=panel.external_id
+            ).order_by("panel_version")
+        )
+        versions_by_id = {version.id: version for version in lineage}
+
+        to_update = []
+        to_create = []
+        copied_from = []
+
+        for panel_gene in panel_genes:
+            if not panel_gene.shared:
+                continue
+
+            start = versions_by_id[panel_gene.panel_id].panel_version
+            versions = [
+                version
+                for version in lineage
+                if version.panel_version >= start
+                and (
+                    panel_gene.valid_until is None
+                    or version.panel_version < panel_gene.valid_until
+                )
+            ]
+            if [version.id for version in versions] == [panel.id]:
+                continue
+
+            later = [
+                version
+                for version in versions
+                if version.panel_version > panel.panel_version
+            ]
+            fields = {
+                field.attname: getattr(panel_gene, field.attname)
+                for field in PanelGene._meta.concrete_fields
+                if not field.primary_key
+            }
+
+            if panel_gene.panel_id == panel.id:
+                # the link itself becomes the version's own
+                panel_gene.shared = False
+                panel_gene.valid_until = None
+            else:
+                panel_gene.valid_until = panel.panel_version
+                copy = PanelGene(
+                    **{
+                        **fields,
+                        "panel_id": panel.id,
+                        "shared": False,
+                        "valid_until": None,
+                    }
+                )
+                to_create.append(copy)
+                copied_from.append((panel_gene.id, copy))
+            to_update.append(panel_gene)
+
+            if later:
+                to_create.append(
+                    PanelGene(
+                        **{
+                            **fields,
+                            "panel_id": later[0].id,
+                            "shared": True,
+                        }
+                    )
+                )
+
+        self.bulk_update(to_update, ["shared", "valid_until"])
+        self.bulk_create(to_create)
+
+        for panel_gene_id, copy in copied_from:
+            own[panel_gene_id] = copy
+
+        return own
+
+
 class PanelGene(models.Model):
     """Defines a link between a single panel and a single gene"""
 
@@ -1050,6 +1501,22 @@ class PanelGene(models.Model):
         verbose_name="Active",
     )
 
+    # whether the link is shared with later versions of a PanelApp panel.
+    # 'panel' is then the first version the link applies to
+    shared = models.BooleanField(
+        verbose_name="Shared with later panel versions",
+        default=False,
+    )
+
+    # for shared links, the (sortable) panel version from which the link no
+    # longer applies - null if it applies to every later version
+    valid_until = models.TextField(
+        verbose_name="Valid until panel version",
+        null=True,
+    )
+
+    objects = PanelGeneQuerySet.as_manager()
+
     class Meta:
         db_table = "panel_gene"
 
@@ -1080,8 +1547,19 @@ class PanelGeneHistory(models.Model):
         on_delete=models.PROTECT,
     )
 
+    event_type = HistoryEventTypeField(verbose_name="event type")
+
     class Meta:
         db_table = "panel_gene_history"
+        indexes = [
+            models.Index(
+                fields=["created", "id"], name="panel_gene_history_created_idx"
+            ),
+            models.Index(
+                fields=["event_type", "created", "id"],
+                name="panel_gene_history_event_idx",
+            ),
+        ]
 
     def __str__(self):
         return str(self.id)
@@ -55,6 +55,10 @@ urlpatterns = [
     path("review/", views.review, name="review"),
     # api
     path("api/genes/", views.ajax_genes, name="api_genes"),
+    path("api/genes/table/", views.ajax_gene_table, name="api_gene_table"),
+    path("api/cis/", views.ajax_ci_table, name="api_ci_table"),
+    path("api/panels/", views.ajax_panel_table, name="api_panel_table"),
+    path("api/cips/", views.ajax_cip_table, name="api_cip_table"),
     path(
         "api/genetranscripts/<str:reference_genome>/",
         views.ajax_gene_transcripts,
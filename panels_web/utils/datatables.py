@@ -0,0 +1,94 @@
+"""
+Server-side processing for DataTables tables.
+DataTables sends the page, search and ordering it wants as GET parameters
+(draw, start, length, search[value], order[0][column], order[0][dir]), and
+expects the page of rows back with the total and filtered row counts.
+See https://datatables.net/manual/server-side
+"""
+from typing import Callable
+
+from django.db.models import QuerySet
+from django.http import QueryDict
+
+# page size used for the first page rendered into the landing page, and
+# when DataTables doesn't ask for one
+DEFAULT_PAGE_LENGTH = 10
+
+# largest page a client can ask for - DataTables asks for -1 to mean "all"
+MAX_PAGE_LENGTH = 100
+
+
+class DataTablesParams:
+    """
+    The paging, search and ordering asked for by a DataTables request
+    """
+
+    def __init__(self, params: QueryDict | dict | None = None) -> None:
+        """
+        :param: params, the GET parameters of the request, or None for the
+        first page in the default order
+        """
+        params = params or {}
+
+        self.draw = _to_int(params.get("draw"), 0)
+        self.start = max(_to_int(params.get("start"), 0), 0)
+
+        length = _to_int(params.get("length"), DEFAULT_PAGE_LENGTH)
+        if length < 1 or length > MAX_PAGE_LENGTH:
+            length = MAX_PAGE_LENGTH
+        self.length = length
+
+        self.search = (params.get("search[value]") or "").strip()
+        self.order_column = _to_int(params.get("order[0][column]"), 0)
+        self.order_descending = params.get("order[0][dir]") == "desc"
+
+
+def _to_int(value: str | None, default: int) -> int:
+    """
+    :param: value, a GET parameter
+    :param: default, the value to use if it's missing or not a number
+    :return: the parameter as an int
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def datatables_page(
+    params: DataTablesParams,
+    records_total: int,
+    queryset: QuerySet,
+    order_fields: list[tuple[str, ...]],
+    make_row: Callable[[dict], list[str]],
+) -> dict:
+    """
+    Order and slice an already-searched queryset into one page of a
+    DataTables table, in two queries (the filtered count, and the page)
+
+    :param: params, the DataTables request
+    :param: records_total, the number of rows in the table before searching
+    :param: queryset, the rows matching the search, as a values queryset
+    :param: order_fields, for each table column, the fields to order by
+    :param: make_row, turns a row of the queryset into a list of cell HTML
+    :return: the DataTables response - draw, recordsTotal, recordsFiltered
+    and data (the rows of the page)
+    """
+    if not 0 <= params.order_column < len(order_fields):
+        params.order_column = 0
+
+    fields = order_fields[params.order_column]
+    if params.order_descending:
+        fields = tuple(f"-{field}" for field in fields)
+
+    records_filtered = queryset.count()
+    page = queryset.order_by(*fields)[
+        params.start : params.start + params.length
+    ]
+
+    return {
+        "draw": params.draw,
+        "recordsTotal": records_total,
+        "recordsFiltered": records_filtered,
+        "data": [make_row(row) for row in page],
+    }
@@ -0,0 +1,63 @@
+"""
+Keyset pagination on (created, id), newest first.
+Rather than an OFFSET, which reads and throws away every earlier row, each
+page carries a cursor - the created time and ID of its last row - and the
+next page starts straight after it, read from an index on (created, id).
+"""
+import datetime as dt
+
+from django.db.models import Q, QuerySet
+
+
+def encode_cursor(created: dt.datetime, row_id: int) -> str:
+    """
+    :param: created, the created time of the last row of a page
+    :param: row_id, the ID of the last row of a page
+    :return: the cursor for the page after it
+    """
+    return f"{created.isoformat()}|{row_id}"
+
+
+def decode_cursor(cursor: str) -> tuple[dt.datetime, int]:
+    """
+    :param: cursor, a cursor made by encode_cursor
+    :return: the created time and ID the next page starts after
+    :raise: ValueError if the cursor isn't valid
+    """
+    created, _, row_id = cursor.rpartition("|")
+    created = dt.datetime.fromisoformat(created)
+
+    if created.tzinfo is None:
+        raise ValueError("cursor time has no timezone")
+
+    return created, int(row_id)
+
+
+def keyset_page(
+    queryset: QuerySet, cursor: str | None, limit: int
+) -> tuple[list[dict], str | None]:
+    """
+    Fetch one page of rows, newest first, in one query
+
+    :param: queryset, a values queryset including "created" and "id"
+    :param: cursor, where the page starts, or None for the first page
+    :param: limit, the number of rows in a page
+    :return: the rows of the page
+    :return: the cursor for the next page, or None if this is the last page
+    :raise: ValueError if the cursor isn't valid
+    """
+    if cursor:
+        created, row_id = decode_cursor(cursor)
+        # the created__lte bound lets the database start its index scan at
+        # the cursor, rather than filtering the rows before it
+        queryset = queryset.filter(created__lte=created).filter(
+            Q(created__lt=created) | Q(created=created, id__lt=row_id)
+        )
+
+    rows = list(queryset.order_by("-created", "-id")[: limit + 1])
+
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1]["created"], rows[-1]["id"])
@@ -1,20 +1,43 @@
 import collections
+import gzip
+import hashlib
 import json
+import os
+import tempfile
 import pandas as pd
 from io import BytesIO
+from itertools import islice
+from typing import Iterator
 from panels_backend.management.commands._parse_transcript import (
     check_missing_columns,
 )
-from itertools import chain
 import dxpy as dx
 import datetime as dt
-from packaging.version import Version
-from django.http import HttpRequest, HttpResponse
+from django.http import HttpRequest, HttpResponse, StreamingHttpResponse
 
 from django.shortcuts import render, redirect
-from django.http import JsonResponse
-from django.core.files.uploadedfile import TemporaryUploadedFile
-from django.db.models import QuerySet, Q, F
+from django.http import JsonResponse, QueryDict
+from django.db.models import (
+    Case,
+    Count,
+    Model,
+    QuerySet,
+    Q,
+    F,
+    OuterRef,
+    Subquery,
+    TextField,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.dateparse import parse_date
+from django.utils.http import quote_etag
+from django.utils.html import escape, format_html
 from django.db import transaction
 from django.contrib.auth.views import LoginView
 from django.contrib.auth.decorators import permission_required
@@ -22,8 +45,14 @@ from django.contrib.auth.decorators import permission_required
 
 from .forms import ClinicalIndicationForm, PanelForm, GeneForm
 from .utils.utils import WebChildPanel, WebGene, WebGenePanel
+from .utils.datatables import DataTablesParams, datatables_page
+from .utils.keyset import keyset_page
 
-from panels_backend.management.commands.history import History
+from panels_backend.management.commands.history import (
+    History,
+    HistoryRecorder,
+    record_history,
+)
 from panels_backend.management.commands.utils import (
     normalize_version,
 )
@@ -34,9 +63,17 @@ from panels_backend.management.commands._insert_ci import (
 from panels_backend.management.commands._parse_transcript import (
     get_latest_transcript_release,
 )
+from panels_backend.management.commands._lookup_cache import LookupCache
+from panels_backend.management.commands._g2t import (
+    DNAnexusSink,
+    g2t_rows,
+    write_g2t,
+)
+from panels_backend.management.commands._td_diff import diff_test_directory
 
 from panels_backend.models import (
     ClinicalIndication,
+    HistoryEvent,
     Panel,
     ClinicalIndicationPanel,
     ClinicalIndicationPanelHistory,
@@ -49,10 +86,6 @@ from panels_backend.models import (
     PanelGeneHistory,
     PanelSuperPanel,
     Gene,
-    Confidence,
-    ModeOfInheritance,
-    ModeOfPathogenicity,
-    Penetrance,
     TranscriptReleaseTranscript,
     TestDirectoryRelease,
     SuperPanel,
@@ -64,138 +97,314 @@ from panels_backend.models import (
 )
 
 
-def index(request: HttpRequest) -> HttpResponse:
-    """
-    Main page of the web app.
-    Displaying:
-    - Clinical Indications
-    - Panels
-    - Clinical Indication-Panel links
-    - Test Directory Releases
-    - Transcript Sources
+def _ci_table(params: DataTablesParams) -> dict:
     """
+    One page of the clinical indication table on the index page
 
-    # fetch all clinical indications
-    clinical_indications: list[
-        ClinicalIndication
-    ] = ClinicalIndication.objects.order_by("r_code").all()
+    :param: params, the DataTables request
+    :return: the DataTables response
+    """
+    cis = ClinicalIndication.objects.values("id", "r_code", "name")
+    if params.search:
+        cis = cis.filter(
+            Q(r_code__istartswith=params.search)
+            | Q(name__icontains=params.search)
+        )
 
-    # fetch all panels
-    panels: list[Panel] = Panel.objects.order_by("panel_name").all()
+    def make_row(ci: dict) -> list[str]:
+        return [
+            escape(ci["r_code"]),
+            format_html(
+                '<a href="{}">{}</a>',
+                reverse("clinical_indication", args=[ci["id"]]),
+                ci["name"],
+            ),
+        ]
 
-    # normalize panel version
-    for panel in panels:
-        panel.panel_version = normalize_version(panel.panel_version)
-        panel.superpanel = False
+    return datatables_page(
+        params,
+        ClinicalIndication.objects.count(),
+        cis,
+        [("r_code", "id"), ("name", "id")],
+        make_row,
+    )
 
-    super_panels: list[SuperPanel] = SuperPanel.objects.all()
 
-    # normalize panel version
-    for sp in super_panels:
-        sp.panel_version = normalize_version(sp.panel_version)
-        sp.superpanel = True
+def _panel_table(params: DataTablesParams) -> dict:
+    """
+    One page of the panel table on the index page - Panels and SuperPanels
 
-    all_panels = list(chain(panels, super_panels))
+    :param: params, the DataTables request
+    :return: the DataTables response
+    """
+    search = Q()
+    if params.search:
+        search = Q(external_id__istartswith=params.search) | Q(
+            panel_name__icontains=params.search
+        )
 
-    # fetch clinical indication-panel links
-    clinical_indication_panels = ClinicalIndicationPanel.objects.values(
-        "clinical_indication_id",
-        "panel_id",
-        "current",
-        "pending",
-        "id",
-        panel_name=F("panel_id__panel_name"),
-        clinical_indication_name=F("clinical_indication_id__name"),
+    # both halves of the union select the same columns, in the same order
+    columns = ("id", "external_id", "panel_name", "panel_version")
+    panels = (
+        Panel.objects.filter(search)
+        .values(*columns, is_superpanel=Value(False))
+        .union(
+            SuperPanel.objects.filter(search).values(
+                *columns, is_superpanel=Value(True)
+            ),
+            all=True,
+        )
     )
 
-    clinical_indication_sp = ClinicalIndicationSuperPanel.objects.values(
-        "clinical_indication_id",
-        "current",
-        "pending",
-        "id",
-        panel_id=F("superpanel_id"),
-        panel_name=F("superpanel_id__panel_name"),
-        clinical_indication_name=F("clinical_indication_id__name"),
-    )
+    def make_row(row: dict) -> list[str]:
+        if row["is_superpanel"]:
+            name = format_html(
+                '<a href="{}">{}</a>&nbsp;&nbsp;<span '
+                'class="badge text-bg-info">SuperPanel</span>',
+                reverse("superpanel", args=[row["id"]]),
+                row["panel_name"],
+            )
+        else:
+            name = format_html(
+                '<a href="{}">{}</a>',
+                reverse("panel", args=[row["id"]]),
+                row["panel_name"],
+            )
 
-    # get latest test directory release for each ci-panel link
-    for row in clinical_indication_sp:
-        superpanel_id = row["id"]
+        return [
+            escape(row["external_id"]),
+            name,
+            escape(normalize_version(row["panel_version"]) or "1.0"),
+        ]
 
-        releases = CiSuperpanelTdRelease.objects.filter(
-            ci_superpanel_id=superpanel_id
-        ).values(
-            "td_release_id__release",
-        )
+    return datatables_page(
+        params,
+        Panel.objects.count() + SuperPanel.objects.count(),
+        panels,
+        [
+            ("external_id", "id"),
+            ("panel_name", "id"),
+            ("panel_version", "id"),
+        ],
+        make_row,
+    )
 
-        row["td_release"] = (
-            max(
-                [
-                    Version(release["td_release_id__release"])
-                    for release in releases
-                ]
-            )
-            if releases
-            else None
+
+def _latest_td_release(link_model: type[Model], field: str) -> Subquery:
+    """
+    :param: link_model, CiPanelTdRelease or CiSuperpanelTdRelease
+    :param: field, the td release field to return
+    :return: a subquery for a field of the latest test directory release of
+    the outer CI-panel or CI-superpanel link
+    """
+    link_field = (
+        "ci_panel_id" if link_model is CiPanelTdRelease else "ci_superpanel_id"
+    )
+    return Subquery(
+        link_model.objects.filter(**{link_field: OuterRef("id")})
+        .order_by(
+            F("td_release__release_sort_key").desc(nulls_last=True),
+            "-td_release_id",
         )
+        .values(f"td_release__{field}")[:1]
+    )
 
-        row["superpanel"] = True
 
-    for row in clinical_indication_panels:
-        id = row["id"]
+def _cip_table(params: DataTablesParams) -> dict:
+    """
+    One page of the clinical indication-panel link table on the index page -
+    CI-panel and CI-superpanel links
 
-        releases = CiPanelTdRelease.objects.filter(ci_panel_id=id).values(
-            "td_release_id__release",
+    :param: params, the DataTables request
+    :return: the DataTables response
+    """
+    cips = ClinicalIndicationPanel.objects.all()
+    cisps = ClinicalIndicationSuperPanel.objects.all()
+    if params.search:
+        cips = cips.filter(
+            Q(clinical_indication__name__icontains=params.search)
+            | Q(panel__panel_name__icontains=params.search)
+        )
+        cisps = cisps.filter(
+            Q(clinical_indication__name__icontains=params.search)
+            | Q(superpanel__panel_name__icontains=params.search)
         )
 
-        row["td_release"] = (
-            max(
-                [
-                    Version(release["td_release_id__release"])
-                    for release in releases
-                ]
+    # both halves of the union select the same columns, in the same order
+    columns = ("id", "clinical_indication_id", "current", "pending")
+    links = cips.values(
+        *columns,
+        linked_panel_id=F("panel_id"),
+        panel_name=F("panel__panel_name"),
+        clinical_indication_name=F("clinical_indication__name"),
+        td_release=_latest_td_release(CiPanelTdRelease, "release"),
+        td_release_sort_key=Coalesce(
+            _latest_td_release(CiPanelTdRelease, "release_sort_key"),
+            Value(""),
+            output_field=TextField(),
+        ),
+        is_superpanel=Value(False),
+    ).union(
+        cisps.values(
+            *columns,
+            linked_panel_id=F("superpanel_id"),
+            panel_name=F("superpanel__panel_name"),
+            clinical_indication_name=F("clinical_indication__name"),
+            td_release=_latest_td_release(CiSuperpanelTdRelease, "release"),
+            td_release_sort_key=Coalesce(
+                _latest_td_release(CiSuperpanelTdRelease, "release_sort_key"),
+                Value(""),
+                output_field=TextField(),
+            ),
+            is_superpanel=Value(True),
+        ),
+        all=True,
+    )
+
+    def make_row(row: dict) -> list[str]:
+        if row["is_superpanel"]:
+            link_url = reverse(
+                "clinical_indication_superpanel", args=[row["id"]]
+            )
+            panel = format_html(
+                '<a href="{}">{}</a> <span '
+                'class="badge text-bg-info">SuperPanel</span>',
+                reverse("superpanel", args=[row["linked_panel_id"]]),
+                row["panel_name"],
+            )
+        else:
+            link_url = reverse("clinical_indication_panel", args=[row["id"]])
+            panel = format_html(
+                '<a href="{}">{}</a>',
+                reverse("panel", args=[row["linked_panel_id"]]),
+                row["panel_name"],
             )
-            if releases
-            else None
-        )
 
-        row["superpanel"] = False
+        if row["current"] and not row["pending"]:
+            status = format_html(
+                '<span class="badge text-bg-success">Active</span>'
+            )
+        elif row["current"] and row["pending"]:
+            status = format_html(
+                '<span class="badge text-bg-warning">Pending</span>'
+            )
+        else:
+            status = format_html(
+                '<span class="badge text-bg-danger">Inactive</span>'
+            )
+
+        return [
+            format_html('<a href="{}">{}</a>', link_url, row["id"]),
+            format_html(
+                '<a href="{}">{}</a>',
+                reverse(
+                    "clinical_indication",
+                    args=[row["clinical_indication_id"]],
+                ),
+                row["clinical_indication_name"],
+            ),
+            panel,
+            escape(row["td_release"]),
+            status,
+        ]
 
-    all_clinical_indication_p_and_sp = list(
-        chain(clinical_indication_panels, clinical_indication_sp)
+    return datatables_page(
+        params,
+        ClinicalIndicationPanel.objects.count()
+        + ClinicalIndicationSuperPanel.objects.count(),
+        links,
+        [
+            ("id", "is_superpanel"),
+            ("clinical_indication_name", "id"),
+            ("panel_name", "id"),
+            ("td_release_sort_key", "id"),
+            ("current", "pending", "id"),
+        ],
+        make_row,
     )
 
+
+def index(request: HttpRequest) -> HttpResponse:
+    """
+    Main page of the web app.
+    Displaying:
+    - Clinical Indications
+    - Panels
+    - Clinical Indication-Panel links
+    - Test Directory Releases
+    - Transcript Sources
+
+    Only the first page of the clinical indication, panel and
+    clinical indication-panel tables is rendered - later pages, searches
+    and reordering are fetched from the api_*_table endpoints
+    """
+    first_page = DataTablesParams()
+
     # fetch Test Directory Releases
     td_releases = TestDirectoryRelease.objects.all()
 
-    transcript_sources = TranscriptRelease.objects.values(
-        "id",
-        "source__source",
-        "source",
-        "release",
-        "created",
-        "reference_genome__name",
-    ).order_by("-created")
+    transcript_sources = list(
+        TranscriptRelease.objects.values(
+            "id",
+            "source__source",
+            "source",
+            "release",
+            "created",
+            "reference_genome__name",
+        ).order_by("-created")
+    )
+
+    # files of every transcript release, fetched in one query
+    # NOTE: HGMD have 2 files (g2refseq and markname)
+    release_files = collections.defaultdict(list)
+    for release_file in TranscriptReleaseTranscriptFile.objects.filter(
+        transcript_release_id__in=[ts["id"] for ts in transcript_sources]
+    ).values(
+        "transcript_release_id",
+        "transcript_file__file_type",
+        "transcript_file__file_id",
+    ):
+        release_files[release_file["transcript_release_id"]].append(
+            release_file
+        )
 
     for ts in transcript_sources:
-        # NOTE: HGMD have 2 files (g2refseq and markname)
-        ts["files"] = TranscriptReleaseTranscriptFile.objects.filter(
-            transcript_release=ts["id"]
-        ).values("transcript_file__file_type", "transcript_file__file_id")
+        ts["files"] = release_files[ts["id"]]
 
     return render(
         request,
         "web/index.html",
         {
-            "cis": clinical_indications,
-            "panels": all_panels,
-            "cips": all_clinical_indication_p_and_sp,
+            "ci_table": _ci_table(first_page),
+            "panel_table": _panel_table(first_page),
+            "cip_table": _cip_table(first_page),
             "td_releases": td_releases,
             "transcript_sources": transcript_sources,
         },
     )
 
 
+def ajax_ci_table(request: HttpRequest) -> JsonResponse:
+    """
+    Ajax fetch call for a page of the index clinical indication table
+    """
+    return JsonResponse(_ci_table(DataTablesParams(request.GET)))
+
+
+def ajax_panel_table(request: HttpRequest) -> JsonResponse:
+    """
+    Ajax fetch call for a page of the index panel table
+    """
+    return JsonResponse(_panel_table(DataTablesParams(request.GET)))
+
+
+def ajax_cip_table(request: HttpRequest) -> JsonResponse:
+    """
+    Ajax fetch call for a page of the index clinical indication-panel table
+    """
+    return JsonResponse(_cip_table(DataTablesParams(request.GET)))
+
+
 def login(request: HttpRequest):
     """
     Allows logging in
@@ -229,6 +438,19 @@ def panel(request: HttpRequest, panel_id: int) -> HttpResponse:
                 "web/info/panel.html",
             )
 
+        # fetch genes associated with panel, including genes shared with
+        # earlier versions of the panel - before the version is normalised
+        panel_genes: QuerySet[dict] = (
+            PanelGene.objects.for_panel(panel)
+            .values(
+                "gene_id",
+                "gene_id__hgnc_id",
+                "gene_id__gene_symbol",
+                "active",
+            )
+            .order_by("gene_id__gene_symbol")
+        )
+
         panel.panel_version = (
             normalize_version(panel.panel_version)
             if panel.panel_version
@@ -249,18 +471,6 @@ def panel(request: HttpRequest, panel_id: int) -> HttpResponse:
             "clinical_indication_id__r_code",
         )
 
-        # fetch genes associated with panel
-        panel_genes: QuerySet[dict] = (
-            PanelGene.objects.filter(panel_id=panel_id)
-            .values(
-                "gene_id",
-                "gene_id__hgnc_id",
-                "gene_id__gene_symbol",
-                "active",
-            )
-            .order_by("gene_id__gene_symbol")
-        )
-
         return render(
             request,
             "web/info/panel.html",
@@ -434,7 +644,8 @@ def clinical_indication(request: HttpRequest, ci_id: int) -> HttpResponse:
                         .strip()
                     )
 
-                    ClinicalIndicationTestMethodHistory.objects.create(
+                    record_history(
+                        ClinicalIndicationTestMethodHistory,
                         clinical_indication_id=ci_id,
                         note=History.clinical_indication_metadata_changed(
                             "test_method",
@@ -513,11 +724,10 @@ def add_clinical_indication(request: HttpRequest) -> HttpResponse:
 def add_panel(request: HttpRequest) -> HttpResponse:
     """
     Add panel page
+    Genes are picked with a typeahead search against the gene api
     """
-    genes = Gene.objects.all().order_by("hgnc_id")
-
     if request.method == "GET":
-        return render(request, "web/addition/add_panel.html", {"genes": genes})
+        return render(request, "web/addition/add_panel.html")
     else:  # POST
         # form submission
         panel_name: str = request.POST.get("panel_name", "")
@@ -540,18 +750,11 @@ def add_panel(request: HttpRequest) -> HttpResponse:
                     panel_source="online",
                 )
 
-                conf, _ = Confidence.objects.get_or_create(
-                    confidence_level=None
-                )
-                moi, _ = ModeOfInheritance.objects.get_or_create(
-                    mode_of_inheritance=None
-                )
-                mop, _ = ModeOfPathogenicity.objects.get_or_create(
-                    mode_of_pathogenicity=None
-                )
-                penetrance, _ = Penetrance.objects.get_or_create(
-                    penetrance=None
-                )
+                cache = LookupCache()
+                conf = cache.confidence(None)
+                moi = cache.mode_of_inheritance(None)
+                mop = cache.mode_of_pathogenicity(None)
+                penetrance = cache.penetrance(None)
 
                 for gene_id in selected_genes:
                     pg_instance, pg_created = PanelGene.objects.get_or_create(
@@ -568,7 +771,8 @@ def add_panel(request: HttpRequest) -> HttpResponse:
                     )
 
                     if pg_created:
-                        PanelGeneHistory.objects.create(
+                        record_history(
+                            PanelGeneHistory,
                             panel_gene_id=pg_instance.id,
                             note=History.panel_gene_created(),
                             user=request.user,
@@ -587,7 +791,10 @@ def add_panel(request: HttpRequest) -> HttpResponse:
             "web/addition/add_panel.html",
             {
                 "panel": panel,
-                "genes": genes,
+                # keep the genes picked so far
+                "selected_genes": Gene.objects.filter(
+                    id__in=selected_genes
+                ).order_by("hgnc_id"),
                 "errors": form.errors if not form_valid else None,
             },
         )
@@ -649,7 +856,8 @@ def add_ci_panel(request: HttpRequest) -> HttpResponse:
             )
             cip_instance.save()
 
-            ClinicalIndicationPanelHistory.objects.create(
+            record_history(
+                ClinicalIndicationPanelHistory,
                 clinical_indication_panel_id=cip_instance.id,
                 note=History.clinical_indication_panel_created(),
                 user=request.user,
@@ -661,21 +869,108 @@ def add_ci_panel(request: HttpRequest) -> HttpResponse:
         )
 
 
-def _get_clinical_indication_panel_history() -> QuerySet:
+# the tables the history page can show, and their titles
+HISTORY_TABLES = {
+    "clinical indication-panel": "Clinical Indication Panel",
+    "panel-gene": "Panel Genes",
+    "panels": "Panels",
+    "clinical indications": "Clinical Indications",
+}
+
+# number of rows in a page of the history page
+HISTORY_PAGE_SIZE = 50
+
+
+def _history_date(value: str | None, name: str) -> dt.datetime | None:
     """
-    Function to fetch clinical indication panel history with limit
+    :param: value, a date from the history page filters, as YYYY-MM-DD
+    :param: name, the name of the filter, for the error message
+    :return: the start of the day in local time, or None if not given
+    :raise: ValueError if the date isn't valid
+    """
+    if not value:
+        return None
 
-    Args:
-        limit (int): limit of history to fetch
+    try:
+        date = parse_date(value)
+    except ValueError:
+        date = None
+
+    if not date:
+        raise ValueError(f"{name} must be a date (YYYY-MM-DD)")
+
+    return timezone.make_aware(dt.datetime.combine(date, dt.time.min))
+
+
+def _history_queryset(table: str, params: QueryDict) -> QuerySet:
     """
+    Build the query for the rows of the history page, filtered in the
+    database on indexed columns - the event type and user of history rows,
+    the created date range, and the entity (R code, panel or HGNC ID)
+
+    :param: table, one of HISTORY_TABLES
+    :param: params, the GET parameters of the request
+    :return: a values queryset of the matching rows, with "created" and "id"
+    :raise: ValueError if a filter isn't valid
+    """
+    actions = params.getlist("action")
+    event_types = {value for value, _ in HistoryEvent.CHOICES}
+    if any(action not in event_types for action in actions):
+        raise ValueError(f"action must be one of {sorted(event_types)}")
+
+    date_from = _history_date(params.get("from"), "from")
+    date_to = _history_date(params.get("to"), "to")
+    username = (params.get("user") or "").strip()
+    r_code = (params.get("r_code") or "").strip()
+    hgnc_id = (params.get("hgnc_id") or "").strip()
+
+    panel_id = (params.get("panel") or "").strip()
+    if panel_id and not panel_id.isdigit():
+        raise ValueError("panel must be a panel ID")
+
+    conditions = Q()
+    if date_from:
+        conditions &= Q(created__gte=date_from)
+    if date_to:
+        # the whole of the last day
+        conditions &= Q(created__lt=date_to + dt.timedelta(days=1))
+
+    if table == "panels":
+        if panel_id:
+            conditions &= Q(id=panel_id)
+
+        return Panel.objects.filter(conditions).values(
+            "id", "created", "external_id", "panel_name"
+        )
 
-    return (
-        ClinicalIndicationPanelHistory.objects.order_by("-created")
-        .all()
-        .values(
+    if table == "clinical indications":
+        if r_code:
+            conditions &= Q(r_code=r_code)
+
+        return ClinicalIndication.objects.filter(conditions).values(
+            "id", "created", "r_code", "name"
+        )
+
+    if actions:
+        conditions &= Q(event_type__in=actions)
+    if username:
+        conditions &= Q(user__username=username)
+
+    if table == "clinical indication-panel":
+        if r_code:
+            conditions &= Q(
+                clinical_indication_panel__clinical_indication__r_code=r_code
+            )
+        if panel_id:
+            conditions &= Q(clinical_indication_panel__panel_id=panel_id)
+
+        return ClinicalIndicationPanelHistory.objects.filter(
+            conditions
+        ).values(
+            "id",
             "created",
             "note",
-            "user",
+            "event_type",
             "user__username",
             "clinical_indication_panel_id__clinical_indication_id__name",
             "clinical_indication_panel_id__clinical_indication_id__r_code",
@@ -684,139 +979,102 @@ def _get_clinical_indication_panel_history() -> QuerySet:
             "clinical_indication_panel_id__clinical_indication_id",
             "clinical_indication_panel_id__panel_id",
         )
+
+    # panel-gene
+    if hgnc_id:
+        conditions &= Q(panel_gene__gene__hgnc_id=hgnc_id)
+    if panel_id:
+        # links can be shared between versions of a PanelApp panel, so
+        # a panel's links aren't all attached to it
+        panel = Panel.objects.filter(id=panel_id).first()
+        if not panel:
+            return PanelGeneHistory.objects.none().values("id", "created")
+
+        conditions &= Q(
+            panel_gene__in=PanelGene.objects.for_panel(panel).values("id")
+        )
+
+    return PanelGeneHistory.objects.filter(conditions).values(
+        "id",
+        "created",
+        "note",
+        "event_type",
+        "user__username",
+        "panel_gene_id__panel_id__panel_name",
+        "panel_gene_id__panel_id",
+        "panel_gene_id__gene_id",
+        "panel_gene_id__gene_id__hgnc_id",
     )
 
 
 def history(request: HttpRequest) -> HttpResponse:
     """
     History page for clinical indication, panel, clinical indication-panel etc.
+    Shows one page of rows at a time, newest first, with the filters and
+    page cursor given as GET parameters:
+    - table: one of HISTORY_TABLES
+    - action: event types of history rows (may be repeated)
+    - user: username of whoever made the change
+    - from / to: created date range, as YYYY-MM-DD
+    - r_code / panel / hgnc_id: the entity the rows are about
+    - cursor: where the page starts, from the previous page's "older" link
     """
+    table = request.GET.get("table") or "clinical indication-panel"
+    if table not in HISTORY_TABLES:
+        return HttpResponse(
+            f"table must be one of {', '.join(HISTORY_TABLES)}", status=400
+        )
 
-    if request.method == "GET":
-        cip_histories = _get_clinical_indication_panel_history()
+    try:
+        rows, next_cursor = keyset_page(
+            _history_queryset(table, request.GET),
+            request.GET.get("cursor"),
+            HISTORY_PAGE_SIZE,
+        )
+    except ValueError as e:
+        return HttpResponse(str(e), status=400)
 
+    if table == "clinical indication-panel":
         # normalize panel version
-        for cip in cip_histories:
-            cip[
+        for row in rows:
+            row[
                 "clinical_indication_panel_id__panel_id__panel_version"
             ] = normalize_version(
-                cip["clinical_indication_panel_id__panel_id__panel_version"]
-            )
-
-        return render(
-            request,
-            "web/history.html",
-            {
-                "data": cip_histories,
-                "showing": "Clinical Indication Panel",
-                "selected": "clinical indication-panel",
-            },
-        )
-    else:
-        # POST method
-        history_selection = request.POST.get("history selection")
-
-        if history_selection == "panels":
-            panels = Panel.objects.all()
-
-            for panel in panels:
-                panel.panel_version = normalize_version(panel.panel_version)
-
-            return render(
-                request,
-                "web/history.html",
-                {
-                    "data": panels,
-                    "showing": "Panels",
-                    "selected": "panels",
-                },
+                row["clinical_indication_panel_id__panel_id__panel_version"]
             )
-        elif history_selection == "clinical indications":
-            clinical_indications = ClinicalIndication.objects.all()
-
-            return render(
-                request,
-                "web/history.html",
-                {
-                    "data": clinical_indications,
-                    "showing": "Clinical Indications",
-                    "selected": "clinical indications",
-                },
-            )
-        elif history_selection == "clinical indication-panel":
-            actions = request.POST.getlist("checkbox selections")
-
-            # if no checkbox ticked, fetch default history limit 50
-            if not actions:
-                cip_histories = _get_clinical_indication_panel_history()
-            else:
-                # else do cip-history filter with specific query filter
-                query_filters = Q()
-
-                for note_prefix in actions:
-                    query_filters |= Q(note__icontains=note_prefix)
 
-                cip_histories: QuerySet[ClinicalIndicationPanelHistory] = (
-                    ClinicalIndicationPanelHistory.objects.filter(
-                        query_filters
-                    )
-                    .order_by("-created")
-                    .values(
-                        "created",
-                        "note",
-                        "user",
-                        "user__username",
-                        "clinical_indication_panel_id__clinical_indication_id__name",
-                        "clinical_indication_panel_id__clinical_indication_id__r_code",
-                        "clinical_indication_panel_id__panel_id__panel_name",
-                        "clinical_indication_panel_id__panel_id__panel_version",
-                        "clinical_indication_panel_id__clinical_indication_id",
-                        "clinical_indication_panel_id__panel_id",
-                    )
-                )
+    next_url = None
+    if next_cursor:
+        next_params = request.GET.copy()
+        next_params["cursor"] = next_cursor
+        next_url = f"{reverse('history')}?{next_params.urlencode()}"
 
-            # normalize panel version
-            for history in cip_histories:
-                history[
-                    "clinical_indication_panel_id__panel_id__panel_version"
-                ] = normalize_version(
-                    history[
-                        "clinical_indication_panel_id__panel_id__panel_version"
-                    ]
-                )
+    first_url = None
+    if request.GET.get("cursor"):
+        first_params = request.GET.copy()
+        del first_params["cursor"]
+        first_url = f"{reverse('history')}?{first_params.urlencode()}"
 
-            return render(
-                request,
-                "web/history.html",
-                {
-                    "data": cip_histories,
-                    "showing": f"Clinical Indication Panel & {' + '.join([action.title() for action in actions])}"
-                    if actions
-                    else "Clinical Indication Panel",
-                    "selected": "clinical indication-panel",
-                },
-            )
-        elif history_selection == "panel-gene":
-            panel_genes = PanelGeneHistory.objects.values(
-                "created",
-                "note",
-                "user",
-                "user__username",
-                "panel_gene_id__panel_id__panel_name",
-                "panel_gene_id__panel_id",
-                "panel_gene_id__gene_id",
-                "panel_gene_id__gene_id__hgnc_id",
-            )
+    actions = request.GET.getlist("action")
+    showing = HISTORY_TABLES[table]
+    if actions and table in ("clinical indication-panel", "panel-gene"):
+        showing += f" & {' + '.join(action.title() for action in actions)}"
 
-            return render(
-                request,
-                "web/history.html",
-                {
-                    "data": panel_genes,
-                    "showing": "Panel Genes",
-                    "selected": "panel-gene",
-                },
-            )
+    return render(
+        request,
+        "web/history.html",
+        {
+            "data": rows,
+            "showing": showing,
+            "selected": table,
+            "tables": HISTORY_TABLES,
+            "event_types": HistoryEvent.CHOICES,
+            "filters": request.GET,
+            "actions": actions,
+            "next_url": next_url,
+            "first_url": first_url,
+        },
+    )
 
 
 def clinical_indication_panel(
@@ -870,7 +1128,8 @@ def clinical_indication_panel(
             if action in ["activate", "deactivate"]:
                 if action == "activate":
                     clinical_indication_panel.current = True
-                    ClinicalIndicationPanelHistory.objects.create(
+                    record_history(
+                        ClinicalIndicationPanelHistory,
                         clinical_indication_panel_id=cip_id,
                         note=History.clinical_indication_panel_activated(
                             cip_id, True
@@ -879,7 +1138,8 @@ def clinical_indication_panel(
                     )
                 elif action == "deactivate":
                     clinical_indication_panel.current = False
-                    ClinicalIndicationPanelHistory.objects.create(
+                    record_history(
+                        ClinicalIndicationPanelHistory,
                         clinical_indication_panel_id=cip_id,
                         note=History.clinical_indication_panel_deactivated(
                             cip_id, True
@@ -896,7 +1156,8 @@ def clinical_indication_panel(
                 )
                 clinical_indication_panel.pending = False
 
-                ClinicalIndicationPanelHistory.objects.create(
+                record_history(
+                    ClinicalIndicationPanelHistory,
                     clinical_indication_panel_id=cip_id,
                     note=History.clinical_indication_panel_reverted(
                         id=cip_id,
@@ -909,7 +1170,8 @@ def clinical_indication_panel(
             else:
                 # action is "approve" from Review page
                 clinical_indication_panel.pending = False
-                ClinicalIndicationPanelHistory.objects.create(
+                record_history(
+                    ClinicalIndicationPanelHistory,
                     clinical_indication_panel_id=cip_id,
                     note=History.clinical_indication_panel_approved(cip_id),
                     user=request.user,
@@ -971,7 +1233,8 @@ def clinical_indication_superpanel(
         with transaction.atomic():
             if action == "revert":
                 # action is "revert" from Review page
-                ClinicalIndicationSuperPanelHistory.objects.create(
+                record_history(
+                    ClinicalIndicationSuperPanelHistory,
                     clinical_indication_superpanel_id=cisp_id,
                     note=History.clinical_indication_superpanel_reverted(
                         id=cisp_id,
@@ -990,7 +1253,8 @@ def clinical_indication_superpanel(
             if action == "approve":
                 # action is "approve" from Review page
                 clinical_indication_superpanel.pending = False
-                ClinicalIndicationSuperPanelHistory.objects.create(
+                record_history(
+                    ClinicalIndicationSuperPanelHistory,
                     clinical_indication_superpanel_id=cisp_id,
                     note=History.clinical_indication_superpanel_approved(
                         cisp_id
@@ -1003,6 +1267,166 @@ def clinical_indication_superpanel(
         return redirect("review")
 
 
+def _latest_history_note(history_model: type[Model], field: str) -> Subquery:
+    """
+    :param: history_model, a history table, e.g. PanelGeneHistory
+    :param: field, the name of the history table's link to the outer row
+    :return: a subquery for the note of the latest history row of the outer
+    row, or NULL if it has none
+    """
+    return Subquery(
+        history_model.objects.filter(**{field: OuterRef("id")})
+        .order_by("-id")
+        .values("note")[:1]
+    )
+
+
+def _review_decisions(
+    approve: bool,
+    cip_ids: list[str],
+    cisp_ids: list[str],
+    panel_gene_ids: list[str],
+    user,
+) -> int:
+    """
+    Approve or revert many pending CI-panel, CI-superpanel and panel-gene
+    links in one transaction. Each kind of link is read with one query and
+    updated with one bulk update, and the history notes (the same as the
+    single approve / revert actions write) are written in bulk.
+    Links which are no longer pending are skipped, so submitting the same
+    decisions twice doesn't apply them twice.
+    A panel-gene link shared by several versions of a PanelApp panel is
+    decided for all of them - the review page lists the versions.
+
+    :param: approve, True to approve the links, False to revert them
+    :param: cip_ids, IDs of CI-panel links
+    :param: cisp_ids, IDs of CI-superpanel links
+    :param: panel_gene_ids, IDs of PanelGene links
+    :param: user, the user making the decisions
+    :return: the number of links changed
+    """
+    changed = 0
+
+    with transaction.atomic(), HistoryRecorder():
+        cips = list(
+            ClinicalIndicationPanel.objects.select_for_update().filter(
+                id__in=cip_ids, pending=True
+            )
+        )
+        for cip in cips:
+            if approve:
+                note = History.clinical_indication_panel_approved(cip.id)
+            else:
+                note = History.clinical_indication_panel_reverted(
+                    id=cip.id,
+                    old_value=cip.current,
+                    new_value=not cip.current,
+                    review=True,
+                )
+                cip.current = not cip.current
+
+            cip.pending = False
+            record_history(
+                ClinicalIndicationPanelHistory,
+                clinical_indication_panel=cip,
+                note=note,
+                user=user,
+            )
+
+        cisps = list(
+            ClinicalIndicationSuperPanel.objects.select_for_update().filter(
+                id__in=cisp_ids, pending=True
+            )
+        )
+        for cisp in cisps:
+            if approve:
+                note = History.clinical_indication_superpanel_approved(cisp.id)
+            else:
+                note = History.clinical_indication_superpanel_reverted(
+                    id=cisp.id,
+                    metadata="current",
+                    old_value=cisp.current,
+                    new_value=not cisp.current,
+                    review=True,
+                )
+                cisp.current = not cisp.current
+
+            cisp.pending = False
+            record_history(
+                ClinicalIndicationSuperPanelHistory,
+                clinical_indication_superpanel=cisp,
+                note=note,
+                user=user,
+            )
+
+        panel_genes = list(
+            PanelGene.objects.select_for_update().filter(
+                id__in=panel_gene_ids, pending=True
+            )
+        )
+        for panel_gene in panel_genes:
+            if approve:
+                notes = [
+                    History.panel_gene_approved("manual review"),
+                    History.panel_gene_metadata_changed(
+                        "active", not panel_gene.active, panel_gene.active
+                    ),
+                ]
+            else:
+                notes = [
+                    History.panel_gene_reverted("manual review"),
+                    History.panel_gene_metadata_changed(
+                        "active", panel_gene.active, not panel_gene.active
+                    ),
+                ]
+                panel_gene.active = not panel_gene.active
+
+            panel_gene.pending = False
+            for note in notes:
+                record_history(
+                    PanelGeneHistory,
+                    panel_gene=panel_gene,
+                    note=note,
+                    user=user,
+                )
+
+        for model, links in (
+            (ClinicalIndicationPanel, cips),
+            (ClinicalIndicationSuperPanel, cisps),
+        ):
+            model.objects.bulk_update(
+                links, ["current", "pending"], batch_size=1000
+            )
+            changed += len(links)
+
+        PanelGene.objects.bulk_update(
+            panel_genes, ["active", "pending"], batch_size=1000
+        )
+        changed += len(panel_genes)
+
+    return changed
+
+
+def _panel_version_range(panels: list[Panel]) -> str:
+    """
+    Describe the versions of a panel a link applies to
+
+    :param: panels, Panel versions, oldest first
+    :return: e.g. '1.5', or '1.5 to 2.1' for several versions
+    """
+    versions = [
+        normalize_version(panel.panel_version) if panel.panel_version else ""
+        for panel in panels
+    ]
+
+    if not versions:
+        return ""
+    if len(versions) == 1:
+        return versions[0]
+
+    return f"{versions[0]} to {versions[-1]}"
+
+
 @permission_required("staff", raise_exception=False)
 def review(request: HttpRequest) -> HttpResponse:
     """
@@ -1016,6 +1440,12 @@ def review(request: HttpRequest) -> HttpResponse:
     - PanelGene
     - PanelRegion (TODO)
     - PanelTestMethod (TODO)
+
+    Pending CI-panel, CI-superpanel and panel-gene links can be approved
+    or reverted one at a time, or ticked and approved / reverted together.
+    Seeding gives a panel version its own copy of a shared panel-gene link
+    before flagging it, but a link which was already pending while shared
+    is decided for every version it applies to, so those versions are shown
     """
     action_pg = None
 
@@ -1037,13 +1467,15 @@ def review(request: HttpRequest) -> HttpResponse:
                 panel_gene.pending = False
                 panel_gene.save()
 
-                PanelGeneHistory.objects.create(
+                record_history(
+                    PanelGeneHistory,
                     panel_gene_id=panel_gene_id,
                     note=History.panel_gene_approved("manual review"),
                     user=request.user,
                 )
 
-                PanelGeneHistory.objects.create(
+                record_history(
+                    PanelGeneHistory,
                     panel_gene_id=panel_gene_id,
                     note=History.panel_gene_metadata_changed(
                         "active",
@@ -1065,13 +1497,15 @@ def review(request: HttpRequest) -> HttpResponse:
             with transaction.atomic():
                 panel_gene: PanelGene = PanelGene.objects.get(id=panel_gene_id)
 
-                PanelGeneHistory.objects.create(
+                record_history(
+                    PanelGeneHistory,
                     panel_gene_id=panel_gene_id,
                     note=History.panel_gene_reverted("manual review"),
                     user=request.user,
                 )
 
-                PanelGeneHistory.objects.create(
+                record_history(
+                    PanelGeneHistory,
                     panel_gene_id=panel_gene_id,
                     note=History.panel_gene_metadata_changed(
                         "active",
@@ -1085,6 +1519,18 @@ def review(request: HttpRequest) -> HttpResponse:
                 panel_gene.pending = False
                 panel_gene.save()
 
+        elif action in ["bulk_approve", "bulk_revert"]:
+            # many decisions ticked on the review page, applied together
+            _review_decisions(
+                action == "bulk_approve",
+                request.POST.getlist("cip_ids"),
+                request.POST.getlist("cisp_ids"),
+                request.POST.getlist("pg_ids"),
+                request.user,
+            )
+
+            return redirect("review")
+
         return redirect("panel", panel_id=panel_gene.panel_id)
 
     panels: QuerySet[Panel] = Panel.objects.filter(pending=True).all()
@@ -1094,26 +1540,19 @@ def review(request: HttpRequest) -> HttpResponse:
         if panel.panel_version:
             panel.panel_version = normalize_version(panel.panel_version)
 
+    # the latest test method change of each clinical indication, if any -
+    # otherwise it's a new clinical indication
     clinical_indications: QuerySet[
         ClinicalIndication
-    ] = ClinicalIndication.objects.filter(pending=True).all()
-
-    # clinical indication test method history
-    if clinical_indications:
-        for indication in clinical_indications:
-            indication_history = (
-                ClinicalIndicationTestMethodHistory.objects.filter(
-                    clinical_indication_id=indication.id
-                )
-                .order_by("-id")
-                .first()
-            )
-
-            # determine if test method is changed
-            # or it's a new clinical indication creation
-            indication.reason = (
-                indication_history.note if indication_history else "NEW"
-            )
+    ] = ClinicalIndication.objects.filter(pending=True).annotate(
+        reason=Coalesce(
+            _latest_history_note(
+                ClinicalIndicationTestMethodHistory, "clinical_indication_id"
+            ),
+            Value("NEW"),
+            output_field=TextField(),
+        )
+    )
 
     clinical_indication_panels: QuerySet[ClinicalIndicationPanel] = (
         ClinicalIndicationPanel.objects.filter(pending=True)
@@ -1164,23 +1603,32 @@ def review(request: HttpRequest) -> HttpResponse:
         else:
             cisp["superpanel_id__panel_version"] = "None"
 
-    panel_gene = PanelGene.objects.filter(pending=True).values(
-        "id",
-        "panel_id__panel_name",
-        "panel_id",
-        "gene_id__hgnc_id",
-        "gene_id",
-        "active",
-    )
-
-    for pg in panel_gene:
-        pg_history = (
-            PanelGeneHistory.objects.filter(panel_gene_id=pg["id"])
-            .order_by("-id")
-            .first()
+    # the latest history note of each panel gene is the reason it's pending.
+    # a shared link is pending for every panel version it applies to, and
+    # approving or reverting it decides for all of them
+    panel_gene = [
+        {
+            "id": pg.id,
+            "panel_id__panel_name": pg.panel.panel_name,
+            "panel_id": pg.panel_id,
+            "gene_id__hgnc_id": pg.gene.hgnc_id,
+            "gene_id": pg.gene_id,
+            "active": pg.active,
+            "reason": pg.reason,
+            "versions": _panel_version_range(versions),
+            "version_count": len(versions),
+        }
+        for pg, versions in PanelGene.objects.filter(pending=True)
+        .annotate(
+            reason=Coalesce(
+                _latest_history_note(PanelGeneHistory, "panel_gene_id"),
+                Value("Reason not found"),
+                output_field=TextField(),
+            )
         )
-
-        pg["reason"] = pg_history.note if pg_history else "Reason not found"
+        .order_by("id")
+        .with_panel_versions()
+    ]
 
     return render(
         request,
@@ -1211,11 +1659,24 @@ def gene(request: HttpRequest, gene_id: int) -> HttpResponse:
     except Gene.DoesNotExist:
         return render(request, "web/info/gene.html")
 
-    associated_panels = PanelGene.objects.filter(gene_id=gene_id).values(
-        "panel_id__panel_name",
-        "panel_id",
-        "active",
-    )
+    # a shared link applies to several versions of a PanelApp panel, but is
+    # only stored on the first of them
+    associated_panels = [
+        {
+            "panel_id": panel.id,
+            "panel_id__panel_name": panel.panel_name,
+            "panel_id__panel_version": (
+                normalize_version(panel.panel_version)
+                if panel.panel_version
+                else None
+            ),
+            "active": panel_gene.active,
+        }
+        for panel_gene, panels in PanelGene.objects.filter(gene_id=gene_id)
+        .order_by("id")
+        .with_panel_versions()
+        for panel in panels
+    ]
 
     transcripts = TranscriptReleaseTranscript.objects.filter(
         transcript_id__gene_id=gene_id
@@ -1238,18 +1699,18 @@ def gene(request: HttpRequest, gene_id: int) -> HttpResponse:
     )
 
 
-def _parse_excluded_hgncs_from_bytes(file: TemporaryUploadedFile) -> set[str]:
+def _parse_excluded_hgncs_from_bytes(data: bytes) -> set[str]:
     """
     Function to parse a file containing hgnc ids that are excluded from the genepanel creation
     This function is similar to "parse_excluded_hgncs_from_file" from
     panels_backend/management/commands/utils.py but takes different type of input
 
-    :param: file: TemporaryUploadedFile - this is an uploaded file from the front-end in bytes
+    :param: data: bytes - the contents of a file uploaded from the front-end
 
     :return: set[str] - a set of hgnc ids that are excluded
     """
     try:
-        df = pd.read_csv(BytesIO(file.read()), delimiter="\t", dtype=str)
+        df = pd.read_csv(BytesIO(data), delimiter="\t", dtype=str)
 
         df = df[
             df["Locus type"].str.contains("rna", case=False)
@@ -1264,31 +1725,24 @@ def _parse_excluded_hgncs_from_bytes(file: TemporaryUploadedFile) -> set[str]:
     return set(df["HGNC ID"].tolist())
 
 
-@permission_required("staff", raise_exception=False)
-def _add_panel_genes_to_genepanel(
-    panel_id: str,
-    panel_id_to_genes: dict[str, list[WebGene]],
-    genepanel: WebGenePanel,
-) -> None:
+def _genepanel_genes(panels: list[Panel]) -> dict[int, list[WebGene]]:
     """
-    Small helper function to add panel genes to genepanel object
-    used in genepanel function
+    Small helper function to get the genes of every panel on the genepanel
+    page, in one query
 
-    :param: panel_id: str - panel id
-    :param: panel_id_to_genes: dict[str, list[WebGene]] - dict of panel id to list of WebGene
-    :param: genepanel: GenePanel - genepanel object
+    :param: panels: list[Panel] - the panels, including superpanel children
 
-    :return: None
+    :return: dict of panel id to list of WebGene
     """
-    for gene in PanelGene.objects.filter(panel_id=panel_id).values(
-        "gene_id__hgnc_id", "gene_id", "panel_id"
-    ):
-        gene_id = gene["gene_id"]
-        hgnc_id = gene["gene_id__hgnc_id"]
-
-        panel_id_to_genes[panel_id].append(WebGene(gene_id, hgnc_id))
-
-        genepanel.hgncs.append(WebGene(gene_id, hgnc_id))
+    return {
+        panel_id: [
+            WebGene(panel_gene.gene_id, panel_gene.gene.hgnc_id)
+            for panel_gene in panel_genes
+        ]
+        for panel_id, panel_genes in PanelGene.objects.for_panels(
+            panels
+        ).items()
+    }
 
 
 @permission_required("staff", raise_exception=False)
@@ -1298,6 +1752,10 @@ def genepanel(
     """
     Genepanel page where user view R code, clinical indication name
     its associated panels and genes.
+
+    The page is built from a fixed number of bulk queries - the active
+    CI-panel and CI-superpanel links, the superpanels' child panels, and the
+    genes of all of those panels
     """
 
     success = None
@@ -1310,7 +1768,6 @@ def genepanel(
         ClinicalIndicationSuperPanel.objects.filter(pending=True).exists()
     )
     pending_panel_genes = PanelGene.objects.filter(pending=True).exists()
-    from django.db.models import Count, Q
 
     # check if there're clinical indication with more than one active links
     clinical_indication_with_more_than_one_active_links = (
@@ -1319,12 +1776,17 @@ def genepanel(
         .filter(panel_count__gt=1)
         .annotate(true_current_count=Count("id", filter=Q(current=True)))
         .filter(true_current_count__gt=1)
+        .exists()
+    )
+
+    cips = list(
+        ClinicalIndicationPanel.objects.filter(
+            current=True, pending=False
+        ).select_related("clinical_indication", "panel")
     )
 
     # if there's no CiPanelAssociation date column, return empty list
-    if not ClinicalIndicationPanel.objects.filter(
-        current=True, pending=False
-    ).exists():
+    if not cips:
         return render(request, "web/info/genepanel.html")
 
     # if there're pending CiPanel / CiSuperPanel / PanelGene
@@ -1340,98 +1802,83 @@ def genepanel(
             "Clinical Indication(s) with more than one active links found."
         )
 
-    genepanels: list[WebGenePanel] = []
-    panel_id_to_genes: dict[str, list[WebGene]] = collections.defaultdict(list)
-
-    for row in ClinicalIndicationPanel.objects.filter(
-        current=True, pending=False
-    ).values(
-        "clinical_indication_id__r_code",
-        "clinical_indication_id__name",
-        "panel_id",
-        "clinical_indication_id",
-        "panel_id__panel_name",
-        "panel_id__panel_version",
-    ):
-        panel_id = row["panel_id"]
-
-        genepanel = WebGenePanel(
-            row["clinical_indication_id__r_code"],
-            row["clinical_indication_id__name"],
-            row["clinical_indication_id"],
-            row["panel_id"],
-            row["panel_id__panel_name"],
-            normalize_version(row["panel_id__panel_version"])
-            if row["panel_id__panel_version"]
-            else None,
-            [],
-        )
-        _add_panel_genes_to_genepanel(panel_id, panel_id_to_genes, genepanel)
+    cisps = list(
+        ClinicalIndicationSuperPanel.objects.filter(
+            current=True, pending=False
+        ).select_related("clinical_indication", "superpanel")
+    )
 
-        genepanels.append(genepanel)
+    # child panels of every superpanel, in one query
+    superpanel_id_to_children: dict[
+        int, list[Panel]
+    ] = collections.defaultdict(list)
+    for link in PanelSuperPanel.objects.filter(
+        superpanel_id__in={cisp.superpanel_id for cisp in cisps}
+    ).select_related("panel"):
+        superpanel_id_to_children[link.superpanel_id].append(link.panel)
+
+    # genes of every panel and child panel, in one query
+    panels = {cip.panel.id: cip.panel for cip in cips}
+    for children in superpanel_id_to_children.values():
+        panels.update({panel.id: panel for panel in children})
+    panel_id_to_genes = _genepanel_genes(list(panels.values()))
 
-    # deal with CiSuperPanel
-    for row in ClinicalIndicationSuperPanel.objects.filter(
-        current=True, pending=False
-    ).values(
-        "clinical_indication_id__r_code",
-        "clinical_indication_id__name",
-        "clinical_indication_id",
-        "superpanel_id",
-        "superpanel_id__panel_name",
-        "superpanel_id__panel_version",
-    ):
-        superpanel_id = row["superpanel_id"]
-
-        genepanel = WebGenePanel(
-            row["clinical_indication_id__r_code"],
-            row["clinical_indication_id__name"],
-            row["clinical_indication_id"],
-            row["superpanel_id"],
-            row["superpanel_id__panel_name"],
-            normalize_version(row["superpanel_id__panel_version"])
-            if row["superpanel_id__panel_version"]
-            else None,
-            [],
-            True,
-            [],  # child panels
-        )
+    genepanels: list[WebGenePanel] = []
 
-        for child_panel in PanelSuperPanel.objects.filter(
-            superpanel_id=superpanel_id
-        ).values(
-            "panel_id__panel_name",
-            "panel_id",
-            "panel_id__panel_version",
-        ):
-            child_panel_id = child_panel["panel_id"]
-
-            genepanel.child_panels.append(
-                WebChildPanel(
-                    child_panel["panel_id"],
-                    child_panel["panel_id__panel_name"],
-                    normalize_version(child_panel["panel_id__panel_version"])
-                    if child_panel["panel_id__panel_version"]
-                    else None,
-                )
+    for cip in cips:
+        genepanels.append(
+            WebGenePanel(
+                cip.clinical_indication.r_code,
+                cip.clinical_indication.name,
+                cip.clinical_indication_id,
+                cip.panel_id,
+                cip.panel.panel_name,
+                normalize_version(cip.panel.panel_version)
+                if cip.panel.panel_version
+                else None,
+                list(panel_id_to_genes.get(cip.panel_id, [])),
             )
+        )
 
-            if child_panel_id in panel_id_to_genes:
-                genepanel.hgncs.extend(panel_id_to_genes[child_panel_id])
-                continue
-
-            _add_panel_genes_to_genepanel(
-                child_panel_id, panel_id_to_genes, genepanel
+    # deal with CiSuperPanel
+    for cisp in cisps:
+        children = superpanel_id_to_children[cisp.superpanel_id]
+
+        genepanels.append(
+            WebGenePanel(
+                cisp.clinical_indication.r_code,
+                cisp.clinical_indication.name,
+                cisp.clinical_indication_id,
+                cisp.superpanel_id,
+                cisp.superpanel.panel_name,
+                normalize_version(cisp.superpanel.panel_version)
+                if cisp.superpanel.panel_version
+                else None,
+                [
+                    gene
+                    for child_panel in children
+                    for gene in panel_id_to_genes.get(child_panel.id, [])
+                ],
+                True,
+                [
+                    WebChildPanel(
+                        child_panel.id,
+                        child_panel.panel_name,
+                        normalize_version(child_panel.panel_version)
+                        if child_panel.panel_version
+                        else None,
+                    )
+                    for child_panel in children
+                ],
             )
-
-        genepanels.append(genepanel)
+        )
 
     if request.method == "POST":
         # return errors if there're pending links in Manual Review
         if (
             pending_clinical_indication_panels
-            or pending_clinical_indication_panels
-            or pending_clinical_indication_panels
+            or pending_clinical_indication_superpanels
+            or pending_panel_genes
         ):
             return render(
                 request,
@@ -1445,11 +1892,12 @@ def genepanel(
 
         project_id = request.POST.get("project_id").strip()
         dnanexus_token = request.POST.get("dnanexus_token").strip()
-        hgnc = request.FILES.get("hgnc_upload")
+        # the upload can only be read once
+        hgnc_data = request.FILES.get("hgnc_upload").read()
 
         # validate hgnc columns
         if missing_columns := check_missing_columns(
-            pd.read_csv(BytesIO(hgnc.read()), delimiter="\t"),
+            pd.read_csv(BytesIO(hgnc_data), delimiter="\t"),
             ["HGNC ID", "Locus type", "Approved name"],
         ):
             return render(
@@ -1463,7 +1911,7 @@ def genepanel(
                 },
             )
 
-        rnas = _parse_excluded_hgncs_from_bytes(hgnc)
+        rnas = _parse_excluded_hgncs_from_bytes(hgnc_data)
 
         try:
             # login dnanexus
@@ -1500,7 +1948,7 @@ def genepanel(
             for gp in genepanels:
                 if gp.superpanel:
                     for child_panel in gp.child_panels:
-                        for gene in panel_id_to_genes[child_panel.id]:
+                        for gene in panel_id_to_genes.get(child_panel.id, []):
                             if (
                                 gene.hgnc in HGNC_IDS_TO_OMIT
                                 or gene.hgnc in rnas
@@ -1593,102 +2041,309 @@ def add_gene(request: HttpRequest) -> HttpResponse:
             )
 
 
-def ajax_genes(request: HttpRequest) -> JsonResponse:
+# number of genes returned by the gene search api when no limit is given,
+# and the most it will return
+GENE_SEARCH_LIMIT = 20
+GENE_SEARCH_MAX_LIMIT = 100
+
+
+def _search_genes(
+    query: str, limit: int, cursor: tuple[int, str] | None = None
+) -> tuple[list[dict], tuple[int, str] | None]:
     """
-    Ajax fetch call to get all genes
+    Search genes by HGNC ID, approved symbol and alias symbols, case
+    insensitively. Exact matches on HGNC ID or symbol come first, then
+    prefix matches, then any other substring matches (including aliases),
+    each in HGNC ID order.
+
+    :param: query, the search term - if empty, every gene matches
+    :param: limit, the number of genes to return
+    :param: cursor, the (rank, HGNC ID) of the last gene of the previous
+    page, or None for the first page
+    :return: the genes found, and the cursor for the next page, or None if
+    this is the last page
     """
-    if request.method == "GET":
-        genes = list(Gene.objects.all().order_by("hgnc_id").values())
+    genes = Gene.objects.all()
+
+    if query:
+        genes = genes.filter(
+            Q(hgnc_id__icontains=query)
+            | Q(gene_symbol__icontains=query)
+            | Q(alias_symbols__icontains=query)
+        ).annotate(
+            rank=Case(
+                When(
+                    Q(hgnc_id__iexact=query) | Q(gene_symbol__iexact=query),
+                    then=Value(0),
+                ),
+                When(
+                    Q(hgnc_id__istartswith=query)
+                    | Q(gene_symbol__istartswith=query),
+                    then=Value(1),
+                ),
+                default=Value(2),
+            )
+        )
+    else:
+        genes = genes.annotate(rank=Value(0))
+
+    if cursor:
+        rank, hgnc_id = cursor
+        genes = genes.filter(
+            Q(rank__gt=rank) | Q(rank=rank, hgnc_id__gt=hgnc_id)
+        )
+
+    # fetch one extra gene to find out if there's another page
+    page = list(
+        genes.order_by("rank", "hgnc_id").values(
+            "id", "hgnc_id", "gene_symbol", "alias_symbols", "rank"
+        )[: limit + 1]
+    )
+
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_cursor = (page[-1]["rank"], page[-1]["hgnc_id"])
+
+    for gene in page:
+        del gene["rank"]
 
-        return JsonResponse({"data": genes}, safe=False)
+    return page, next_cursor
 
 
-def _giving_transcript_clinical_context(
-    transcripts: list[dict[str, str]], release_ids: list[str]
-) -> list[dict[str, str | bool | None]]:
+def ajax_genes(request: HttpRequest) -> JsonResponse:
     """
-    Function to give transcripts clinical context by querying TranscriptReleaseTranscript
+    Ajax fetch call to search genes, e.g. /api/genes/?q=brca&limit=20
 
-    Args:
-        transcripts: list of transcripts in dict form
-        release_ids: list of release ids
+    GET parameters:
+    - q: search term, matched against HGNC ID, symbol and aliases
+    - limit: number of genes to return (default 20, max 100)
+    - cursor: the 'next' value of the previous response, to get the next
+    page
 
-    Returns:
-        list of transcripts with clinical context in the form of
-        dict with keys:
-            - hgnc_id
-            - gene_id
-            - transcript
-            - clinical
-            - source
-            - source_id
+    Returns the genes found as 'data', and 'next', the cursor for the next
+    page (null on the last page)
+    """
+    query = request.GET.get("q", "").strip()
+
+    try:
+        limit = int(request.GET.get("limit", GENE_SEARCH_LIMIT))
+    except ValueError:
+        return JsonResponse({"error": "limit must be a number"}, status=400)
+    limit = min(max(limit, 1), GENE_SEARCH_MAX_LIMIT)
+
+    cursor = None
+    if request.GET.get("cursor"):
+        rank, _, hgnc_id = request.GET["cursor"].partition("|")
+        if not rank.isdigit() or not hgnc_id:
+            return JsonResponse({"error": "invalid cursor"}, status=400)
+        cursor = (int(rank), hgnc_id)
 
+    genes, next_cursor = _search_genes(query, limit, cursor)
+
+    return JsonResponse(
+        {
+            "data": genes,
+            "next": (
+                f"{next_cursor[0]}|{next_cursor[1]}" if next_cursor else None
+            ),
+        }
+    )
+
+
+def _gene_table(params: DataTablesParams) -> dict:
     """
+    One page of the gene table on the index page
 
-    relevant_transcripts = TranscriptReleaseTranscript.objects.filter(
-        transcript_id__in=set([tx["id"] for tx in transcripts]),
-        release_id__in=release_ids,
-        default_clinical=True,
-    ).values(
-        "transcript__transcript",
-        "transcript_id",
-        "release_id__release",
-        "release_id__source_id__source",
-        "release_id__source_id",
+    :param: params, the DataTables request
+    :return: the DataTables response
+    """
+    genes = Gene.objects.values(
+        "id", "hgnc_id", "gene_symbol", "alias_symbols"
     )
+    if params.search:
+        genes = genes.filter(
+            Q(hgnc_id__icontains=params.search)
+            | Q(gene_symbol__icontains=params.search)
+            | Q(alias_symbols__icontains=params.search)
+        )
+
+    def make_row(gene: dict) -> list[str]:
+        return [
+            escape(gene["hgnc_id"]),
+            format_html(
+                '<a href="{}">{}</a>',
+                reverse("gene", args=[gene["id"]]),
+                gene["gene_symbol"],
+            ),
+            escape(gene["alias_symbols"]),
+        ]
+
+    return datatables_page(
+        params,
+        Gene.objects.count(),
+        genes,
+        [("hgnc_id",), ("gene_symbol", "hgnc_id"), ("alias_symbols", "id")],
+        make_row,
+    )
+
+
+def ajax_gene_table(request: HttpRequest) -> JsonResponse:
+    """
+    Ajax fetch call for a page of the index gene table
+    """
+    return JsonResponse(_gene_table(DataTablesParams(request.GET)))
 
-    clinical_transcripts_to_source: dict[str, str] = {
-        str(c["transcript_id"])
-        + c["transcript__transcript"]: c["release_id__source_id__source"]
-        for c in relevant_transcripts
-    }
 
-    source_to_source_id = {
-        c["release_id__source_id__source"]: c["release_id__source_id"]
-        for c in relevant_transcripts
+# gene-transcripts bodies are cached by the latest releases they're built
+# from, so seeding a new release makes a new entry rather than a stale one -
+# the timeout only clears out entries for old releases
+GENE_TRANSCRIPTS_CACHE_TIMEOUT = 60 * 60 * 24
+
+# size of the pieces the gene-transcripts body is built and streamed in
+GENE_TRANSCRIPTS_CHUNK_SIZE = 5000
+GENE_TRANSCRIPTS_STREAM_BYTES = 64 * 1024
+
+
+def _latest_gene_transcript_releases(
+    reference_genome: str,
+) -> tuple[ReferenceGenome | None, list[TranscriptRelease | None]]:
+    """
+    Get the latest HGMD, MANE Select and MANE Plus Clinical releases for a
+    reference genome
+
+    :param: reference_genome, the name of the reference genome e.g. GRCh38
+    :return: the ReferenceGenome, and a list of the latest HGMD, MANE Select
+    and MANE Plus Clinical releases - any of which may be None
+    """
+    refgenome = ReferenceGenome.objects.filter(name=reference_genome).first()
+
+    return refgenome, [
+        get_latest_transcript_release(source, refgenome)
+        for source in ["HGMD", "MANE Select", "MANE Plus Clinical"]
+    ]
+
+
+def _gene_transcript_rows(
+    refgenome: ReferenceGenome, release_ids: list[int]
+) -> Iterator[dict[str, str | bool | None]]:
+    """
+    Give every transcript of a reference genome its clinical context, in
+    gene order. Clinical transcripts are looked up in one query, and the
+    transcripts are read in chunks rather than all at once.
+
+    :param: refgenome, the reference genome
+    :param: release_ids, ids of the releases deciding which transcripts are
+    clinical
+    :return: a generator of transcripts, as dicts with keys:
+        - hgnc_id
+        - gene_id
+        - transcript
+        - clinical
+        - source
+        - source_id
+    """
+    clinical_transcripts: dict[int, tuple[str, int]] = {
+        transcript_id: (source, source_id)
+        for transcript_id, source, source_id in (
+            TranscriptReleaseTranscript.objects.filter(
+                release_id__in=release_ids,
+                default_clinical=True,
+            ).values_list(
+                "transcript_id",
+                "release__source__source",
+                "release__source_id",
+            )
+        )
     }
 
-    return [
-        {
+    for tx in (
+        Transcript.objects.order_by("gene_id")
+        .filter(reference_genome=refgenome)
+        .values("gene_id__hgnc_id", "gene_id", "transcript", "id")
+        .iterator(chunk_size=GENE_TRANSCRIPTS_CHUNK_SIZE)
+    ):
+        source, source_id = clinical_transcripts.get(tx["id"], (None, None))
+        yield {
             "hgnc_id": tx["gene_id__hgnc_id"],
             "gene_id": tx["gene_id"],
             "transcript": tx["transcript"],
-            "clinical": (str(tx["id"]) + tx["transcript"])
-            in clinical_transcripts_to_source,
-            "source": clinical_transcripts_to_source.get(
-                (str(tx["id"]) + tx["transcript"]), None
-            ),
-            "source_id": source_to_source_id.get(
-                clinical_transcripts_to_source.get(
-                    (str(tx["id"]) + tx["transcript"]), None
-                ),
-                None,
-            ),
+            "clinical": source is not None,
+            "source": source,
+            "source_id": source_id,
         }
-        for tx in transcripts
-    ]
+
+
+def _gzipped_gene_transcripts(
+    refgenome: ReferenceGenome, release_ids: list[int]
+) -> bytes:
+    """
+    Build the gene-transcripts json body, gzip-compressed as it's built, so
+    the whole uncompressed body is never held in memory
+
+    :param: refgenome, the reference genome
+    :param: release_ids, ids of the releases deciding which transcripts are
+    clinical
+    :return: the gzipped json, {"data": [transcript, ...]}
+    """
+    buffer = BytesIO()
+
+    with gzip.GzipFile(fileobj=buffer, mode="wb") as body:
+        body.write(b'{"data": [')
+
+        rows = _gene_transcript_rows(refgenome, release_ids)
+        first = True
+        while chunk := list(islice(rows, GENE_TRANSCRIPTS_CHUNK_SIZE)):
+            if not first:
+                body.write(b", ")
+            # dump each chunk as a list, and drop its brackets
+            body.write(json.dumps(chunk)[1:-1].encode())
+            first = False
+
+        body.write(b"]}")
+
+    return buffer.getvalue()
+
+
+def _stream_bytes(body: bytes) -> Iterator[bytes]:
+    """
+    :param: body, a response body
+    :return: a generator of the body in pieces
+    """
+    for start in range(0, len(body), GENE_TRANSCRIPTS_STREAM_BYTES):
+        yield body[start : start + GENE_TRANSCRIPTS_STREAM_BYTES]
+
+
+def _stream_gunzipped(body: bytes) -> Iterator[bytes]:
+    """
+    :param: body, a gzipped response body
+    :return: a generator of the decompressed body in pieces
+    """
+    with gzip.GzipFile(fileobj=BytesIO(body)) as f:
+        while piece := f.read(GENE_TRANSCRIPTS_STREAM_BYTES):
+            yield piece
 
 
 def ajax_gene_transcripts(
     request: HttpRequest, reference_genome: str
-) -> JsonResponse:
+) -> HttpResponse:
     """
     Ajax fetch call to get all transcripts for a given reference genome.
     Returns a json response as this will be requested by the datatable in the front-end
 
     The content of the json response is a list of transcripts with clinical context
-    See function: `_giving_transcript_clinical_context`
-    """
-    refgenome = ReferenceGenome.objects.filter(name=reference_genome).first()
+    See function: `_gene_transcript_rows`
 
-    latest_select = get_latest_transcript_release("MANE Select", refgenome)
-    latest_plus_clinical = get_latest_transcript_release(
-        "MANE Plus Clinical", refgenome
-    )
-    latest_hgmd = get_latest_transcript_release("HGMD", refgenome)
+    The body is cached per reference genome and latest HGMD, MANE Select
+    and MANE Plus Clinical release, and streamed gzip-compressed to clients
+    which accept it. Its ETag is made from the same releases, so a browser
+    which already has the body gets a 304 without it being read. The ETag
+    also differs between the gzipped and plain bodies.
+    """
+    refgenome, releases = _latest_gene_transcript_releases(reference_genome)
 
     # lack of latest release version in the backend
-    if None in [latest_select, latest_plus_clinical, latest_hgmd]:
+    if None in releases:
         return JsonResponse(
             {
                 "data": [
@@ -1703,22 +2358,48 @@ def ajax_gene_transcripts(
             safe=False,
         )
 
-    transcripts = (
-        Transcript.objects.order_by("gene_id")
-        .filter(reference_genome=refgenome)
-        .values("gene_id__hgnc_id", "gene_id", "transcript", "id")
+    release_ids = [release.id for release in releases]
+    cache_key = "gene_transcripts:{}:{}".format(
+        refgenome.id, ":".join(str(release_id) for release_id in release_ids)
     )
-
-    return JsonResponse(
-        {
-            "data": _giving_transcript_clinical_context(
-                transcripts,
-                [latest_hgmd.id, latest_select.id, latest_plus_clinical.id],
-            )
-        },
-        safe=False,
+    # the gzipped and plain bodies are different representations, so they
+    # get different etags
+    gzipped = "gzip" in request.headers.get("Accept-Encoding", "")
+    etag = quote_etag(
+        hashlib.sha1(cache_key.encode()).hexdigest()
+        + ("-gzip" if gzipped else "")
     )
 
+    # the etag only depends on the releases and encoding, so repeat loads
+    # can be answered without the body
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified:
+        not_modified["ETag"] = etag
+        patch_vary_headers(not_modified, ["Accept-Encoding"])
+        return not_modified
+
+    body = cache.get(cache_key)
+    if body is None:
+        body = _gzipped_gene_transcripts(refgenome, release_ids)
+        cache.set(cache_key, body, GENE_TRANSCRIPTS_CACHE_TIMEOUT)
+
+    if gzipped:
+        response = StreamingHttpResponse(
+            _stream_bytes(body), content_type="application/json"
+        )
+        response["Content-Encoding"] = "gzip"
+    else:
+        response = StreamingHttpResponse(
+            _stream_gunzipped(body), content_type="application/json"
+        )
+
+    response["ETag"] = etag
+    # browsers should check the etag before reusing the body
+    response["Cache-Control"] = "no-cache"
+    patch_vary_headers(response, ["Accept-Encoding"])
+
+    return response
+
 
 def genetranscriptsview(request: HttpRequest) -> HttpResponse:
     """
@@ -1784,25 +2465,21 @@ def genetranscripts(request: HttpRequest) -> HttpResponse:
 
             current_datetime = dt.datetime.today().strftime("%Y%m%d")
 
-            transcripts = ajax_gene_transcripts(
-                HttpRequest, reference_genome=reference_genome
+            refgenome, releases = _latest_gene_transcript_releases(
+                reference_genome
             )
+            if None in releases:
+                raise ValueError(
+                    "Missing latest HGMD, MANE Select or MANE Plus Clinical "
+                    f"release for {reference_genome}"
+                )
 
-            # write result to dnanexus file
-            with dx.new_dxfile(
-                name=f"{current_datetime}_g2t.tsv",
-                project=project_id,
-                media_type="text/plain",
-            ) as f:
-                for row in json.loads(transcripts.content)["data"]:
-                    hgnc_id = row["hgnc_id"]
-                    transcript = row["transcript"]
-                    source = row.get("source")
-
-                    data = "\t".join(
-                        [hgnc_id, transcript, "True" if source else "False"]
-                    )
-                    f.write(f"{data}\n")
+            # stream rows straight into the dnanexus file
+            write_g2t(
+                g2t_rows(refgenome, [release.id for release in releases]),
+                DNAnexusSink(project_id),
+                f"{current_datetime}_g2t.tsv",
+            )
 
             return render(
                 request, "web/info/genetranscripts.html", {"success": True}
@@ -1852,36 +2529,105 @@ def transcript_source(request: HttpRequest, ts_id: int) -> HttpResponse:
     )
 
 
+def _save_td_seed(data: str) -> str:
+    """
+    Keep an uploaded test directory in a temporary file until the import is
+    confirmed, rather than in the session
+
+    :param: data, the test directory json
+    :return: the name of the file, to keep in the session
+    """
+    with tempfile.NamedTemporaryFile(
+        "w", prefix="td_seed_", suffix=".json", delete=False
+    ) as file:
+        file.write(data)
+
+    return os.path.basename(file.name)
+
+
+def _pop_td_seed(name: str | None) -> str | None:
+    """
+    Read and remove a test directory kept by _save_td_seed
+
+    :param: name, the file name kept in the session, or None
+    :return: the test directory json, or None if there isn't one
+    """
+    if not name:
+        return None
+
+    path = os.path.join(tempfile.gettempdir(), os.path.basename(name))
+    try:
+        with open(path) as file:
+            data = file.read()
+    except FileNotFoundError:
+        return None
+
+    os.remove(path)
+    return data
+
+
 @permission_required("staff", raise_exception=False)
 def seed(request: HttpRequest) -> HttpResponse:
     """
     Handle seed page:
     Currently only handle Test Directory seed
 
+    An uploaded test directory is first compared to the db, and the changes
+    it would make are shown. The upload is kept in a temporary file, named
+    in the session, until the user confirms the import.
+
     TODO: Handle other seed (transcript)
     """
 
     error = None
+    preview = None
 
     if request.method == "POST":
         try:
-            # if force update (True), disregard td version and continue seeding Test Directory
-            force_update = request.POST.get("force")
-            td_version = request.POST.get("version")
+            if request.POST.get("confirm"):
+                pending_seed = request.session.pop("td_seed", None) or {}
+                data = _pop_td_seed(pending_seed.get("file"))
+                if not data:
+                    raise ValueError(
+                        "No test directory to import - please upload it again"
+                    )
 
-            test_directory_data = json.loads(
-                request.FILES.get("td_upload").read().decode()
-            )
+                insert_test_directory_data(
+                    json.loads(data),
+                    pending_seed["version"],
+                    pending_seed["force"],
+                    request.user,
+                )
 
-            insert_test_directory_data(
-                test_directory_data,
-                td_version,
-                True if force_update else False,
-                request.user,
-            )
+                error = False
+            else:
+                # if force update (True), disregard td version and continue seeding Test Directory
+                force_update = request.POST.get("force")
+                td_version = request.POST.get("version")
+
+                data = request.FILES.get("td_upload").read().decode()
+                report = diff_test_directory(json.loads(data), td_version)
+
+                # replace any upload which wasn't confirmed
+                _pop_td_seed(request.session.get("td_seed", {}).get("file"))
+                request.session["td_seed"] = {
+                    "file": _save_td_seed(data),
+                    "version": td_version,
+                    "force": True if force_update else False,
+                }
 
-            error = False
+                preview = {
+                    "report": report,
+                    "force": True if force_update else False,
+                    "sections": [
+                        (section.replace("_", " ").capitalize(), rows)
+                        for section, rows in report.items()
+                        if isinstance(rows, list)
+                    ],
+                }
         except Exception as e:
             error = e
 
-    return render(request, "web/info/seed.html", {"error": error})
+    return render(
+        request, "web/info/seed.html", {"error": error, "preview": preview}
+    )
@@ -0,0 +1,84 @@
+import json
+import re
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+class TestRequestMetricsMiddleware(TestCase):
+    """
+    Each request's query count, database time, view time and response size
+    are sent back in a Server-Timing header and written to the metrics log
+    """
+
+    def test_server_timing_header(self):
+        """
+        CASE: a page is requested
+        EXPECT: its Server-Timing header gives the number of queries it ran,
+        and the database and view times
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("history"))
+
+        match = re.fullmatch(
+            r'db;dur=[\d.]+;desc="(\d+) queries", view;dur=[\d.]+',
+            response["Server-Timing"],
+        )
+        self.assertIsNotNone(match)
+        self.assertEqual(int(match.group(1)), len(queries))
+
+    def test_metrics_logged(self):
+        """
+        CASE: a page is requested
+        EXPECT: one line of json is logged with the request's metrics
+        """
+        with self.assertLogs("eris.metrics", "INFO") as logs:
+            response = self.client.get(reverse("history"))
+
+        self.assertEqual(len(logs.records), 1)
+        metrics = json.loads(logs.records[0].getMessage())
+        self.assertEqual(metrics["path"], reverse("history"))
+        self.assertEqual(metrics["view"], "history")
+        self.assertEqual(metrics["status"], 200)
+        self.assertEqual(metrics["bytes"], len(response.content))
+        self.assertGreater(metrics["queries"], 0)
+
+    @override_settings(QUERY_BUDGET=1)
+    def test_over_budget_logs_sql(self):
+        """
+        CASE: a page runs more queries than the query budget
+        EXPECT: a warning is logged with the SQL of its queries, but not
+        their parameters, such as the session key
+        """
+        # the session and user lookups add to the page's own query
+        self.client.force_login(User.objects.create_user("alice"))
+
+        with self.assertLogs("eris.metrics", "INFO") as logs:
+            self.client.get(reverse("history"))
+
+        warnings = [
+            record for record in logs.records if record.levelname == "WARNING"
+        ]
+        self.assertEqual(len(warnings), 1)
+        self.assertIn("over the budget of 1", warnings[0].getMessage())
+        self.assertIn("SELECT", warnings[0].getMessage())
+        self.assertIn("django_session", warnings[0].getMessage())
+        self.assertNotIn(
+            self.client.session.session_key, warnings[0].getMessage()
+        )
+
+    @override_settings(QUERY_BUDGET=1000)
+    def test_within_budget_no_warning(self):
+        """
+        CASE: a page runs fewer queries than the query budget
+        EXPECT: only its metrics are logged
+        """
+        with self.assertLogs("eris.metrics", "INFO") as logs:
+            self.client.get(reverse("history"))
+
+        self.assertEqual(
+            [record.levelname for record in logs.records], ["INFO"]
+        )
@@ -0,0 +1,53 @@
+from django.test import TestCase
+
+from panels_backend.models import Panel
+from panels_backend.management.commands.backfill import (
+    backfill_gene_set_fingerprints,
+)
+from panels_backend.management.commands.utils import gene_set_fingerprint
+
+
+class TestBackfillGeneSetFingerprints(TestCase):
+    def setUp(self) -> None:
+        self.hgnc_panel = Panel.objects.create(
+            panel_name="HGNC:1&HGNC:2",
+            panel_source="test directory",
+            test_directory=True,
+        )
+
+        self.fingerprinted_panel = Panel.objects.create(
+            panel_name="HGNC:3",
+            panel_source="test directory",
+            test_directory=True,
+            gene_set_fingerprint="existing",
+        )
+
+        self.panelapp_panel = Panel.objects.create(
+            panel_name="HGNC:4",
+            panel_source="PanelApp",
+            test_directory=False,
+        )
+
+    def test_only_unfingerprinted_hgnc_panels_are_updated(self):
+        """
+        CASE: A test directory HGNC panel without a fingerprint, one which
+        already has a fingerprint, and a PanelApp panel
+        EXPECT: Only the first panel is given a fingerprint, made from the
+        HGNC IDs in its name
+        """
+        updated = backfill_gene_set_fingerprints()
+
+        assert updated == 1
+
+        for panel in (
+            self.hgnc_panel,
+            self.fingerprinted_panel,
+            self.panelapp_panel,
+        ):
+            panel.refresh_from_db()
+
+        assert self.hgnc_panel.gene_set_fingerprint == gene_set_fingerprint(
+            ["HGNC:2", "HGNC:1"]
+        )
+        assert self.fingerprinted_panel.gene_set_fingerprint == "existing"
+        assert self.panelapp_panel.gene_set_fingerprint is None
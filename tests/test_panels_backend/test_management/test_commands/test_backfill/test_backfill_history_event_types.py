@@ -0,0 +1,48 @@
+from django.test import TestCase
+
+from panels_backend.models import (
+    ClinicalIndication,
+    ClinicalIndicationPanel,
+    ClinicalIndicationPanelHistory,
+    HistoryEvent,
+    Panel,
+)
+from panels_backend.management.commands.backfill import (
+    backfill_history_event_types,
+)
+from panels_backend.management.commands.history import History
+
+
+class TestBackfillHistoryEventTypes(TestCase):
+    def setUp(self) -> None:
+        ci = ClinicalIndication.objects.create(
+            r_code="R1", name="CI", test_method="wgs"
+        )
+        panel = Panel.objects.create(panel_name="panel")
+        cip = ClinicalIndicationPanel.objects.create(
+            clinical_indication=ci, panel=panel, current=True
+        )
+
+        self.flagged = ClinicalIndicationPanelHistory.objects.create(
+            clinical_indication_panel=cip,
+            note=History.flag_clinical_indication_panel("reason"),
+        )
+        self.approved = ClinicalIndicationPanelHistory.objects.create(
+            clinical_indication_panel=cip,
+            note=History.clinical_indication_panel_approved(cip.id),
+        )
+        # rows written before event types existed
+        ClinicalIndicationPanelHistory.objects.update(event_type="")
+
+    def test_missing_event_types_are_set(self):
+        """
+        CASE: History rows have no event type
+        EXPECT: Their event type is set from their note, and they're counted
+        """
+        assert backfill_history_event_types() == 2
+
+        self.flagged.refresh_from_db()
+        self.approved.refresh_from_db()
+        assert self.flagged.event_type == HistoryEvent.FLAGGED
+        assert self.approved.event_type == HistoryEvent.APPROVED
+        assert backfill_history_event_types() == 0
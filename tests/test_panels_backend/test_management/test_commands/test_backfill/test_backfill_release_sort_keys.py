@@ -0,0 +1,28 @@
+from django.test import TestCase
+
+from panels_backend.models import TestDirectoryRelease, release_sort_key
+from panels_backend.management.commands.backfill import (
+    backfill_release_sort_keys,
+)
+
+
+class TestBackfillReleaseSortKeys(TestCase):
+    def setUp(self) -> None:
+        self.release = TestDirectoryRelease.objects.create(
+            release="5.1", td_source="td", config_source="config", td_date="1"
+        )
+        # a release made before sort keys existed
+        TestDirectoryRelease.objects.filter(id=self.release.id).update(
+            release_sort_key=None
+        )
+
+    def test_missing_keys_are_set(self):
+        """
+        CASE: A release has no sort key
+        EXPECT: Its sort key is set from its release, and it's counted
+        """
+        assert backfill_release_sort_keys() == 1
+
+        self.release.refresh_from_db()
+        assert self.release.release_sort_key == release_sort_key("5.1")
+        assert backfill_release_sort_keys() == 0
@@ -0,0 +1,100 @@
+from django.test import TestCase
+
+from panels_backend.models import (
+    Confidence,
+    Gene,
+    Panel,
+    PanelGene,
+    PanelGeneHistory,
+)
+from panels_backend.management.commands.backfill import (
+    backfill_shared_panel_genes,
+)
+from panels_backend.management.commands.utils import sortable_version
+
+
+class TestBackfillSharedPanelGenes(TestCase):
+    def setUp(self) -> None:
+        self.genes = [
+            Gene.objects.create(hgnc_id=f"HGNC:{i}", gene_symbol=f"G{i}")
+            for i in range(1, 4)
+        ]
+        self.confidence = Confidence.objects.create(confidence_level="3")
+
+        # three versions, each with its own copy of every link
+        # version 1.1 drops gene 3, version 1.2 adds it back
+        self.panels = []
+        for version, genes in (
+            ("1.0", self.genes),
+            ("1.1", self.genes[:2]),
+            ("1.2", self.genes),
+        ):
+            panel = Panel.objects.create(
+                external_id="1",
+                panel_name="Panel one",
+                panel_source="PanelApp",
+                panel_version=sortable_version(version),
+            )
+            self.panels.append(panel)
+            for gene in genes:
+                panel_gene = PanelGene.objects.create(
+                    panel=panel,
+                    gene=gene,
+                    confidence=self.confidence,
+                    active=True,
+                )
+                PanelGeneHistory.objects.create(
+                    panel_gene=panel_gene, note="Created"
+                )
+
+        self.links_before = {
+            panel.id: set(
+                PanelGene.objects.for_panel(panel).values_list(
+                    "gene_id", flat=True
+                )
+            )
+            for panel in self.panels
+        }
+
+    def test_unchanged_links_are_collapsed(self):
+        """
+        CASE: Three versions of a panel each have their own links
+        EXPECT: Unchanged links are shared, every version still sees the same
+        genes, and no history is lost
+        """
+        before, after = backfill_shared_panel_genes()
+
+        assert (before, after) == (8, 4)
+        assert PanelGeneHistory.objects.count() == 8
+
+        for panel in self.panels:
+            assert (
+                set(
+                    PanelGene.objects.for_panel(panel).values_list(
+                        "gene_id", flat=True
+                    )
+                )
+                == self.links_before[panel.id]
+            )
+
+    def test_backfill_can_be_rerun(self):
+        """
+        CASE: The backfill is run twice
+        EXPECT: The second run doesn't change anything
+        """
+        backfill_shared_panel_genes()
+        state = list(
+            PanelGene.objects.order_by("id").values_list(
+                "id", "shared", "valid_until"
+            )
+        )
+
+        assert backfill_shared_panel_genes() == (4, 4)
+        assert (
+            list(
+                PanelGene.objects.order_by("id").values_list(
+                    "id", "shared", "valid_until"
+                )
+            )
+            == state
+        )
@@ -0,0 +1,74 @@
+from django.test import TestCase
+
+from panels_backend.models import HistoryEvent
+from panels_backend.management.commands.backfill import history_event_type
+
+
+class TestHistoryEventType(TestCase):
+    """
+    Notes written before event types were stored are classified by their
+    wording
+    """
+
+    def test_old_notes(self):
+        """
+        CASE: notes as written before event types were stored
+        EXPECT: each is given the event type it records
+        """
+        cases = [
+            (
+                "Flagged for manual review - new panel",
+                HistoryEvent.FLAGGED,
+            ),
+            (
+                "PanelGene flagged for manual review - confidence level "
+                "dropped to 2",
+                HistoryEvent.FLAGGED,
+            ),
+            (
+                "Panel of similar genes has been created in PanelApp",
+                HistoryEvent.FLAGGED,
+            ),
+            ("Auto-created ci-panel link", HistoryEvent.CREATED),
+            ("PanelGene record created", HistoryEvent.CREATED),
+            ("Created by command line", HistoryEvent.CREATED),
+            (
+                "ClinicalIndicationPanel 1 activated online by review",
+                HistoryEvent.ACTIVATED,
+            ),
+            (
+                "ClinicalIndicationPanel 1 deactivated online by review",
+                HistoryEvent.DEACTIVATED,
+            ),
+            (
+                "ClinicalIndicationPanel 1 reverted from True to False by "
+                "review",
+                HistoryEvent.REVERTED,
+            ),
+            ("PanelGene approved by manual review", HistoryEvent.APPROVED),
+            (
+                "PanelGene metadata pending changed from True to False",
+                HistoryEvent.CHANGED,
+            ),
+            (
+                "Panel-ClinicalIndication linked to a new "
+                "TestDirectoryRelease 5.1",
+                HistoryEvent.TD_LINKED,
+            ),
+            (
+                "Panel has automatically been linked to an existing "
+                "ClinicalIndication - test directory version applied "
+                "automatically",
+                HistoryEvent.TD_LINKED,
+            ),
+            (
+                "Existing ci-panel link set to inactive by admin",
+                HistoryEvent.DEACTIVATED,
+            ),
+            ("something else", HistoryEvent.OTHER),
+            ("", HistoryEvent.OTHER),
+        ]
+
+        for note, event_type in cases:
+            with self.subTest(note=note):
+                self.assertEqual(history_event_type(note), event_type)
@@ -0,0 +1,139 @@
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from panels_backend.models import (
+    GffRelease,
+    Gene,
+    ReferenceGenome,
+    Transcript,
+    TranscriptGffRelease,
+    TranscriptRelease,
+    TranscriptReleaseTranscript,
+    TranscriptSource,
+)
+from panels_backend.management.commands._g2t import g2t_rows
+
+
+class TestG2tRows(TestCase):
+    """
+    g2t rows are built from set-based queries, for a whole reference genome
+    or a single GFF release
+    """
+
+    def setUp(self) -> None:
+        self.genome = ReferenceGenome.objects.create(name="GRCh38")
+        self.other_genome = ReferenceGenome.objects.create(name="GRCh37")
+        self.gff = GffRelease.objects.create(
+            ensembl_release="110", reference_genome=self.genome
+        )
+        self.releases = [
+            TranscriptRelease.objects.create(
+                source=TranscriptSource.objects.create(source=source),
+                release="1.0",
+                reference_genome=self.genome,
+            )
+            for source in ["MANE Select", "MANE Plus Clinical", "HGMD"]
+        ]
+        self.release_ids = [release.id for release in self.releases]
+
+        self.gene_b = Gene.objects.create(hgnc_id="HGNC:2")
+        self.gene_a = Gene.objects.create(hgnc_id="HGNC:1")
+
+        self.tx_b = Transcript.objects.create(
+            transcript="NM_B.1", gene=self.gene_b, reference_genome=self.genome
+        )
+        self.tx_a1 = Transcript.objects.create(
+            transcript="NM_A1.1",
+            gene=self.gene_a,
+            reference_genome=self.genome,
+        )
+        self.tx_a2 = Transcript.objects.create(
+            transcript="NM_A2.1",
+            gene=self.gene_a,
+            reference_genome=self.genome,
+        )
+        Transcript.objects.create(
+            transcript="NM_OTHER.1",
+            gene=self.gene_a,
+            reference_genome=self.other_genome,
+        )
+
+        # clinical in HGMD only
+        TranscriptReleaseTranscript.objects.create(
+            transcript=self.tx_a1,
+            release=self.releases[0],
+            default_clinical=False,
+        )
+        TranscriptReleaseTranscript.objects.create(
+            transcript=self.tx_a1,
+            release=self.releases[2],
+            default_clinical=True,
+        )
+        # not clinical in any release
+        TranscriptReleaseTranscript.objects.create(
+            transcript=self.tx_b,
+            release=self.releases[1],
+            default_clinical=False,
+        )
+
+    def test_whole_genome(self):
+        """
+        CASE: rows are made for the whole reference genome
+        EXPECT: every transcript of the genome, in gene order, clinical if
+        it's default clinical in any of the releases
+        """
+        self.assertEqual(
+            list(g2t_rows(self.genome, self.release_ids)),
+            [
+                ("HGNC:2", "NM_B.1", False),
+                ("HGNC:1", "NM_A1.1", True),
+                ("HGNC:1", "NM_A2.1", False),
+            ],
+        )
+
+    def test_gff_release(self):
+        """
+        CASE: rows are made for a GFF release with 2 of the transcripts
+        EXPECT: only those transcripts, in the order they were linked
+        """
+        TranscriptGffRelease.objects.create(
+            transcript=self.tx_a2, gff_release=self.gff
+        )
+        TranscriptGffRelease.objects.create(
+            transcript=self.tx_a1, gff_release=self.gff
+        )
+
+        self.assertEqual(
+            list(g2t_rows(self.genome, self.release_ids, self.gff)),
+            [("HGNC:1", "NM_A2.1", False), ("HGNC:1", "NM_A1.1", True)],
+        )
+
+    def test_query_count_does_not_grow(self):
+        """
+        CASE: rows are made for 3 transcripts, then for 30
+        EXPECT: both take the same number of queries
+        """
+        counts = []
+        for extra in [0, 27]:
+            with transaction.atomic():
+                for i in range(extra):
+                    tx = Transcript.objects.create(
+                        transcript=f"NM_X{i}.1",
+                        gene=self.gene_a,
+                        reference_genome=self.genome,
+                    )
+                    TranscriptReleaseTranscript.objects.create(
+                        transcript=tx,
+                        release=self.releases[i % 3],
+                        default_clinical=bool(i % 2),
+                    )
+
+                with CaptureQueriesContext(connection) as ctx:
+                    rows = list(g2t_rows(self.genome, self.release_ids))
+
+                self.assertEqual(len(rows), 3 + extra)
+                counts.append(len(ctx.captured_queries))
+                transaction.set_rollback(True)
+
+        self.assertEqual(counts[0], counts[1])
@@ -0,0 +1,62 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.test import TestCase
+
+from panels_backend.management.commands import _g2t
+from panels_backend.management.commands._g2t import (
+    LocalDirectorySink,
+    write_g2t,
+)
+
+
+class TestWriteG2t(TestCase):
+    """
+    g2t rows are streamed into a sink in large chunks
+    """
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.sink = LocalDirectorySink(self.directory.name)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_lines(self):
+        """
+        CASE: 2 rows are written to a local directory
+        EXPECT: a tab-separated file with True/False clinical status
+        """
+        count = write_g2t(
+            [("HGNC:1", "NM_1.1", True), ("HGNC:2", "NM_2.1", False)],
+            self.sink,
+            "g2t.tsv",
+        )
+
+        self.assertEqual(count, 2)
+        with open(os.path.join(self.directory.name, "g2t.tsv")) as f:
+            self.assertEqual(
+                f.read(), "HGNC:1\tNM_1.1\tTrue\nHGNC:2\tNM_2.1\tFalse\n"
+            )
+
+    def test_chunked_writes(self):
+        """
+        CASE: 25 rows are written, with 10 rows per write
+        EXPECT: 3 writes to the file, and every row is written once
+        """
+        rows = ((f"HGNC:{i}", f"NM_{i}.1", False) for i in range(25))
+        file = mock.MagicMock()
+        sink = mock.MagicMock()
+        sink.open.return_value.__enter__.return_value = file
+
+        with mock.patch.object(_g2t, "G2T_WRITE_ROWS", 10):
+            count = write_g2t(rows, sink, "g2t.tsv")
+
+        self.assertEqual(count, 25)
+        sink.open.assert_called_once_with("g2t.tsv")
+        self.assertEqual(file.write.call_count, 3)
+        self.assertEqual(
+            "".join(call.args[0] for call in file.write.call_args_list),
+            "".join(f"HGNC:{i}\tNM_{i}.1\tFalse\n" for i in range(25)),
+        )
@@ -0,0 +1,172 @@
+from django.test import TestCase
+
+from panels_backend.models import (
+    ClinicalIndication,
+    ClinicalIndicationPanel,
+    ClinicalIndicationPanelHistory,
+    ClinicalIndicationTestMethodHistory,
+    HistoryEvent,
+    Panel,
+)
+from panels_backend.management.commands.history import (
+    History,
+    HistoryRecorder,
+    record_history,
+)
+
+
+class TestHistoryNote(TestCase):
+    """
+    Each History helper returns its note along with the kind of event it
+    records
+    """
+
+    def test_helper_event_types(self):
+        """
+        CASE: notes written by the History helpers
+        EXPECT: each carries the event type it records, and reads as its
+        note text
+        """
+        cases = [
+            (
+                History.flag_clinical_indication_panel("new panel"),
+                HistoryEvent.FLAGGED,
+            ),
+            (
+                History.panel_gene_flagged_due_to_confidence("2"),
+                HistoryEvent.FLAGGED,
+            ),
+            (
+                History.similar_panel_created_in_panelapp(),
+                HistoryEvent.FLAGGED,
+            ),
+            (
+                History.auto_created_clinical_indication_panel(),
+                HistoryEvent.CREATED,
+            ),
+            (History.panel_gene_created(), HistoryEvent.CREATED),
+            (
+                History.clinical_indication_panel_created_by_command_line(),
+                HistoryEvent.CREATED,
+            ),
+            (
+                History.clinical_indication_panel_activated("1", True),
+                HistoryEvent.ACTIVATED,
+            ),
+            (
+                History.clinical_indication_panel_set_inactive("admin"),
+                HistoryEvent.DEACTIVATED,
+            ),
+            (
+                History.clinical_indication_panel_reverted(
+                    "1", True, False, True
+                ),
+                HistoryEvent.REVERTED,
+            ),
+            (
+                History.panel_gene_approved("manual review"),
+                HistoryEvent.APPROVED,
+            ),
+            (
+                History.panel_gene_metadata_changed("pending", True, False),
+                HistoryEvent.CHANGED,
+            ),
+            (History.panel_ci_autolink(), HistoryEvent.TD_LINKED),
+            (History.td_panel_ci_autolink("5.1"), HistoryEvent.TD_LINKED),
+        ]
+
+        for note, event_type in cases:
+            with self.subTest(note=note):
+                self.assertEqual(note.event_type, event_type)
+
+        self.assertEqual(
+            History.similar_panel_created_in_panelapp(),
+            "Panel of similar genes has been created in PanelApp",
+        )
+
+
+class TestRecordHistoryEventType(TestCase):
+    """
+    record_history sets the event type of rows in tables which have one
+    """
+
+    def setUp(self) -> None:
+        self.ci = ClinicalIndication.objects.create(
+            r_code="R1", name="CI", test_method="wgs"
+        )
+        panel = Panel.objects.create(panel_name="panel")
+        self.cip = ClinicalIndicationPanel.objects.create(
+            clinical_indication=self.ci, panel=panel, current=True
+        )
+
+    def test_written_now_and_buffered(self):
+        """
+        CASE: history rows are recorded directly and inside a
+        HistoryRecorder block
+        EXPECT: both have the event type of their note
+        """
+        record_history(
+            ClinicalIndicationPanelHistory,
+            clinical_indication_panel=self.cip,
+            note=History.similar_panel_created_in_panelapp(),
+        )
+        with HistoryRecorder():
+            record_history(
+                ClinicalIndicationPanelHistory,
+                clinical_indication_panel=self.cip,
+                note=History.clinical_indication_panel_approved(self.cip.id),
+            )
+
+        self.assertEqual(
+            list(
+                ClinicalIndicationPanelHistory.objects.order_by(
+                    "id"
+                ).values_list("event_type", flat=True)
+            ),
+            [HistoryEvent.FLAGGED, HistoryEvent.APPROVED],
+        )
+
+    def test_plain_note_and_explicit_event_type(self):
+        """
+        CASE: a row is recorded with a plain string note, and another with
+        its event type given
+        EXPECT: the plain note is OTHER, and the given event type is kept
+        """
+        record_history(
+            ClinicalIndicationPanelHistory,
+            clinical_indication_panel=self.cip,
+            note="something else",
+        )
+        record_history(
+            ClinicalIndicationPanelHistory,
+            clinical_indication_panel=self.cip,
+            note=History.panel_gene_created(),
+            event_type=HistoryEvent.CHANGED,
+        )
+
+        self.assertEqual(
+            list(
+                ClinicalIndicationPanelHistory.objects.order_by(
+                    "id"
+                ).values_list("event_type", flat=True)
+            ),
+            [HistoryEvent.OTHER, HistoryEvent.CHANGED],
+        )
+
+    def test_table_without_event_type(self):
+        """
+        CASE: a row is recorded in a history table with no event type
+        column
+        EXPECT: it's written without one
+        """
+        record_history(
+            ClinicalIndicationTestMethodHistory,
+            clinical_indication=self.ci,
+            note=History.clinical_indication_metadata_changed(
+                "test_method", "wgs", "wes"
+            ),
+        )
+
+        self.assertEqual(
+            ClinicalIndicationTestMethodHistory.objects.count(), 1
+        )
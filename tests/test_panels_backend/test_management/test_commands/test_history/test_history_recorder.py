@@ -0,0 +1,131 @@
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from panels_backend.models import (
+    ClinicalIndication,
+    ClinicalIndicationTestMethodHistory,
+    Gene,
+    HgncRelease,
+    GeneHgncRelease,
+    GeneHgncReleaseHistory,
+)
+from panels_backend.management.commands.history import (
+    HistoryRecorder,
+    record_history,
+)
+
+
+class TestHistoryRecorder(TestCase):
+    """
+    History rows written inside a HistoryRecorder block are buffered, and
+    written with one query per history table when the block exits
+    """
+
+    def setUp(self) -> None:
+        self.cis = [
+            ClinicalIndication.objects.create(
+                r_code=f"R{ci}", name=f"CI {ci}", test_method="wgs"
+            )
+            for ci in range(20)
+        ]
+
+    def _record(self, cis: list[ClinicalIndication]) -> None:
+        for ci in cis:
+            record_history(
+                ClinicalIndicationTestMethodHistory,
+                clinical_indication=ci,
+                note="test method changed",
+                user=None,
+            )
+
+    def test_rows_buffered_until_exit(self):
+        """
+        CASE: history is recorded inside a HistoryRecorder block
+        EXPECT: nothing is written until the block exits, then every row is
+        """
+        with HistoryRecorder():
+            self._record(self.cis)
+            self.assertFalse(
+                ClinicalIndicationTestMethodHistory.objects.exists()
+            )
+
+        self.assertEqual(
+            ClinicalIndicationTestMethodHistory.objects.count(), 20
+        )
+
+    def test_query_count_does_not_grow_with_rows(self):
+        """
+        CASE: 2 rows and then 20 rows are recorded in a HistoryRecorder block
+        EXPECT: both take the same number of queries
+        """
+        counts = []
+        for cis in (self.cis[:2], self.cis):
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as ctx:
+                    with HistoryRecorder():
+                        self._record(cis)
+                counts.append(len(ctx.captured_queries))
+                transaction.set_rollback(True)
+
+        self.assertEqual(counts[0], counts[1])
+
+    def test_one_query_per_history_table(self):
+        """
+        CASE: rows for two different history tables are recorded
+        EXPECT: one INSERT per table when the block exits
+        """
+        release = HgncRelease.objects.create(release="1.0")
+        gene = Gene.objects.create(hgnc_id="HGNC:1", gene_symbol="A1BG")
+        gene_release = GeneHgncRelease.objects.create(
+            gene=gene, hgnc_release=release
+        )
+
+        with CaptureQueriesContext(connection) as ctx:
+            with HistoryRecorder():
+                self._record(self.cis)
+                record_history(
+                    GeneHgncReleaseHistory,
+                    gene_hgnc_release=gene_release,
+                    note="present",
+                    user=None,
+                )
+
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertEqual(
+            GeneHgncReleaseHistory.objects.filter(
+                gene_hgnc_release=gene_release
+            ).count(),
+            1,
+        )
+
+    def test_rows_discarded_on_error(self):
+        """
+        CASE: the HistoryRecorder block raises an error
+        EXPECT: the buffered rows aren't written, and later history is
+        written straight away again
+        """
+        with self.assertRaises(ValueError):
+            with HistoryRecorder():
+                self._record(self.cis)
+                raise ValueError("import failed")
+
+        self.assertFalse(ClinicalIndicationTestMethodHistory.objects.exists())
+
+        self._record(self.cis[:1])
+        self.assertEqual(
+            ClinicalIndicationTestMethodHistory.objects.count(), 1
+        )
+
+    def test_rows_written_immediately_without_recorder(self):
+        """
+        CASE: history is recorded outside a HistoryRecorder block
+        EXPECT: each row is written straight away
+        """
+        with CaptureQueriesContext(connection) as ctx:
+            self._record(self.cis[:3])
+
+        self.assertEqual(len(ctx.captured_queries), 3)
+        self.assertEqual(
+            ClinicalIndicationTestMethodHistory.objects.count(), 3
+        )
@@ -0,0 +1,109 @@
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from panels_backend.models import (
+    ClinicalIndication,
+    ClinicalIndicationPanel,
+    ClinicalIndicationPanelHistory,
+    CiPanelTdRelease,
+    CiPanelTdReleaseHistory,
+    CiSuperpanelTdRelease,
+    Panel,
+    SuperPanel,
+)
+from panels_backend.management.commands._insert_ci import (
+    insert_test_directory_data,
+)
+
+
+class TestInsertTestDirectoryDataQueryCount(TestCase):
+    """
+    The clinical indications, panels and links a test directory refers to
+    are preloaded, and changes are written in bulk, so the number of queries
+    used to import a test directory shouldn't depend on its size
+    """
+
+    def setUp(self) -> None:
+        for pa_id in range(40):
+            Panel.objects.create(
+                external_id=str(pa_id),
+                panel_name=f"Panel {pa_id}",
+                panel_version="00001.00000",
+            )
+            Panel.objects.create(
+                external_id=str(pa_id),
+                panel_name=f"Panel {pa_id}",
+                panel_version="00002.00000",
+            )
+        SuperPanel.objects.create(external_id="1", panel_name="Superpanel 1")
+
+    def _make_td(self, size: int, test_method: str) -> dict:
+        """
+        Make a test directory of indications, each linked to two panels
+        """
+        return {
+            "td_source": "td_source",
+            "config_source": "config_source",
+            "date": "date",
+            "indications": [
+                {
+                    "code": f"R{ci}",
+                    "name": f"Indication {ci}",
+                    "test_method": test_method,
+                    "panels": [str(ci), str(ci + 1)],
+                }
+                for ci in range(size)
+            ],
+        }
+
+    def _count_queries(self, td: dict, release: str) -> int:
+        """
+        Count the queries used to import a test directory, then roll the
+        import back
+        """
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                insert_test_directory_data(td, release)
+            transaction.set_rollback(True)
+        return len(queries)
+
+    def test_new_indication_queries_dont_grow(self):
+        """
+        CASE: Test directories with 3 and 30 new indications are imported
+        EXPECT: Both use the same number of queries
+        """
+        small = self._count_queries(self._make_td(3, "wgs"), "1")
+        large = self._count_queries(self._make_td(30, "wgs"), "1")
+        assert small == large, (small, large)
+
+    def test_changed_indication_queries_dont_grow(self):
+        """
+        CASE: Test directories with 3 and 30 indications are imported, where
+        the indications and links exist, but the test methods have changed
+        EXPECT: Both use the same number of queries
+        """
+        insert_test_directory_data(self._make_td(3, "wgs"), "1")
+        small = self._count_queries(self._make_td(3, "panel"), "2")
+
+        insert_test_directory_data(self._make_td(30, "wgs"), "1", force=True)
+        large = self._count_queries(self._make_td(30, "panel"), "2")
+        assert small == large, (small, large)
+
+    def test_links_are_made_to_the_latest_panels(self):
+        """
+        CASE: A test directory is imported
+        EXPECT: Each indication is linked to the latest version of its panels,
+        once, with history and a link to the release. Superpanels with the
+        same PanelApp ID are linked too.
+        """
+        insert_test_directory_data(self._make_td(30, "wgs"), "1")
+
+        links = ClinicalIndicationPanel.objects.all()
+        assert ClinicalIndication.objects.count() == 30
+        assert links.count() == 60
+        assert not links.exclude(panel__panel_version="00002.00000").exists()
+        assert ClinicalIndicationPanelHistory.objects.count() == 60
+        assert CiPanelTdRelease.objects.count() == 60
+        assert CiPanelTdReleaseHistory.objects.count() == 60
+        assert CiSuperpanelTdRelease.objects.count() == 2
@@ -1,37 +1,116 @@
 """
-This file test the function `_make_panels_from_hgncs` in the file `panels_backend/management/commands/_insert_ci.py`
+This file tests the function `_make_panels_from_hgnc_lists` in the file `panels_backend/management/commands/_insert_ci.py`
 
 Tested scenario:
+- making panels for many clinical indications in one pass, with bulk queries
 - core function of making panels from a list of hgncs and linking it to a clinical indication
 - scenario where a new list of hgncs is given to an existing clinical indication (that is already in the db)
+- panel-gene justification updated when a new test directory has the same hgncs
 """
 
-from django.test import TestCase
 from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from panels_backend.models import (
     ClinicalIndication,
-    Panel,
     ClinicalIndicationPanel,
+    ClinicalIndicationPanelHistory,
+    CiPanelTdRelease,
     Gene,
+    Panel,
     PanelGene,
     PanelGeneHistory,
-    ClinicalIndicationPanelHistory,
     TestDirectoryRelease,
-    CiPanelTdRelease,
 )
 from panels_backend.management.commands._insert_ci import (
-    _make_panels_from_hgncs,
+    _make_panels_from_hgnc_lists,
 )
+from panels_backend.management.commands.history import History
+from panels_backend.management.commands.utils import gene_set_fingerprint
 from tests.test_panels_backend.test_management.test_commands.test_insert_panel.test_insert_gene import (
     len_check_wrapper,
     value_check_wrapper,
 )
 
 
+class TestMakePanelsFromHgncLists(TestCase):
+    """
+    HGNC-only panels for every clinical indication in a test directory are
+    made in one pass, with bulk queries
+    """
+
+    def setUp(self) -> None:
+        self.td_release = TestDirectoryRelease.objects.create(
+            release="3.0",
+            td_source="td_source",
+            config_source="config_source",
+            td_date="date",
+        )
+        self.cis = [
+            ClinicalIndication.objects.create(
+                r_code=f"R{ci}", name=f"CI {ci}", test_method="wgs"
+            )
+            for ci in range(20)
+        ]
+
+    def _hgnc_lists(self, size: int) -> list:
+        """
+        Give each clinical indication its own list of 5 HGNC IDs, with the
+        last two indications sharing a list
+        """
+        hgnc_lists = [
+            (ci, [f"HGNC:{ci.id}{gene}" for gene in range(5)])
+            for ci in self.cis[: size - 1]
+        ]
+        hgnc_lists.append((self.cis[size - 1], hgnc_lists[-1][1]))
+        return hgnc_lists
+
+    def _count_queries(self, hgnc_lists: list) -> int:
+        """
+        Count the queries used to make the panels, then roll back
+        """
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                _make_panels_from_hgnc_lists(hgnc_lists, self.td_release)
+            transaction.set_rollback(True)
+        return len(queries)
+
+    def test_query_count_does_not_grow(self):
+        """
+        CASE: Panels are made for 3 and for 20 clinical indications
+        EXPECT: Both use the same number of queries
+        """
+        small = self._count_queries(self._hgnc_lists(3))
+        large = self._count_queries(self._hgnc_lists(20))
+
+        assert small == large, (small, large)
+
+    def test_panels_genes_and_links_are_made(self):
+        """
+        CASE: Panels are made for 20 clinical indications, two of which share
+        a list of HGNC IDs
+        EXPECT: One panel per distinct list, each gene and panel-gene made
+        once with history, and every indication linked to its panel and the
+        test directory release
+        """
+        _make_panels_from_hgnc_lists(self._hgnc_lists(20), self.td_release)
+
+        assert Panel.objects.filter(test_directory=True).count() == 19
+        assert Gene.objects.count() == 19 * 5
+        assert PanelGene.objects.count() == 19 * 5
+        assert PanelGeneHistory.objects.count() == 19 * 5
+        assert ClinicalIndicationPanel.objects.filter(
+            current=True, pending=False
+        ).count() == len(self.cis)
+        assert CiPanelTdRelease.objects.count() == len(self.cis)
+
+
 class TestMakePanelsFromHgncs(TestCase):
     """
-    The core function is to make panels from a list of hgncs.
+    The core function is to make panels from a clinical indication's list
+    of hgncs.
     example: if a clinical indication has hgnc:1 and hgnc2 in its panel list
     this function will create a panel named "hgnc:1,hgnc:2" and link it to the clinical indication
 
@@ -65,10 +144,9 @@ class TestMakePanelsFromHgncs(TestCase):
         """
         errors = []
 
-        _make_panels_from_hgncs(
-            self.first_clinical_indication,
+        _make_panels_from_hgnc_lists(
+            [(self.first_clinical_indication, ["HGNC:1", "HGNC:2"])],
             self.td_version,
-            ["HGNC:1", "HGNC:2"],
             self.user,
         )
 
@@ -81,6 +159,12 @@ class TestMakePanelsFromHgncs(TestCase):
             "HGNC:1&HGNC:2",
         )  # panel name should be the list of hgncs joined by an ampersand
 
+        errors += value_check_wrapper(
+            panels[0].gene_set_fingerprint,
+            "panel gene set fingerprint",
+            gene_set_fingerprint(["HGNC:1", "HGNC:2"]),
+        )  # fingerprint is used to match PanelApp panels with the same genes
+
         errors += value_check_wrapper(
             panels[0].test_directory,
             "panel test directory",
@@ -180,10 +264,9 @@ class TestMakePanelsFromHgncs(TestCase):
             pending=False,
         )  # we make a mock link in the database with td version 6.1
 
-        _make_panels_from_hgncs(
-            self.first_clinical_indication,
+        _make_panels_from_hgnc_lists(
+            [(self.first_clinical_indication, ["HGNC:1", "HGNC:2", "HGNC:3"])],
             self.td_version,
-            ["HGNC:1", "HGNC:2", "HGNC:3"],
             self.user,
         )
 
@@ -226,3 +309,81 @@ class TestMakePanelsFromHgncs(TestCase):
     # the clinical indication will be linked to it (and both old and new will be flagged for review)
     # this is different from the panel-gene interaction where panel get their genes from PanelApp API
     # thus there's a need to monitor the changes in panel-gene relationship
+
+
+class TestMakePanelsFromHgncListsJustification(TestCase):
+    """
+    A test directory panel-gene link which is already in the db takes the
+    newest test directory as its justification
+    """
+
+    def setUp(self) -> None:
+        self.ci = ClinicalIndication.objects.create(
+            r_code="R123", name="Test CI", test_method="wgs"
+        )
+        self.old_td_release = TestDirectoryRelease.objects.create(
+            release="5",
+            td_source="National-genomic-test-directory-for-rare-and-"
+            "inherited-disease-version-5.xlsx",
+            config_source="230401_RD",
+            td_date="230616",
+        )
+        self.new_td_release = TestDirectoryRelease.objects.create(
+            release="6",
+            td_source="National-genomic-test-directory-for-rare-and-"
+            "inherited-disease-version-6.xlsx",
+            config_source="test",
+            td_date="test",
+        )
+        self.old_td_source = (
+            "National-genomic-test-directory-for-rare-and-inherited-disease-"
+            "version-5.xlsx + 230401_RD + 230616"
+        )
+        self.new_td_source = (
+            "National-genomic-test-directory-for-rare-and-inherited-disease-"
+            "version-6.xlsx + test + test"
+        )
+
+        _make_panels_from_hgnc_lists(
+            [(self.ci, ["HGNC:1049"])], self.old_td_release
+        )
+        PanelGeneHistory.objects.all().delete()
+
+    def test_pg_justification_is_unchanged(self):
+        """
+        CASE: A PanelGene which is in the test directory already exists in
+        the db from the same test directory source
+        EXPECT: No change is made and no history is logged.
+        """
+        _make_panels_from_hgnc_lists(
+            [(self.ci, ["HGNC:1049"])], self.old_td_release
+        )
+
+        assert list(
+            PanelGene.objects.values_list("justification", flat=True)
+        ) == [self.old_td_source]
+        assert not PanelGeneHistory.objects.exists()
+
+    def test_pg_justification_is_changed(self):
+        """
+        CASE: A db is seeded with a new version of a test directory.
+        A PanelGene which already exists in the db, persists in the new
+        TD JSON.
+        EXPECT: The justification is updated to the new TD JSON,
+        and the history is logged.
+        """
+        _make_panels_from_hgnc_lists(
+            [(self.ci, ["HGNC:1049"])], self.new_td_release
+        )
+
+        assert list(
+            PanelGene.objects.values_list("justification", flat=True)
+        ) == [self.new_td_source]
+
+        pg_history = PanelGeneHistory.objects.all()
+        assert len(pg_history) == 1
+        assert pg_history[0].note == History.panel_gene_metadata_changed(
+            "justification",
+            self.old_td_source,
+            self.new_td_source,
+        )
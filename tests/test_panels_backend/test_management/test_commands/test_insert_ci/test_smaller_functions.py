@@ -3,12 +3,12 @@ This file contains tests for the smaller functions in the insert_ci command.
 - _backward_deactivate
 - flag_clinical_indication_panel_for_review
 - provisionally_link_clinical_indication_to_panel
-- _retrieve_panel_from_pa_id
 - _retrieve_unknown_metadata_records
-- _make_provisional_test_method_change
 """
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
 
 from panels_backend.models import (
@@ -19,7 +19,6 @@ from panels_backend.models import (
     ClinicalIndicationSuperPanel,
     ClinicalIndicationPanelHistory,
     ClinicalIndicationSuperPanelHistory,
-    ClinicalIndicationTestMethodHistory,
     TestDirectoryRelease,
 )
 from panels_backend.management.commands.utils import sortable_version
@@ -29,8 +28,6 @@ from panels_backend.management.commands._insert_ci import (
     flag_clinical_indication_superpanel_for_review,
     provisionally_link_clinical_indication_to_panel,
     provisionally_link_clinical_indication_to_superpanel,
-    _retrieve_panel_from_pa_id,
-    _make_provisional_test_method_change,
 )
 
 
@@ -109,6 +106,58 @@ class TestBackwardDeactivation(TestCase):
             self.first_clinical_indication_panel.current is True
         )  # link should still be active
 
+    def test_superpanel_links_are_flagged(self):
+        """
+        CASE: R123 is linked to a superpanel, and isn't in the latest test
+        directory
+        EXPECT: The CI-superpanel link is flagged with a history record too,
+        and the number of flagged links of each type is returned
+        """
+        superpanel = SuperPanel.objects.create(
+            external_id="456", panel_name="Test superpanel"
+        )
+        ci_superpanel = ClinicalIndicationSuperPanel.objects.create(
+            clinical_indication=self.first_clinical_indication,
+            superpanel=superpanel,
+            current=True,
+        )
+
+        assert _backward_deactivate([], self.user) == (1, 1)
+
+        ci_superpanel.refresh_from_db()
+        assert ci_superpanel.pending is True
+        assert ci_superpanel.current is False
+        assert (
+            ClinicalIndicationSuperPanelHistory.objects.get().user.username
+            == "test"
+        )
+
+    def test_query_count_does_not_grow_with_clinical_indications(self):
+        """
+        CASE: Many clinical indications are missing from the test directory
+        EXPECT: They're all flagged with the same number of queries as one
+        """
+        with CaptureQueriesContext(connection) as queries:
+            _backward_deactivate([], self.user)
+        one = len(queries)
+
+        for r_code in range(50):
+            ci = ClinicalIndication.objects.create(
+                r_code=f"R{r_code}", name="Test CI", test_method="Test method"
+            )
+            ClinicalIndicationPanel.objects.create(
+                clinical_indication=ci, panel=self.first_panel, current=True
+            )
+
+        with CaptureQueriesContext(connection) as queries:
+            flagged, _ = _backward_deactivate([], self.user)
+
+        assert flagged == 51
+        assert len(queries) == one
+        assert not ClinicalIndicationPanel.objects.filter(
+            current=True
+        ).exists()
+
 
 class TestFlagClinicalIndicationPanelForReview(TestCase):
     """
@@ -409,82 +458,3 @@ class TestProvisionallyLinkClinicalIndicationToSuperPanel(TestCase):
             releases = TestDirectoryRelease.objects.all()
             assert len(releases) == 1
             assert releases[0].release == "5.0"
-
-
-class TestRetrievePanelFromPanelID(TestCase):
-    """
-    `_retrieve_panel_from_pa_id` will retrieve a panel from db based on given panel id
-    panel id is the external id of a panel
-
-    if there are multiple panel with the same external id, the latest version will be retrieved
-    """
-
-    def setUp(self) -> None:
-        self.first_panel = Panel.objects.create(
-            external_id=123,
-            panel_name="Test panel",
-            panel_version=sortable_version("1.15"),
-        )
-
-        self.second_panel = Panel.objects.create(
-            external_id=123,
-            panel_name="Test panel",
-            panel_version=sortable_version(
-                "1.19"
-            ),  # notice the version number
-        )
-
-    def test_that_latest_panel_version_will_be_retrieved(self):
-        """
-        Case: Trying to fetch the latest version for a panel which exists in 2 versions
-        Expect: The panel with the most-recent version number to be returned
-        """
-        panel = _retrieve_panel_from_pa_id(123)
-
-        assert panel.panel_version == sortable_version("1.19")
-
-    def test_that_it_will_return_none_if_panel_id_does_not_exist(self):
-        """
-        Case: Trying to fetch the latest version for a panel which is not in the database
-        Expect: Function returns None
-        """
-        panel = _retrieve_panel_from_pa_id(999)
-
-        assert panel is None
-
-
-class TestMakeProvisionalTestMethodChange(TestCase):
-    def setUp(self) -> None:
-        self.first_clinical_indication = ClinicalIndication.objects.create(
-            r_code="R123", name="Test CI", test_method="Test method"
-        )
-        self.user = User.objects.create_user(username="test", is_staff=True)
-
-    def test_if_clinical_indication_is_flagged(self):
-        """
-        this function is called when a clinical indication's test method changed
-        it will make a record in ClinicalIndicationTestMethodHistory model, flag the clinical indication for review
-        and update the test method of the clinical indication
-        """
-
-        _make_provisional_test_method_change(
-            self.first_clinical_indication, "Test method 2", self.user
-        )
-
-        self.first_clinical_indication.refresh_from_db()
-
-        assert (
-            self.first_clinical_indication.test_method == "Test method 2"
-        )  # test method updated for clinical indication
-        assert (
-            self.first_clinical_indication.pending is True
-        )  # flagged for review
-
-        assert (
-            ClinicalIndicationTestMethodHistory.objects.count() == 1
-        )  # one history
-
-        assert (
-            ClinicalIndicationTestMethodHistory.objects.all()[0].user.username
-            == self.user.username
-        )
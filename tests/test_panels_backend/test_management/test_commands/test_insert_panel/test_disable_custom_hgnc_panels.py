@@ -10,6 +10,7 @@ from panels_backend.models import (
 from panels_backend.management.commands._insert_panel import (
     _disable_custom_hgnc_panels,
 )
+from panels_backend.management.commands.utils import gene_set_fingerprint
 
 
 class TestDisableCustomPanels_NoMatchingHgncPanel(TestCase):
@@ -68,6 +69,7 @@ class TestDisableCustomPanels_DeactivateMatchingHgncPanel(TestCase):
             panel_source="test directory",
             panel_version=None,
             test_directory=True,
+            gene_set_fingerprint=gene_set_fingerprint(["HGNC:2000"]),
             custom=False,
             pending=False,
         )
@@ -0,0 +1,153 @@
+import collections
+from django.test import TestCase
+from unittest import mock
+
+from panels_backend.models import Panel
+from panels_backend.management.commands.panelapp import PanelClass
+from panels_backend.management.commands._insert_panel import (
+    _get_panel_content_hash,
+    _insert_panel_data_into_db,
+)
+
+
+def _make_gene(hgnc_id: str, confidence_level: str, moi: str | None) -> dict:
+    """
+    Make a gene entry as returned by the PanelApp API
+    """
+    return {
+        "gene_data": {
+            "hgnc_id": hgnc_id,
+            "gene_name": hgnc_id,
+            "gene_symbol": hgnc_id,
+            "alias": [],
+        },
+        "confidence_level": confidence_level,
+        "mode_of_inheritance": moi,
+        "mode_of_pathogenicity": None,
+        "penetrance": None,
+    }
+
+
+class TestGetPanelContentHash(TestCase):
+    def test_gene_order_does_not_change_hash(self):
+        """
+        CASE: The same genes are listed in a different order
+        EXPECT: The hashes match
+        """
+        genes = [
+            _make_gene("HGNC:1", "3", "AD"),
+            _make_gene("HGNC:2", "3", None),
+        ]
+
+        assert _get_panel_content_hash(
+            PanelClass(genes=genes)
+        ) == _get_panel_content_hash(PanelClass(genes=genes[::-1]))
+
+    def test_blank_and_null_fields_hash_the_same(self):
+        """
+        CASE: A gene's MOI is blank in one payload and null in the other
+        EXPECT: The hashes match, as both are stored as null
+        """
+        assert _get_panel_content_hash(
+            PanelClass(genes=[_make_gene("HGNC:1", "3", "  ")])
+        ) == _get_panel_content_hash(
+            PanelClass(genes=[_make_gene("HGNC:1", "3", None)])
+        )
+
+    def test_stored_gene_fields_change_hash(self):
+        """
+        CASE: A gene's confidence or MOI changes, or a gene is added
+        EXPECT: The hash changes
+        """
+        original = _get_panel_content_hash(
+            PanelClass(genes=[_make_gene("HGNC:1", "3", "AD")])
+        )
+
+        for genes in [
+            [_make_gene("HGNC:1", "2", "AD")],
+            [_make_gene("HGNC:1", "3", "AR")],
+            [
+                _make_gene("HGNC:1", "3", "AD"),
+                _make_gene("HGNC:2", "3", "AD"),
+            ],
+        ]:
+            assert _get_panel_content_hash(PanelClass(genes=genes)) != original
+
+
+class TestInsertPanelDataSkipsUnchangedPanels(TestCase):
+    def setUp(self) -> None:
+        self.genes = [_make_gene("HGNC:1", "3", "AD")]
+        _insert_panel_data_into_db(
+            PanelClass(
+                id="1",
+                name="Panel",
+                version="1.0",
+                panel_source="PanelApp",
+                genes=self.genes,
+            )
+        )
+
+    @mock.patch(
+        "panels_backend.management.commands._insert_panel._disable_custom_hgnc_panels"
+    )
+    @mock.patch(
+        "panels_backend.management.commands._insert_panel._insert_gene"
+    )
+    def test_unchanged_panel_is_skipped(
+        self, mock_insert_gene, mock_disable_custom
+    ):
+        """
+        CASE: The same panel version is seeded again with the same genes
+        EXPECT: Gene insertion and the custom panel check are skipped, and the
+        panel is counted as skipped
+        """
+        summary = collections.Counter()
+
+        _, created = _insert_panel_data_into_db(
+            PanelClass(
+                id="1",
+                name="Panel",
+                version="1.0",
+                panel_source="PanelApp",
+                genes=self.genes[::-1],
+            ),
+            summary=summary,
+        )
+
+        assert not created
+        mock_insert_gene.assert_not_called()
+        mock_disable_custom.assert_not_called()
+        assert summary == {"skipped": 1}
+
+    @mock.patch(
+        "panels_backend.management.commands._insert_panel._disable_custom_hgnc_panels"
+    )
+    @mock.patch(
+        "panels_backend.management.commands._insert_panel._insert_gene"
+    )
+    def test_changed_panel_is_processed(
+        self, mock_insert_gene, mock_disable_custom
+    ):
+        """
+        CASE: The same panel version is seeded again, but a gene's confidence
+        has dropped
+        EXPECT: Genes are processed, the stored hash is updated, and the panel
+        is counted as changed
+        """
+        summary = collections.Counter()
+        changed_panel = PanelClass(
+            id="1",
+            name="Panel",
+            version="1.0",
+            panel_source="PanelApp",
+            genes=[_make_gene("HGNC:1", "2", "AD")],
+        )
+
+        _insert_panel_data_into_db(changed_panel, summary=summary)
+
+        mock_insert_gene.assert_called_once()
+        mock_disable_custom.assert_called_once()
+        assert summary == {"changed": 1}
+        assert Panel.objects.get(
+            external_id="1"
+        ).content_hash == _get_panel_content_hash(changed_panel)
@@ -0,0 +1,108 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from panels_backend.models import PanelGene, PanelGeneHistory
+from panels_backend.management.commands.panelapp import (
+    PanelClass,
+    SuperPanelClass,
+)
+from panels_backend.management.commands._insert_panel import (
+    _insert_panelapp_superpanel,
+)
+
+
+def _make_superpanel(
+    superpanel_id: str, genes_per_child: int, confidence_level: str
+) -> SuperPanelClass:
+    """
+    Make a superpanel with 3 child panels, each with its own genes
+
+    :param: superpanel_id, the id of the superpanel - child panels and genes
+    are given ids based on it
+    :param: genes_per_child, the number of genes in each child panel
+    :param: confidence_level, the confidence level of every gene
+    :return: a SuperPanelClass
+    """
+    superpanel = SuperPanelClass(
+        id=superpanel_id, name=f"Superpanel {superpanel_id}", version="1.0"
+    )
+    superpanel.child_panels = [
+        PanelClass(
+            id=f"{superpanel_id}-{child}",
+            name=f"Child panel {superpanel_id}-{child}",
+            version="1.0",
+            genes=[
+                {
+                    "gene_data": {
+                        "hgnc_id": f"HGNC:{superpanel_id}{child}{gene}",
+                        "gene_name": f"gene {gene}",
+                        "gene_symbol": f"G{superpanel_id}{child}{gene}",
+                        "alias": [],
+                    },
+                    "confidence_level": confidence_level,
+                    "mode_of_inheritance": "AD",
+                    "mode_of_pathogenicity": None,
+                    "penetrance": "complete",
+                }
+                for gene in range(genes_per_child)
+            ],
+        )
+        for child in range(3)
+    ]
+    return superpanel
+
+
+class TestInsertGeneQueryCount(TestCase):
+    """
+    Panel genes are written in bulk, so the number of queries used to insert
+    a superpanel shouldn't depend on how many genes it has
+    """
+
+    def _count_queries(self, superpanel: SuperPanelClass) -> int:
+        with CaptureQueriesContext(connection) as queries:
+            _insert_panelapp_superpanel(superpanel)
+        return len(queries)
+
+    def test_new_superpanel_queries_dont_grow_with_genes(self):
+        """
+        CASE: A superpanel with 15 genes and one with 3000 genes are inserted
+        EXPECT: Both use the same number of queries, and every gene is linked
+        to its panel with a history record
+        """
+        # make the lookup table rows, so neither insert needs to create them
+        self._count_queries(_make_superpanel("1", 1, "3"))
+
+        small = self._count_queries(_make_superpanel("2", 5, "3"))
+        large = self._count_queries(_make_superpanel("3", 1000, "3"))
+
+        assert small == large, (small, large)
+        assert (
+            PanelGene.objects.filter(
+                panel__external_id__startswith="3-", active=True
+            ).count()
+            == 3000
+        )
+        assert (
+            PanelGeneHistory.objects.filter(
+                panel_gene__panel__external_id__startswith="3-"
+            ).count()
+            == 3000
+        )
+
+    def test_flagging_queries_dont_grow_with_genes(self):
+        """
+        CASE: Superpanels of 15 and 3000 genes are inserted, then inserted
+        again with every gene dropped to confidence level 2
+        EXPECT: The second inserts use the same number of queries, and every
+        PanelGene is flagged for review
+        """
+        self._count_queries(_make_superpanel("2", 5, "3"))
+        self._count_queries(_make_superpanel("3", 1000, "3"))
+
+        small = self._count_queries(_make_superpanel("2", 5, "2"))
+        large = self._count_queries(_make_superpanel("3", 1000, "2"))
+
+        assert small == large, (small, large)
+        assert not PanelGene.objects.filter(active=True).exists()
+        assert PanelGene.objects.filter(pending=True).count() == 3015
@@ -0,0 +1,57 @@
+from django.test import TestCase
+
+from panels_backend.models import Panel, SuperPanel, PanelSuperPanel
+from panels_backend.management.commands.panelapp import (
+    PanelClass,
+    SuperPanelClass,
+)
+from panels_backend.management.commands._insert_panel import (
+    panel_stream_insert_controller,
+)
+
+
+class TestPanelStreamInsertController(TestCase):
+    def setUp(self) -> None:
+        self.panel = PanelClass(id="1", name="Panel one", version="1.0")
+
+        self.superpanel = SuperPanelClass(
+            id="100", name="Superpanel", version="2.0"
+        )
+        self.superpanel.child_panels = [
+            PanelClass(id="2", name="Child panel", version="3.0")
+        ]
+
+    def test_panels_and_superpanels_are_inserted_from_stream(self):
+        """
+        CASE: A stream containing one panel and one superpanel with one child
+        EXPECT: Both panels and the superpanel are inserted, with PanelApp as
+        the source, and the superpanel is linked to its child
+        """
+        stream = iter([(self.panel, False), (self.superpanel, True)])
+
+        panel_stream_insert_controller(stream, user=None)
+
+        assert sorted(
+            Panel.objects.values_list("external_id", "panel_source")
+        ) == [("1", "PanelApp"), ("2", "PanelApp")]
+
+        superpanel = SuperPanel.objects.get(external_id="100")
+        assert superpanel.panel_source == "PanelApp"
+        assert PanelSuperPanel.objects.filter(
+            superpanel=superpanel, panel__external_id="2"
+        ).exists()
+
+    def test_stream_error_rolls_back_inserted_panels(self):
+        """
+        CASE: The stream raises an error after the first panel is inserted
+        EXPECT: The error is raised, and nothing is left in the database
+        """
+
+        def _failing_stream():
+            yield self.panel, False
+            raise ValueError("PanelApp is down")
+
+        with self.assertRaisesRegex(ValueError, "PanelApp is down"):
+            panel_stream_insert_controller(_failing_stream(), user=None)
+
+        assert not Panel.objects.exists()
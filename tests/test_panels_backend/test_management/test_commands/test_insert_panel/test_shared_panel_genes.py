@@ -0,0 +1,205 @@
+from django.test import TestCase
+
+from panels_backend.models import Panel, PanelGene, PanelGeneHistory
+from panels_backend.management.commands.panelapp import PanelClass
+from panels_backend.management.commands._insert_panel import (
+    _insert_panel_data_into_db,
+)
+
+
+def _make_panel(version: str, genes: dict[str, str]) -> PanelClass:
+    """
+    Make a version of PanelApp panel 1
+
+    :param: version, the panel version
+    :param: genes, a dict of HGNC ID to confidence level
+    :return: a PanelClass
+    """
+    panel = PanelClass(
+        id="1",
+        name="Panel one",
+        version=version,
+        genes=[
+            {
+                "gene_data": {
+                    "hgnc_id": hgnc_id,
+                    "gene_name": hgnc_id,
+                    "gene_symbol": hgnc_id.replace("HGNC:", "G"),
+                    "alias": [],
+                },
+                "confidence_level": confidence_level,
+                "mode_of_inheritance": "AD",
+                "mode_of_pathogenicity": None,
+                "penetrance": "complete",
+            }
+            for hgnc_id, confidence_level in genes.items()
+        ],
+    )
+    panel.panel_source = "PanelApp"
+    return panel
+
+
+def _active_hgnc_ids(panel: Panel) -> set[str]:
+    """
+    :param: panel, a Panel version
+    :return: the HGNC IDs of the active links which apply to it
+    """
+    return set(
+        PanelGene.objects.for_panel(panel)
+        .filter(active=True)
+        .values_list("gene__hgnc_id", flat=True)
+    )
+
+
+class TestSharedPanelGenes(TestCase):
+    """
+    Versions of a PanelApp panel share the links of genes which haven't
+    changed between versions
+    """
+
+    def setUp(self) -> None:
+        self.v1, _ = _insert_panel_data_into_db(
+            _make_panel("1.0", {"HGNC:1": "3", "HGNC:2": "3", "HGNC:3": "3"})
+        )
+
+    def test_new_version_only_writes_changed_genes(self):
+        """
+        CASE: A new version removes one gene, adds one, and leaves two as
+        they were
+        EXPECT: Only the added gene gets a new link and history, and each
+        version sees its own genes
+        """
+        links_before = PanelGene.objects.count()
+        history_before = PanelGeneHistory.objects.count()
+
+        v2, _ = _insert_panel_data_into_db(
+            _make_panel("1.1", {"HGNC:1": "3", "HGNC:2": "3", "HGNC:4": "3"})
+        )
+
+        assert PanelGene.objects.count() == links_before + 1
+        assert PanelGeneHistory.objects.count() == history_before + 1
+        assert _active_hgnc_ids(self.v1) == {"HGNC:1", "HGNC:2", "HGNC:3"}
+        assert _active_hgnc_ids(v2) == {"HGNC:1", "HGNC:2", "HGNC:4"}
+
+        removed = PanelGene.objects.get(gene__hgnc_id="HGNC:3")
+        assert removed.shared
+        assert removed.valid_until == v2.panel_version
+
+    def test_version_inserted_out_of_order(self):
+        """
+        CASE: Versions 1.0 and 1.2 share a gene, then 1.1 is inserted without
+        that gene
+        EXPECT: 1.1 doesn't see the gene, but 1.0 and 1.2 still do
+        """
+        v3, _ = _insert_panel_data_into_db(
+            _make_panel("1.2", {"HGNC:1": "3", "HGNC:2": "3", "HGNC:3": "3"})
+        )
+        v2, _ = _insert_panel_data_into_db(
+            _make_panel("1.1", {"HGNC:1": "3", "HGNC:2": "3"})
+        )
+
+        assert _active_hgnc_ids(self.v1) == {"HGNC:1", "HGNC:2", "HGNC:3"}
+        assert _active_hgnc_ids(v2) == {"HGNC:1", "HGNC:2"}
+        assert _active_hgnc_ids(v3) == {"HGNC:1", "HGNC:2", "HGNC:3"}
+
+    def test_for_panels_matches_for_panel(self):
+        """
+        CASE: Links for several versions are fetched together
+        EXPECT: Each version gets the same links as fetching it alone
+        """
+        v2, _ = _insert_panel_data_into_db(
+            _make_panel("1.1", {"HGNC:1": "2", "HGNC:2": "3"})
+        )
+
+        with self.assertNumQueries(1):
+            links = PanelGene.objects.for_panels([self.v1, v2])
+
+        for panel in (self.v1, v2):
+            assert {link.id for link in links[panel.id]} == set(
+                PanelGene.objects.for_panel(panel).values_list("id", flat=True)
+            )
+
+    def test_with_panel_versions(self):
+        """
+        CASE: A gene is shared by three versions, and another gene is
+        dropped in the last
+        EXPECT: Each link lists the versions it applies to, oldest first
+        """
+        v2, _ = _insert_panel_data_into_db(
+            _make_panel("1.1", {"HGNC:1": "3", "HGNC:2": "3", "HGNC:3": "3"})
+        )
+        v3, _ = _insert_panel_data_into_db(
+            _make_panel("1.2", {"HGNC:1": "3", "HGNC:2": "3"})
+        )
+
+        versions = {
+            panel_gene.gene.hgnc_id: [panel.id for panel in panels]
+            for panel_gene, panels in PanelGene.objects.filter(
+                gene__hgnc_id__in=["HGNC:1", "HGNC:3"]
+            ).with_panel_versions()
+        }
+
+        assert versions == {
+            "HGNC:1": [self.v1.id, v2.id, v3.id],
+            "HGNC:3": [self.v1.id, v2.id],
+        }
+
+    def test_split_for_panel(self):
+        """
+        CASE: A link shared by three versions is split for the middle one
+        EXPECT: The middle version gets its own link in a fixed number of
+        queries, and the first and last versions still see a link for the
+        gene
+        """
+        v2, _ = _insert_panel_data_into_db(
+            _make_panel("1.1", {"HGNC:1": "3", "HGNC:2": "3", "HGNC:3": "3"})
+        )
+        v3, _ = _insert_panel_data_into_db(
+            _make_panel("1.2", {"HGNC:1": "3", "HGNC:2": "3", "HGNC:3": "3"})
+        )
+        shared = PanelGene.objects.get(gene__hgnc_id="HGNC:1")
+
+        with self.assertNumQueries(3):
+            own = PanelGene.objects.split_for_panel([shared], v2)[shared.id]
+
+        assert own.id != shared.id
+        assert own.panel_id == v2.id
+        assert not own.shared
+        for panel in (self.v1, v2, v3):
+            assert _active_hgnc_ids(panel) == {"HGNC:1", "HGNC:2", "HGNC:3"}
+        assert (
+            PanelGene.objects.for_panel(v2).get(gene__hgnc_id="HGNC:1").id
+            == own.id
+        )
+        assert (
+            PanelGene.objects.for_panel(self.v1).get(gene__hgnc_id="HGNC:1").id
+            == shared.id
+        )
+
+        # a link which only applies to the version is left as it is
+        assert PanelGene.objects.split_for_panel([own], v2) == {own.id: own}
+
+    def test_reseeding_a_version_only_flags_that_version(self):
+        """
+        CASE: Three versions share a gene, then the middle version is seeded
+        again with the gene's confidence lowered
+        EXPECT: The gene is pending deactivation for the middle version only
+        """
+        v2, _ = _insert_panel_data_into_db(
+            _make_panel("1.1", {"HGNC:1": "3", "HGNC:2": "3", "HGNC:3": "3"})
+        )
+        v3, _ = _insert_panel_data_into_db(
+            _make_panel("1.2", {"HGNC:1": "3", "HGNC:2": "3", "HGNC:3": "3"})
+        )
+
+        _insert_panel_data_into_db(
+            _make_panel("1.1", {"HGNC:1": "2", "HGNC:2": "3", "HGNC:3": "3"})
+        )
+
+        assert _active_hgnc_ids(v2) == {"HGNC:2", "HGNC:3"}
+        assert _active_hgnc_ids(self.v1) == {"HGNC:1", "HGNC:2", "HGNC:3"}
+        assert _active_hgnc_ids(v3) == {"HGNC:1", "HGNC:2", "HGNC:3"}
+
+        flagged = PanelGene.objects.get(pending=True)
+        assert flagged.panel_id == v2.id
+        assert PanelGeneHistory.objects.filter(panel_gene=flagged).exists()
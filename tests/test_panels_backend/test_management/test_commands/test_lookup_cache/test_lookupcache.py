@@ -0,0 +1,130 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from panels_backend.models import (
+    Confidence,
+    Gene,
+    ModeOfInheritance,
+    PanelGene,
+    Panel,
+)
+from panels_backend.management.commands._lookup_cache import LookupCache
+from panels_backend.management.commands._insert_panel import _insert_gene
+from panels_backend.management.commands.panelapp import PanelClass
+
+
+class TestLookupCache(TestCase):
+    def setUp(self) -> None:
+        self.confidence = Confidence.objects.create(confidence_level="3")
+        self.moi = ModeOfInheritance.objects.create(mode_of_inheritance="AD")
+        self.gene = Gene.objects.create(hgnc_id="HGNC:1", gene_symbol="A")
+
+    def test_table_is_loaded_once(self):
+        """
+        CASE: The same lookup table is used several times
+        EXPECT: The table is loaded in one query, and later lookups are
+        served from memory
+        """
+        cache = LookupCache()
+
+        with self.assertNumQueries(1):
+            assert cache.confidence(3) == self.confidence
+            assert cache.confidence("3") == self.confidence
+
+        with self.assertNumQueries(0):
+            assert cache.confidence(3) == self.confidence
+
+    def test_missing_values_are_created_once(self):
+        """
+        CASE: A value isn't in its lookup table, including a None value
+        EXPECT: It's created on first use, and reused after that
+        """
+        cache = LookupCache()
+
+        moi = cache.mode_of_inheritance("AR")
+        none_moi = cache.mode_of_inheritance(None)
+
+        with self.assertNumQueries(0):
+            assert cache.mode_of_inheritance("AR") == moi
+            assert cache.mode_of_inheritance(None) == none_moi
+            assert cache.mode_of_inheritance("AD") == self.moi
+
+        assert ModeOfInheritance.objects.count() == 3
+
+    def test_genes_are_prefetched_in_one_query(self):
+        """
+        CASE: A batch of genes is prefetched, one of which isn't in the db
+        EXPECT: Existing genes are served from memory, and the missing gene
+        is created with the given symbol
+        """
+        cache = LookupCache()
+
+        with self.assertNumQueries(1):
+            cache.prefetch_genes(["HGNC:1", "HGNC:2"])
+
+        with self.assertNumQueries(0):
+            assert cache.gene("HGNC:1", "Other symbol") == self.gene
+
+        new_gene = cache.gene("HGNC:2", "B", "B1,B2")
+        assert new_gene.gene_symbol == "B"
+        assert new_gene.alias_symbols == "B1,B2"
+
+        with self.assertNumQueries(0):
+            assert cache.gene("HGNC:2") == new_gene
+
+    def test_shared_cache_avoids_lookup_queries_when_inserting_genes(self):
+        """
+        CASE: Two panels with the same gene fields are inserted with one cache
+        EXPECT: The second panel doesn't query the lookup tables or genes
+        again
+        """
+        genes = [
+            {
+                "gene_data": {
+                    "hgnc_id": f"HGNC:{i}",
+                    "gene_name": f"gene {i}",
+                    "gene_symbol": f"G{i}",
+                    "alias": [],
+                },
+                "confidence_level": "3",
+                "mode_of_inheritance": "AD",
+                "mode_of_pathogenicity": "loss",
+                "penetrance": "complete",
+            }
+            for i in range(1, 11)
+        ]
+        cache = LookupCache()
+
+        first_panel = Panel.objects.create(panel_name="First")
+        second_panel = Panel.objects.create(panel_name="Second")
+
+        _insert_gene(
+            PanelClass(name="First", genes=genes),
+            first_panel,
+            True,
+            cache=cache,
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            _insert_gene(
+                PanelClass(name="Second", genes=genes),
+                second_panel,
+                True,
+                cache=cache,
+            )
+
+        lookup_tables = (
+            '"gene"',
+            '"confidence"',
+            '"mode_of_inheritance"',
+            '"mode_of_pathogenicity"',
+            '"penetrance"',
+        )
+        assert not [
+            query["sql"]
+            for query in queries.captured_queries
+            if any(f"FROM {table}" in query["sql"] for table in lookup_tables)
+        ]
+
+        assert PanelGene.objects.filter(panel=second_panel).count() == 10
@@ -0,0 +1,113 @@
+from django.test import TestCase
+from unittest import mock
+
+from panels_backend.models import Panel, SuperPanel
+from panels_backend.management.commands.utils import sortable_version
+from panels_backend.management.commands.panelapp import (
+    _classify_signed_off_panels,
+    process_all_signed_off_panels,
+    PanelClass,
+)
+
+
+class TestClassifySignedOffPanels(TestCase):
+    def setUp(self) -> None:
+        Panel.objects.create(
+            external_id="1",
+            panel_name="Panel one",
+            panel_source="PanelApp",
+            panel_version=sortable_version("1.15"),
+        )
+
+        SuperPanel.objects.create(
+            external_id="2",
+            panel_name="Superpanel two",
+            panel_source="PanelApp",
+            panel_version=sortable_version("3.0"),
+        )
+
+        self.listing = [
+            {"id": 1, "version": "1.15"},  # unchanged
+            {"id": 2, "version": "3.1"},  # updated superpanel
+            {"id": 3, "version": "0.5"},  # new
+        ]
+
+    def test_listing_is_sorted_into_unchanged_updated_and_new(self):
+        """
+        CASE: The signed-off listing contains a panel already in the db, a
+        superpanel with a new version, and a panel not in the db at all
+        EXPECT: Each entry is put into the matching category
+        """
+        unchanged, updated, new = _classify_signed_off_panels(self.listing)
+
+        assert unchanged == [{"id": 1, "version": "1.15"}]
+        assert updated == [{"id": 2, "version": "3.1"}]
+        assert new == [{"id": 3, "version": "0.5"}]
+
+    def test_listing_is_compared_in_a_single_query(self):
+        """
+        CASE: The listing contains both panels and superpanels
+        EXPECT: Only one database query is used to compare them to the db
+        """
+        with self.assertNumQueries(1):
+            _classify_signed_off_panels(self.listing)
+
+
+class TestProcessAllSignedOffPanelsIncremental(TestCase):
+    def setUp(self) -> None:
+        Panel.objects.create(
+            external_id="1",
+            panel_name="Panel one",
+            panel_source="PanelApp",
+            panel_version=sortable_version("1.15"),
+        )
+
+    @mock.patch(
+        "panels_backend.management.commands.panelapp.get_specific_version_panel"
+    )
+    @mock.patch(
+        "panels_backend.management.commands.panelapp._get_all_signed_off_panels"
+    )
+    def test_only_changed_panels_are_fetched(
+        self, mock_listing, mock_specific_version
+    ):
+        """
+        CASE: Incremental mode, one listed panel is already in the db at the
+        same version and one panel is new
+        EXPECT: Only the new panel is fetched from PanelApp
+        """
+        mock_listing.return_value = [
+            {"id": 1, "version": "1.15"},
+            {"id": 4, "version": "2.0"},
+        ]
+        mock_specific_version.return_value = (
+            PanelClass(id=4, name="Panel four", version="2.0"),
+            False,
+        )
+
+        fetched = list(process_all_signed_off_panels(incremental=True))
+
+        mock_specific_version.assert_called_once_with(4, "2.0")
+        assert [(panel.id, is_super) for panel, is_super in fetched] == [
+            (4, False)
+        ]
+
+    @mock.patch(
+        "panels_backend.management.commands.panelapp.get_specific_version_panel"
+    )
+    @mock.patch(
+        "panels_backend.management.commands.panelapp._get_all_signed_off_panels"
+    )
+    def test_no_op_sync_fetches_nothing(
+        self, mock_listing, mock_specific_version
+    ):
+        """
+        CASE: Incremental mode, every listed panel is already in the db
+        EXPECT: No individual panels are fetched from PanelApp
+        """
+        mock_listing.return_value = [{"id": 1, "version": "1.15"}]
+
+        fetched = list(process_all_signed_off_panels(incremental=True))
+
+        mock_specific_version.assert_not_called()
+        assert not fetched
@@ -0,0 +1,85 @@
+from django.test import TestCase
+import json
+import tracemalloc
+
+from panels_backend.management.commands.panelapp import (
+    PanelClass,
+    PanelGeneData,
+)
+
+
+class TestPanelClass(TestCase):
+    """
+    Tests for the compact panel representation built from the PanelApp API
+    """
+
+    def setUp(self) -> None:
+        with open(
+            "testing_files/eris/panelapp_api_mocks/mock_panel.json"
+        ) as reader:
+            self.panel_json = json.load(reader)
+
+    def test_stored_fields_are_parsed(self):
+        """
+        CASE: A panel is built from a PanelApp API response
+        EXPECT: Panel details and the stored fields of each gene are kept
+        """
+        panel = PanelClass(**self.panel_json)
+
+        assert panel.id == self.panel_json["id"]
+        assert panel.name == self.panel_json["name"]
+        assert panel.version == self.panel_json["version"]
+        assert panel.panel_source is None
+        assert len(panel.genes) == len(self.panel_json["genes"])
+
+        gene = panel.genes[0]
+        assert isinstance(gene, PanelGeneData)
+        assert gene.hgnc_id == "HGNC:1071"
+        assert gene.gene_symbol == "BMP4"
+        assert gene.alias_symbols == ()
+        assert gene.confidence_level == "3"
+        assert gene.mode_of_inheritance == (
+            "MONOALLELIC, autosomal or pseudoautosomal, imprinted status unknown"
+        )
+        assert gene.mode_of_pathogenicity is None
+        assert gene.penetrance is None
+
+    def test_unused_api_fields_are_dropped(self):
+        """
+        CASE: The API response has fields which Eris doesn't store, and a gene
+        with no gene data
+        EXPECT: Those fields aren't kept, and the gene is left out
+        """
+        self.panel_json["genes"].append({"confidence_level": "3"})
+
+        panel = PanelClass(**self.panel_json)
+
+        assert len(panel.genes) == len(self.panel_json["genes"]) - 1
+        assert not hasattr(panel, "__dict__")
+        assert not hasattr(panel, "regions")
+        assert not hasattr(panel.genes[0], "publications")
+
+    def test_compact_panel_uses_less_memory_than_api_json(self):
+        """
+        CASE: The largest mocked PanelApp response is parsed
+        EXPECT: The compact panel holds less than a quarter of the memory
+        held by the raw JSON
+        """
+        with open(
+            "testing_files/eris/panelapp_api_mocks/superpanel_api_mock.json"
+        ) as reader:
+            text = reader.read()
+
+        tracemalloc.start()
+        raw = json.loads(text)
+        raw_size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del raw
+
+        tracemalloc.start()
+        panel = PanelClass(**json.loads(text))
+        compact_size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        assert panel.genes
+        assert compact_size < raw_size / 4, (compact_size, raw_size)
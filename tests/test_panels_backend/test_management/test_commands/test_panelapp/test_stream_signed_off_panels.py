@@ -0,0 +1,122 @@
+import threading
+from django.test import TestCase
+from unittest import mock
+
+from panels_backend.management.commands.panelapp import (
+    stream_signed_off_panels,
+    PanelClass,
+    SuperPanelClass,
+)
+
+
+def _fake_specific_version_panel(panel_id, version):
+    """
+    Stand-in for get_specific_version_panel - ids of 100 or more are
+    treated as superpanels
+    """
+    if panel_id >= 100:
+        return SuperPanelClass(id=panel_id, version=version), True
+    return PanelClass(id=panel_id, version=version), False
+
+
+class TestStreamSignedOffPanels(TestCase):
+    @mock.patch(
+        "panels_backend.management.commands.panelapp.get_specific_version_panel"
+    )
+    def test_panels_are_yielded_in_listing_order(self, mock_specific_version):
+        """
+        CASE: A listing with a mix of panels and superpanels
+        EXPECT: Every panel is yielded once, in listing order, with the right
+        superpanel flag and the PanelApp source set
+        """
+        mock_specific_version.side_effect = _fake_specific_version_panel
+        listing = [
+            {"id": 1, "version": "1.0"},
+            {"id": 100, "version": "2.0"},
+            {"id": 3, "version": "0.5"},
+        ]
+
+        fetched = list(stream_signed_off_panels(listing, buffer_size=1))
+
+        assert [(panel.id, is_super) for panel, is_super in fetched] == [
+            (1, False),
+            (100, True),
+            (3, False),
+        ]
+        assert all(panel.panel_source == "PanelApp" for panel, _ in fetched)
+
+    @mock.patch(
+        "panels_backend.management.commands.panelapp.get_specific_version_panel"
+    )
+    def test_panels_which_fail_to_parse_are_skipped(
+        self, mock_specific_version
+    ):
+        """
+        CASE: One panel in the listing can't be parsed, so None is returned
+        EXPECT: That panel is left out of the stream
+        """
+        mock_specific_version.side_effect = [
+            (None, False),
+            (PanelClass(id=2, version="1.0"), False),
+        ]
+        listing = [{"id": 1, "version": "1.0"}, {"id": 2, "version": "1.0"}]
+
+        fetched = list(stream_signed_off_panels(listing))
+
+        assert [panel.id for panel, _ in fetched] == [2]
+
+    @mock.patch(
+        "panels_backend.management.commands.panelapp.get_specific_version_panel"
+    )
+    def test_fetch_errors_reach_the_consumer(self, mock_specific_version):
+        """
+        CASE: Fetching the second panel raises an error
+        EXPECT: The first panel is yielded, then the error is raised to the
+        caller rather than being lost in the fetching thread
+        """
+        mock_specific_version.side_effect = [
+            (PanelClass(id=1, version="1.0"), False),
+            ValueError("PanelApp is down"),
+        ]
+        listing = [{"id": 1, "version": "1.0"}, {"id": 2, "version": "1.0"}]
+
+        stream = stream_signed_off_panels(listing)
+        panel, _ = next(stream)
+        assert panel.id == 1
+
+        with self.assertRaisesRegex(ValueError, "PanelApp is down"):
+            next(stream)
+
+    @mock.patch(
+        "panels_backend.management.commands.panelapp.get_specific_version_panel"
+    )
+    def test_fetching_stays_bounded_by_buffer_size(
+        self, mock_specific_version
+    ):
+        """
+        CASE: The consumer reads one panel then stops reading
+        EXPECT: The fetching thread does not run ahead by more than the
+        buffer size (plus the panel it is waiting to add), and stops once
+        the stream is closed
+        """
+        fetched_ids = []
+        fetched_enough = threading.Event()
+
+        def _fetch(panel_id, version):
+            fetched_ids.append(panel_id)
+            if len(fetched_ids) >= 4:
+                fetched_enough.set()
+            return PanelClass(id=panel_id, version=version), False
+
+        mock_specific_version.side_effect = _fetch
+        listing = [{"id": i, "version": "1.0"} for i in range(50)]
+
+        stream = stream_signed_off_panels(listing, buffer_size=2)
+        next(stream)
+
+        # 1 consumed + 2 buffered + 1 waiting for space
+        fetched_enough.wait(timeout=5)
+        assert len(fetched_ids) == 4
+
+        stream.close()
+        assert len(fetched_ids) == 4
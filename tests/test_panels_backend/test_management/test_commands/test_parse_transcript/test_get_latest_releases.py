@@ -0,0 +1,98 @@
+from django.test import TestCase
+
+from panels_backend.models import (
+    GffRelease,
+    HgncRelease,
+    ReferenceGenome,
+    TranscriptRelease,
+    TranscriptSource,
+    release_sort_key,
+)
+from panels_backend.management.commands._parse_transcript import (
+    _get_latest_gff_release,
+    _get_latest_hgnc_release,
+    get_latest_transcript_release,
+)
+
+
+class TestReleaseSortKey(TestCase):
+    def test_keys_sort_in_version_order(self):
+        """
+        CASE: Releases with differing numbers of digits and parts
+        EXPECT: Sorting the keys as text gives version order
+        """
+        releases = ["10", "v1.0.5", "2", "1.10", "1.9", "1.0.5a"]
+        assert sorted(releases, key=release_sort_key) == [
+            "v1.0.5",
+            "1.0.5a",
+            "1.9",
+            "1.10",
+            "2",
+            "10",
+        ]
+
+    def test_trailing_zeros_are_ignored(self):
+        """
+        CASE: The same release written with and without trailing zeros
+        EXPECT: Both give the same key
+        """
+        assert release_sort_key("5") == release_sort_key("5.0.0")
+
+
+class TestGetLatestReleases(TestCase):
+    def setUp(self) -> None:
+        self.genome = ReferenceGenome.objects.create(name="GRCh37")
+        self.other_genome = ReferenceGenome.objects.create(name="GRCh38")
+        self.source = TranscriptSource.objects.create(source="HGMD")
+
+        for release in ["9", "10", "1.5"]:
+            HgncRelease.objects.create(release=release)
+            TranscriptRelease.objects.create(
+                source=self.source,
+                release=release,
+                reference_genome=self.genome,
+            )
+
+        GffRelease.objects.create(
+            ensembl_release="10.2", reference_genome=self.genome
+        )
+        GffRelease.objects.create(
+            ensembl_release="19", reference_genome=self.genome
+        )
+        GffRelease.objects.create(
+            ensembl_release="110", reference_genome=self.other_genome
+        )
+
+    def test_latest_release_uses_version_order(self):
+        """
+        CASE: Releases where text order and version order differ
+        EXPECT: The release with the highest version is returned
+        """
+        assert _get_latest_hgnc_release().release == "10"
+        assert (
+            get_latest_transcript_release("HGMD", self.genome).release == "10"
+        )
+
+    def test_gff_release_is_for_reference_genome(self):
+        """
+        CASE: A later GFF release exists for another reference genome
+        EXPECT: The latest release for the requested genome is returned
+        """
+        assert _get_latest_gff_release(self.genome).ensembl_release == "19"
+
+    def test_latest_release_is_one_query(self):
+        """
+        CASE: The latest release is looked up
+        EXPECT: Only one query is used, however many releases there are
+        """
+        with self.assertNumQueries(1):
+            _get_latest_hgnc_release()
+
+    def test_no_releases(self):
+        """
+        CASE: There are no releases for the source
+        EXPECT: None is returned
+        """
+        assert (
+            get_latest_transcript_release("MANE Select", self.genome) is None
+        )
@@ -0,0 +1,122 @@
+from django.test import TestCase
+
+from panels_backend.models import (
+    ClinicalIndication,
+    ClinicalIndicationPanel,
+    ClinicalIndicationPanelHistory,
+    Gene,
+    HistoryEvent,
+    Panel,
+    PanelGene,
+    PanelGeneHistory,
+    Transcript,
+)
+from panels_backend.management.commands.synth_data import (
+    SYNTH_HISTORY_START,
+    insert_synthetic_data,
+    plan_synthetic_data,
+)
+
+
+class TestInsertSyntheticData(TestCase):
+    def setUp(self) -> None:
+        self.plan = plan_synthetic_data(0.005, 0)
+        self.counts = insert_synthetic_data(self.plan)
+
+    def test_counts(self):
+        """
+        CASE: A plan is inserted
+        EXPECT: Its genes, transcripts in both builds, panel versions and
+        clinical indications are in the database
+        """
+        transcripts = sum(len(g["transcripts"]) for g in self.plan["genes"])
+        versions = sum(len(p["versions"]) for p in self.plan["panels"])
+
+        assert Gene.objects.count() == len(self.plan["genes"])
+        assert Transcript.objects.count() == 2 * transcripts
+        assert Panel.objects.count() == versions
+        assert ClinicalIndication.objects.count() == len(
+            self.plan["clinical_indications"]
+        )
+        assert self.counts["transcripts"] == 2 * transcripts
+        assert self.counts["panels"] == versions
+
+    def test_latest_panel_versions_have_planned_genes(self):
+        """
+        CASE: A plan is inserted
+        EXPECT: The shared links of each panel's latest version give the
+        genes left after every planned version's changes
+        """
+        genes = list(Gene.objects.order_by("id"))
+
+        for planned in self.plan["panels"]:
+            expected = set()
+            for version in planned["versions"]:
+                expected.difference_update(version["removed"])
+                expected.update(version["added"])
+
+            latest = Panel.objects.get(
+                external_id=planned["external_id"],
+                panel_version=planned["versions"][-1]["version"],
+            )
+            found = set(
+                PanelGene.objects.for_panel(latest)
+                .filter(pending=False)
+                .values_list("gene__hgnc_id", flat=True)
+            )
+            assert found == {genes[gene].hgnc_id for gene in expected}
+
+    def test_clinical_indications_have_one_current_link_per_panel(self):
+        """
+        CASE: A plan is inserted
+        EXPECT: Each clinical indication has one current link for each of
+        its panels
+        """
+        for planned in self.plan["clinical_indications"]:
+            assert ClinicalIndicationPanel.objects.filter(
+                clinical_indication__r_code=planned["r_code"], current=True
+            ).count() == len(planned["panels"])
+
+    def test_history_dates_are_spread(self):
+        """
+        CASE: A plan is inserted
+        EXPECT: History rows have different created times from
+        SYNTH_HISTORY_START on
+        """
+        created = list(
+            PanelGeneHistory.objects.order_by("id").values_list(
+                "created", flat=True
+            )
+        )
+
+        assert len(set(created)) == len(created)
+        assert min(created) > SYNTH_HISTORY_START
+
+    def test_history_event_types_are_set(self):
+        """
+        CASE: A plan is inserted
+        EXPECT: Every panel gene and clinical indication-panel history row
+        has the event type of its note
+        """
+        for history_model in (
+            PanelGeneHistory,
+            ClinicalIndicationPanelHistory,
+        ):
+            assert history_model.objects.exists()
+            assert not history_model.objects.filter(event_type="").exists()
+
+        assert ClinicalIndicationPanelHistory.objects.filter(
+            event_type=HistoryEvent.TD_LINKED
+        ).exists()
+
+    def test_database_must_be_empty(self):
+        """
+        CASE: A plan is inserted into a database which already has data
+        EXPECT: ValueError, and nothing more is inserted
+        """
+        genes = Gene.objects.count()
+
+        with self.assertRaises(ValueError):
+            insert_synthetic_data(self.plan)
+
+        assert Gene.objects.count() == genes
@@ -0,0 +1,91 @@
+from django.test import TestCase
+
+from panels_backend.management.commands.synth_data import (
+    SYNTH_MAX_PANEL_VERSIONS,
+    SYNTH_TD_RELEASES,
+    plan_synthetic_data,
+)
+
+
+class TestPlanSyntheticData(TestCase):
+    def test_same_seed_same_plan(self):
+        """
+        CASE: Two plans are made with the same scale and seed
+        EXPECT: They're identical
+        """
+        assert plan_synthetic_data(0.01, 3) == plan_synthetic_data(0.01, 3)
+
+    def test_different_seed_different_plan(self):
+        """
+        CASE: Two plans are made with different seeds
+        EXPECT: They differ
+        """
+        assert plan_synthetic_data(0.01, 1) != plan_synthetic_data(0.01, 2)
+
+    def test_volumes_scale(self):
+        """
+        CASE: A plan is made at 1/100 scale
+        EXPECT: 1/100 of the genes, panels, superpanels and clinical
+        indications, with the full number of test directory releases
+        """
+        plan = plan_synthetic_data(0.01, 0)
+
+        assert len(plan["genes"]) == 450
+        assert len(plan["panels"]) == 10
+        assert len(plan["superpanels"]) == 1
+        assert len(plan["clinical_indications"]) == 4
+        assert len(plan["td_releases"]) == SYNTH_TD_RELEASES
+
+    def test_panel_versions_are_consistent(self):
+        """
+        CASE: A plan is made
+        EXPECT: Each panel has at most SYNTH_MAX_PANEL_VERSIONS versions,
+        only removes genes it has, never empties, and only adds genes it
+        doesn't have
+        """
+        plan = plan_synthetic_data(0.01, 0)
+
+        for panel in plan["panels"]:
+            assert 1 <= len(panel["versions"]) <= SYNTH_MAX_PANEL_VERSIONS
+
+            genes = set()
+            for version in panel["versions"]:
+                assert set(version["removed"]) <= genes
+                genes.difference_update(version["removed"])
+                assert not genes & set(version["added"])
+                genes.update(version["added"])
+                assert genes
+
+    def test_transcripts_are_unique(self):
+        """
+        CASE: A plan is made
+        EXPECT: No transcript accession is used by more than one gene
+        """
+        plan = plan_synthetic_data(0.01, 0)
+
+        bases = [
+            tx["transcript"].split(".")[0]
+            for gene in plan["genes"]
+            for tx in gene["transcripts"]
+        ]
+        assert len(bases) == len(set(bases))
+
+    def test_without_pending(self):
+        """
+        CASE: A plan is made without items awaiting review
+        EXPECT: No pending genes or clinical indications, and otherwise the
+        same plan
+        """
+        plan = plan_synthetic_data(0.05, 0)
+        without_pending = plan_synthetic_data(0.05, 0, pending=False)
+
+        assert any(plan["pending_genes"])
+        assert not any(without_pending["pending_genes"])
+        assert not any(
+            ci["pending"] for ci in without_pending["clinical_indications"]
+        )
+
+        for ci in plan["clinical_indications"]:
+            ci["pending"] = False
+        plan["pending_genes"] = without_pending["pending_genes"]
+        assert plan == without_pending
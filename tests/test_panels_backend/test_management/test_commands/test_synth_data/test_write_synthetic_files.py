@@ -0,0 +1,107 @@
+import tempfile
+
+from django.test import TestCase
+
+from panels_backend.management.commands._parse_transcript import (
+    _prepare_gene2refseq_file,
+    _prepare_gff_file,
+    _prepare_mane_file,
+    _prepare_markname_file,
+)
+from panels_backend.management.commands.synth_data import (
+    plan_synthetic_data,
+    write_synthetic_files,
+)
+
+
+class TestWriteSyntheticFiles(TestCase):
+    """
+    The synthetic files are read by the same functions as seed transcript
+    """
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.plan = plan_synthetic_data(0.002, 0)
+        self.paths = write_synthetic_files(self.plan, self.directory.name)
+        self.genes = self.plan["genes"]
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_mane(self):
+        """
+        CASE: The MANE file is read
+        EXPECT: A row for every planned MANE transcript, with its HGNC ID
+        """
+        symbol_to_hgnc_id = {g["symbol"]: g["hgnc_id"] for g in self.genes}
+
+        mane = _prepare_mane_file(self.paths["mane"], symbol_to_hgnc_id)
+
+        assert sorted(
+            (row["HGNC ID"], row["RefSeq"], row["MANE TYPE"]) for row in mane
+        ) == sorted(
+            (gene["hgnc_id"], tx["transcript"], tx["mane"])
+            for gene in self.genes
+            for tx in gene["transcripts"]
+            if tx["mane"]
+        )
+
+    def test_gff(self):
+        """
+        CASE: The GFF files are read
+        EXPECT: Every planned transcript of every gene, in both builds
+        """
+        expected = {
+            gene["hgnc_id"]: sorted(
+                tx["transcript"] for tx in gene["transcripts"]
+            )
+            for gene in self.genes
+        }
+
+        for genome in ["GRCh37", "GRCh38"]:
+            gff = _prepare_gff_file(self.paths[f"gff_{genome}"])
+            assert {
+                hgnc_id: sorted(transcripts)
+                for hgnc_id, transcripts in gff.items()
+            } == expected
+
+    def test_hgmd(self):
+        """
+        CASE: The markname and gene2refseq files are read
+        EXPECT: Each gene's HGNC ID leads through its HGMD ID to its planned
+        HGMD transcript
+        """
+        markname = _prepare_markname_file(self.paths["markname"])
+        gene2refseq = _prepare_gene2refseq_file(self.paths["g2refseq"])
+
+        for gene in self.genes:
+            hgmd_ids = markname[int(gene["hgnc_id"].split(":")[1])]
+            assert len(hgmd_ids) == 1
+
+            expected = [
+                tuple(tx["transcript"].split("."))
+                for tx in gene["transcripts"]
+                if tx["hgmd"]
+            ]
+            found = gene2refseq.get(str(hgmd_ids[0]), [])
+            assert [tuple(tx) for tx in found] == expected
+
+    def test_hgnc(self):
+        """
+        CASE: The HGNC file is written
+        EXPECT: A tab-separated header, then a line per gene
+        """
+        with open(self.paths["hgnc"]) as f:
+            lines = f.read().splitlines()
+
+        assert lines[0].split("\t")[:6] == [
+            "HGNC ID",
+            "Approved symbol",
+            "Approved name",
+            "Locus type",
+            "Previous symbols",
+            "Alias symbols",
+        ]
+        assert [line.split("\t")[0] for line in lines[1:]] == [
+            gene["hgnc_id"] for gene in self.genes
+        ]
@@ -0,0 +1,235 @@
+import json
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from panels_backend.models import (
+    ClinicalIndication,
+    ClinicalIndicationPanel,
+    Panel,
+    TestDirectoryRelease,
+)
+from panels_backend.management.commands._insert_ci import (
+    insert_test_directory_data,
+)
+from panels_backend.management.commands._td_diff import (
+    diff_test_directory,
+    format_td_diff_table,
+)
+from panels_backend.management.commands.utils import gene_set_fingerprint
+
+
+class TestDiffTestDirectory(TestCase):
+    def setUp(self) -> None:
+        TestDirectoryRelease.objects.create(
+            release="5",
+            td_source="td_source",
+            config_source="config_source",
+            td_date="date",
+        )
+
+        self.panel_one = Panel.objects.create(
+            external_id="1", panel_name="Panel one"
+        )
+        self.panel_two = Panel.objects.create(
+            external_id="2", panel_name="Panel two"
+        )
+
+        # R1 is linked to panel 1, R2 to panel 2, R3 to panel 1
+        for r_code, panel in (
+            ("R1", self.panel_one),
+            ("R2", self.panel_two),
+            ("R3", self.panel_one),
+        ):
+            ci = ClinicalIndication.objects.create(
+                r_code=r_code, name=f"{r_code} name", test_method="wgs"
+            )
+            ClinicalIndicationPanel.objects.create(
+                clinical_indication=ci, panel=panel, current=True
+            )
+
+        # R1 is unchanged, R2 changes test method and moves to panel 1,
+        # R3 is missing, and R4 is new
+        self.td = {
+            "td_source": "td_source",
+            "config_source": "config_source",
+            "date": "date",
+            "indications": [
+                {
+                    "code": "R1",
+                    "name": "R1 name",
+                    "test_method": "wgs",
+                    "panels": ["1"],
+                },
+                {
+                    "code": "R2",
+                    "name": "R2 name",
+                    "test_method": "panel",
+                    "panels": ["1", "999"],
+                },
+                {
+                    "code": "R4",
+                    "name": "R4 name",
+                    "test_method": "wgs",
+                    "panels": ["2"],
+                },
+            ],
+        }
+
+    def test_changes_are_reported(self):
+        """
+        CASE: A test directory with unchanged, changed, missing and new
+        indications is compared to the db
+        EXPECT: Each change is reported under its R code
+        """
+        report = diff_test_directory(self.td, "6")
+
+        assert report["version_error"] is None
+        assert report["new_clinical_indications"] == [
+            {"r_code": "R4", "name": "R4 name", "test_method": "wgs"}
+        ]
+        assert report["test_method_changes"] == [
+            {"r_code": "R2", "name": "R2 name", "old": "wgs", "new": "panel"}
+        ]
+        assert report["panels_added"] == [
+            {
+                "r_code": "R2",
+                "panel": "Panel one",
+                "type": "panel",
+                "pending": False,
+            },
+            {
+                "r_code": "R4",
+                "panel": "Panel two",
+                "type": "panel",
+                "pending": False,
+            },
+        ]
+        assert report["panels_removed"] == [
+            {"r_code": "R2", "panel": "Panel two", "type": "panel"}
+        ]
+        assert report["unknown_panel_ids"] == [
+            {"r_code": "R2", "panel_id": "999"}
+        ]
+        assert [link["r_code"] for link in report["links_to_pending"]] == [
+            "R2"
+        ]
+        assert report["clinical_indications_removed"] == [
+            {"r_code": "R3", "links_to_pending": 1}
+        ]
+
+    def test_report_matches_import(self):
+        """
+        CASE: A test directory is compared to the db, then imported
+        EXPECT: The links the report says would become pending are the ones
+        which do, and the report is json-serialisable
+        """
+        report = diff_test_directory(self.td, "6")
+        json.dumps(report)
+
+        insert_test_directory_data(self.td, "6")
+
+        expected = len(report["links_to_pending"]) + sum(
+            ci["links_to_pending"]
+            for ci in report["clinical_indications_removed"]
+        )
+        assert (
+            ClinicalIndicationPanel.objects.filter(
+                pending=True, current=False
+            ).count()
+            == expected
+        )
+
+    def test_hgnc_panels_matched_on_genes(self):
+        """
+        CASE: R1 is linked to an HGNC panel, which the test directory lists
+        in a different order with a repeat. R2's HGNC panel has no stored
+        fingerprint.
+        EXPECT: Neither HGNC panel is reported as added or removed, and the
+        import doesn't make new panels either
+        """
+        fingerprinted = Panel.objects.create(
+            panel_name="HGNC:1&HGNC:2",
+            test_directory=True,
+            gene_set_fingerprint=gene_set_fingerprint(["HGNC:1", "HGNC:2"]),
+        )
+        legacy = Panel.objects.create(
+            panel_name="HGNC:3&HGNC:4", test_directory=True
+        )
+        for r_code, panel in (("R1", fingerprinted), ("R2", legacy)):
+            ClinicalIndicationPanel.objects.create(
+                clinical_indication=ClinicalIndication.objects.get(
+                    r_code=r_code
+                ),
+                panel=panel,
+                current=True,
+            )
+        self.td["indications"][0]["panels"] += ["HGNC:2", "hgnc:1", "HGNC:2"]
+        self.td["indications"][1]["panels"] += ["HGNC:4", "HGNC:3"]
+
+        report = diff_test_directory(self.td, "6")
+
+        assert not [
+            row
+            for row in report["panels_added"] + report["panels_removed"]
+            if row["type"] == "hgnc"
+        ]
+
+        insert_test_directory_data(self.td, "6")
+
+        assert set(
+            Panel.objects.filter(test_directory=True).values_list(
+                "id", flat=True
+            )
+        ) == {fingerprinted.id, legacy.id}
+
+    def test_db_is_not_changed(self):
+        """
+        CASE: A test directory is compared to the db
+        EXPECT: Only reads are made
+        """
+        with CaptureQueriesContext(connection) as queries:
+            diff_test_directory(self.td, "6")
+
+        assert all(
+            query["sql"].lstrip().upper().startswith("SELECT")
+            for query in queries
+        )
+
+    def test_query_count_does_not_grow_with_indications(self):
+        """
+        CASE: A test directory has many more indications
+        EXPECT: It's compared with the same number of queries
+        """
+        self.td["indications"][0]["panels"].append("HGNC:1")
+
+        with CaptureQueriesContext(connection) as queries:
+            diff_test_directory(self.td, "6")
+        small = len(queries)
+
+        self.td["indications"].extend(
+            {
+                "code": f"R{r_code}",
+                "name": "name",
+                "test_method": "wgs",
+                "panels": [str(r_code), "HGNC:1"],
+            }
+            for r_code in range(100, 200)
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            diff_test_directory(self.td, "6")
+
+        assert len(queries) == small
+
+    def test_old_release_is_reported(self):
+        """
+        CASE: The release is older than the latest in the db
+        EXPECT: The report includes the error the import would raise, and
+        the table shows it
+        """
+        report = diff_test_directory(self.td, "4")
+
+        assert "Abandoning import" in report["version_error"]
+        assert "WARNING" in format_td_diff_table(report)
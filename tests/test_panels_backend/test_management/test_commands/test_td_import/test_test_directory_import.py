@@ -0,0 +1,278 @@
+"""
+This file tests TestDirectoryImport in the file `panels_backend/management/commands/_td_import.py`
+
+Tested scenario:
+- the latest version of each panel is picked for a PanelApp ID
+- a clinical indication's changed test method is flagged for review
+- CI-panel and CI-superpanel links are made and attached to the test directory release
+- existing links are attached to the test directory release
+- links no longer in the test directory are flagged for review
+"""
+
+from django.test import TestCase
+from django.contrib.auth.models import User
+
+from panels_backend.models import (
+    ClinicalIndication,
+    Panel,
+    SuperPanel,
+    ClinicalIndicationPanel,
+    ClinicalIndicationPanelHistory,
+    ClinicalIndicationSuperPanel,
+    ClinicalIndicationSuperPanelHistory,
+    ClinicalIndicationTestMethodHistory,
+    TestDirectoryRelease,
+    CiPanelTdRelease,
+    CiPanelTdReleaseHistory,
+    CiSuperpanelTdRelease,
+    CiSuperpanelTdReleaseHistory,
+)
+from panels_backend.management.commands._td_import import (
+    TestDirectoryImport,
+)
+from panels_backend.management.commands.history import History
+from panels_backend.management.commands.utils import sortable_version
+
+
+def _indication(panels: list[str], test_method: str = "ngs") -> dict:
+    """
+    :param: panels, the panel IDs of R104 in the test directory
+    :param: test_method, the test method of R104 in the test directory
+    :return: R104 as it appears in the test directory json
+    """
+    return {
+        "code": "R104",
+        "name": "Clin Ind Here",
+        "test_method": test_method,
+        "panels": panels,
+    }
+
+
+class TestTestDirectoryImport(TestCase):
+    """
+    Changes to clinical indications and their links are made in memory, and
+    written with the same history as single changes would have
+    """
+
+    def setUp(self) -> None:
+        self.ci = ClinicalIndication.objects.create(
+            r_code="R104", name="Clin Ind Here", test_method="ngs"
+        )
+
+        self.panel = Panel.objects.create(
+            external_id="304",
+            panel_name="A class of genetic disorder",
+            panel_source="PanelApp",
+            panel_version=sortable_version("3"),
+        )
+        self.superpanel = SuperPanel.objects.create(
+            external_id="305",
+            panel_name="A superpanel",
+            panel_source="PanelApp",
+            panel_version=sortable_version("3"),
+        )
+
+        self.td_release = TestDirectoryRelease.objects.create(
+            release="2",
+            td_source="test_dir_v2.xlsx",
+            config_source="config source",
+            td_date="20220405",
+        )
+
+        self.user = User.objects.create_user(username="test", is_staff=True)
+
+    def _import(self, indication: dict) -> TestDirectoryImport:
+        return TestDirectoryImport([indication], self.td_release, self.user)
+
+    def test_latest_panel_version_is_picked(self):
+        """
+        CASE: A PanelApp ID exists in 2 versions, and another isn't in the db
+        EXPECT: The most-recent version is picked, and the missing ID has no
+        panel
+        """
+        newer = Panel.objects.create(
+            external_id="304",
+            panel_name="A class of genetic disorder",
+            panel_source="PanelApp",
+            panel_version=sortable_version("3.19"),
+        )
+
+        td_import = self._import(_indication(["304", "999"]))
+
+        assert td_import.panels["304"] == newer
+        assert "999" not in td_import.panels
+
+    def test_changed_test_method_is_flagged(self):
+        """
+        CASE: A clinical indication's test method changes in the test
+        directory
+        EXPECT: The test method is updated, the clinical indication is flagged
+        for review, and the change is recorded with the user
+        """
+        indication = _indication([], test_method="wgs")
+        td_import = self._import(indication)
+
+        ((ci, created),) = td_import.get_or_create_clinical_indications(
+            [indication]
+        )
+
+        self.ci.refresh_from_db()
+        assert not created
+        assert ci == self.ci
+        assert self.ci.test_method == "wgs"
+        assert self.ci.pending
+
+        (history,) = ClinicalIndicationTestMethodHistory.objects.all()
+        assert history.note == History.clinical_indication_metadata_changed(
+            "test_method", "ngs", "wgs"
+        )
+        assert history.user == self.user
+
+    def test_new_links_made_and_attached_to_td_release(self):
+        """
+        CASE: CI-Panel and CI-SuperPanel links need making and don't exist
+        already
+        EXPECT: Each link is made with a history entry, then attached to the
+        test directory release, which itself generates a history entry
+        """
+        td_import = self._import(_indication(["304", "305"]))
+
+        td_import.ci_panels.link(self.ci, self.panel)
+        td_import.ci_superpanels.link(self.ci, self.superpanel)
+        td_import.save()
+
+        (cip,) = ClinicalIndicationPanel.objects.all()
+        assert cip.clinical_indication == self.ci
+        assert cip.panel == self.panel
+        assert cip.current and not cip.pending
+
+        (cip_history,) = ClinicalIndicationPanelHistory.objects.all()
+        assert cip_history.note == History.clinical_indication_panel_created()
+        assert cip_history.user == self.user
+
+        (cip_td,) = CiPanelTdRelease.objects.all()
+        assert cip_td.ci_panel == cip
+        assert cip_td.td_release == self.td_release
+        assert CiPanelTdReleaseHistory.objects.get(
+            cip_td=cip_td
+        ).note == History.td_panel_ci_autolink(self.td_release.release)
+
+        (cisp,) = ClinicalIndicationSuperPanel.objects.all()
+        assert cisp.superpanel == self.superpanel
+        assert (
+            ClinicalIndicationSuperPanelHistory.objects.get().note
+            == History.clinical_indication_superpanel_created()
+        )
+
+        (cisp_td,) = CiSuperpanelTdRelease.objects.all()
+        assert cisp_td.ci_superpanel == cisp
+        assert CiSuperpanelTdReleaseHistory.objects.get(
+            cip_td=cisp_td
+        ).note == History.td_superpanel_ci_autolink(self.td_release.release)
+
+    def test_existing_link_attached_to_td_release(self):
+        """
+        CASE: A CI-Panel link already exists, and needs attaching to a new
+        test directory release
+        EXPECT: No new link or link history - the existing link is attached
+        to the release, with history
+        """
+        existing = ClinicalIndicationPanel.objects.create(
+            clinical_indication=self.ci, panel=self.panel, current=True
+        )
+        td_import = self._import(_indication(["304"]))
+
+        td_import.ci_panels.link(self.ci, self.panel)
+        td_import.save()
+
+        assert list(ClinicalIndicationPanel.objects.all()) == [existing]
+        assert not ClinicalIndicationPanelHistory.objects.exists()
+
+        (cip_td,) = CiPanelTdRelease.objects.all()
+        assert cip_td.ci_panel == existing
+        history = CiPanelTdReleaseHistory.objects.get(cip_td=cip_td)
+        assert history.note == History.td_panel_ci_autolink(
+            self.td_release.release
+        )
+        assert history.user == self.user
+
+    def test_links_no_longer_in_td_are_flagged(self):
+        """
+        CASE: R104 used to be linked to panels 3 and 4 and superpanels 5 and
+        6. In the newest test directory, it's only linked to 4 and 6.
+        EXPECT: The links to 3 and 5 are set to current=False, pending=True,
+        and history-logged. The links to 4 and 6 are left as they were.
+        """
+        panels = {
+            external_id: Panel.objects.create(
+                external_id=external_id,
+                panel_name=f"Panel {external_id}",
+                panel_source="PanelApp",
+                panel_version=sortable_version("1"),
+            )
+            for external_id in ("3", "4")
+        }
+        superpanels = {
+            external_id: SuperPanel.objects.create(
+                external_id=external_id,
+                panel_name=f"Superpanel {external_id}",
+                panel_source="PanelApp",
+                panel_version=sortable_version("1"),
+            )
+            for external_id in ("5", "6")
+        }
+        for panel in panels.values():
+            ClinicalIndicationPanel.objects.create(
+                clinical_indication=self.ci, panel=panel, current=True
+            )
+        for superpanel in superpanels.values():
+            ClinicalIndicationSuperPanel.objects.create(
+                clinical_indication=self.ci,
+                superpanel=superpanel,
+                current=True,
+            )
+        td_panels = ["4", "6"]
+        td_import = self._import(_indication(td_panels))
+
+        for cip in td_import.ci_panels.current_links("R104"):
+            if cip.panel.external_id not in td_panels:
+                td_import.ci_panels.flag_for_review(
+                    cip,
+                    "Panel ID no longer attached to clinical indication in TD",
+                )
+        for cisp in td_import.ci_superpanels.current_links("R104"):
+            if cisp.superpanel.external_id not in td_panels:
+                td_import.ci_superpanels.flag_for_review(
+                    cisp,
+                    "Superpanel ID no longer attached to clinical "
+                    "indication in TD",
+                )
+        td_import.save()
+
+        assert set(
+            ClinicalIndicationPanel.objects.filter(
+                current=False, pending=True
+            ).values_list("panel__external_id", flat=True)
+        ) == {"3"}
+        assert set(
+            ClinicalIndicationPanel.objects.filter(
+                current=True, pending=False
+            ).values_list("panel__external_id", flat=True)
+        ) == {"4"}
+        assert set(
+            ClinicalIndicationSuperPanel.objects.filter(
+                current=False, pending=True
+            ).values_list("superpanel__external_id", flat=True)
+        ) == {"5"}
+
+        (history,) = ClinicalIndicationPanelHistory.objects.all()
+        assert history.clinical_indication_panel.panel == panels["3"]
+        assert history.note == History.flag_clinical_indication_panel(
+            "Panel ID no longer attached to clinical indication in TD"
+        )
+        assert history.user == self.user
+
+        (super_history,) = ClinicalIndicationSuperPanelHistory.objects.all()
+        assert super_history.note == History.flag_clinical_indication_panel(
+            "Superpanel ID no longer attached to clinical indication in TD"
+        )
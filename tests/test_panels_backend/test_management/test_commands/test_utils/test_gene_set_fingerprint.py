@@ -0,0 +1,24 @@
+from django.test import TestCase
+
+from panels_backend.management.commands.utils import gene_set_fingerprint
+
+
+class TestGeneSetFingerprint(TestCase):
+    def test_order_case_and_repeats_are_ignored(self):
+        """
+        CASE: The same HGNC IDs are given in a different order, with different
+        case and whitespace, and with a repeated ID
+        EXPECT: The fingerprints match
+        """
+        assert gene_set_fingerprint(
+            ["HGNC:1", "HGNC:2"]
+        ) == gene_set_fingerprint([" hgnc:2", "HGNC:1", "HGNC:2 "])
+
+    def test_different_genes_give_different_fingerprints(self):
+        """
+        CASE: Two gene sets differ by one HGNC ID
+        EXPECT: The fingerprints differ
+        """
+        assert gene_set_fingerprint(
+            ["HGNC:1", "HGNC:2"]
+        ) != gene_set_fingerprint(["HGNC:1", "HGNC:3"])
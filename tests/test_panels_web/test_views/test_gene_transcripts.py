@@ -0,0 +1,190 @@
+import gzip
+import json
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from panels_backend.models import (
+    Gene,
+    ReferenceGenome,
+    Transcript,
+    TranscriptRelease,
+    TranscriptReleaseTranscript,
+    TranscriptSource,
+)
+
+
+class TestGeneTranscripts(TestCase):
+    """
+    The gene-transcripts api body is cached per set of latest releases, and
+    served gzipped with an ETag
+    """
+
+    def setUp(self) -> None:
+        cache.clear()
+
+        self.genome = ReferenceGenome.objects.create(name="GRCh38")
+        self.releases = {
+            source: TranscriptRelease.objects.create(
+                source=TranscriptSource.objects.create(source=source),
+                release="1.0",
+                reference_genome=self.genome,
+            )
+            for source in ["HGMD", "MANE Select", "MANE Plus Clinical"]
+        }
+
+        self.genes = [
+            Gene.objects.create(hgnc_id=f"HGNC:{i}", gene_symbol=f"GENE{i}")
+            for i in range(2)
+        ]
+        self.transcripts = [
+            Transcript.objects.create(
+                transcript=f"NM_00{i}.1",
+                gene=self.genes[i // 2],
+                reference_genome=self.genome,
+            )
+            for i in range(4)
+        ]
+        TranscriptReleaseTranscript.objects.create(
+            transcript=self.transcripts[0],
+            release=self.releases["MANE Select"],
+            default_clinical=True,
+        )
+        TranscriptReleaseTranscript.objects.create(
+            transcript=self.transcripts[3],
+            release=self.releases["HGMD"],
+            default_clinical=True,
+        )
+        # not clinical, so doesn't count
+        TranscriptReleaseTranscript.objects.create(
+            transcript=self.transcripts[1],
+            release=self.releases["HGMD"],
+            default_clinical=False,
+        )
+
+        self.url = reverse("api_genetranscripts", args=["GRCh38"])
+
+    def _get(self, **headers):
+        return self.client.get(self.url, headers=headers)
+
+    def _json(self, response) -> dict:
+        body = b"".join(response.streaming_content)
+        if response.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        return json.loads(body)
+
+    def test_rows(self):
+        """
+        CASE: transcripts are fetched without gzip
+        EXPECT: plain json with each transcript's clinical source, in gene
+        order
+        """
+        response = self._get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(
+            [
+                (row["transcript"], row["clinical"], row["source"])
+                for row in self._json(response)["data"]
+            ],
+            [
+                ("NM_000.1", True, "MANE Select"),
+                ("NM_001.1", False, None),
+                ("NM_002.1", False, None),
+                ("NM_003.1", True, "HGMD"),
+            ],
+        )
+
+    def test_gzip(self):
+        """
+        CASE: the client accepts gzip
+        EXPECT: a gzipped body with the same content
+        """
+        plain = self._json(self._get())
+        response = self._get(accept_encoding="gzip, deflate")
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(self._json(response), plain)
+
+    def test_cached(self):
+        """
+        CASE: the transcripts are fetched twice
+        EXPECT: the second request only looks up the latest releases
+        """
+        self._json(self._get())
+
+        with CaptureQueriesContext(connection) as ctx:
+            self._json(self._get())
+
+        # reference genome and 3 latest releases
+        self.assertEqual(len(ctx.captured_queries), 4)
+
+    def test_etag_not_modified(self):
+        """
+        CASE: the client sends back the ETag it was given, with and without
+        gzip
+        EXPECT: 304 with no body, varying on Accept-Encoding. The gzipped
+        and plain bodies have different ETags, so one isn't revalidated as
+        the other
+        """
+        etag = self._get()["ETag"]
+        gzip_etag = self._get(accept_encoding="gzip")["ETag"]
+
+        self.assertNotEqual(etag, gzip_etag)
+
+        for encoding, sent in (("", etag), ("gzip", gzip_etag)):
+            response = self._get(if_none_match=sent, accept_encoding=encoding)
+
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response["ETag"], sent)
+            self.assertIn("Accept-Encoding", response["Vary"])
+
+        # an ETag for one encoding doesn't match the other
+        response = self._get(if_none_match=etag, accept_encoding="gzip")
+        self.assertEqual(response.status_code, 200)
+
+    def test_new_release_invalidates(self):
+        """
+        CASE: a new MANE Select release is seeded after the body is cached
+        EXPECT: a new ETag, and a body built from the new release
+        """
+        first = self._get()
+        self._json(first)
+
+        release = TranscriptRelease.objects.create(
+            source=self.releases["MANE Select"].source,
+            release="2.0",
+            reference_genome=self.genome,
+        )
+        TranscriptReleaseTranscript.objects.create(
+            transcript=self.transcripts[2],
+            release=release,
+            default_clinical=True,
+        )
+
+        response = self._get(if_none_match=first["ETag"])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], first["ETag"])
+        self.assertEqual(
+            [row["clinical"] for row in self._json(response)["data"]],
+            [False, False, True, True],
+        )
+
+    def test_missing_release(self):
+        """
+        CASE: there's no HGMD release for the reference genome
+        EXPECT: the placeholder row, as before
+        """
+        self.url = reverse("api_genetranscripts", args=["GRCh37"])
+
+        response = self._get()
+
+        self.assertEqual(
+            json.loads(response.content)["data"][0]["transcript"], None
+        )
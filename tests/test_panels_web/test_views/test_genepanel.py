@@ -0,0 +1,206 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from panels_backend.models import (
+    ClinicalIndication,
+    ClinicalIndicationPanel,
+    ClinicalIndicationSuperPanel,
+    Gene,
+    Panel,
+    PanelGene,
+    PanelSuperPanel,
+    SuperPanel,
+)
+
+
+class TestGenepanel(TestCase):
+    """
+    The genepanel page is built from a fixed number of bulk queries
+    """
+
+    def setUp(self) -> None:
+        self.client.force_login(
+            User.objects.create_superuser("admin", password="admin")
+        )
+        self.genes = [
+            Gene.objects.create(hgnc_id=f"HGNC:{i}", gene_symbol=f"G{i}")
+            for i in range(4)
+        ]
+
+    def _panel(self, name: str, genes: list[Gene]) -> Panel:
+        panel = Panel.objects.create(
+            external_id=name,
+            panel_name=name,
+            panel_version="00001.00000",
+            panel_source="PanelApp",
+        )
+        for gene in genes:
+            PanelGene.objects.create(panel=panel, gene=gene, active=True)
+        return panel
+
+    def _make_data(self, size: int) -> None:
+        """
+        Add clinical indications, each linked to a panel, and to a
+        superpanel with 2 child panels
+
+        :param: size, the number of clinical indications
+        """
+        for i in range(size):
+            ci = ClinicalIndication.objects.create(
+                r_code=f"R{i}", name=f"CI {i}", test_method="wgs"
+            )
+            ClinicalIndicationPanel.objects.create(
+                clinical_indication=ci,
+                panel=self._panel(f"P{i}", self.genes[:2]),
+                current=True,
+                pending=False,
+            )
+
+            superpanel = SuperPanel.objects.create(
+                external_id=f"S{i}",
+                panel_name=f"S{i}",
+                panel_version="00002.00000",
+            )
+            for j, genes in enumerate([self.genes[2:3], self.genes[3:]]):
+                PanelSuperPanel.objects.create(
+                    superpanel=superpanel,
+                    panel=self._panel(f"S{i}C{j}", genes),
+                )
+            ClinicalIndicationSuperPanel.objects.create(
+                clinical_indication=ci,
+                superpanel=superpanel,
+                current=True,
+                pending=False,
+            )
+
+    def test_genepanels(self):
+        """
+        CASE: a clinical indication linked to a panel and a superpanel
+        EXPECT: the panel with its genes, and the superpanel with its child
+        panels and their genes
+        """
+        self._make_data(1)
+
+        response = self.client.get(reverse("genepanel"))
+
+        panel, superpanel = response.context["genepanels"]
+        self.assertEqual(panel.panel_name, "P0")
+        self.assertEqual(panel.panel_version, "1.0")
+        self.assertEqual(
+            sorted(gene.hgnc for gene in panel.hgncs), ["HGNC:0", "HGNC:1"]
+        )
+
+        self.assertTrue(superpanel.superpanel)
+        self.assertEqual(
+            [child.panel_name for child in superpanel.child_panels],
+            ["S0C0", "S0C1"],
+        )
+        self.assertEqual(
+            [gene.hgnc for gene in superpanel.hgncs], ["HGNC:2", "HGNC:3"]
+        )
+
+    def test_shared_panel_genes(self):
+        """
+        CASE: a later PanelApp version of a panel shares a gene from the
+        earlier version
+        EXPECT: the later version is shown with the shared gene
+        """
+        old = self._panel("P", [])
+        PanelGene.objects.create(
+            panel=old, gene=self.genes[0], active=True, shared=True
+        )
+        new = Panel.objects.create(
+            external_id="P",
+            panel_name="P",
+            panel_version="00002.00000",
+            panel_source="PanelApp",
+        )
+        ClinicalIndicationPanel.objects.create(
+            clinical_indication=ClinicalIndication.objects.create(
+                r_code="R1", name="CI", test_method="wgs"
+            ),
+            panel=new,
+            current=True,
+            pending=False,
+        )
+
+        response = self.client.get(reverse("genepanel"))
+
+        (genepanel,) = response.context["genepanels"]
+        self.assertEqual([gene.hgnc for gene in genepanel.hgncs], ["HGNC:0"])
+
+    @mock.patch("panels_web.views.dx")
+    def test_upload_leaves_out_rna_genes(self, mock_dx):
+        """
+        CASE: a genepanel file is uploaded with an HGNC file listing one of
+        the panel genes as an RNA, and another as mitochondrially encoded
+        EXPECT: the file has every other gene, but neither of those
+        """
+        self._make_data(1)
+        mock_dx.DXProject.return_value.describe.return_value = {
+            "name": "003_project"
+        }
+        hgnc = (
+            "HGNC ID\tLocus type\tApproved name\n"
+            "HGNC:0\tgene with protein product\tgene 0\n"
+            "HGNC:1\tRNA, long non-coding\tgene 1\n"
+            "HGNC:2\tgene with protein product\t"
+            "mitochondrially encoded gene 2\n"
+            "HGNC:3\tgene with protein product\tgene 3\n"
+        )
+
+        response = self.client.post(
+            reverse("genepanel"),
+            {
+                "project_id": "project-1",
+                "dnanexus_token": "token",
+                "hgnc_upload": SimpleUploadedFile("hgnc.tsv", hgnc.encode()),
+            },
+        )
+
+        self.assertTrue(response.context["success"])
+        file = mock_dx.new_dxfile.return_value.__enter__.return_value
+        rows = [call.args[0].split("\t") for call in file.write.call_args_list]
+        self.assertEqual(
+            [row[2].strip() for row in rows], ["HGNC:0", "HGNC:3"]
+        )
+
+    def test_pending_warnings(self):
+        """
+        CASE: a pending panel gene
+        EXPECT: a warning on the page
+        """
+        self._make_data(1)
+        PanelGene.objects.update(pending=True)
+
+        response = self.client.get(reverse("genepanel"))
+
+        self.assertEqual(
+            response.context["warnings"], ["Pending Panel Gene(s) found."]
+        )
+
+    def test_query_count_does_not_grow_with_data(self):
+        """
+        CASE: the genepanel page is rendered for 2, then 10, clinical
+        indications
+        EXPECT: both take the same number of queries
+        """
+        counts = []
+        for size in [2, 10]:
+            with transaction.atomic():
+                self._make_data(size)
+
+                with CaptureQueriesContext(connection) as ctx:
+                    response = self.client.get(reverse("genepanel"))
+
+                self.assertEqual(len(response.context["genepanels"]), size * 2)
+                counts.append(len(ctx.captured_queries))
+                transaction.set_rollback(True)
+
+        self.assertEqual(counts[0], counts[1])
@@ -0,0 +1,274 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from panels_backend.models import Gene, Panel, PanelGene
+from panels_backend.management.commands.utils import sortable_version
+
+
+class TestGeneSearch(TestCase):
+    """
+    The gene api searches genes by HGNC ID, symbol and alias, a page at a
+    time
+    """
+
+    def setUp(self) -> None:
+        Gene.objects.bulk_create(
+            [
+                Gene(
+                    hgnc_id="HGNC:1100",
+                    gene_symbol="BRCA1",
+                    alias_symbols=None,
+                ),
+                Gene(
+                    hgnc_id="HGNC:1101",
+                    gene_symbol="BRCA2",
+                    alias_symbols="FANCD1",
+                ),
+                Gene(
+                    hgnc_id="HGNC:26144",
+                    gene_symbol="PALB2",
+                    alias_symbols="FANCN",
+                ),
+                Gene(
+                    hgnc_id="HGNC:20473",
+                    gene_symbol="BRIP1",
+                    alias_symbols="FANCJ,BACH1",
+                ),
+                Gene(
+                    hgnc_id="HGNC:1",
+                    gene_symbol="ABRCA",
+                    alias_symbols=None,
+                ),
+            ]
+        )
+
+    def _search(self, **params) -> dict:
+        response = self.client.get(reverse("api_genes"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_prefix_matches_before_substring(self):
+        """
+        CASE: genes are searched for "brca"
+        EXPECT: case-insensitive matches, prefix matches on the symbol first
+        """
+        result = self._search(q="brca")
+
+        self.assertEqual(
+            [gene["gene_symbol"] for gene in result["data"]],
+            ["BRCA1", "BRCA2", "ABRCA"],
+        )
+        self.assertIsNone(result["next"])
+
+    def test_exact_match_first(self):
+        """
+        CASE: genes are searched for an exact HGNC ID which is also a prefix
+        of others
+        EXPECT: the exact match comes first
+        """
+        result = self._search(q="hgnc:1")
+
+        self.assertEqual(result["data"][0]["hgnc_id"], "HGNC:1")
+        self.assertEqual(len(result["data"]), 3)
+
+    def test_alias_search(self):
+        """
+        CASE: genes are searched for an alias
+        EXPECT: the genes with that alias
+        """
+        result = self._search(q="fanc")
+
+        self.assertEqual(
+            sorted(gene["gene_symbol"] for gene in result["data"]),
+            ["BRCA2", "BRIP1", "PALB2"],
+        )
+
+    def test_cursor_pagination(self):
+        """
+        CASE: every gene is fetched 2 at a time, following the cursor
+        EXPECT: each gene is returned once, in the same order as one page
+        """
+        whole = [gene["id"] for gene in self._search(q="")["data"]]
+
+        paged = []
+        cursor = None
+        while True:
+            params = {"limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            result = self._search(**params)
+            paged.extend(gene["id"] for gene in result["data"])
+            cursor = result["next"]
+            if not cursor:
+                break
+
+        self.assertEqual(paged, whole)
+        self.assertEqual(len(paged), 5)
+
+    def test_cursor_across_ranks(self):
+        """
+        CASE: "brca" results are fetched one at a time
+        EXPECT: the pages follow on from prefix to substring matches
+        """
+        symbols = []
+        cursor = None
+        for _ in range(3):
+            params = {"q": "brca", "limit": 1}
+            if cursor:
+                params["cursor"] = cursor
+            result = self._search(**params)
+            symbols.extend(gene["gene_symbol"] for gene in result["data"])
+            cursor = result["next"]
+
+        self.assertEqual(symbols, ["BRCA1", "BRCA2", "ABRCA"])
+        self.assertIsNone(cursor)
+
+    def test_limit_capped(self):
+        """
+        CASE: more than the maximum limit is asked for
+        EXPECT: at most 100 genes are returned
+        """
+        Gene.objects.bulk_create(
+            [Gene(hgnc_id=f"HGNC:9{i:04}") for i in range(150)]
+        )
+
+        result = self._search(limit=1000)
+
+        self.assertEqual(len(result["data"]), 100)
+        self.assertIsNotNone(result["next"])
+
+    def test_bad_parameters(self):
+        """
+        CASE: the limit or cursor is malformed
+        EXPECT: a 400 response
+        """
+        for params in [{"limit": "many"}, {"cursor": "nonsense"}]:
+            response = self.client.get(reverse("api_genes"), params)
+            self.assertEqual(response.status_code, 400)
+
+    def test_gene_table(self):
+        """
+        CASE: the index gene table is searched for "fanc"
+        EXPECT: a DataTables page of the matching genes
+        """
+        response = self.client.get(
+            reverse("api_gene_table"),
+            {"draw": 1, "start": 0, "length": 10, "search[value]": "fanc"},
+        )
+        result = response.json()
+
+        self.assertEqual(result["recordsTotal"], 5)
+        self.assertEqual(result["recordsFiltered"], 3)
+        self.assertEqual(
+            [row[0] for row in result["data"]],
+            ["HGNC:1101", "HGNC:20473", "HGNC:26144"],
+        )
+
+
+class TestAddPanelGenes(TestCase):
+    """
+    The add panel page no longer renders every gene
+    """
+
+    def setUp(self) -> None:
+        self.user = User.objects.create_superuser("admin", password="admin")
+        self.client.force_login(self.user)
+        self.genes = Gene.objects.bulk_create(
+            [
+                Gene(hgnc_id=f"HGNC:{i}", gene_symbol=f"GENE{i}")
+                for i in range(5)
+            ]
+        )
+
+    def test_get_renders_no_genes(self):
+        """
+        CASE: the add panel page is loaded
+        EXPECT: no genes are rendered - they're searched for instead
+        """
+        response = self.client.get(reverse("panel_add"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, "GENE1")
+
+    def test_post_links_selected_genes(self):
+        """
+        CASE: a panel is submitted with 2 genes picked
+        EXPECT: the panel is made with those genes
+        """
+        response = self.client.post(
+            reverse("panel_add"),
+            {
+                "panel_name": "New panel",
+                "panel_version": "1",
+                "genes": [self.genes[0].id, self.genes[3].id],
+            },
+        )
+
+        panel = Panel.objects.get(panel_name="New panel")
+        self.assertRedirects(
+            response,
+            reverse("panel", args=[panel.id]),
+            fetch_redirect_response=False,
+        )
+        self.assertEqual(
+            sorted(
+                PanelGene.objects.filter(panel=panel).values_list(
+                    "gene__gene_symbol", flat=True
+                )
+            ),
+            ["GENE0", "GENE3"],
+        )
+
+
+class TestGenePage(TestCase):
+    """
+    The gene page lists each panel version the gene is linked to
+    """
+
+    def setUp(self) -> None:
+        self.gene = Gene.objects.create(hgnc_id="HGNC:1", gene_symbol="G1")
+        self.versions = [
+            Panel.objects.create(
+                external_id="1",
+                panel_name="Panel one",
+                panel_source="PanelApp",
+                panel_version=sortable_version(version),
+            )
+            for version in ("1.0", "1.1", "1.2")
+        ]
+
+    def test_shared_link_listed_for_each_version(self):
+        """
+        CASE: a link stored on version 1.0 is shared until 1.2, and a custom
+        panel has an inactive link
+        EXPECT: versions 1.0 and 1.1 are listed as active, and the custom
+        panel as inactive
+        """
+        PanelGene.objects.create(
+            panel=self.versions[0],
+            gene=self.gene,
+            active=True,
+            shared=True,
+            valid_until=self.versions[2].panel_version,
+        )
+        custom = Panel.objects.create(panel_name="Custom", custom=True)
+        PanelGene.objects.create(panel=custom, gene=self.gene, active=False)
+
+        response = self.client.get(reverse("gene", args=[self.gene.id]))
+
+        self.assertEqual(
+            [
+                (
+                    panel["panel_id"],
+                    panel["panel_id__panel_version"],
+                    panel["active"],
+                )
+                for panel in response.context["panels"]
+            ],
+            [
+                (self.versions[0].id, "1.0", True),
+                (self.versions[1].id, "1.1", True),
+                (custom.id, None, False),
+            ],
+        )
@@ -0,0 +1,103 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from panels_backend.models import (
+    Gene,
+    ReferenceGenome,
+    Transcript,
+    TranscriptRelease,
+    TranscriptReleaseTranscript,
+    TranscriptSource,
+)
+from panels_backend.management.commands._g2t import LocalDirectorySink
+
+
+@mock.patch("panels_web.views.dx")
+class TestGeneTranscriptsExport(TestCase):
+    """
+    The g2t export streams rows into the DNAnexus sink - a local directory
+    stands in for DNAnexus here
+    """
+
+    def setUp(self) -> None:
+        self.client.force_login(
+            User.objects.create_superuser("admin", password="admin")
+        )
+        self.directory = tempfile.TemporaryDirectory()
+
+        genome = ReferenceGenome.objects.create(name="GRCh38")
+        releases = [
+            TranscriptRelease.objects.create(
+                source=TranscriptSource.objects.create(source=source),
+                release="1.0",
+                reference_genome=genome,
+            )
+            for source in ["HGMD", "MANE Select", "MANE Plus Clinical"]
+        ]
+        gene = Gene.objects.create(hgnc_id="HGNC:1")
+        for i, clinical in enumerate([True, False]):
+            TranscriptReleaseTranscript.objects.create(
+                transcript=Transcript.objects.create(
+                    transcript=f"NM_{i}.1", gene=gene, reference_genome=genome
+                ),
+                release=releases[1],
+                default_clinical=clinical,
+            )
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def _post(self, reference_genome: str):
+        with mock.patch(
+            "panels_web.views.DNAnexusSink",
+            return_value=LocalDirectorySink(self.directory.name),
+        ) as sink:
+            response = self.client.post(
+                reverse("genetranscripts"),
+                {
+                    "project_id": "project-1",
+                    "dnanexus_token": "token",
+                    "reference_genome": reference_genome,
+                },
+            )
+        return response, sink
+
+    def test_export(self, mock_dx):
+        """
+        CASE: a g2t file is exported for GRCh38
+        EXPECT: the sink is made for the project, and gets every transcript
+        """
+        mock_dx.DXProject.return_value.describe.return_value = {
+            "name": "003_project"
+        }
+
+        response, sink = self._post("GRCh38")
+
+        self.assertTrue(response.context["success"])
+        sink.assert_called_once_with("project-1")
+
+        (name,) = os.listdir(self.directory.name)
+        self.assertTrue(name.endswith("_g2t.tsv"))
+        with open(os.path.join(self.directory.name, name)) as f:
+            self.assertEqual(
+                f.read(), "HGNC:1\tNM_0.1\tTrue\nHGNC:1\tNM_1.1\tFalse\n"
+            )
+
+    def test_missing_releases(self, mock_dx):
+        """
+        CASE: a g2t file is exported for a genome with no releases
+        EXPECT: an error, and nothing is written
+        """
+        mock_dx.DXProject.return_value.describe.return_value = {
+            "name": "003_project"
+        }
+
+        response, _ = self._post("GRCh37")
+
+        self.assertIn("GRCh37", str(response.context["error"]))
+        self.assertEqual(os.listdir(self.directory.name), [])
@@ -0,0 +1,215 @@
+import datetime as dt
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from panels_backend.models import (
+    ClinicalIndication,
+    ClinicalIndicationPanel,
+    ClinicalIndicationPanelHistory,
+    Gene,
+    HistoryEvent,
+    Panel,
+    PanelGene,
+    PanelGeneHistory,
+)
+from panels_backend.management.commands.history import History
+from panels_web import views
+
+
+class TestHistory(TestCase):
+    """
+    The history page shows one page of rows at a time, newest first,
+    filtered in the database
+    """
+
+    def setUp(self) -> None:
+        self.user = User.objects.create_user("alice", password="alice")
+        self.ci = ClinicalIndication.objects.create(
+            r_code="R1", name="CI 1", test_method="wgs"
+        )
+        self.other_ci = ClinicalIndication.objects.create(
+            r_code="R2", name="CI 2", test_method="wgs"
+        )
+        self.panel = Panel.objects.create(
+            panel_name="panel", panel_version="1.0"
+        )
+        self.cip = ClinicalIndicationPanel.objects.create(
+            clinical_indication=self.ci, panel=self.panel, current=True
+        )
+        self.other_cip = ClinicalIndicationPanel.objects.create(
+            clinical_indication=self.other_ci, panel=self.panel, current=True
+        )
+        self.day = timezone.make_aware(dt.datetime(2024, 1, 10, 12))
+
+    def _cip_history(self, count: int, **fields) -> list[int]:
+        """
+        Add CI-panel history rows, one day apart, going back from self.day
+
+        :param: count, the number of rows
+        :param: fields, the fields of each row
+        :return: the IDs of the rows, newest first
+        """
+        fields.setdefault("clinical_indication_panel", self.cip)
+        fields.setdefault("note", History.clinical_indication_panel_created())
+        fields.setdefault("event_type", fields["note"].event_type)
+
+        ids = []
+        for i in range(count):
+            history = ClinicalIndicationPanelHistory.objects.create(**fields)
+            ClinicalIndicationPanelHistory.objects.filter(
+                id=history.id
+            ).update(created=self.day - dt.timedelta(days=i))
+            ids.append(history.id)
+
+        return ids
+
+    def _ids(self, response) -> list[int]:
+        return [row["id"] for row in response.context["data"]]
+
+    def test_pages_follow_cursor(self):
+        """
+        CASE: there are more history rows than fit in a page, some created
+        at the same time
+        EXPECT: following the older links shows every row once, newest
+        first, and the last page has no older link
+        """
+        ids = self._cip_history(5)
+        # rows created at the same time are ordered by ID
+        tied = ClinicalIndicationPanelHistory.objects.create(
+            clinical_indication_panel=self.cip, note="tied"
+        )
+        ClinicalIndicationPanelHistory.objects.filter(id=tied.id).update(
+            created=self.day
+        )
+        expected = [tied.id] + ids
+
+        seen = []
+        url = reverse("history")
+        with mock.patch.object(views, "HISTORY_PAGE_SIZE", 2):
+            while url:
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                seen.extend(self._ids(response))
+                url = response.context["next_url"]
+
+        self.assertEqual(seen, expected)
+
+    def test_filter_by_action(self):
+        """
+        CASE: history of several event types, filtered to two of them
+        EXPECT: only rows of those event types are shown
+        """
+        created = self._cip_history(1)
+        flagged = self._cip_history(
+            1, note=History.flag_clinical_indication_panel("reason")
+        )
+        self._cip_history(
+            1, note=History.clinical_indication_panel_approved(self.cip.id)
+        )
+
+        response = self.client.get(
+            reverse("history"),
+            {"action": [HistoryEvent.CREATED, HistoryEvent.FLAGGED]},
+        )
+
+        self.assertEqual(
+            sorted(self._ids(response)), sorted(created + flagged)
+        )
+
+    def test_filter_by_user_date_and_entity(self):
+        """
+        CASE: history by different users, dates and CIs
+        EXPECT: each filter narrows the rows shown
+        """
+        by_alice = self._cip_history(3, user=self.user)
+        self._cip_history(1)
+        other_ci = self._cip_history(
+            1, clinical_indication_panel=self.other_cip
+        )
+
+        response = self.client.get(reverse("history"), {"user": "alice"})
+        self.assertEqual(self._ids(response), by_alice)
+
+        # by_alice[1] is the only row of alice's a day before self.day
+        response = self.client.get(
+            reverse("history"),
+            {"user": "alice", "from": "2024-01-09", "to": "2024-01-09"},
+        )
+        self.assertEqual(self._ids(response), [by_alice[1]])
+
+        response = self.client.get(reverse("history"), {"r_code": "R2"})
+        self.assertEqual(self._ids(response), other_ci)
+
+    def test_panel_gene_history_by_panel(self):
+        """
+        CASE: panel-gene history filtered by a panel version, where a link
+        is shared from an earlier version
+        EXPECT: history of the shared link is shown for the later version
+        """
+        gene = Gene.objects.create(hgnc_id="HGNC:1", gene_symbol="G1")
+        versions = [
+            Panel.objects.create(
+                external_id="1",
+                panel_name="panel",
+                panel_version=version,
+                panel_source="PanelApp",
+            )
+            for version in ("00001.00000", "00002.00000")
+        ]
+        link = PanelGene.objects.create(
+            panel=versions[0], gene=gene, active=True, shared=True
+        )
+        history = PanelGeneHistory.objects.create(
+            panel_gene=link, note=History.panel_gene_created()
+        )
+
+        response = self.client.get(
+            reverse("history"),
+            {"table": "panel-gene", "panel": versions[1].id},
+        )
+
+        self.assertEqual(self._ids(response), [history.id])
+
+    def test_invalid_filters(self):
+        """
+        CASE: an unknown table or action, a bad date, panel ID or cursor
+        EXPECT: a 400 response
+        """
+        for params in (
+            {"table": "nonsense"},
+            {"action": "nonsense"},
+            {"from": "2024-13-01"},
+            {"panel": "abc"},
+            {"cursor": "nonsense"},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get(reverse("history"), params)
+                self.assertEqual(response.status_code, 400)
+
+    def test_query_count_does_not_grow(self):
+        """
+        CASE: a page of 10 and then 100 history rows is shown
+        EXPECT: both take the same number of queries
+        """
+        counts = []
+
+        for size in (10, 100):
+            with transaction.atomic():
+                self._cip_history(size, user=self.user)
+
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(
+                        reverse("history"), {"action": HistoryEvent.CREATED}
+                    )
+
+                self.assertEqual(len(response.context["data"]), min(size, 50))
+                counts.append(len(queries))
+                transaction.set_rollback(True)
+
+        self.assertEqual(counts[0], counts[1])
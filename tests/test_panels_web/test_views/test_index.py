@@ -0,0 +1,147 @@
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from panels_backend.models import (
+    ClinicalIndication,
+    ClinicalIndicationPanel,
+    ClinicalIndicationSuperPanel,
+    CiPanelTdRelease,
+    CiSuperpanelTdRelease,
+    Panel,
+    ReferenceGenome,
+    SuperPanel,
+    TestDirectoryRelease,
+    TranscriptFile,
+    TranscriptRelease,
+    TranscriptReleaseTranscriptFile,
+    TranscriptSource,
+)
+
+
+class TestIndexQueryCount(TestCase):
+    """
+    The index page is built with a fixed number of queries, however many
+    clinical indications, links and releases there are
+    """
+
+    def setUp(self) -> None:
+        self.td_releases = [
+            TestDirectoryRelease.objects.create(
+                release=release,
+                td_source="td_source",
+                config_source="config_source",
+                td_date="date",
+            )
+            for release in ["4.0", "10.0"]
+        ]
+        self.source = TranscriptSource.objects.create(source="MANE Select")
+        self.genome = ReferenceGenome.objects.create(name="GRCh38")
+
+    def _make_data(self, size: int) -> None:
+        """
+        Add clinical indications, each linked to a panel and a superpanel in
+        both test directory releases, and transcript releases with 2 files
+        each
+
+        :param: size, the number of clinical indications and transcript
+        releases to add
+        """
+        for i in range(size):
+            ci = ClinicalIndication.objects.create(
+                r_code=f"R{i}", name=f"CI {i}", test_method="wgs"
+            )
+            panel = Panel.objects.create(
+                external_id=str(i),
+                panel_name=f"Panel {i}",
+                panel_version="1.0",
+            )
+            superpanel = SuperPanel.objects.create(
+                external_id=str(1000 + i),
+                panel_name=f"SuperPanel {i}",
+                panel_version="1.0",
+            )
+            cip = ClinicalIndicationPanel.objects.create(
+                clinical_indication=ci, panel=panel, current=True
+            )
+            cisp = ClinicalIndicationSuperPanel.objects.create(
+                clinical_indication=ci, superpanel=superpanel, current=True
+            )
+            for td_release in self.td_releases:
+                CiPanelTdRelease.objects.create(
+                    ci_panel=cip, td_release=td_release
+                )
+                CiSuperpanelTdRelease.objects.create(
+                    ci_superpanel=cisp, td_release=td_release
+                )
+
+            release = TranscriptRelease.objects.create(
+                source=self.source,
+                release=f"1.{i}",
+                reference_genome=self.genome,
+            )
+            for file_type in ["g2refseq", "markname"]:
+                TranscriptReleaseTranscriptFile.objects.create(
+                    transcript_release=release,
+                    transcript_file=TranscriptFile.objects.create(
+                        file_id=f"file-{i}-{file_type}", file_type=file_type
+                    ),
+                )
+
+    def _count_queries(self, size: int) -> int:
+        """
+        Render the index page with a given amount of data, rolling the data
+        back afterwards
+
+        :param: size, the amount of data to add
+        :return: the number of queries the page took
+        """
+        with transaction.atomic():
+            self._make_data(size)
+
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(reverse("index"))
+
+            self.assertEqual(response.status_code, 200)
+            transaction.set_rollback(True)
+
+        return len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_data(self):
+        """
+        CASE: the index page is rendered with 2, then 20, clinical
+        indications, links and transcript releases
+        EXPECT: both take the same number of queries
+        """
+        self.assertEqual(self._count_queries(2), self._count_queries(20))
+
+    def test_latest_td_release_shown_for_each_link(self):
+        """
+        CASE: links are in test directory releases 4.0 and 10.0
+        EXPECT: each link shows 10.0, the latest release by version
+        """
+        self._make_data(2)
+
+        response = self.client.get(reverse("index"))
+
+        self.assertEqual(
+            [row[3] for row in response.context["cip_table"]["data"]],
+            ["10.0"] * 4,
+        )
+
+    def test_transcript_release_files(self):
+        """
+        CASE: each transcript release has 2 files
+        EXPECT: each release is shown with its own files
+        """
+        self._make_data(2)
+
+        response = self.client.get(reverse("index"))
+
+        for ts in response.context["transcript_sources"]:
+            i = ts["release"].split(".")[1]
+            self.assertEqual(
+                sorted(f["transcript_file__file_id"] for f in ts["files"]),
+                [f"file-{i}-g2refseq", f"file-{i}-markname"],
+            )
@@ -0,0 +1,222 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from panels_backend.models import (
+    ClinicalIndication,
+    ClinicalIndicationPanel,
+    ClinicalIndicationSuperPanel,
+    CiPanelTdRelease,
+    Panel,
+    SuperPanel,
+    TestDirectoryRelease,
+)
+
+
+class TestIndexTables(TestCase):
+    """
+    The clinical indication, panel and clinical indication-panel tables on
+    the index page are paged, searched and ordered on the server
+    """
+
+    def setUp(self) -> None:
+        self.cis = [
+            ClinicalIndication.objects.create(
+                r_code=f"R{i:02}", name=f"Indication {i:02}", test_method="wgs"
+            )
+            for i in range(25)
+        ]
+        self.panels = [
+            Panel.objects.create(
+                external_id=str(i),
+                panel_name=f"Panel {i:02}",
+                panel_version="00001.00002",
+            )
+            for i in range(15)
+        ]
+        self.superpanel = SuperPanel.objects.create(
+            external_id="500",
+            panel_name="Cardiac superpanel",
+            panel_version="00003.00000",
+        )
+
+        self.td_releases = {
+            release: TestDirectoryRelease.objects.create(
+                release=release,
+                td_source="td_source",
+                config_source="config_source",
+                td_date="date",
+            )
+            for release in ["4.0", "10.0"]
+        }
+
+        self.cip = ClinicalIndicationPanel.objects.create(
+            clinical_indication=self.cis[0],
+            panel=self.panels[0],
+            current=True,
+            pending=False,
+        )
+        CiPanelTdRelease.objects.create(
+            ci_panel=self.cip, td_release=self.td_releases["10.0"]
+        )
+
+        self.old_cip = ClinicalIndicationPanel.objects.create(
+            clinical_indication=self.cis[1],
+            panel=self.panels[1],
+            current=True,
+            pending=True,
+        )
+        CiPanelTdRelease.objects.create(
+            ci_panel=self.old_cip, td_release=self.td_releases["4.0"]
+        )
+
+        self.cisp = ClinicalIndicationSuperPanel.objects.create(
+            clinical_indication=self.cis[2],
+            superpanel=self.superpanel,
+            current=False,
+            pending=False,
+        )
+
+    def _get(self, url_name: str, **params) -> dict:
+        response = self.client.get(reverse(url_name), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_ci_table_first_page(self):
+        """
+        CASE: the first page of 25 clinical indications is requested
+        EXPECT: 10 rows in R code order, with the total counts
+        """
+        result = self._get("api_ci_table", draw=1, start=0, length=10)
+
+        self.assertEqual(result["draw"], 1)
+        self.assertEqual(result["recordsTotal"], 25)
+        self.assertEqual(result["recordsFiltered"], 25)
+        self.assertEqual(
+            [row[0] for row in result["data"]],
+            [f"R{i:02}" for i in range(10)],
+        )
+        self.assertIn(
+            reverse("clinical_indication", args=[self.cis[0].id]),
+            result["data"][0][1],
+        )
+
+    def test_ci_table_search_and_order(self):
+        """
+        CASE: clinical indications are searched for "indication 1", in
+        descending name order, second page of 5
+        EXPECT: the search is case-insensitive, and counts reflect it
+        """
+        result = self._get(
+            "api_ci_table",
+            draw=2,
+            start=5,
+            length=5,
+            **{
+                "search[value]": "indication 1",
+                "order[0][column]": 1,
+                "order[0][dir]": "desc",
+            },
+        )
+
+        self.assertEqual(result["recordsTotal"], 25)
+        self.assertEqual(result["recordsFiltered"], 10)
+        self.assertEqual(
+            [row[0] for row in result["data"]],
+            ["R14", "R13", "R12", "R11", "R10"],
+        )
+
+    def test_page_length_capped(self):
+        """
+        CASE: DataTables asks for every row (length -1)
+        EXPECT: at most 100 rows are returned
+        """
+        for i in range(100):
+            ClinicalIndication.objects.create(
+                r_code=f"R{100 + i}", name="Extra", test_method="wgs"
+            )
+
+        result = self._get("api_ci_table", start=0, length=-1)
+
+        self.assertEqual(result["recordsFiltered"], 125)
+        self.assertEqual(len(result["data"]), 100)
+
+    def test_panel_table_includes_superpanels(self):
+        """
+        CASE: the panel table is searched for "cardiac"
+        EXPECT: only the superpanel, linked and badged, with its version
+        normalised
+        """
+        result = self._get("api_panel_table", **{"search[value]": "cardiac"})
+
+        self.assertEqual(result["recordsTotal"], 16)
+        self.assertEqual(result["recordsFiltered"], 1)
+
+        external_id, name, version = result["data"][0]
+        self.assertEqual(external_id, "500")
+        self.assertIn(reverse("superpanel", args=[self.superpanel.id]), name)
+        self.assertIn("SuperPanel", name)
+        self.assertEqual(version, "3.0")
+
+    def test_cip_table_rows(self):
+        """
+        CASE: the CI-panel link table, ordered by TD release descending
+        EXPECT: CI-panel and CI-superpanel links with their latest TD
+        release, ordered by release version rather than as text, with their
+        status
+        """
+        result = self._get(
+            "api_cip_table",
+            **{"order[0][column]": 3, "order[0][dir]": "desc"},
+        )
+
+        self.assertEqual(result["recordsTotal"], 3)
+        self.assertEqual(
+            [(row[3], row[4]) for row in result["data"]],
+            [
+                ("10.0", '<span class="badge text-bg-success">Active</span>'),
+                ("4.0", '<span class="badge text-bg-warning">Pending</span>'),
+                ("None", '<span class="badge text-bg-danger">Inactive</span>'),
+            ],
+        )
+        self.assertIn(
+            reverse("clinical_indication_superpanel", args=[self.cisp.id]),
+            result["data"][2][0],
+        )
+
+    def test_cip_table_search(self):
+        """
+        CASE: the CI-panel link table is searched by panel name
+        EXPECT: only the matching link
+        """
+        result = self._get("api_cip_table", **{"search[value]": "panel 01"})
+
+        self.assertEqual(result["recordsFiltered"], 1)
+        self.assertIn(
+            reverse("clinical_indication_panel", args=[self.old_cip.id]),
+            result["data"][0][0],
+        )
+
+    def test_names_escaped(self):
+        """
+        CASE: a clinical indication name contains HTML
+        EXPECT: it's escaped in the table cell
+        """
+        ClinicalIndication.objects.create(
+            r_code="R00", name="<b>bold</b>", test_method="wgs"
+        )
+
+        result = self._get("api_ci_table", **{"search[value]": "bold"})
+
+        self.assertIn("&lt;b&gt;bold&lt;/b&gt;", result["data"][0][1])
+
+    def test_index_renders_first_page_only(self):
+        """
+        CASE: the index page is rendered with 25 clinical indications
+        EXPECT: only the first 10 are in the page, and the total is passed
+        to DataTables
+        """
+        response = self.client.get(reverse("index"))
+
+        self.assertEqual(len(response.context["ci_table"]["data"]), 10)
+        self.assertContains(response, "deferLoading: [25, 25]")
+        self.assertNotContains(response, "Indication 24")
@@ -0,0 +1,291 @@
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from panels_backend.models import (
+    ClinicalIndication,
+    ClinicalIndicationPanel,
+    ClinicalIndicationPanelHistory,
+    ClinicalIndicationSuperPanel,
+    ClinicalIndicationSuperPanelHistory,
+    ClinicalIndicationTestMethodHistory,
+    Gene,
+    Panel,
+    PanelGene,
+    PanelGeneHistory,
+    SuperPanel,
+)
+from panels_backend.management.commands.history import History
+from panels_backend.management.commands.utils import sortable_version
+
+
+class TestReview(TestCase):
+    """
+    The review page is built from a fixed number of queries, and many
+    pending links can be approved or reverted at once
+    """
+
+    def setUp(self) -> None:
+        self.user = User.objects.create_superuser("admin", password="admin")
+        self.client.force_login(self.user)
+        self.panel = Panel.objects.create(
+            panel_name="panel", panel_version="1.0"
+        )
+        self.superpanel = SuperPanel.objects.create(
+            panel_name="superpanel", panel_version="1.0"
+        )
+
+    def _make_data(self, size: int) -> dict:
+        """
+        Add pending clinical indications, CI-panel links, CI-superpanel
+        links and panel genes, each with some history
+
+        :param: size, the number of each
+        :return: a dict of the pending links of each kind
+        """
+        links = {"cips": [], "cisps": [], "panel_genes": []}
+
+        for i in range(size):
+            ci = ClinicalIndication.objects.create(
+                r_code=f"R{i}", name=f"CI {i}", test_method="wgs", pending=True
+            )
+            for note in ("old method", f"new method {i}"):
+                ClinicalIndicationTestMethodHistory.objects.create(
+                    clinical_indication=ci, note=note
+                )
+
+            links["cips"].append(
+                ClinicalIndicationPanel.objects.create(
+                    clinical_indication=ci,
+                    panel=self.panel,
+                    current=True,
+                    pending=True,
+                )
+            )
+            links["cisps"].append(
+                ClinicalIndicationSuperPanel.objects.create(
+                    clinical_indication=ci,
+                    superpanel=self.superpanel,
+                    current=False,
+                    pending=True,
+                )
+            )
+
+            gene = Gene.objects.create(hgnc_id=f"HGNC:{i}")
+            panel_gene = PanelGene.objects.create(
+                panel=self.panel, gene=gene, active=True, pending=True
+            )
+            for note in ("old reason", f"reason {i}"):
+                PanelGeneHistory.objects.create(
+                    panel_gene=panel_gene, note=note
+                )
+            links["panel_genes"].append(panel_gene)
+
+        return links
+
+    def test_reasons_from_latest_history(self):
+        """
+        CASE: pending CIs and panel genes, some with history and some without
+        EXPECT: each shows its latest history note, or the default reason
+        """
+        self._make_data(2)
+        new_ci = ClinicalIndication.objects.create(
+            r_code="R9", name="new", test_method="wgs", pending=True
+        )
+        new_panel_gene = PanelGene.objects.create(
+            panel=self.panel,
+            gene=Gene.objects.create(hgnc_id="HGNC:9"),
+            active=True,
+            pending=True,
+        )
+
+        response = self.client.get(reverse("review"))
+
+        reasons = {ci.id: ci.reason for ci in response.context["cis"]}
+        self.assertEqual(reasons[new_ci.id], "NEW")
+        self.assertEqual(
+            sorted(reasons.values()), ["NEW", "new method 0", "new method 1"]
+        )
+
+        pg_reasons = {
+            pg["id"]: pg["reason"] for pg in response.context["panel_gene"]
+        }
+        self.assertEqual(pg_reasons[new_panel_gene.id], "Reason not found")
+        self.assertEqual(
+            sorted(pg_reasons.values()),
+            ["Reason not found", "reason 0", "reason 1"],
+        )
+
+    def test_shared_panel_gene_versions(self):
+        """
+        CASE: a pending link is shared by two versions of a PanelApp panel
+        EXPECT: the review page lists both versions, and says the decision
+        applies to both
+        """
+        versions = [
+            Panel.objects.create(
+                external_id="1",
+                panel_name="PanelApp panel",
+                panel_source="PanelApp",
+                panel_version=sortable_version(version),
+            )
+            for version in ("1.0", "1.1")
+        ]
+        PanelGene.objects.create(
+            panel=versions[0],
+            gene=Gene.objects.create(hgnc_id="HGNC:1"),
+            active=True,
+            pending=True,
+            shared=True,
+        )
+
+        response = self.client.get(reverse("review"))
+
+        (panel_gene,) = response.context["panel_gene"]
+        self.assertEqual(panel_gene["versions"], "1.0 to 1.1")
+        self.assertEqual(panel_gene["version_count"], 2)
+        self.assertContains(response, "decision applies to all 2 versions")
+
+    def test_query_count_does_not_grow(self):
+        """
+        CASE: the page is shown with 2 and then 20 of each pending item
+        EXPECT: both take the same number of queries
+        """
+        counts = []
+
+        for size in (2, 20):
+            with transaction.atomic():
+                self._make_data(size)
+
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(reverse("review"))
+
+                self.assertEqual(len(response.context["cips"]), size)
+                counts.append(len(queries))
+                transaction.set_rollback(True)
+
+        self.assertEqual(counts[0], counts[1])
+
+    def _bulk(self, action: str, links: dict):
+        return self.client.post(
+            reverse("review"),
+            {
+                "action": action,
+                "cip_ids": [cip.id for cip in links["cips"]],
+                "cisp_ids": [cisp.id for cisp in links["cisps"]],
+                "pg_ids": [pg.id for pg in links["panel_genes"]],
+            },
+        )
+
+    def test_bulk_approve(self):
+        """
+        CASE: every pending link is ticked and approved
+        EXPECT: none are pending, their current / active values are kept,
+        and each has its approval in history
+        """
+        links = self._make_data(3)
+
+        response = self._bulk("bulk_approve", links)
+
+        self.assertRedirects(response, reverse("review"))
+        self.assertFalse(
+            ClinicalIndicationPanel.objects.filter(pending=True).exists()
+        )
+        self.assertFalse(
+            ClinicalIndicationSuperPanel.objects.filter(pending=True).exists()
+        )
+        self.assertFalse(PanelGene.objects.filter(pending=True).exists())
+        self.assertEqual(
+            ClinicalIndicationPanel.objects.filter(current=True).count(), 3
+        )
+        self.assertEqual(
+            ClinicalIndicationSuperPanel.objects.filter(current=False).count(),
+            3,
+        )
+
+        cip = links["cips"][0]
+        self.assertTrue(
+            ClinicalIndicationPanelHistory.objects.filter(
+                clinical_indication_panel=cip,
+                note=History.clinical_indication_panel_approved(cip.id),
+                user=self.user,
+            ).exists()
+        )
+        self.assertEqual(
+            PanelGeneHistory.objects.filter(
+                note=History.panel_gene_approved("manual review")
+            ).count(),
+            3,
+        )
+
+    def test_bulk_revert(self):
+        """
+        CASE: every pending link is ticked and reverted
+        EXPECT: none are pending, their current / active values are flipped,
+        and each has its revert in history
+        """
+        links = self._make_data(3)
+
+        self._bulk("bulk_revert", links)
+
+        self.assertEqual(
+            ClinicalIndicationPanel.objects.filter(
+                current=False, pending=False
+            ).count(),
+            3,
+        )
+        self.assertEqual(
+            ClinicalIndicationSuperPanel.objects.filter(
+                current=True, pending=False
+            ).count(),
+            3,
+        )
+        self.assertEqual(
+            PanelGene.objects.filter(active=False, pending=False).count(), 3
+        )
+
+        cisp = links["cisps"][0]
+        self.assertTrue(
+            ClinicalIndicationSuperPanelHistory.objects.filter(
+                clinical_indication_superpanel=cisp,
+                note=History.clinical_indication_superpanel_reverted(
+                    cisp.id, "current", False, True, True
+                ),
+            ).exists()
+        )
+
+    def test_bulk_skips_links_no_longer_pending(self):
+        """
+        CASE: the same revert is submitted twice
+        EXPECT: the links are only reverted once
+        """
+        links = self._make_data(2)
+
+        self._bulk("bulk_revert", links)
+        self._bulk("bulk_revert", links)
+
+        self.assertEqual(
+            ClinicalIndicationPanel.objects.filter(current=False).count(), 2
+        )
+        self.assertEqual(ClinicalIndicationPanelHistory.objects.count(), 2)
+
+    def test_bulk_query_count_does_not_grow(self):
+        """
+        CASE: 2 and then 20 of each kind of pending link are approved at once
+        EXPECT: both take the same number of queries
+        """
+        counts = []
+
+        for size in (2, 20):
+            with transaction.atomic():
+                links = self._make_data(size)
+
+                with CaptureQueriesContext(connection) as queries:
+                    self._bulk("bulk_approve", links)
+
+                counts.append(len(queries))
+                transaction.set_rollback(True)
+
+        self.assertEqual(counts[0], counts[1])
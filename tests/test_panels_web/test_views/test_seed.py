@@ -0,0 +1,74 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+
+from panels_backend.models import ClinicalIndication, TestDirectoryRelease
+
+
+class TestSeed(TestCase):
+    """
+    An uploaded test directory is previewed, and kept out of the session
+    until the import is confirmed
+    """
+
+    def setUp(self) -> None:
+        self.user = User.objects.create_superuser("admin", password="admin")
+        self.client.force_login(self.user)
+        self.td = {
+            "td_source": "td_source",
+            "config_source": "config_source",
+            "date": "date",
+            "indications": [
+                {
+                    "code": "R1",
+                    "name": "R1 name",
+                    "test_method": "wgs",
+                    "panels": [],
+                }
+            ],
+        }
+
+    def _upload(self):
+        return self.client.post(
+            reverse("seed"),
+            {
+                "version": "6",
+                "td_upload": SimpleUploadedFile(
+                    "td.json", json.dumps(self.td).encode()
+                ),
+            },
+        )
+
+    def test_upload_then_confirm(self):
+        """
+        CASE: a test directory is uploaded, then the import is confirmed
+        EXPECT: the session only names the upload, and confirming imports
+        it once
+        """
+        response = self._upload()
+
+        self.assertEqual(
+            response.context["preview"]["report"]["new_clinical_indications"],
+            [{"r_code": "R1", "name": "R1 name", "test_method": "wgs"}],
+        )
+        pending_seed = self.client.session["td_seed"]
+        self.assertNotIn("data", pending_seed)
+        self.assertNotIn("R1 name", json.dumps(pending_seed))
+        self.assertFalse(ClinicalIndication.objects.exists())
+
+        response = self.client.post(reverse("seed"), {"confirm": "1"})
+
+        self.assertIs(response.context["error"], False)
+        self.assertTrue(
+            ClinicalIndication.objects.filter(r_code="R1").exists()
+        )
+        self.assertEqual(TestDirectoryRelease.objects.count(), 1)
+
+        # the upload is gone once imported
+        response = self.client.post(reverse("seed"), {"confirm": "1"})
+
+        self.assertIn("upload it again", str(response.context["error"]))
+        self.assertEqual(TestDirectoryRelease.objects.count(), 1)
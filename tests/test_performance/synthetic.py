@@ -0,0 +1,305 @@
+"""
+A synthetic panels database for the query budget tests. Everything in it
+scales with one size parameter - the number of clinical indications, panels,
+superpanels, genes in each panel, transcripts, pending items and history
+rows - so a check run against a small and a large database shows whether
+its query count grows with the data.
+"""
+import contextlib
+import io
+from typing import Callable
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, tag
+from django.test.utils import CaptureQueriesContext
+
+from panels_backend.models import (
+    ClinicalIndication,
+    ClinicalIndicationPanel,
+    ClinicalIndicationPanelHistory,
+    ClinicalIndicationSuperPanel,
+    ClinicalIndicationTestMethodHistory,
+    CiPanelTdRelease,
+    CiSuperpanelTdRelease,
+    Gene,
+    GffRelease,
+    Panel,
+    PanelGene,
+    PanelGeneHistory,
+    PanelSuperPanel,
+    ReferenceGenome,
+    SuperPanel,
+    TestDirectoryRelease,
+    Transcript,
+    TranscriptGffRelease,
+    TranscriptRelease,
+    TranscriptReleaseTranscript,
+    TranscriptSource,
+)
+from panels_backend.management.commands.history import (
+    History,
+    record_history,
+)
+
+# the sizes every check is run at
+SMALL = 2
+LARGE = 10
+
+
+def _panel(
+    external_id: str, version: str, genes: list[Gene], shared: bool = False
+) -> Panel:
+    """
+    Make a PanelApp panel version linked to genes
+
+    :param: external_id, the PanelApp ID
+    :param: version, the panel version
+    :param: genes, the genes of the panel
+    :param: shared, whether the links are shared with later versions
+    :return: the Panel
+    """
+    panel = Panel.objects.create(
+        external_id=external_id,
+        panel_name=f"Panel {external_id}",
+        panel_version=version,
+        panel_source="PanelApp",
+    )
+    PanelGene.objects.bulk_create(
+        [
+            PanelGene(
+                panel=panel,
+                gene=gene,
+                active=True,
+                pending=False,
+                shared=shared,
+            )
+            for gene in genes
+        ]
+    )
+    return panel
+
+
+def seed_synthetic_db(size: int) -> dict:
+    """
+    Fill the database with data which scales with size:
+    - size clinical indications, each linked to the second version of a
+    PanelApp panel (sharing its genes with the first version), and to a
+    superpanel of 2 child panels, in a test directory release
+    - size + 1 genes in each panel, each gene with 2 transcripts in the
+    latest MANE Select, MANE Plus Clinical, HGMD and GFF releases
+    - size pending clinical indications, CI-panel links and panel genes,
+    each with history
+
+    :param: size, the number of each item
+    :return: a dict of objects for checks to use - "panel", "superpanel",
+    "ci", "gene", "genome", "gff_release", "releases" (the transcript
+    releases by source) and "size"
+    """
+    genome = ReferenceGenome.objects.create(name="GRCh38")
+    releases = {
+        source: TranscriptRelease.objects.create(
+            source=TranscriptSource.objects.create(source=source),
+            release="1.0",
+            reference_genome=genome,
+        )
+        for source in ["MANE Select", "MANE Plus Clinical", "HGMD"]
+    }
+    gff_release = GffRelease.objects.create(
+        ensembl_release="110", reference_genome=genome
+    )
+    td_release = TestDirectoryRelease.objects.create(
+        release="1.0", td_source="td", config_source="config", td_date="1"
+    )
+
+    genes = Gene.objects.bulk_create(
+        [
+            Gene(hgnc_id=f"HGNC:{i}", gene_symbol=f"GENE{i}")
+            for i in range(size + 1)
+        ]
+    )
+    transcripts = Transcript.objects.bulk_create(
+        [
+            Transcript(
+                transcript=f"NM_{i:05}.{version}",
+                gene=gene,
+                reference_genome=genome,
+            )
+            for i, gene in enumerate(genes)
+            for version in (1, 2)
+        ]
+    )
+    TranscriptGffRelease.objects.bulk_create(
+        [
+            TranscriptGffRelease(
+                transcript=transcript, gff_release=gff_release
+            )
+            for transcript in transcripts
+        ]
+    )
+    TranscriptReleaseTranscript.objects.bulk_create(
+        [
+            TranscriptReleaseTranscript(
+                transcript=transcript,
+                release=release,
+                default_clinical=transcript.transcript.endswith(".1"),
+            )
+            for transcript in transcripts
+            for release in releases.values()
+        ]
+    )
+
+    data = {
+        "genome": genome,
+        "gff_release": gff_release,
+        "releases": releases,
+        "gene": genes[0],
+        "size": size,
+    }
+
+    for i in range(size):
+        old_version = _panel(str(i), "00001.00000", genes, shared=True)
+        panel = _panel(str(i), "00002.00000", [])
+
+        superpanel = SuperPanel.objects.create(
+            external_id=f"S{i}",
+            panel_name=f"Superpanel {i}",
+            panel_version="1.0",
+            panel_source="PanelApp",
+        )
+        for child in range(2):
+            PanelSuperPanel.objects.create(
+                superpanel=superpanel,
+                panel=_panel(f"{i}-{child}", "1.0", genes),
+            )
+
+        ci = ClinicalIndication.objects.create(
+            r_code=f"R{i}", name=f"Indication {i}", test_method="wgs"
+        )
+        cip = ClinicalIndicationPanel.objects.create(
+            clinical_indication=ci, panel=panel, current=True, pending=False
+        )
+        CiPanelTdRelease.objects.create(ci_panel=cip, td_release=td_release)
+        cisp = ClinicalIndicationSuperPanel.objects.create(
+            clinical_indication=ci,
+            superpanel=superpanel,
+            current=True,
+            pending=False,
+        )
+        CiSuperpanelTdRelease.objects.create(
+            ci_superpanel=cisp, td_release=td_release
+        )
+        ClinicalIndicationPanelHistory.objects.bulk_create(
+            [
+                ClinicalIndicationPanelHistory(
+                    clinical_indication_panel=cip,
+                    note=note,
+                    event_type=note.event_type,
+                )
+                for note in (
+                    History.clinical_indication_panel_created(),
+                    History.td_panel_ci_autolink(td_release.release),
+                )
+            ]
+        )
+
+        # items awaiting review
+        pending_ci = ClinicalIndication.objects.create(
+            r_code=f"R{i}",
+            name=f"Renamed indication {i}",
+            test_method="wes",
+            pending=True,
+        )
+        ClinicalIndicationTestMethodHistory.objects.create(
+            clinical_indication=pending_ci,
+            note=History.clinical_indication_metadata_changed(
+                "test_method", "wgs", "wes"
+            ),
+        )
+        pending_cip = ClinicalIndicationPanel.objects.create(
+            clinical_indication=ci,
+            panel=old_version,
+            current=False,
+            pending=True,
+        )
+        record_history(
+            ClinicalIndicationPanelHistory,
+            clinical_indication_panel=pending_cip,
+            note=History.flag_clinical_indication_panel("new panel version"),
+        )
+        pending_gene = PanelGene.objects.create(
+            panel=panel,
+            gene=Gene.objects.create(hgnc_id=f"HGNC:P{i}"),
+            active=True,
+            pending=True,
+        )
+        record_history(
+            PanelGeneHistory,
+            panel_gene=pending_gene,
+            note=History.panel_gene_flagged_due_to_confidence("2"),
+        )
+
+        data.update(panel=panel, superpanel=superpanel, ci=ci)
+
+    return data
+
+
+@tag("performance")
+class QueryBudgetTestCase(TestCase):
+    """
+    Query budget checks, run on their own with
+    python manage.py test --tag performance
+
+    Each check is run against a small and a large synthetic database, and
+    must run the same number of queries against both - and no more than its
+    declared budget
+    """
+
+    def setUp(self) -> None:
+        self.user = User.objects.create_superuser("admin", password="admin")
+        self.client.force_login(self.user)
+
+    def count_queries(self, size: int, check: Callable[[dict], None]) -> int:
+        """
+        Seed a synthetic database, count the queries a check runs against
+        it, then roll it back
+
+        :param: size, the size of the synthetic database
+        :param: check, called with the dict from seed_synthetic_db
+        :return: the number of queries the check ran
+        """
+        with transaction.atomic():
+            data = seed_synthetic_db(size)
+            cache.clear()
+
+            # commands print their progress
+            with contextlib.redirect_stdout(io.StringIO()):
+                with CaptureQueriesContext(connection) as queries:
+                    check(data)
+
+            transaction.set_rollback(True)
+
+        return len(queries)
+
+    def assertQueryBudget(
+        self, check: Callable[[dict], None], budget: int
+    ) -> None:
+        """
+        Assert that a check runs the same number of queries against a small
+        and a large database, and no more than its budget
+
+        :param: check, called with the dict from seed_synthetic_db
+        :param: budget, the most queries the check may run
+        """
+        counts = [self.count_queries(size, check) for size in (SMALL, LARGE)]
+
+        self.assertEqual(
+            counts[0],
+            counts[1],
+            f"queries grew from {counts[0]} to {counts[1]} between sizes "
+            f"{SMALL} and {LARGE}",
+        )
+        self.assertLessEqual(
+            counts[0], budget, f"{counts[0]} queries, over budget of {budget}"
+        )
@@ -0,0 +1,129 @@
+import tempfile
+
+from panels_backend.management.commands.generate import (
+    Command as GenerateCommand,
+)
+from panels_backend.management.commands.panelapp import PanelClass
+from panels_backend.management.commands._g2t import (
+    LocalDirectorySink,
+    g2t_rows,
+    write_g2t,
+)
+from panels_backend.management.commands._insert_ci import (
+    insert_test_directory_data,
+)
+from panels_backend.management.commands._insert_panel import (
+    panel_insert_controller,
+)
+
+from .synthetic import QueryBudgetTestCase
+
+
+def _panelapp_panel(panel_id: str, version: str, genes: int) -> PanelClass:
+    """
+    Make a PanelApp panel as parsed from the API
+
+    :param: panel_id, the PanelApp ID
+    :param: version, the panel version
+    :param: genes, the number of genes - the first ones are already in the
+    synthetic database
+    :return: a PanelClass
+    """
+    return PanelClass(
+        id=panel_id,
+        name=f"Panel {panel_id}",
+        version=version,
+        genes=[
+            {
+                "gene_data": {
+                    "hgnc_id": f"HGNC:{gene}",
+                    "gene_name": f"gene {gene}",
+                    "gene_symbol": f"GENE{gene}",
+                    "alias": [],
+                },
+                "confidence_level": "3",
+                "mode_of_inheritance": "AD",
+                "mode_of_pathogenicity": None,
+                "penetrance": "complete",
+            }
+            for gene in range(genes)
+        ],
+    )
+
+
+class TestCommandQueryBudgets(QueryBudgetTestCase):
+    """
+    The query count of generating outputs and seeding data doesn't grow with
+    the size of the database, or of the data being seeded
+    """
+
+    def test_generate_genepanels(self):
+        self.assertQueryBudget(
+            lambda data: GenerateCommand()._generate_genepanels_results(set()),
+            9,
+        )
+
+    def test_generate_g2t(self):
+        self.assertQueryBudget(
+            lambda data: GenerateCommand()._generate_g2t_results(
+                data["genome"],
+                data["gff_release"],
+                data["releases"]["MANE Select"],
+                data["releases"]["MANE Plus Clinical"],
+                data["releases"]["HGMD"],
+            ),
+            2,
+        )
+
+    def test_write_g2t(self):
+        def check(data: dict) -> None:
+            with tempfile.TemporaryDirectory() as directory:
+                write_g2t(
+                    g2t_rows(
+                        data["genome"],
+                        [release.id for release in data["releases"].values()],
+                        data["gff_release"],
+                    ),
+                    LocalDirectorySink(directory),
+                    "g2t.tsv",
+                )
+
+        self.assertQueryBudget(check, 2)
+
+    def test_seed_test_directory(self):
+        def check(data: dict) -> None:
+            insert_test_directory_data(
+                {
+                    "td_source": "td",
+                    "config_source": "config",
+                    "date": "2",
+                    "indications": [
+                        {
+                            "code": f"R{i}",
+                            "name": f"Indication {i}",
+                            "test_method": "wgs",
+                            "panels": [str(i), f"S{i}"],
+                        }
+                        for i in range(data["size"])
+                    ],
+                },
+                "2.0",
+            )
+
+        self.assertQueryBudget(check, 16)
+
+    def test_seed_new_panelapp_panel(self):
+        self.assertQueryBudget(
+            lambda data: panel_insert_controller(
+                [_panelapp_panel("new", "1.0", data["size"] * 5)], []
+            ),
+            20,
+        )
+
+    def test_seed_new_panelapp_panel_version(self):
+        self.assertQueryBudget(
+            lambda data: panel_insert_controller(
+                [_panelapp_panel("0", "00003.00000", data["size"] * 5)], []
+            ),
+            37,
+        )
@@ -0,0 +1,94 @@
+from django.urls import reverse
+
+from .synthetic import QueryBudgetTestCase
+
+
+class TestViewQueryBudgets(QueryBudgetTestCase):
+    """
+    The query count of each web page and api endpoint doesn't grow with the
+    size of the database
+    """
+
+    def _get(self, url: str, params: dict | None = None) -> None:
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        if response.streaming:
+            b"".join(response.streaming_content)
+
+    def test_index(self):
+        self.assertQueryBudget(lambda data: self._get(reverse("index")), 16)
+
+    def test_index_tables(self):
+        for name, budget in (
+            ("api_ci_table", 3),
+            ("api_panel_table", 4),
+            ("api_cip_table", 4),
+            ("api_gene_table", 3),
+        ):
+            with self.subTest(name=name):
+                self.assertQueryBudget(
+                    lambda data: self._get(
+                        reverse(name), {"draw": 1, "search[value]": "1"}
+                    ),
+                    budget,
+                )
+
+    def test_gene_search(self):
+        self.assertQueryBudget(
+            lambda data: self._get(reverse("api_genes"), {"q": "GENE"}), 1
+        )
+
+    def test_gene_transcripts(self):
+        self.assertQueryBudget(
+            lambda data: self._get(
+                reverse("api_genetranscripts", args=["GRCh38"])
+            ),
+            6,
+        )
+
+    def test_genepanel(self):
+        self.assertQueryBudget(
+            lambda data: self._get(reverse("genepanel")), 10
+        )
+
+    def test_review(self):
+        self.assertQueryBudget(lambda data: self._get(reverse("review")), 7)
+
+    def test_history(self):
+        for table in ("clinical indication-panel", "panel-gene"):
+            with self.subTest(table=table):
+                self.assertQueryBudget(
+                    lambda data: self._get(
+                        reverse("history"), {"table": table}
+                    ),
+                    3,
+                )
+
+    def test_panel(self):
+        self.assertQueryBudget(
+            lambda data: self._get(reverse("panel", args=[data["panel"].id])),
+            5,
+        )
+
+    def test_superpanel(self):
+        self.assertQueryBudget(
+            lambda data: self._get(
+                reverse("superpanel", args=[data["superpanel"].id])
+            ),
+            5,
+        )
+
+    def test_clinical_indication(self):
+        self.assertQueryBudget(
+            lambda data: self._get(
+                reverse("clinical_indication", args=[data["ci"].id])
+            ),
+            6,
+        )
+
+    def test_gene(self):
+        self.assertQueryBudget(
+            lambda data: self._get(reverse("gene", args=[data["gene"].id])),
+            # one more to find the versions of panels with shared links
+            6,
+        )